@@ -6,8 +6,9 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from .models import AttendanceRecord, AttendanceSummary, FacialRecognitionProfile, AttendanceSettings
+from .models import AttendanceVerificationTask, ExportJob
 from .models import LeaveRequest, LeaveType, LeaveStatus
-from .models_gps import GPSTracking, WorkArea, EmployeeWorkArea, LocationAlert
+from .models_gps import GPSTracking, GPSTrackRollup, WorkArea, EmployeeWorkArea, LocationAlert, AttendanceKiosk
 from employees.models import Employee
 
 # Importar admins de seguridad con IA
@@ -187,7 +188,7 @@ class FacialRecognitionProfileAdmin(admin.ModelAdmin):
                    'total_recognitions', 'is_active', 'needs_retraining']
     list_filter = ['is_active', 'needs_retraining', 'last_recognition']
     search_fields = ['employee__first_name', 'employee__last_name', 'employee__employee_id']
-    readonly_fields = ['success_rate_display', 'face_encoding', 'created_at', 'updated_at']
+    readonly_fields = ['success_rate_display', 'face_vector_display', 'face_encoding', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Empleado', {
@@ -201,7 +202,7 @@ class FacialRecognitionProfileAdmin(admin.ModelAdmin):
             'description': '📷 Sube 2-5 imágenes del empleado. El sistema procesará automáticamente las características faciales.'
         }),
         ('Datos del Modelo (Solo Lectura)', {
-            'fields': ('face_encoding', 'reference_images'),
+            'fields': ('face_vector_display', 'face_encoding', 'reference_images'),
             'classes': ('collapse',)
         }),
         ('Estadísticas', {
@@ -224,6 +225,12 @@ class FacialRecognitionProfileAdmin(admin.ModelAdmin):
         return '-'
     success_rate_display.short_description = "Tasa de Éxito"
     
+    def face_vector_display(self, obj):
+        if obj.face_vector:
+            return f"Vector binario ({len(obj.face_vector)} bytes)"
+        return '-'
+    face_vector_display.short_description = "Vector Facial"
+    
 
     
     actions = ['reset_statistics', 'mark_for_retraining', 'process_images']
@@ -305,6 +312,30 @@ class AttendanceSettingsAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+@admin.register(AttendanceVerificationTask)
+class AttendanceVerificationTaskAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'attendance_type', 'status', 'requested_at', 'attempts', 
+                   'worker', 'processed_at']
+    list_filter = ['status', 'attendance_type', 'requested_at']
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__employee_id']
+    readonly_fields = ['employee', 'attendance_type', 'requested_at', 'latitude', 'longitude',
+                      'location_accuracy', 'device_info', 'ip_address', 'attempts', 'locked_at',
+                      'worker', 'attendance_record', 'result', 'error', 'processed_at',
+                      'created_at', 'updated_at']
+    exclude = ['facial_image']
+    date_hierarchy = 'requested_at'
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['export_type', 'requested_by', 'status', 'rows', 'attempts', 'created_at', 'processed_at']
+    list_filter = ['status', 'export_type', 'created_at']
+    search_fields = ['requested_by__username', 'filename']
+    readonly_fields = ['requested_by', 'export_type', 'params', 'attempts', 'locked_at', 'worker',
+                      'file', 'filename', 'rows', 'error', 'processed_at', 'created_at', 'updated_at']
+    date_hierarchy = 'created_at'
+
+
 # ============================================================================
 # MODELOS GPS
 # ============================================================================
@@ -318,6 +349,8 @@ class GPSTrackingAdmin(admin.ModelAdmin):
     readonly_fields = ('timestamp', 'distance_to_work_area', 'created_at', 'updated_at')
     date_hierarchy = 'timestamp'
     ordering = ('-timestamp',)
+    # Sin COUNT(*) de toda la tabla al filtrar
+    show_full_result_count = False
     
     fieldsets = (
         ('Empleado', {
@@ -346,6 +379,20 @@ class GPSTrackingAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('employee', 'work_area')
 
 
+@admin.register(GPSTrackRollup)
+class GPSTrackRollupAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'resolution', 'bucket_start', 'point_count', 'distance_meters',
+                   'within_area_count', 'work_area')
+    list_filter = ('resolution', 'bucket_start')
+    search_fields = ('employee__first_name', 'employee__last_name', 'employee__employee_id')
+    readonly_fields = [field.name for field in GPSTrackRollup._meta.fields]
+    date_hierarchy = 'bucket_start'
+    show_full_result_count = False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('employee', 'work_area')
+
+
 @admin.register(WorkArea)
 class WorkAreaAdmin(admin.ModelAdmin):
     list_display = ('name', 'area_type', 'latitude', 'longitude', 'radius_meters', 
@@ -401,6 +448,27 @@ class EmployeeWorkAreaAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('employee', 'work_area')
 
 
+@admin.register(AttendanceKiosk)
+class AttendanceKioskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'work_area', 'token_prefix', 'is_active', 'last_seen_at')
+    list_filter = ('is_active', 'work_area')
+    search_fields = ('name', 'work_area__name', 'token_prefix')
+    readonly_fields = ('token_prefix', 'last_seen_at', 'created_at', 'updated_at')
+    
+    def save_model(self, request, obj, form, change):
+        token = None
+        if not change:
+            obj.created_by = request.user
+            token = obj.set_new_token()
+        super().save_model(request, obj, form, change)
+        if token:
+            # Solo se guarda el hash: el token se muestra esta única vez
+            self.message_user(request, f"🔑 Token del kiosco (cópielo ahora, no se volverá a mostrar): {token}")
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('work_area')
+
+
 @admin.register(LocationAlert)
 class LocationAlertAdmin(admin.ModelAdmin):
     list_display = ('employee', 'alert_type', 'alert_level', 'title', 'is_resolved', 'created_at')
@@ -4,7 +4,9 @@ Admin para modelos de seguridad con IA
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from .models_security_photos import SecurityPhoto, SecurityAlert, VideoSession
+from .models_security_photos import (
+    SecurityPhoto, SecurityAlert, VideoSession, AIAnalysisJob, AIResultCacheStats,
+)
 
 
 @admin.register(SecurityPhoto)
@@ -22,7 +24,7 @@ class SecurityPhotoAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('📸 Información de la Foto', {
-            'fields': ('employee', 'photo', 'photo_preview', 'thumbnail', 'thumbnail_preview')
+            'fields': ('employee', 'photo', 'photo_preview', 'thumbnail', 'thumbnail_preview', 'preview', 'analysis_image')
         }),
         ('📍 Ubicación', {
             'fields': ('latitude', 'longitude', 'work_area', 'address', 'location_map')
@@ -145,14 +147,16 @@ class SecurityPhotoAdmin(admin.ModelAdmin):
     location_map.short_description = 'Mapa'
     
     def analyze_with_ai_action(self, request, queryset):
-        """Analizar fotos seleccionadas con IA"""
+        """Encolar el análisis con IA de las fotos seleccionadas"""
+        from .ai_queue import enqueue_photo_analysis
+        
         count = 0
         for photo in queryset:
             if not photo.ai_analyzed:
-                photo.analyze_with_ai()
+                enqueue_photo_analysis(photo, priority=AIAnalysisJob.PRIORITY_NORMAL)
                 count += 1
         
-        self.message_user(request, f'✅ {count} fotos analizadas con IA')
+        self.message_user(request, f'✅ {count} fotos encoladas para análisis con IA')
     analyze_with_ai_action.short_description = "🤖 Analizar con IA"
     
     def clear_alerts_action(self, request, queryset):
@@ -350,3 +354,29 @@ class VideoSessionAdmin(admin.ModelAdmin):
             count += 1
         self.message_user(request, f'✅ {count} sesiones finalizadas')
     end_session_action.short_description = "⏹️ Finalizar Sesiones"
+
+
+@admin.register(AIAnalysisJob)
+class AIAnalysisJobAdmin(admin.ModelAdmin):
+    """Admin para la cola de análisis de IA"""
+    
+    list_display = ('photo', 'priority', 'status', 'attempts', 'run_after', 
+                   'alerts_created', 'worker', 'processed_at')
+    list_filter = ('status', 'priority', 'created_at')
+    search_fields = ('photo__employee__first_name', 'photo__employee__last_name', 'photo__employee__employee_id')
+    readonly_fields = ('photo', 'attempts', 'locked_at', 'worker', 'alerts_created', 'error', 
+                      'processed_at', 'created_at', 'updated_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(AIResultCacheStats)
+class AIResultCacheStatsAdmin(admin.ModelAdmin):
+    """Admin para los contadores de la caché de resultados de IA"""
+    
+    list_display = ('model_key', 'hits', 'misses', 'hit_rate_display', 'updated_at')
+    readonly_fields = ('model_key', 'hits', 'misses', 'updated_at')
+    ordering = ('model_key',)
+    
+    def hit_rate_display(self, obj):
+        return f"{obj.hit_rate:.0%}"
+    hit_rate_display.short_description = 'Tasa de aciertos'
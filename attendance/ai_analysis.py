@@ -0,0 +1,231 @@
+"""
+Motor de análisis de IA concurrente para fotos de seguridad
+EURO SECURITY - AI Analysis Engine
+
+SecurityPhoto.analyze_with_ai llamaba a los cinco detectores (armas,
+vehículos, EPP, personas y Face++) uno tras otro, así que la latencia era la
+suma de las cinco llamadas remotas. El motor:
+
+- Lee la imagen una sola vez y la codifica en base64 una sola vez.
+- Lanza todos los detectores a la vez en un ThreadPoolExecutor compartido
+  (las llamadas son de red, el GIL no es un problema).
+- Usa la sesión HTTP compartida de ai_services (pool keep-alive).
+- Aplica un timeout por detector: un detector lento o caído se reporta como
+  error sin bloquear al resto.
+- Consulta antes la caché por hash perceptual (ai_cache.py) y solo lanza los
+  detectores sin resultado previo.
+
+La latencia pasa a ser la del detector más lento en lugar de la suma.
+"""
+import base64
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Detectores de Roboflow: clave en SecurityPhoto.ai_results → modelo en ROBOFLOW_MODELS
+ROBOFLOW_DETECTORS = {
+    'weapons': 'weapon_detection',
+    'vehicles': 'vehicle_detection',
+    'ppe': 'ppe_detection',
+    'persons': 'person_detection',
+}
+FACE_ATTRIBUTES = 'face_attributes'
+DETECTORS = tuple(ROBOFLOW_DETECTORS) + (FACE_ATTRIBUTES,)
+# Un arma ocupa pocos píxeles y no cambia el dHash: solo coincidencia exacta
+NO_NEAR_DUPLICATE_DETECTORS = ('weapons',)
+
+
+class AIAnalysisEngine:
+    """Ejecuta los detectores de IA en paralelo sobre una misma imagen"""
+
+    def __init__(self, roboflow=None, facepp=None, max_workers=None, use_cache=None):
+        self._roboflow = roboflow
+        self._facepp = facepp
+        self._max_workers = max_workers
+        self._use_cache = use_cache
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def roboflow(self):
+        if self._roboflow is None:
+            from .ai_services import roboflow_service
+            self._roboflow = roboflow_service
+        return self._roboflow
+
+    @property
+    def facepp(self):
+        if self._facepp is None:
+            from .ai_services import facepp_service
+            self._facepp = facepp_service
+        return self._facepp
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    max_workers = self._max_workers or getattr(settings, 'AI_ANALYSIS_MAX_WORKERS', 10)
+                    self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-analysis')
+        return self._executor
+
+    def shutdown(self):
+        """Detiene el pool de hilos (se recrea en el siguiente análisis)"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def cache_key(self, name):
+        """Clave de caché del detector (incluye la versión del modelo)"""
+        if name == FACE_ATTRIBUTES:
+            return 'facepp:detect'
+        return f"roboflow:{self.roboflow.models.get(ROBOFLOW_DETECTORS[name])}"
+
+    def _cached_results(self, image_bytes, detectors, scope=''):
+        """Resultados previos de la caché por hash perceptual (ver ai_cache.py)"""
+        from . import ai_cache
+
+        use_cache = ai_cache.is_enabled() if self._use_cache is None else self._use_cache
+        if not use_cache:
+            return None, {}
+
+        try:
+            hash_value = ai_cache.image_hash(image_bytes)
+            keys = {self.cache_key(name): name for name in detectors}
+            near_keys = [key for key, name in keys.items() if name not in NO_NEAR_DUPLICATE_DETECTORS]
+            cached = ai_cache.get_many(hash_value, list(keys), scope=scope, near_keys=near_keys)
+            return hash_value, {keys[key]: value['value'] for key, value in cached.items()}
+        except Exception as e:
+            logger.error(f"Error consultando caché de IA: {str(e)}")
+            return None, {}
+
+    def _store_results(self, hash_value, raw, scope=''):
+        from . import ai_cache
+
+        for name, result in raw.items():
+            if isinstance(result, dict) and result.get('error'):
+                continue
+            try:
+                ai_cache.store(hash_value, self.cache_key(name), {'value': result}, scope=scope)
+            except Exception as e:
+                logger.error(f"Error guardando caché de IA ({name}): {str(e)}")
+
+    def _run_detector(self, name, image_bytes, image_base64, timeout):
+        if name == FACE_ATTRIBUTES:
+            result = self.facepp.detect_face(image_bytes, timeout=timeout)
+            if result.get('error'):
+                return {'error': result['error']}
+            return self.facepp.face_attributes(result)
+        return self.roboflow.infer_base64(image_base64, ROBOFLOW_DETECTORS[name], timeout=timeout)
+
+    def run(self, image_bytes, detectors=DETECTORS, timeout=None, scope=''):
+        """
+        Ejecuta los detectores en paralelo
+
+        Args:
+            image_bytes: imagen ya leída
+            detectors: nombres de DETECTORS a ejecutar
+            timeout: segundos máximos por detector (AI_ANALYSIS_TIMEOUT_SECONDS)
+            scope: ámbito de la foto para los casi-duplicados de la caché
+                (ej. 'employee:12')
+
+        Returns:
+            dict detector → resultado crudo del servicio, o
+            {'error': ..., 'predictions': []} si falló o excedió el timeout
+        """
+        timeout = timeout or getattr(settings, 'AI_ANALYSIS_TIMEOUT_SECONDS', 10)
+        start = time.perf_counter()
+
+        # Fotos repetidas o casi idénticas no repiten la inferencia
+        hash_value, cached = self._cached_results(image_bytes, detectors, scope)
+        pending = [name for name in detectors if name not in cached]
+        if not pending:
+            logger.info(f"🤖 Análisis IA servido desde caché ({hash_value})")
+            return cached
+
+        image_base64 = base64.b64encode(image_bytes).decode('ascii')
+        futures = {
+            self.executor.submit(self._run_detector, name, image_bytes, image_base64, timeout): name
+            for name in pending
+        }
+
+        # El timeout HTTP cubre cada llamada; el margen cubre la espera en cola
+        done, not_done = wait(futures, timeout=timeout + 1)
+
+        raw = {}
+        for future, name in futures.items():
+            if future in not_done:
+                future.cancel()
+                logger.warning(f"⏱️ Detector {name} excedió {timeout}s")
+                raw[name] = {'error': 'timeout', 'predictions': []}
+                continue
+            try:
+                raw[name] = future.result()
+            except Exception as e:
+                logger.error(f"❌ Error en detector {name}: {str(e)}")
+                raw[name] = {'error': str(e), 'predictions': []}
+
+        if hash_value:
+            self._store_results(hash_value, raw, scope)
+
+        logger.info(
+            f"🤖 Análisis IA ({len(futures)} detectores, {len(cached)} desde caché) "
+            f"en {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        raw.update(cached)
+        return raw
+
+
+def merge_results(raw, analyzed_at):
+    """
+    Combina los resultados crudos en el formato de SecurityPhoto.ai_results
+
+    Returns:
+        (results, has_alerts, alert_level) donde alert_level es None si no
+        hay motivo para cambiar el nivel actual
+    """
+    results = {
+        'weapons': [],
+        'vehicles': [],
+        'ppe': [],
+        'persons': [],
+        'face_attributes': None,
+        'analyzed_at': analyzed_at,
+    }
+
+    for name in ROBOFLOW_DETECTORS:
+        result = raw.get(name) or {}
+        if result.get('predictions'):
+            results[name] = result['predictions']
+
+    face_attrs = raw.get(FACE_ATTRIBUTES)
+    if face_attrs and 'error' not in face_attrs:
+        results['face_attributes'] = face_attrs
+
+    errors = {name: result['error'] for name, result in raw.items() if isinstance(result, dict) and result.get('error')}
+    if errors:
+        results['errors'] = errors
+
+    has_alerts = False
+    alert_level = None
+
+    if results['weapons']:
+        has_alerts = True
+        alert_level = 'CRITICAL'
+
+    if any('no-' in pred.get('class', '').lower() for pred in results['ppe']):
+        has_alerts = True
+        alert_level = alert_level or 'MEDIUM'
+
+    return results, has_alerts, alert_level
+
+
+# Instancia global del proceso
+ai_analysis_engine = AIAnalysisEngine()
@@ -0,0 +1,185 @@
+"""
+Caché de resultados de los detectores de IA por hash perceptual
+EURO SECURITY - AI Result Cache
+
+Los guardias reenvían a menudo la misma imagen (reintentos del PWA, captura
+automática de una escena estática). Antes de llamar a Roboflow/Face++ se
+calcula un dHash de 64 bits de la foto y se buscan resultados previos del
+mismo modelo:
+
+- Coincidencia exacta del hash (consulta indexada), y si no hay,
+- solo si AI_RESULT_CACHE_MAX_DISTANCE > 0 (por defecto 0): casi-duplicados
+  a distancia de Hamming <= AI_RESULT_CACHE_MAX_DISTANCE, únicamente del
+  mismo ámbito (el empleado que tomó la foto), de los últimos
+  AI_RESULT_CACHE_NEAR_SECONDS y de los modelos indicados en near_keys. Un
+  dHash de 64 bits no ve objetos pequeños: el detector de armas nunca usa
+  casi-duplicados (ver ai_analysis.NO_NEAR_DUPLICATE_DETECTORS).
+
+La caché vive en la base de datos (AIResultCache) para compartirse entre
+procesos y workers. Las entradas caducan a los AI_RESULT_CACHE_TTL_SECONDS y
+la tabla se mantiene por debajo de AI_RESULT_CACHE_MAX_ENTRIES expulsando las
+menos usadas recientemente (LRU por last_used_at). Los aciertos y fallos se
+cuentan por modelo en AIResultCacheStats.
+"""
+import logging
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+
+from .models_security_photos import AIResultCache, AIResultCacheStats
+
+logger = logging.getLogger(__name__)
+
+
+HASH_SIZE = 8
+EVICTION_PROBABILITY = 0.02
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def is_enabled():
+    return _setting('AI_RESULT_CACHE_ENABLED', True)
+
+
+def image_hash(image_bytes):
+    """
+    dHash de 64 bits (16 caracteres hex) de una imagen
+
+    Compara cada píxel con su vecino derecho en una miniatura de 9x8 en
+    escala de grises; es estable ante recompresión JPEG y cambios de tamaño.
+    """
+    with Image.open(BytesIO(image_bytes)) as image:
+        image.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+        small = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR)
+        pixels = list(small.getdata())
+
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f'{value:016x}'
+
+
+def hamming_distance(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+
+def _count(model_key, hits=0, misses=0):
+    updated = AIResultCacheStats.objects.filter(model_key=model_key).update(
+        hits=F('hits') + hits, misses=F('misses') + misses
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                AIResultCacheStats.objects.create(model_key=model_key, hits=hits, misses=misses)
+        except IntegrityError:
+            AIResultCacheStats.objects.filter(model_key=model_key).update(
+                hits=F('hits') + hits, misses=F('misses') + misses
+            )
+
+
+def get_many(hash_value, model_keys, scope='', near_keys=()):
+    """
+    Busca resultados en caché para varios modelos de una misma imagen
+
+    Args:
+        hash_value: dHash de la imagen
+        model_keys: modelos consultados
+        scope: ámbito de la foto (ej. 'employee:12'); sin ámbito no se
+            buscan casi-duplicados
+        near_keys: modelos que admiten casi-duplicados
+
+    Returns:
+        dict model_key → resultado (solo los aciertos)
+    """
+    now = timezone.now()
+    fresh_after = now - timedelta(seconds=_setting('AI_RESULT_CACHE_TTL_SECONDS', 86400))
+    max_distance = _setting('AI_RESULT_CACHE_MAX_DISTANCE', 0)
+    near_window = _setting('AI_RESULT_CACHE_NEAR_WINDOW', 500)
+    near_after = now - timedelta(seconds=_setting('AI_RESULT_CACHE_NEAR_SECONDS', 300))
+
+    entries = {
+        entry.model_key: entry
+        for entry in AIResultCache.objects.filter(
+            model_key__in=model_keys, image_hash=hash_value, created_at__gte=fresh_after
+        )
+    }
+
+    # Casi-duplicados: mismo empleado, pocos minutos y modelos permitidos
+    if max_distance and scope:
+        for model_key in model_keys:
+            if model_key in entries or model_key not in near_keys:
+                continue
+            candidates = AIResultCache.objects.filter(
+                model_key=model_key, scope=scope, created_at__gte=max(fresh_after, near_after)
+            ).order_by('-created_at').values_list('id', 'image_hash')[:near_window]
+            best = min(
+                ((hamming_distance(hash_value, candidate_hash), entry_id) for entry_id, candidate_hash in candidates),
+                default=None,
+            )
+            if best and best[0] <= max_distance:
+                entries[model_key] = AIResultCache.objects.get(id=best[1])
+
+    if entries:
+        AIResultCache.objects.filter(id__in=[entry.id for entry in entries.values()]).update(
+            hits=F('hits') + 1, last_used_at=now
+        )
+
+    for model_key in model_keys:
+        _count(model_key, hits=int(model_key in entries), misses=int(model_key not in entries))
+
+    return {model_key: entry.result for model_key, entry in entries.items()}
+
+
+def store(hash_value, model_key, result, scope=''):
+    """Guarda (o reemplaza) el resultado de un modelo para una imagen"""
+    now = timezone.now()
+    AIResultCache.objects.update_or_create(
+        model_key=model_key,
+        image_hash=hash_value,
+        defaults={'result': result, 'scope': scope, 'created_at': now, 'last_used_at': now},
+    )
+
+    if random.random() < EVICTION_PROBABILITY:
+        evict()
+
+
+def evict():
+    """
+    Elimina entradas caducadas y, si se supera el máximo, las menos usadas
+
+    Returns:
+        Número de entradas eliminadas
+    """
+    expired_before = timezone.now() - timedelta(seconds=_setting('AI_RESULT_CACHE_TTL_SECONDS', 86400))
+    deleted, _ = AIResultCache.objects.filter(created_at__lt=expired_before).delete()
+
+    max_entries = _setting('AI_RESULT_CACHE_MAX_ENTRIES', 20000)
+    cutoff = (
+        AIResultCache.objects.order_by('-last_used_at')
+        .values_list('last_used_at', flat=True)[max_entries:max_entries + 1]
+    )
+    cutoff = list(cutoff)
+    if cutoff:
+        lru_deleted, _ = AIResultCache.objects.filter(last_used_at__lte=cutoff[0]).delete()
+        deleted += lru_deleted
+
+    if deleted:
+        logger.info(f"🧹 Caché de IA: {deleted} entradas expulsadas")
+    return deleted
+
+
+def clear():
+    """Vacía la caché y reinicia los contadores"""
+    deleted, _ = AIResultCache.objects.all().delete()
+    AIResultCacheStats.objects.all().delete()
+    return deleted
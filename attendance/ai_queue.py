@@ -0,0 +1,220 @@
+"""
+Cola de análisis de IA de fotos de seguridad en base de datos
+EURO SECURITY - AI Analysis Queue
+
+capture_security_photo ya no ejecuta el análisis de IA dentro de la petición
+del PWA: guarda la foto y un AIAnalysisJob y responde de inmediato. Los jobs
+los procesan:
+
+- hilos dentro de cada proceso web (AI_QUEUE_WORKERS), y/o
+- procesos dedicados: python manage.py run_ai_worker
+
+Carriles de prioridad: las capturas ALERT y REQUEST (botón de alerta y
+solicitudes de operaciones) se analizan antes que las MANUAL, y estas antes
+que las automáticas. Si todos los detectores fallan (proveedor caído, red)
+el job se reprograma con backoff exponencial hasta AI_QUEUE_MAX_ATTEMPTS.
+
+Un job que supera AI_QUEUE_TASK_TIMEOUT puede reclamarlo otro worker. El
+análisis, sus alertas y el cierre del job van en una transacción que solo
+confirma el worker que conserva el reclamo (igual que attendance_queue).
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .attendance_queue import AttendanceWorkerPool, ClaimLostError, _setting
+from .models_security_photos import AIAnalysisJob, SecurityAlert
+
+logger = logging.getLogger(__name__)
+
+
+UNFINISHED_STATUSES = ('PENDING', 'PROCESSING')
+
+CAPTURE_PRIORITIES = {
+    'ALERT': AIAnalysisJob.PRIORITY_HIGH,
+    'REQUEST': AIAnalysisJob.PRIORITY_HIGH,
+    'MANUAL': AIAnalysisJob.PRIORITY_NORMAL,
+}
+
+
+class TransientAnalysisError(Exception):
+    """Ningún detector respondió; el análisis se reintenta más tarde"""
+
+
+def priority_for_capture(capture_type):
+    return CAPTURE_PRIORITIES.get(capture_type, AIAnalysisJob.PRIORITY_LOW)
+
+
+def queue_depth():
+    """Número de análisis pendientes o en proceso"""
+    return AIAnalysisJob.objects.filter(status__in=UNFINISHED_STATUSES).count()
+
+
+def enqueue_photo_analysis(photo, priority=None):
+    """
+    Encola el análisis de IA de una foto
+
+    Si la foto ya tiene un análisis sin terminar se retorna ese mismo, subiendo
+    su prioridad si la nueva es mayor.
+    """
+    if priority is None:
+        priority = priority_for_capture(photo.capture_type)
+
+    existing = AIAnalysisJob.objects.filter(photo=photo, status__in=UNFINISHED_STATUSES).first()
+    if existing:
+        if priority < existing.priority:
+            AIAnalysisJob.objects.filter(id=existing.id).update(priority=priority)
+            existing.priority = priority
+        return existing
+
+    job = AIAnalysisJob.objects.create(photo=photo, priority=priority)
+
+    if _setting('AI_QUEUE_WORKERS', 2) > 0:
+        ai_worker_pool.ensure_started()
+    transaction.on_commit(ai_worker_pool.notify)
+
+    return job
+
+
+def claim_next_job(worker_name):
+    """
+    Reclama el siguiente análisis listo (por prioridad) o uno bloqueado por
+    un worker caído
+
+    Returns:
+        AIAnalysisJob o None si no hay trabajo listo
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=_setting('AI_QUEUE_TASK_TIMEOUT', 300))
+    claimable = (
+        Q(status='PENDING', run_after__lte=now)
+        | Q(status='PROCESSING', locked_at__lt=stale_before)
+    )
+
+    candidates = list(
+        AIAnalysisJob.objects.filter(claimable)
+        .order_by('priority', 'run_after', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+
+    for job_id in candidates:
+        claimed = AIAnalysisJob.objects.filter(claimable, id=job_id).update(
+            status='PROCESSING',
+            locked_at=now,
+            worker=worker_name,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return AIAnalysisJob.objects.select_related('photo__employee').get(id=job_id)
+
+    return None
+
+
+def retry_delay(attempts):
+    """Backoff exponencial: base, 2·base, 4·base... hasta el máximo"""
+    base = _setting('AI_QUEUE_RETRY_BASE_SECONDS', 30)
+    maximum = _setting('AI_QUEUE_RETRY_MAX_SECONDS', 1800)
+    return min(maximum, base * (2 ** max(0, attempts - 1)))
+
+
+def _owned(job):
+    """El job solo si sigue reclamado por este worker con el mismo bloqueo"""
+    return AIAnalysisJob.objects.filter(
+        id=job.id, status='PROCESSING', worker=job.worker, locked_at=job.locked_at,
+    )
+
+
+def process_job(job):
+    """Ejecuta el análisis de IA de un job reclamado"""
+    from .ai_analysis import DETECTORS
+
+    max_attempts = _setting('AI_QUEUE_MAX_ATTEMPTS', 5)
+    photo = job.photo
+    started_at = timezone.now()
+
+    try:
+        # Resultados, alertas y cierre del job se confirman juntos: si otro
+        # worker reclamó el job por tiempo agotado, este descarta su análisis
+        # en lugar de duplicar las alertas de la foto
+        with transaction.atomic():
+            if not _owned(job).select_for_update().exists():
+                raise ClaimLostError(f"Análisis IA {job.id} reclamado por otro worker")
+
+            results = photo.analyze_with_ai()
+            if results is None:
+                raise TransientAnalysisError('No se pudo leer o analizar la foto')
+
+            errors = results.get('errors') or {}
+            if len(errors) >= len(DETECTORS):
+                raise TransientAnalysisError(f"Todos los detectores fallaron: {errors}")
+
+            alerts_created = SecurityAlert.objects.filter(photo=photo, created_at__gte=started_at).count()
+            finished = _owned(job).update(
+                status='DONE',
+                alerts_created=alerts_created,
+                error='; '.join(f'{name}: {error}' for name, error in errors.items()),
+                locked_at=None,
+                processed_at=timezone.now(),
+            )
+            if not finished:
+                raise ClaimLostError(f"Análisis IA {job.id} reclamado por otro worker")
+
+        if alerts_created:
+            logger.warning(f"🚨 Foto {photo.id} de {photo.employee}: {alerts_created} alerta(s) de IA")
+        logger.info(f"✅ Análisis IA de foto {photo.id} completado")
+        return 'DONE'
+
+    except ClaimLostError as e:
+        logger.warning(f"⚠️ {e}: se descarta este análisis")
+        return 'LOST'
+
+    except Exception as e:
+        logger.error(f"Error analizando foto {photo.id} (intento {job.attempts}): {str(e)}")
+
+        # Sin filas actualizadas el job ya es de otro worker: no tocar su estado
+        if job.attempts >= max_attempts:
+            updated = _owned(job).update(
+                status='FAILED', error=str(e), locked_at=None, processed_at=timezone.now()
+            )
+            return 'FAILED' if updated else 'LOST'
+
+        # Reprogramar con backoff exponencial
+        updated = _owned(job).update(
+            status='PENDING',
+            locked_at=None,
+            error=str(e),
+            run_after=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+        )
+        return 'PENDING' if updated else 'LOST'
+
+
+def purge_finished_jobs(days=7):
+    """Elimina análisis terminados más antiguos que `days` días"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = AIAnalysisJob.objects.filter(
+        status__in=('DONE', 'FAILED'),
+        processed_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+class AIAnalysisWorkerPool(AttendanceWorkerPool):
+    """Hilos que consumen la cola de análisis de IA dentro del proceso actual"""
+
+    label = 'análisis IA'
+    thread_prefix = 'ai-worker'
+    workers_setting = ('AI_QUEUE_WORKERS', 2)
+    poll_setting = ('AI_QUEUE_POLL_SECONDS', 2.0)
+
+    def claim(self, worker_name):
+        return claim_next_job(worker_name)
+
+    def process(self, job):
+        return process_job(job)
+
+
+# Instancia global del proceso
+ai_worker_pool = AIAnalysisWorkerPool()
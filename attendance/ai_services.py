@@ -6,7 +6,9 @@ Integración con Roboflow, Face++, Firebase y Agora
 import requests
 import json
 import base64
+import threading
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 from io import BytesIO
 from PIL import Image
 import logging
@@ -14,55 +16,90 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Sesión HTTP compartida por los servicios de IA
+
+    Mantiene un pool de conexiones keep-alive (AI_HTTP_POOL_SIZE por host)
+    para que los detectores que se ejecutan en paralelo no abran una conexión
+    TLS nueva en cada llamada.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                pool_size = getattr(settings, 'AI_HTTP_POOL_SIZE', 16)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _http_session = session
+    return _http_session
+
+
 class RoboflowService:
     """Servicio de detección de objetos con Roboflow"""
     
-    def __init__(self):
-        self.api_key = settings.ROBOFLOW_API_KEY
-        self.api_url = settings.ROBOFLOW_API_URL
-        self.models = settings.ROBOFLOW_MODELS
+    def __init__(self, api_url=None, api_key=None, models=None, session=None):
+        self.api_key = settings.ROBOFLOW_API_KEY if api_key is None else api_key
+        self.api_url = settings.ROBOFLOW_API_URL if api_url is None else api_url
+        self.models = settings.ROBOFLOW_MODELS if models is None else models
+        self.session = session
     
-    def detect_weapons(self, image_path_or_bytes):
+    def detect_weapons(self, image_path_or_bytes, timeout=None):
         """Detectar armas en una imagen"""
-        return self._detect(image_path_or_bytes, 'weapon_detection')
+        return self._detect(image_path_or_bytes, 'weapon_detection', timeout=timeout)
     
-    def detect_vehicles(self, image_path_or_bytes):
+    def detect_vehicles(self, image_path_or_bytes, timeout=None):
         """Detectar vehículos en una imagen"""
-        return self._detect(image_path_or_bytes, 'vehicle_detection')
+        return self._detect(image_path_or_bytes, 'vehicle_detection', timeout=timeout)
     
-    def detect_ppe(self, image_path_or_bytes):
+    def detect_ppe(self, image_path_or_bytes, timeout=None):
         """Detectar equipo de protección personal"""
-        return self._detect(image_path_or_bytes, 'ppe_detection')
+        return self._detect(image_path_or_bytes, 'ppe_detection', timeout=timeout)
     
-    def detect_persons(self, image_path_or_bytes):
+    def detect_persons(self, image_path_or_bytes, timeout=None):
         """Detectar personas en una imagen"""
-        return self._detect(image_path_or_bytes, 'person_detection')
+        return self._detect(image_path_or_bytes, 'person_detection', timeout=timeout)
     
-    def _detect(self, image_path_or_bytes, model_type):
+    def _detect(self, image_path_or_bytes, model_type, timeout=None):
         """Método genérico de detección"""
+        if isinstance(image_path_or_bytes, bytes):
+            image_bytes = image_path_or_bytes
+        else:
+            with open(image_path_or_bytes, 'rb') as f:
+                image_bytes = f.read()
+        
+        image_base64 = base64.b64encode(image_bytes).decode('ascii')
+        return self.infer_base64(image_base64, model_type, timeout=timeout)
+    
+    def infer_base64(self, image_base64, model_type, timeout=None):
+        """
+        Detección con una imagen ya codificada en base64
+        
+        Usa la API REST de Roboflow (la misma que InferenceHTTPClient) sobre
+        la sesión HTTP compartida, sin archivos temporales.
+        """
         try:
-            from inference_sdk import InferenceHTTPClient
-            
-            client = InferenceHTTPClient(
-                api_url=self.api_url,
-                api_key=self.api_key
-            )
-            
             model_id = self.models.get(model_type)
             if not model_id:
                 logger.error(f"Modelo {model_type} no configurado")
                 return {'error': 'Modelo no configurado'}
             
-            # Si es bytes, guardar temporalmente
-            if isinstance(image_path_or_bytes, bytes):
-                import tempfile
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp:
-                    tmp.write(image_path_or_bytes)
-                    image_path = tmp.name
-            else:
-                image_path = image_path_or_bytes
-            
-            result = client.infer(image_path, model_id=model_id)
+            session = self.session or get_http_session()
+            response = session.post(
+                f"{self.api_url.rstrip('/')}/{model_id}",
+                params={'api_key': self.api_key},
+                data=image_base64,
+                headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                timeout=timeout or getattr(settings, 'AI_ANALYSIS_TIMEOUT_SECONDS', 10),
+            )
+            response.raise_for_status()
+            result = response.json()
             
             logger.info(f"✅ Detección {model_type} exitosa: {len(result.get('predictions', []))} objetos")
             return result
@@ -75,12 +112,13 @@ class RoboflowService:
 class FacePlusPlusService:
     """Servicio de reconocimiento facial avanzado con Face++"""
     
-    def __init__(self):
-        self.api_key = settings.FACEPP_API_KEY
-        self.api_secret = settings.FACEPP_API_SECRET
-        self.api_url = settings.FACEPP_API_URL
+    def __init__(self, api_url=None, api_key=None, api_secret=None, session=None):
+        self.api_key = settings.FACEPP_API_KEY if api_key is None else api_key
+        self.api_secret = settings.FACEPP_API_SECRET if api_secret is None else api_secret
+        self.api_url = settings.FACEPP_API_URL if api_url is None else api_url
+        self.session = session
     
-    def detect_face(self, image_bytes):
+    def detect_face(self, image_bytes, timeout=10):
         """Detectar rostro en imagen"""
         try:
             url = f"{self.api_url}/detect"
@@ -95,7 +133,8 @@ class FacePlusPlusService:
                 'return_attributes': 'gender,age,emotion,facequality'
             }
             
-            response = requests.post(url, files=files, data=data, timeout=10)
+            session = self.session or get_http_session()
+            response = session.post(url, files=files, data=data, timeout=timeout)
             result = response.json()
             
             if 'faces' in result and len(result['faces']) > 0:
@@ -124,7 +163,8 @@ class FacePlusPlusService:
                 'api_secret': self.api_secret
             }
             
-            response = requests.post(url, files=files, data=data, timeout=10)
+            session = self.session or get_http_session()
+            response = session.post(url, files=files, data=data, timeout=10)
             result = response.json()
             
             if 'confidence' in result:
@@ -139,10 +179,13 @@ class FacePlusPlusService:
             logger.error(f"❌ Error Face++ compare: {str(e)}")
             return {'error': str(e), 'confidence': 0}
     
-    def analyze_face_attributes(self, image_bytes):
+    def analyze_face_attributes(self, image_bytes, timeout=10):
         """Analizar atributos faciales (edad, género, emoción)"""
-        result = self.detect_face(image_bytes)
-        
+        return self.face_attributes(self.detect_face(image_bytes, timeout=timeout))
+    
+    @staticmethod
+    def face_attributes(result):
+        """Atributos del primer rostro de una respuesta de detect_face"""
         if result.get('faces'):
             face = result['faces'][0]
             attributes = face.get('attributes', {})
@@ -5,3 +5,10 @@ class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
     verbose_name = 'Sistema de Asistencia'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .face_detectors import detector_registry
+
+        # Evitar parsear las cascadas en la primera marcación
+        detector_registry.warm_up()
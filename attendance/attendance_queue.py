@@ -0,0 +1,308 @@
+"""
+Cola de verificación de marcaciones en base de datos
+EURO SECURITY - Attendance Queue
+
+En los cambios de turno cientos de guardias marcan en pocos minutos y la
+verificación facial síncrona satura los workers de gunicorn. Con
+ATTENDANCE_ASYNC_ENABLED la vista record_attendance solo guarda una
+AttendanceVerificationTask y responde 202; la verificación la hacen:
+
+- hilos dentro de cada proceso web (ATTENDANCE_QUEUE_WORKERS), y/o
+- procesos dedicados: python manage.py run_attendance_worker
+
+La cola usa la tabla como fuente de verdad (funciona sin Redis). Las tareas
+se reclaman con un UPDATE condicional, por lo que varios workers y procesos
+pueden competir sin procesar dos veces la misma tarea.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import AttendanceVerificationTask
+
+logger = logging.getLogger(__name__)
+
+
+UNFINISHED_STATUSES = ('PENDING', 'PROCESSING')
+
+
+class QueueFullError(Exception):
+    """La cola superó ATTENDANCE_QUEUE_MAX_PENDING (back-pressure)"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def queue_depth():
+    """Número de marcaciones pendientes o en proceso"""
+    return AttendanceVerificationTask.objects.filter(status__in=UNFINISHED_STATUSES).count()
+
+
+def enqueue_attendance(employee, attendance_type, latitude, longitude, location_accuracy,
+                       facial_image, device_info='', ip_address=None):
+    """
+    Guarda una marcación pendiente de verificación
+
+    Si el empleado ya tiene una marcación sin procesar se retorna esa misma
+    (reintentos del PWA no generan marcaciones duplicadas).
+
+    Raises:
+        QueueFullError: si la cola está llena
+    """
+    existing = AttendanceVerificationTask.objects.filter(
+        employee=employee,
+        status__in=UNFINISHED_STATUSES,
+    ).first()
+    if existing:
+        return existing
+
+    max_pending = _setting('ATTENDANCE_QUEUE_MAX_PENDING', 300)
+    if max_pending and queue_depth() >= max_pending:
+        logger.warning(f"🚦 Cola de marcaciones llena ({max_pending}), rechazando {employee.employee_id}")
+        raise QueueFullError(
+            'Alta demanda en este momento. Intenta marcar de nuevo en unos segundos.',
+            _setting('ATTENDANCE_QUEUE_RETRY_AFTER', 10),
+        )
+
+    task = AttendanceVerificationTask.objects.create(
+        employee=employee,
+        attendance_type=attendance_type,
+        latitude=latitude,
+        longitude=longitude,
+        location_accuracy=location_accuracy,
+        facial_image=facial_image,
+        device_info=device_info,
+        ip_address=ip_address,
+    )
+
+    if _setting('ATTENDANCE_QUEUE_WORKERS', 2) > 0:
+        worker_pool.ensure_started()
+    transaction.on_commit(worker_pool.notify)
+
+    return task
+
+
+def claim_next_task(worker_name):
+    """
+    Reclama la siguiente tarea pendiente (o una bloqueada por un worker caído)
+
+    Returns:
+        AttendanceVerificationTask o None si la cola está vacía
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=_setting('ATTENDANCE_QUEUE_TASK_TIMEOUT', 120))
+    claimable = Q(status='PENDING') | Q(status='PROCESSING', locked_at__lt=stale_before)
+
+    candidates = list(
+        AttendanceVerificationTask.objects.filter(claimable)
+        .order_by('created_at')
+        .values_list('id', flat=True)[:10]
+    )
+
+    for task_id in candidates:
+        claimed = AttendanceVerificationTask.objects.filter(claimable, id=task_id).update(
+            status='PROCESSING',
+            locked_at=now,
+            worker=worker_name,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return AttendanceVerificationTask.objects.select_related('employee').get(id=task_id)
+
+    return None
+
+
+class ClaimLostError(Exception):
+    """Otro worker reclamó la tarea (se superó ATTENDANCE_QUEUE_TASK_TIMEOUT)"""
+
+
+def _owned(task):
+    """La tarea solo si sigue reclamada por este worker con el mismo bloqueo"""
+    return AttendanceVerificationTask.objects.filter(
+        id=task.id, status='PROCESSING', worker=task.worker, locked_at=task.locked_at,
+    )
+
+
+def _finish_task(task, status, result, error=''):
+    """Cierra la tarea si sigue siendo de este worker; retorna las filas actualizadas"""
+    record_id = (result.get('record') or {}).get('id') if result else None
+    return _owned(task).update(
+        status=status,
+        result=json.dumps(result or {}, default=str),
+        error=error,
+        attendance_record_id=record_id,
+        facial_image='',
+        locked_at=None,
+        processed_at=timezone.now(),
+    )
+
+
+def process_task(task):
+    """Verifica la identidad y registra la marcación de una tarea reclamada"""
+    from .views import process_attendance_submission
+
+    max_attempts = _setting('ATTENDANCE_QUEUE_MAX_ATTEMPTS', 3)
+
+    try:
+        # El registro y el cierre de la tarea son atómicos: si el worker muere
+        # a mitad, la tarea se reintenta sin dejar una marcación duplicada.
+        # La fila queda bloqueada mientras tanto; si otro worker la reclamó
+        # por tiempo agotado, este abandona antes de crear la marcación
+        with transaction.atomic():
+            if not _owned(task).select_for_update().exists():
+                raise ClaimLostError(f"Marcación {task.id} reclamada por otro worker")
+
+            result = process_attendance_submission(
+                employee=task.employee,
+                attendance_type=task.attendance_type,
+                latitude=task.latitude,
+                longitude=task.longitude,
+                location_accuracy=task.location_accuracy,
+                facial_image=task.facial_image,
+                device_info=task.device_info,
+                ip_address=task.ip_address,
+                timestamp=task.requested_at,
+            )
+            status = 'DONE' if result.get('success') else 'FAILED'
+            if not _finish_task(task, status, result, '' if result.get('success') else result.get('error', '')):
+                raise ClaimLostError(f"Marcación {task.id} reclamada por otro worker")
+
+        logger.info(f"✅ Marcación {task.id} de {task.employee.employee_id} procesada: {status}")
+        return status
+
+    except ClaimLostError as e:
+        logger.warning(f"⚠️ {e}: se descarta este procesamiento")
+        return 'LOST'
+
+    except Exception as e:
+        logger.error(f"Error procesando marcación {task.id}: {str(e)}")
+
+        if task.attempts >= max_attempts:
+            _finish_task(task, 'FAILED', {'success': False, 'error': f'Error interno: {str(e)}'}, str(e))
+            return 'FAILED'
+
+        # Devolver a la cola para otro intento
+        _owned(task).update(
+            status='PENDING', locked_at=None, error=str(e)
+        )
+        return 'PENDING'
+
+
+def purge_finished_tasks(days=7):
+    """Elimina tareas terminadas más antiguas que `days` días"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = AttendanceVerificationTask.objects.filter(
+        status__in=('DONE', 'FAILED'),
+        processed_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+class AttendanceWorkerPool:
+    """
+    Hilos que consumen la cola dentro del proceso actual
+
+    Las subclases (ver ai_queue.py) reutilizan el ciclo de vida redefiniendo
+    claim(), process() y los nombres de configuración.
+    """
+
+    label = 'marcación'
+    thread_prefix = 'attendance-worker'
+    workers_setting = ('ATTENDANCE_QUEUE_WORKERS', 2)
+    poll_setting = ('ATTENDANCE_QUEUE_POLL_SECONDS', 1.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+
+    def worker_name(self, index):
+        return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+    def ensure_started(self, threads=None):
+        """Arranca los hilos (una vez por proceso, también tras un fork)"""
+        if self._pid == os.getpid() and self._threads:
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._threads:
+                return
+
+            count = threads if threads is not None else _setting(*self.workers_setting)
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._threads = []
+
+            for index in range(count):
+                thread = threading.Thread(
+                    target=self.run,
+                    args=(self.worker_name(index),),
+                    name=f'{self.thread_prefix}-{index}',
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+            logger.info(f"👷 {count} workers de {self.label} iniciados (pid {self._pid})")
+
+    def notify(self):
+        """Despierta a los hilos en espera (nueva tarea encolada)"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def claim(self, worker_name):
+        return claim_next_task(worker_name)
+
+    def process(self, task):
+        return process_task(task)
+
+    def run(self, worker_name, once=False):
+        """Bucle principal de un worker"""
+        poll_seconds = _setting(*self.poll_setting)
+
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                task = self.claim(worker_name)
+                if task is not None:
+                    self.process(task)
+                    continue
+            except Exception as e:
+                logger.error(f"Error en worker de {self.label} {worker_name}: {str(e)}")
+
+            if once:
+                break
+
+            self._wake.wait(poll_seconds)
+            self._wake.clear()
+
+        close_old_connections()
+
+
+# Instancia global del proceso
+worker_pool = AttendanceWorkerPool()
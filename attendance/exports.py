@@ -0,0 +1,368 @@
+"""
+Exportaciones CSV/Excel en streaming
+EURO SECURITY - Streaming Exports
+
+export_attendance_report armaba el CSV completo en un HttpResponse y
+export_medical_data cargaba todos los documentos y permisos en un workbook
+de openpyxl en memoria. Ahora la memoria no crece con el número de filas:
+
+- Las filas salen de values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+  (sin instanciar modelos ni cachear el queryset).
+- CSV: StreamingHttpResponse que escribe cada fila al vuelo.
+- Excel: openpyxl en modo write-only (las filas van a disco, no a memoria)
+  sobre un archivo temporal que se envía con FileResponse.
+- Si la exportación supera EXPORT_ASYNC_THRESHOLD_ROWS se prepara en
+  segundo plano (ExportJob): un worker escribe el archivo en el storage y
+  el usuario lo descarga cuando está listo.
+"""
+import csv
+import io
+import logging
+import tempfile
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .attendance_queue import AttendanceWorkerPool, _setting
+from .models import (
+    AttendanceSummary, ExportJob, MedicalDocument, MedicalDocumentType, MedicalLeave, MedicalLeaveStatus,
+)
+from .permissions import AttendancePermissions
+
+logger = logging.getLogger(__name__)
+
+
+UNFINISHED_STATUSES = ('PENDING', 'PROCESSING')
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Hoja de una exportación: filas como iterador perezoso
+ExportSheet = namedtuple('ExportSheet', ['title', 'headers', 'rows', 'widths'])
+
+
+def _chunk_size():
+    return _setting('EXPORT_CHUNK_SIZE', 2000)
+
+
+def _full_name(first_name, last_name):
+    return f"{first_name} {last_name}"
+
+
+def _duration_display(duration):
+    """Igual que AttendanceSummary.get_work_hours_display"""
+    if duration:
+        total_seconds = int(duration.total_seconds())
+        return f"{total_seconds // 3600}h {(total_seconds % 3600) // 60}m"
+    return "0h 0m"
+
+
+# Conjuntos de datos
+
+def attendance_queryset(user, start_date, end_date):
+    viewable_employees = AttendancePermissions.get_viewable_employees(user)
+    return AttendanceSummary.objects.filter(
+        employee__in=viewable_employees,
+        date__range=[start_date, end_date]
+    )
+
+
+def attendance_sheet(user, start_date, end_date):
+    """Resúmenes diarios de los empleados visibles para el usuario"""
+    queryset = attendance_queryset(user, start_date, end_date).order_by('employee__first_name', 'date').values_list(
+        'employee__first_name', 'employee__last_name', 'employee__department__name', 'date',
+        'first_entry', 'last_exit', 'total_work_hours', 'is_present', 'is_late', 'is_early_exit',
+    )
+
+    def rows():
+        for (first_name, last_name, department, summary_date, first_entry, last_exit,
+             work_hours, is_present, is_late, is_early_exit) in queryset.iterator(chunk_size=_chunk_size()):
+            yield [
+                _full_name(first_name, last_name),
+                department or 'Sin departamento',
+                summary_date.strftime('%Y-%m-%d'),
+                first_entry.strftime('%H:%M:%S') if first_entry else '',
+                last_exit.strftime('%H:%M:%S') if last_exit else '',
+                _duration_display(work_hours),
+                'Sí' if is_present else 'No',
+                'Sí' if is_late else 'No',
+                'Sí' if is_early_exit else 'No',
+            ]
+
+    return ExportSheet(
+        title='Asistencias',
+        headers=[
+            'Empleado', 'Departamento', 'Fecha', 'Primera Entrada', 'Última Salida',
+            'Horas Trabajadas', 'Presente', 'Tarde', 'Salida Temprana'
+        ],
+        rows=rows(),
+        widths=[30, 25, 12, 15, 15, 16, 10, 10, 16],
+    )
+
+
+def medical_row_count():
+    return MedicalDocument.objects.count() + MedicalLeave.objects.count()
+
+
+def medical_sheets():
+    """Documentos y permisos médicos (hojas de export_medical_data)"""
+    document_types = dict(MedicalDocumentType.choices)
+    leave_statuses = dict(MedicalLeaveStatus.choices)
+
+    documents = MedicalDocument.objects.order_by('-uploaded_at').values_list(
+        'employee__first_name', 'employee__last_name', 'document_type', 'uploaded_at',
+        'processed_by_ai', 'ai_confidence_score', 'diagnosis', 'doctor_name', 'medical_center',
+    )
+    leaves = MedicalLeave.objects.order_by('-created_at').values_list(
+        'employee__first_name', 'employee__last_name', 'start_date', 'end_date', 'total_days', 'status',
+        'ai_recommendation', 'reviewed_by_id', 'reviewed_by__first_name', 'reviewed_by__last_name', 'reviewed_at',
+    )
+
+    def document_rows():
+        for (first_name, last_name, document_type, uploaded_at, processed_by_ai, confidence,
+             diagnosis, doctor_name, medical_center) in documents.iterator(chunk_size=_chunk_size()):
+            yield [
+                _full_name(first_name, last_name),
+                document_types.get(document_type, document_type),
+                uploaded_at.strftime('%d/%m/%Y %H:%M'),
+                'Procesado' if processed_by_ai else 'Pendiente',
+                f"{confidence:.1%}" if confidence else 'N/A',
+                diagnosis or 'N/A',
+                doctor_name or 'N/A',
+                medical_center or 'N/A',
+            ]
+
+    def leave_rows():
+        for (first_name, last_name, start_date, end_date, total_days, status, ai_recommendation,
+             reviewed_by_id, reviewer_first, reviewer_last, reviewed_at) in leaves.iterator(chunk_size=_chunk_size()):
+            yield [
+                _full_name(first_name, last_name),
+                start_date.strftime('%d/%m/%Y'),
+                end_date.strftime('%d/%m/%Y'),
+                total_days,
+                leave_statuses.get(status, status),
+                ai_recommendation or 'N/A',
+                f"{reviewer_first} {reviewer_last}".strip() if reviewed_by_id else 'N/A',
+                reviewed_at.strftime('%d/%m/%Y %H:%M') if reviewed_at else 'N/A',
+            ]
+
+    return [
+        ExportSheet(
+            title='Documentos Médicos',
+            headers=[
+                'Empleado', 'Tipo Documento', 'Fecha Subida', 'Estado',
+                'Confianza IA', 'Diagnóstico', 'Médico', 'Centro Médico'
+            ],
+            rows=document_rows(),
+            widths=[30, 22, 18, 12, 14, 50, 30, 30],
+        ),
+        ExportSheet(
+            title='Permisos Médicos',
+            headers=[
+                'Empleado', 'Fecha Inicio', 'Fecha Fin', 'Días Totales',
+                'Estado', 'Recomendación IA', 'Revisado Por', 'Fecha Revisión'
+            ],
+            rows=leave_rows(),
+            widths=[30, 14, 14, 12, 22, 18, 30, 18],
+        ),
+    ]
+
+
+# Escritores
+
+class _Echo:
+    """Pseudo-archivo: csv.writer retorna la línea en lugar de acumularla"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(sheet):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(sheet.headers)
+    for row in sheet.rows:
+        yield writer.writerow(row)
+
+
+def streaming_csv_response(sheet, filename):
+    response = StreamingHttpResponse(iter_csv(sheet), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def write_xlsx(sheets, fileobj):
+    """
+    Escribe las hojas en modo write-only
+
+    Returns:
+        Número de filas de datos escritas
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    workbook = openpyxl.Workbook(write_only=True)
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    total = 0
+
+    for sheet in sheets:
+        worksheet = workbook.create_sheet(sheet.title)
+        # En write-only los anchos se fijan antes de escribir filas
+        for index, width in enumerate(sheet.widths, 1):
+            worksheet.column_dimensions[get_column_letter(index)].width = width
+
+        header = []
+        for title in sheet.headers:
+            cell = WriteOnlyCell(worksheet, value=title)
+            cell.font = header_font
+            cell.fill = header_fill
+            header.append(cell)
+        worksheet.append(header)
+
+        for row in sheet.rows:
+            worksheet.append(row)
+            total += 1
+
+    workbook.save(fileobj)
+    return total
+
+
+def write_csv(sheet, fileobj):
+    """Escribe el CSV en un archivo binario; retorna el número de filas de datos"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='', write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(sheet.headers)
+    total = 0
+    for row in sheet.rows:
+        writer.writerow(row)
+        total += 1
+    text.detach()
+    return total
+
+
+def xlsx_response(sheets, filename):
+    """Excel generado en un archivo temporal y enviado por bloques"""
+    spool = tempfile.TemporaryFile()
+    write_xlsx(sheets, spool)
+    spool.seek(0)
+    return FileResponse(spool, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+
+# Exportaciones en segundo plano
+
+def queue_depth():
+    """Número de exportaciones pendientes o en proceso"""
+    return ExportJob.objects.filter(status__in=UNFINISHED_STATUSES).count()
+
+
+def should_prepare_async(row_count):
+    return row_count > _setting('EXPORT_ASYNC_THRESHOLD_ROWS', 50000)
+
+
+def enqueue_export(user, export_type, params=None, filename=''):
+    job = ExportJob.objects.create(
+        requested_by=user,
+        export_type=export_type,
+        params=params or {},
+        filename=filename,
+    )
+
+    if _setting('EXPORT_QUEUE_WORKERS', 1) > 0:
+        export_worker_pool.ensure_started()
+    transaction.on_commit(export_worker_pool.notify)
+
+    logger.info(f"📦 Exportación {job.id} ({export_type}) encolada para {user}")
+    return job
+
+
+def claim_next_export(worker_name):
+    """Reclama la siguiente exportación pendiente o una bloqueada por un worker caído"""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=_setting('EXPORT_QUEUE_TASK_TIMEOUT', 1800))
+    claimable = Q(status='PENDING') | Q(status='PROCESSING', locked_at__lt=stale_before)
+
+    candidates = list(
+        ExportJob.objects.filter(claimable).order_by('created_at').values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        claimed = ExportJob.objects.filter(claimable, id=job_id).update(
+            status='PROCESSING', locked_at=now, worker=worker_name, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ExportJob.objects.select_related('requested_by').get(id=job_id)
+    return None
+
+
+def _job_sheets(job):
+    if job.export_type == 'ATTENDANCE':
+        start_date = date.fromisoformat(job.params['start_date'])
+        end_date = date.fromisoformat(job.params['end_date'])
+        return [attendance_sheet(job.requested_by, start_date, end_date)]
+    return medical_sheets()
+
+
+def process_export(job):
+    """Genera el archivo de una exportación reclamada y lo guarda en el storage"""
+    max_attempts = _setting('EXPORT_QUEUE_MAX_ATTEMPTS', 2)
+
+    try:
+        sheets = _job_sheets(job)
+        with tempfile.TemporaryFile() as spool:
+            if job.filename.endswith('.csv'):
+                rows = write_csv(sheets[0], spool)
+            else:
+                rows = write_xlsx(sheets, spool)
+            spool.seek(0)
+            job.file.save(job.filename, File(spool), save=False)
+
+        ExportJob.objects.filter(id=job.id).update(
+            status='DONE', file=job.file.name, rows=rows, error='', locked_at=None, processed_at=timezone.now(),
+        )
+        logger.info(f"✅ Exportación {job.id} lista: {rows} filas")
+        return 'DONE'
+
+    except Exception as e:
+        logger.error(f"Error en exportación {job.id} (intento {job.attempts}): {str(e)}")
+        status = 'FAILED' if job.attempts >= max_attempts else 'PENDING'
+        ExportJob.objects.filter(id=job.id).update(
+            status=status, error=str(e), locked_at=None,
+            processed_at=timezone.now() if status == 'FAILED' else None,
+        )
+        return status
+
+
+def purge_expired_exports(days=None):
+    """Elimina exportaciones (y sus archivos) más antiguas que EXPORT_RETENTION_DAYS"""
+    days = _setting('EXPORT_RETENTION_DAYS', 2) if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    for job in ExportJob.objects.filter(created_at__lt=cutoff).exclude(status__in=UNFINISHED_STATUSES):
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        deleted += 1
+    return deleted
+
+
+class ExportWorkerPool(AttendanceWorkerPool):
+    """Hilos que preparan exportaciones grandes dentro del proceso actual"""
+
+    label = 'exportación'
+    thread_prefix = 'export-worker'
+    workers_setting = ('EXPORT_QUEUE_WORKERS', 1)
+    poll_setting = ('EXPORT_QUEUE_POLL_SECONDS', 5.0)
+
+    def claim(self, worker_name):
+        return claim_next_export(worker_name)
+
+    def process(self, job):
+        return process_export(job)
+
+
+# Instancia global del proceso
+export_worker_pool = ExportWorkerPool()
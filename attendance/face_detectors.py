@@ -0,0 +1,213 @@
+"""
+Registro de detectores faciales compartido por el proceso
+EURO SECURITY - Face Detectors
+
+Carga una sola vez los clasificadores Haar (rostro y ojos) y la red DNN
+res10_300x300_ssd para que FacialRecognitionSystem y
+ProductionFacialRecognitionSystem no vuelvan a parsear XML en cada
+marcación.
+
+- Los CascadeClassifier no garantizan ser seguros entre hilos, así que se
+  mantiene una instancia por hilo (se carga la primera vez que el hilo la
+  usa; en gunicorn sync es una sola vez por worker).
+- La red DNN se comparte y su uso (setInput + forward) se serializa con
+  `dnn_lock`.
+
+detect_largest_face implementa la detección sobre miniatura + refinamiento
+en ROI usada por extract_face_encoding.
+"""
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+FACE_CASCADE_FILE = 'haarcascade_frontalface_default.xml'
+EYE_CASCADE_FILE = 'haarcascade_eye.xml'
+DNN_PROTOTXT_FILE = 'deploy.prototxt'
+DNN_MODEL_FILE = 'res10_300x300_ssd_iter_140000.caffemodel'
+
+
+class DetectorRegistry:
+    """Detectores OpenCV cargados perezosamente y reutilizados"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._dnn_loaded = False
+        self._dnn_net = None
+        self.dnn_lock = threading.Lock()
+
+    def _load_cascade(self, filename):
+        """Carga un clasificador Haar de cv2.data (None si no está disponible)"""
+        if not CV2_AVAILABLE:
+            return None
+
+        cascade_path = os.path.join(cv2.data.haarcascades, filename)
+        if not os.path.exists(cascade_path):
+            logger.error(f"Archivo de cascada no encontrado: {cascade_path}")
+            return None
+
+        cascade = cv2.CascadeClassifier(cascade_path)
+        if cascade.empty():
+            logger.error(f"No se pudo cargar la cascada: {cascade_path}")
+            return None
+
+        return cascade
+
+    def _cascade(self, filename):
+        cascades = getattr(self._local, 'cascades', None)
+        if cascades is None:
+            cascades = self._local.cascades = {}
+
+        if filename not in cascades:
+            cascades[filename] = self._load_cascade(filename)
+
+        return cascades[filename]
+
+    def face_cascade(self):
+        """Clasificador Haar de rostros frontales del hilo actual"""
+        return self._cascade(FACE_CASCADE_FILE)
+
+    def eye_cascade(self):
+        """Clasificador Haar de ojos del hilo actual"""
+        return self._cascade(EYE_CASCADE_FILE)
+
+    def dnn_net(self):
+        """Red DNN res10_300x300_ssd compartida (None si no hay modelos)"""
+        if self._dnn_loaded:
+            return self._dnn_net
+
+        with self._lock:
+            if self._dnn_loaded:
+                return self._dnn_net
+
+            self._dnn_net = None
+            if CV2_AVAILABLE:
+                model_dir = getattr(settings, 'FACE_DNN_MODEL_DIR', os.path.join(settings.BASE_DIR, 'models'))
+                prototxt_path = os.path.join(model_dir, DNN_PROTOTXT_FILE)
+                model_path = os.path.join(model_dir, DNN_MODEL_FILE)
+
+                if os.path.exists(prototxt_path) and os.path.exists(model_path):
+                    try:
+                        self._dnn_net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+                        logger.info("Modelos DNN cargados exitosamente")
+                    except Exception as e:
+                        logger.error(f"Error cargando modelo DNN: {str(e)}")
+                else:
+                    logger.warning("Modelos DNN no encontrados, usando detección básica")
+
+            self._dnn_loaded = True
+            return self._dnn_net
+
+    def warm_up(self):
+        """Precarga los detectores (llamado desde AttendanceConfig.ready)"""
+        if not CV2_AVAILABLE:
+            return
+
+        try:
+            self.face_cascade()
+            self.eye_cascade()
+            self.dnn_net()
+            logger.info("🔍 Detectores faciales precargados")
+        except Exception as e:
+            logger.error(f"Error precargando detectores faciales: {str(e)}")
+
+
+# Instancia global del proceso
+detector_registry = DetectorRegistry()
+
+
+def _largest(faces):
+    return max(faces, key=lambda f: f[2] * f[3]) if len(faces) else None
+
+
+def detect_largest_face(gray, cascade=None, scale_factor=1.05, min_neighbors=3,
+                        min_size=(50, 50), max_size=(500, 500),
+                        max_dimension=None, roi_margin=None):
+    """
+    Detecta el rostro más grande con un pipeline de dos pasos
+
+    1. Detección sobre una miniatura cuyo lado mayor es `max_dimension`.
+    2. Refinamiento sobre el recorte (ROI) a resolución completa alrededor del
+       rostro encontrado, limitando las escalas a las cercanas a su tamaño.
+
+    `min_size` y `max_size` se expresan en píxeles de la imagen original. El
+    resultado (x, y, w, h) siempre está en coordenadas de la imagen original
+    y dentro de sus límites. Si la imagen ya es pequeña se detecta directamente.
+
+    Returns:
+        tuple (x, y, w, h) o None si no hay rostro
+    """
+    if cascade is None:
+        cascade = detector_registry.face_cascade()
+    if cascade is None:
+        return None
+
+    if max_dimension is None:
+        max_dimension = getattr(settings, 'FACE_DETECTION_MAX_DIMENSION', 640)
+    if roi_margin is None:
+        roi_margin = getattr(settings, 'FACE_DETECTION_ROI_MARGIN', 0.25)
+
+    height, width = gray.shape[:2]
+    scale = min(1.0, float(max_dimension) / max(height, width)) if max_dimension else 1.0
+
+    if scale >= 1.0:
+        face = _largest(cascade.detectMultiScale(
+            gray, scale_factor, min_neighbors, minSize=tuple(min_size), maxSize=tuple(max_size)
+        ))
+        return None if face is None else tuple(int(v) for v in face)
+
+    # 1. Detección gruesa en la miniatura
+    small = cv2.resize(gray, (max(1, int(round(width * scale))), max(1, int(round(height * scale)))),
+                       interpolation=cv2.INTER_AREA)
+    small_min = tuple(max(1, int(v * scale)) for v in min_size)
+    small_max = tuple(max(1, int(v * scale)) for v in max_size)
+    face = _largest(cascade.detectMultiScale(
+        small, scale_factor, min_neighbors, minSize=small_min, maxSize=small_max
+    ))
+    if face is None:
+        return None
+
+    sx, sy, sw, sh = face
+    x = int(sx / scale)
+    y = int(sy / scale)
+    w = int(round(sw / scale))
+    h = int(round(sh / scale))
+
+    # 2. Refinamiento en el ROI a resolución completa
+    margin_x = int(w * roi_margin)
+    margin_y = int(h * roi_margin)
+    x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+    x1, y1 = min(width, x + w + margin_x), min(height, y + h + margin_y)
+
+    roi = gray[y0:y1, x0:x1]
+    refine_min = (max(min_size[0], int(w * 0.75)), max(min_size[1], int(h * 0.75)))
+    refine_max = (min(max_size[0], x1 - x0), min(max_size[1], y1 - y0))
+
+    refined = None
+    if refine_min[0] <= refine_max[0] and refine_min[1] <= refine_max[1]:
+        refined = _largest(cascade.detectMultiScale(
+            roi, scale_factor, min_neighbors, minSize=refine_min, maxSize=refine_max
+        ))
+
+    if refined is not None:
+        rx, ry, rw, rh = refined
+        x, y, w, h = x0 + int(rx), y0 + int(ry), int(rw), int(rh)
+
+    # Garantizar coordenadas válidas en la imagen original
+    x = min(max(0, x), width - 1)
+    y = min(max(0, y), height - 1)
+    w = max(1, min(w, width - x))
+    h = max(1, min(h, height - y))
+
+    return x, y, w, h
@@ -0,0 +1,241 @@
+"""
+Representación vectorial de las características faciales
+EURO SECURITY - Face Encoding
+
+Convierte el diccionario de características producido por
+FacialRecognitionSystem._extract_advanced_features (y promediado por
+FacialRecognitionProfile._combine_features) en un vector de longitud fija
+apto para comparaciones vectorizadas con NumPy.
+
+Comparación: normalize_vector normaliza cada bloque y
+standardize_vectors resta la media y divide por la desviación de cada
+dimensión en la galería (feature_statistics) antes de la similitud coseno.
+Sin estandarizar, todos los rostros comparten la mayor parte del vector
+(histogramas y texturas parecidos) y caras distintas puntúan por encima de
+0.9; los umbrales se calibran con manage.py calibrate_face_matching.
+
+Formato binario (FacialRecognitionProfile.face_vector):
+    cabecera de 8 bytes  '<4sHH' = magic b'FVEC', versión, dimensión
+    cuerpo               dimensión x float32 little-endian (layout FEATURE_LAYOUT)
+"""
+import base64
+import json
+import logging
+import struct
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Orden y tamaño de cada bloque de características dentro del vector
+FEATURE_LAYOUT = (
+    ('histogram', 50),
+    ('lbp', 16),
+    ('edges', 1),
+    ('hu_moments', 7),
+    ('color', 3),
+    ('gradient_mean', 2),
+)
+
+FEATURE_DIM = sum(size for _, size in FEATURE_LAYOUT)
+
+# 'edges' es la media de un mapa Canny (valores 0/255)
+EDGES_SCALE = 255.0
+
+# Piso de la desviación por dimensión, relativo a la mediana (estandarización)
+STD_FLOOR_RATIO = 0.1
+
+# Cabecera del formato binario versionado
+BINARY_MAGIC = b'FVEC'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHH')
+BINARY_DTYPE = np.dtype('<f4')
+
+
+def features_to_vector(features):
+    """
+    Convierte un diccionario de características en un vector float32
+
+    Los bloques ausentes o de tamaño incorrecto se rellenan con ceros para
+    que todas las filas de la galería compartan el mismo layout.
+    """
+    if not isinstance(features, dict):
+        return None
+
+    vector = np.zeros(FEATURE_DIM, dtype=np.float32)
+    offset = 0
+    found = False
+
+    for name, size in FEATURE_LAYOUT:
+        value = features.get(name)
+        if value is not None:
+            block = np.asarray(value, dtype=np.float32).ravel()
+            if block.size == size:
+                vector[offset:offset + size] = block
+                found = True
+        offset += size
+
+    return vector if found else None
+
+
+def vector_to_features(vector):
+    """Operación inversa de features_to_vector (para exportar o migrar hacia atrás)"""
+    vector = np.asarray(vector, dtype=np.float64)
+    features = {}
+    offset = 0
+
+    for name, size in FEATURE_LAYOUT:
+        block = vector[offset:offset + size]
+        features[name] = float(block[0]) if name == 'edges' else block.tolist()
+        offset += size
+
+    return features
+
+
+def normalize_vector(vector):
+    """
+    Normaliza un vector de características para similitud coseno
+
+    Cada bloque se normaliza por separado (L2) para que ningún tipo de
+    característica domine por escala (los histogramas son cuentas de píxeles,
+    los momentos de Hu son del orden de 1e-3) y luego se normaliza el total.
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    single = vector.ndim == 1
+    matrix = np.atleast_2d(vector).astype(np.float32, copy=True)
+
+    offset = 0
+    for name, size in FEATURE_LAYOUT:
+        block = matrix[:, offset:offset + size]
+        if name == 'edges':
+            block /= EDGES_SCALE
+        else:
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            block /= norms
+        offset += size
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+
+    return matrix[0] if single else matrix
+
+
+def feature_statistics(vectors):
+    """
+    Media y escala por dimensión de vectores ya normalizados por bloque
+
+    La escala tiene un piso relativo (STD_FLOOR_RATIO de la mediana) para que
+    las dimensiones casi constantes no amplifiquen el ruido.
+
+    Returns:
+        tuple (mean, scale) de arrays float32 o None si hay menos de 2 vectores
+    """
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    if matrix.shape[0] < 2:
+        return None
+
+    mean = matrix.mean(axis=0)
+    scale = matrix.std(axis=0)
+    floor = max(float(np.median(scale)) * STD_FLOOR_RATIO, 1e-6)
+    return mean.astype(np.float32), np.maximum(scale, floor).astype(np.float32)
+
+
+def standardize_vectors(vectors, statistics):
+    """
+    Vectores normalizados por bloque → estandarizados por dimensión y con
+    norma L2 unitaria (su producto punto es la similitud coseno calibrada)
+    """
+    mean, scale = statistics
+    matrix = (np.atleast_2d(np.asarray(vectors, dtype=np.float32)) - mean) / scale
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+def decode_profile_encoding(face_encoding):
+    """
+    Decodifica FacialRecognitionProfile.face_encoding (base64 de JSON)
+
+    Returns:
+        np.ndarray float32 de FEATURE_DIM elementos o None si el perfil no
+        contiene un diccionario de características (perfiles heredados con
+        hashes o marcadores de emergencia).
+    """
+    if not face_encoding:
+        return None
+
+    try:
+        decoded = base64.b64decode(face_encoding).decode('utf-8')
+        features = json.loads(decoded)
+    except Exception:
+        return None
+
+    return features_to_vector(features)
+
+
+def pack_vector(vector):
+    """
+    Serializa un vector de características en el formato binario versionado
+
+    Returns:
+        bytes: cabecera de 8 bytes + FEATURE_DIM float32 (324 bytes en total)
+    """
+    vector = np.asarray(vector, dtype=BINARY_DTYPE).ravel()
+    if vector.size != FEATURE_DIM:
+        raise ValueError(f"Vector de {vector.size} elementos, se esperaban {FEATURE_DIM}")
+
+    return BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, FEATURE_DIM) + vector.tobytes()
+
+
+def pack_features(features):
+    """Serializa un diccionario de características (None si no es válido)"""
+    vector = features_to_vector(features)
+    return None if vector is None else pack_vector(vector)
+
+
+def unpack_vector(data):
+    """
+    Decodifica el formato binario sin copiar
+
+    Acepta bytes, bytearray o memoryview (lo que devuelve el driver de la base
+    de datos para un BinaryField). El resultado es una vista de solo lectura
+    sobre el mismo buffer.
+
+    Returns:
+        np.ndarray float32 de FEATURE_DIM elementos o None si el formato no es válido
+    """
+    if data is None:
+        return None
+
+    buffer = memoryview(data)
+    if buffer.nbytes < BINARY_HEADER.size:
+        return None
+
+    magic, version, dimension = BINARY_HEADER.unpack_from(buffer)
+    if magic != BINARY_MAGIC:
+        return None
+
+    if version != BINARY_VERSION or dimension != FEATURE_DIM:
+        logger.warning(f"Versión de codificación facial no soportada: v{version} ({dimension} dims)")
+        return None
+
+    if buffer.nbytes < BINARY_HEADER.size + dimension * BINARY_DTYPE.itemsize:
+        return None
+
+    return np.frombuffer(buffer, dtype=BINARY_DTYPE, count=dimension, offset=BINARY_HEADER.size)
+
+
+def decode_profile(face_vector, face_encoding):
+    """
+    Vector de características de un perfil: formato binario si existe,
+    base64-JSON heredado en caso contrario
+    """
+    if face_vector:
+        vector = unpack_vector(face_vector)
+        if vector is not None:
+            return vector
+
+    return decode_profile_encoding(face_encoding)
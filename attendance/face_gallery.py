@@ -0,0 +1,390 @@
+"""
+Galería facial en memoria para identificación 1:N
+EURO SECURITY - Face Gallery
+
+Mantiene en cada proceso una matriz contigua float32 con las características
+normalizadas de todos los perfiles faciales activos. La verificación 1:1 y la
+identificación 1:N se resuelven con un producto matricial en lugar de
+decodificar base64/JSON en cada marcación.
+
+La identificación 1:N puntúa vectores estandarizados con la media y la
+desviación de cada dimensión en la propia galería (ver face_encoding). Con
+menos de FACE_STANDARDIZE_MIN_PROFILES perfiles esas estadísticas no son
+representativas: la galería no está calibrada y no identifica. La
+verificación 1:1 puede usar además el coseno sin estandarizar, que no
+depende del tamaño de la galería.
+
+La galería se sincroniza con las señales post_save/post_delete de
+FacialRecognitionProfile (ver signals.py). Como cada worker de gunicorn tiene
+su propia copia, cada FACE_GALLERY_REFRESH_SECONDS se comprueba si otro
+proceso modificó los perfiles y se recarga si es necesario.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .face_encoding import (
+    FEATURE_DIM, decode_profile, feature_statistics, features_to_vector,
+    normalize_vector, standardize_vectors,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _encoding_digest(face_vector, face_encoding):
+    """Huella de la codificación almacenada para detectar cambios reales"""
+    digest = hashlib.sha1(bytes(face_vector or b''))
+    digest.update((face_encoding or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+class FaceGallery:
+    """Matriz de características faciales compartida por todo el proceso"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._last_check = 0.0
+        self._signature = None
+        self._raw = np.empty((0, FEATURE_DIM), dtype=np.float32)
+        self._statistics = None
+        self._matrix = np.empty((0, FEATURE_DIM), dtype=np.float32)
+        self._profile_ids = np.empty(0, dtype=np.int64)
+        self._employee_ids = np.empty(0, dtype=np.int64)
+        self._rows = {}
+        self._digests = {}
+
+    # ------------------------------------------------------------------
+    # Carga y sincronización
+    # ------------------------------------------------------------------
+
+    def _current_signature(self):
+        """Firma barata del estado de la tabla (una sola consulta agregada)"""
+        from .models import FacialRecognitionProfile
+
+        stats = FacialRecognitionProfile.objects.aggregate(
+            total=Count('id'),
+            last_update=Max('updated_at'),
+        )
+        return (stats['total'], stats['last_update'])
+
+    def load(self):
+        """Carga todos los perfiles activos en una matriz contigua"""
+        from .models import FacialRecognitionProfile
+
+        rows = FacialRecognitionProfile.objects.filter(
+            is_active=True
+        ).values_list('id', 'employee_id', 'face_vector', 'face_encoding')
+
+        profile_ids = []
+        employee_ids = []
+        vectors = []
+        digests = {}
+
+        for profile_id, employee_id, face_vector, face_encoding in rows.iterator(chunk_size=500):
+            vector = decode_profile(face_vector, face_encoding)
+            if vector is None:
+                continue
+            profile_ids.append(profile_id)
+            employee_ids.append(employee_id)
+            vectors.append(vector)
+            digests[profile_id] = _encoding_digest(face_vector, face_encoding)
+
+        if vectors:
+            raw = np.ascontiguousarray(normalize_vector(np.vstack(vectors)), dtype=np.float32)
+        else:
+            raw = np.empty((0, FEATURE_DIM), dtype=np.float32)
+
+        signature = self._current_signature()
+
+        with self._lock:
+            self._set_raw(raw)
+            self._profile_ids = np.asarray(profile_ids, dtype=np.int64)
+            self._employee_ids = np.asarray(employee_ids, dtype=np.int64)
+            self._rows = {pid: row for row, pid in enumerate(profile_ids)}
+            self._digests = digests
+            self._signature = signature
+            self._loaded = True
+            self._last_check = time.monotonic()
+
+        logger.info(f"🧠 Galería facial cargada: {len(profile_ids)} perfiles")
+
+    def ensure_loaded(self):
+        """Carga perezosa y recarga periódica si otro proceso cambió perfiles"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+            return
+
+        refresh_seconds = getattr(settings, 'FACE_GALLERY_REFRESH_SECONDS', 300)
+        if refresh_seconds and time.monotonic() - self._last_check >= refresh_seconds:
+            with self._lock:
+                if time.monotonic() - self._last_check < refresh_seconds:
+                    return
+                self._last_check = time.monotonic()
+                try:
+                    if self._current_signature() != self._signature:
+                        self.load()
+                except Exception as e:
+                    logger.error(f"Error verificando galería facial: {str(e)}")
+
+    def invalidate(self):
+        """Fuerza la recarga completa en el próximo acceso"""
+        with self._lock:
+            self._loaded = False
+
+    def _set_raw(self, raw):
+        """Reemplaza la matriz normalizada y recalcula la estandarización"""
+        min_profiles = max(2, getattr(settings, 'FACE_STANDARDIZE_MIN_PROFILES', 10))
+        statistics = feature_statistics(raw) if raw.shape[0] >= min_profiles else None
+
+        self._raw = raw
+        self._statistics = statistics
+        if statistics is None:
+            self._matrix = np.empty((0, FEATURE_DIM), dtype=np.float32)
+        else:
+            self._matrix = standardize_vectors(raw, statistics)
+
+    def _touch_signature(self, updated_at=None, delta=0):
+        """Ajusta la firma conocida tras un cambio hecho por este proceso"""
+        if self._signature is None:
+            return
+        total, last_update = self._signature
+        if updated_at is not None and (last_update is None or updated_at > last_update):
+            last_update = updated_at
+        self._signature = (total + delta, last_update)
+
+    def upsert(self, profile, created=False):
+        """Inserta o actualiza un perfil (llamado desde post_save)"""
+        if not self._loaded:
+            return
+
+        with self._lock:
+            self._touch_signature(profile.updated_at, 1 if created else 0)
+
+        if not profile.is_active:
+            self.remove(profile.id)
+            return
+
+        digest = _encoding_digest(profile.face_vector, profile.face_encoding)
+
+        with self._lock:
+            # Guardar solo estadísticas no cambia la codificación
+            if self._digests.get(profile.id) == digest:
+                return
+
+            vector = profile.get_face_vector()
+            if vector is None:
+                self.remove(profile.id)
+                return
+
+            normalized = normalize_vector(vector)
+            row = self._rows.get(profile.id)
+
+            if row is not None:
+                raw = self._raw.copy()
+                raw[row] = normalized
+                employee_ids = self._employee_ids.copy()
+                employee_ids[row] = profile.employee_id
+            else:
+                row = len(self._profile_ids)
+                raw = np.vstack([self._raw, normalized[np.newaxis, :]])
+                employee_ids = np.append(self._employee_ids, profile.employee_id)
+                self._profile_ids = np.append(self._profile_ids, profile.id)
+                self._rows = {**self._rows, profile.id: row}
+
+            self._set_raw(np.ascontiguousarray(raw, dtype=np.float32))
+            self._employee_ids = employee_ids
+            self._digests[profile.id] = digest
+
+    def remove(self, profile_id, deleted=False):
+        """Elimina un perfil de la galería (post_delete o desactivación)"""
+        with self._lock:
+            if deleted:
+                self._touch_signature(delta=-1)
+            row = self._rows.get(profile_id)
+            if row is None:
+                return
+
+            self._set_raw(np.ascontiguousarray(np.delete(self._raw, row, axis=0)))
+            self._profile_ids = np.delete(self._profile_ids, row)
+            self._employee_ids = np.delete(self._employee_ids, row)
+            self._rows = {int(pid): idx for idx, pid in enumerate(self._profile_ids)}
+            self._digests.pop(profile_id, None)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _snapshot(self):
+        """Referencias consistentes para leer sin mantener el lock"""
+        self.ensure_loaded()
+        with self._lock:
+            return self._matrix, self._raw, self._profile_ids, self._employee_ids, self._rows, self._statistics
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self._profile_ids)
+
+    @property
+    def calibrated(self):
+        """True si hay perfiles suficientes para estandarizar y puntuar"""
+        return self._snapshot()[5] is not None
+
+    def is_current(self, profile):
+        """True si la galería tiene la misma codificación que la fila del perfil"""
+        self.ensure_loaded()
+        digest = _encoding_digest(profile.face_vector, profile.face_encoding)
+        with self._lock:
+            return self._digests.get(profile.id) == digest
+
+    def get_vector(self, profile_id):
+        """Vector estandarizado almacenado para un perfil (o None)"""
+        matrix, _, _, _, rows, statistics = self._snapshot()
+        row = rows.get(profile_id)
+        return None if row is None or statistics is None else matrix[row]
+
+    def similarity(self, profile_id, features, standardized=True):
+        """
+        Similitud coseno 1:1 entre una captura y un perfil
+
+        Args:
+            standardized: True para la similitud estandarizada (requiere la
+                galería calibrada), False para el coseno sin estandarizar
+
+        Returns:
+            float entre 0.0 y 1.0, o None si el perfil no está en la galería o
+            se pidió la similitud estandarizada sin galería calibrada
+        """
+        matrix, raw, _, _, rows, statistics = self._snapshot()
+        row = rows.get(profile_id)
+        if row is None:
+            return None
+        if not standardized:
+            return self._score(raw[row], features, None)
+        if statistics is None:
+            return None
+        return self._score(matrix[row], features, statistics)
+
+    def similarity_to_vector(self, vector, features, standardized=True):
+        """
+        Similitud contra un vector explícito (ver similarity)
+
+        Para perfiles que esta copia de la galería aún no tiene o tiene
+        desactualizados (guardados por otro worker): se compara contra el
+        vector de la fila ya cargada con las estadísticas de la galería.
+
+        Returns:
+            float entre 0.0 y 1.0, o None si no hay vector o se pidió la
+            similitud estandarizada sin galería calibrada
+        """
+        statistics = self._snapshot()[5]
+        if not standardized:
+            statistics = None
+        elif statistics is None:
+            return None
+        reference = self._prepare_query(vector, statistics)
+        if reference is None:
+            return None
+        return self._score(reference[0], features, statistics)
+
+    def _score(self, stored, features, statistics):
+        query = self._prepare_query(features, statistics)
+        if query is None:
+            return 0.0
+        return float(max(0.0, min(1.0, np.dot(stored, query[0]))))
+
+    def identify(self, features, top_k=1, min_similarity=0.0, employee_ids=None):
+        """
+        Identificación 1:N de una captura contra la galería
+
+        Args:
+            features: dict de características o vector de FEATURE_DIM
+            top_k: número máximo de candidatos a retornar
+            min_similarity: umbral mínimo de similitud coseno
+            employee_ids: restringir la búsqueda a estos empleados (opcional)
+
+        Returns:
+            list de dicts {'employee_id', 'profile_id', 'similarity'}
+            ordenados de mayor a menor similitud (vacía si la galería no
+            está calibrada)
+        """
+        return self.identify_batch([features], top_k, min_similarity, employee_ids)[0]
+
+    def identify_batch(self, features_list, top_k=1, min_similarity=0.0, employee_ids=None):
+        """Identificación 1:N de varias capturas con un único producto matricial"""
+        matrix, _, profile_ids, gallery_employee_ids, _, statistics = self._snapshot()
+        if statistics is None:
+            return [[] for _ in features_list]
+
+        queries = [self._prepare_query(features, statistics) for features in features_list]
+        results = [[] for _ in features_list]
+        valid = [i for i, query in enumerate(queries) if query is not None]
+
+        if not valid or matrix.shape[0] == 0:
+            return results
+
+        if employee_ids is not None:
+            mask = np.isin(gallery_employee_ids, np.fromiter(employee_ids, dtype=np.int64))
+            candidate_rows = np.flatnonzero(mask)
+            if candidate_rows.size == 0:
+                return results
+            matrix = matrix[candidate_rows]
+            profile_ids = profile_ids[candidate_rows]
+            gallery_employee_ids = gallery_employee_ids[candidate_rows]
+
+        query_matrix = np.vstack([queries[i] for i in valid])
+        scores = query_matrix @ matrix.T
+
+        k = max(1, min(int(top_k), matrix.shape[0]))
+        for position, query_index in enumerate(valid):
+            row_scores = scores[position]
+            if k < row_scores.size:
+                best = np.argpartition(-row_scores, k - 1)[:k]
+            else:
+                best = np.arange(row_scores.size)
+            best = best[np.argsort(-row_scores[best])]
+
+            results[query_index] = [
+                {
+                    'employee_id': int(gallery_employee_ids[row]),
+                    'profile_id': int(profile_ids[row]),
+                    'similarity': float(max(0.0, min(1.0, row_scores[row]))),
+                }
+                for row in best
+                if row_scores[row] >= min_similarity
+            ]
+
+        return results
+
+    @staticmethod
+    def _prepare_query(features, statistics):
+        """
+        Convierte dict/vector de características en fila normalizada (1, D),
+        estandarizada si se pasan estadísticas
+        """
+        if isinstance(features, dict):
+            vector = features_to_vector(features)
+        elif features is None:
+            vector = None
+        else:
+            vector = np.asarray(features, dtype=np.float32).ravel()
+            if vector.size != FEATURE_DIM:
+                vector = None
+
+        if vector is None:
+            return None
+        normalized = normalize_vector(vector)[np.newaxis, :]
+        if statistics is None:
+            return normalized
+        return standardize_vectors(normalized, statistics)
+
+
+# Instancia global del proceso
+face_gallery = FaceGallery()
@@ -10,6 +10,9 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from django.utils import timezone
 from .models import FacialRecognitionProfile
+from .face_detectors import detect_largest_face, detector_registry
+from .face_gallery import face_gallery
+from .lbp import lbp_histogram
 
 # Importaciones con manejo de errores
 try:
@@ -48,15 +51,19 @@ class FacialRecognitionSystem:
         self.max_face_distance = 0.6  # Distancia máxima para considerar coincidencia
         self.min_face_size = (50, 50)  # Tamaño mínimo de rostro
         
-    def extract_face_encoding(self, image_data):
+    def extract_face_encoding(self, image_data, max_side=None, min_face_size=None):
         """
         Extrae codificación facial usando OpenCV + Machine Learning - Precisión: 94%
         
         Args:
             image_data: Datos de imagen en base64 o PIL Image
+            max_side: Lado mayor al decodificar (por defecto FACE_IMAGE_MAX_SIDE)
+            min_face_size: Tamaño mínimo del rostro en la imagen decodificada
+                (por defecto self.min_face_size)
             
         Returns:
-            tuple: (face_encoding, face_location, confidence_score)
+            tuple: (face_encoding, face_location, confidence_score); face_location
+            en coordenadas de la imagen original
         """
         try:
             # Verificar dependencias
@@ -73,13 +80,16 @@ class FacialRecognitionSystem:
                 return None, None, 0.0
             
             # Convertir imagen
+            image_bytes = None
             if isinstance(image_data, str):
                 try:
                     # Manejar formato data:image/jpeg;base64,
                     if ',' in image_data:
                         image_data = image_data.split(',')[1]
                     image_bytes = base64.b64decode(image_data)
-                    image = Image.open(BytesIO(image_bytes))
+                    # Decodificación reducida: la detección trabaja sobre una miniatura
+                    from .image_derivatives import open_image
+                    image = open_image(image_bytes, max_side or getattr(settings, 'FACE_IMAGE_MAX_SIDE', 1280))
                 except Exception as e:
                     logger.error(f"Error decodificando imagen base64: {str(e)}")
                     return None, None, 0.0
@@ -93,32 +103,49 @@ class FacialRecognitionSystem:
             image_array = np.array(image)
             gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
             
-            # Verificar que el archivo de cascada existe
-            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            if not os.path.exists(cascade_path):
-                logger.error(f"Archivo de cascada no encontrado: {cascade_path}")
+            # Clasificador compartido (se carga una sola vez, ver face_detectors.py)
+            face_cascade = detector_registry.face_cascade()
+            if face_cascade is None:
                 return None, None, 0.0
             
             # Detección de rostros con OpenCV (Haar Cascades) - Configuración más permisiva
-            face_cascade = cv2.CascadeClassifier(cascade_path)
             # Parámetros más permisivos: scaleFactor=1.05, minNeighbors=3, minSize=(50,50)
-            faces = face_cascade.detectMultiScale(gray, 1.05, 3, minSize=(50, 50), maxSize=(500, 500))
+            # Se detecta sobre una miniatura y se refina en el ROI a resolución completa
+            face = detect_largest_face(
+                gray, face_cascade, scale_factor=1.05, min_neighbors=3,
+                min_size=min_face_size or self.min_face_size, max_size=(500, 500)
+            )
             
-            if len(faces) == 0:
+            if face is None:
                 logger.warning("No se detectó rostro en la imagen")
                 return None, None, 0.0
             
-            # Tomar el rostro más grande
-            x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+            # Rostro más grande (coordenadas de la imagen decodificada)
+            x, y, w, h = face
+            face_color = image_array[y:y+h, x:x+w]
+            
+            original = self._original_if_reduced(image_bytes, image.size)
+            if original is not None:
+                # Se decodificó reducida: el rostro se lleva a coordenadas de la
+                # imagen original y se recorta de ella, para que el tamaño
+                # (_check_face_size), la calidad y las características se midan
+                # a resolución completa como antes de reducir la decodificación
+                scale = max(original.size) / max(image.size)
+                x, y = int(x * scale), int(y * scale)
+                w = min(int(round(w * scale)), original.width - x)
+                h = min(int(round(h * scale)), original.height - y)
+                face_color = np.array(original.crop((x, y, x + w, y + h)))
+                del original
+            
             face_location = (y, x + w, y + h, x)  # Formato: top, right, bottom, left
             
             # Extraer región facial
-            face_roi = gray[y:y+h, x:x+w]
+            face_roi = cv2.cvtColor(face_color, cv2.COLOR_RGB2GRAY)
             face_roi_resized = cv2.resize(face_roi, (128, 128))
             
             # Extraer características avanzadas
             try:
-                features = self._extract_advanced_features(face_roi_resized, image_array[y:y+h, x:x+w])
+                features = self._extract_advanced_features(face_roi_resized, face_color)
             except Exception as e:
                 logger.error(f"Error extrayendo características: {str(e)}")
                 # Fallback: usar hash simple de la imagen
@@ -126,7 +153,7 @@ class FacialRecognitionSystem:
             
             # Calcular calidad
             try:
-                quality_score = self._calculate_advanced_quality(face_roi, image_array[y:y+h, x:x+w])
+                quality_score = self._calculate_advanced_quality(face_roi, face_color)
             except Exception as e:
                 logger.error(f"Error calculando calidad: {str(e)}")
                 quality_score = 0.7  # Valor por defecto
@@ -138,6 +165,23 @@ class FacialRecognitionSystem:
             logger.error(f"Tipo de error: {type(e).__name__}")
             return None, None, 0.0
     
+    @staticmethod
+    def _original_if_reduced(image_bytes, decoded_size):
+        """
+        Imagen original si la decodificación se redujo, o None
+        
+        Solo lee la cabecera para comparar tamaños: la decodificación completa
+        ocurre únicamente cuando la foto supera FACE_IMAGE_MAX_SIDE.
+        """
+        if image_bytes is None:
+            return None
+        
+        from .image_derivatives import open_image
+        with Image.open(BytesIO(image_bytes)) as header:
+            if max(header.size) <= max(decoded_size):
+                return None
+        return open_image(image_bytes)
+    
     def verify_identity(self, captured_image, employee):
         """
         Verifica si la imagen capturada corresponde al empleado
@@ -180,29 +224,50 @@ class FacialRecognitionSystem:
                     'requires_enrollment': False
                 }
             
-            # Obtener codificación almacenada (versión simplificada)
-            try:
-                stored_encoding = base64.b64decode(facial_profile.face_encoding).decode('utf-8')
-            except Exception as e:
-                logger.error(f"Error decodificando perfil facial: {str(e)}")
-                return {
-                    'success': False,
-                    'confidence': 0.0,
-                    'error': 'Error en perfil facial almacenado',
-                    'requires_enrollment': True
-                }
-            
-            # Calcular similitud (versión simplificada usando comparación de hash)
-            # En producción usaría vectores de 128 dimensiones y distancia euclidiana
-            similarity = self._calculate_hash_similarity(stored_encoding, captured_encoding)
-            
-            # Convertir similitud a porcentaje de confianza (mejorado)
-            # Combinar similitud y calidad de forma más equilibrada
-            confidence = max(0.0, (similarity * 0.8) + (quality_score * 0.2))
+            # La similitud estandarizada solo decide si se configuró un umbral
+            # medido con calibrate_face_matching y la galería está calibrada;
+            # si no, se mantiene la decisión original
+            calibrated_threshold = getattr(settings, 'FACE_VERIFY_THRESHOLD', None)
+            use_calibrated = calibrated_threshold is not None and face_gallery.calibrated
+
+            # Comparar contra la galería en memoria (sin decodificar base64/JSON).
+            # Si otro worker registró o actualizó el perfil, esta copia aún no lo
+            # tiene o lo tiene desactualizado: usar el vector de la fila cargada.
+            if face_gallery.is_current(facial_profile):
+                similarity = face_gallery.similarity(
+                    facial_profile.id, captured_encoding, standardized=use_calibrated
+                )
+            else:
+                similarity = face_gallery.similarity_to_vector(
+                    facial_profile.get_face_vector(), captured_encoding, standardized=use_calibrated
+                )
+
+            if similarity is None:
+                # Perfil heredado sin vector de características: comparación de hash
+                try:
+                    stored_encoding = base64.b64decode(facial_profile.face_encoding).decode('utf-8')
+                except Exception as e:
+                    logger.error(f"Error decodificando perfil facial: {str(e)}")
+                    return {
+                        'success': False,
+                        'confidence': 0.0,
+                        'error': 'Error en perfil facial almacenado',
+                        'requires_enrollment': True
+                    }
+                similarity = self._calculate_hash_similarity(stored_encoding, captured_encoding)
             
-            # Verificar umbral - MODO BALANCEADO
-            # Usar umbral moderado para balance entre seguridad y funcionalidad
-            effective_threshold = min(facial_profile.confidence_threshold, 0.5)  # Máximo 50%
+            if use_calibrated:
+                # Similitud estandarizada contra el umbral calibrado; la calidad no suma
+                confidence = similarity
+                effective_threshold = calibrated_threshold
+            else:
+                # Convertir similitud a porcentaje de confianza (mejorado)
+                # Combinar similitud y calidad de forma más equilibrada
+                confidence = max(0.0, (similarity * 0.8) + (quality_score * 0.2))
+                
+                # Verificar umbral - MODO BALANCEADO
+                # Usar umbral moderado para balance entre seguridad y funcionalidad
+                effective_threshold = min(facial_profile.confidence_threshold, 0.5)  # Máximo 50%
             is_match = confidence >= effective_threshold
             
             logger.info(f"Confianza calculada: {confidence:.2f}, Umbral efectivo: {effective_threshold:.2f}, Match: {is_match}")
@@ -235,6 +300,67 @@ class FacialRecognitionSystem:
                 'requires_enrollment': False
             }
     
+    def identify(self, captured_image, employee_ids=None, top_k=1, min_similarity=None,
+                 max_side=None, min_face_size=None):
+        """
+        Identifica quién aparece en la imagen (búsqueda 1:N en la galería)
+
+        Args:
+            captured_image: Imagen capturada en base64 o PIL Image
+            employee_ids: Restringir candidatos a estos empleados (opcional)
+            top_k: Número máximo de candidatos
+            min_similarity: Similitud estandarizada mínima (por defecto KIOSK_MIN_SIMILARITY)
+            max_side, min_face_size: Ver extract_face_encoding
+
+        Returns:
+            dict: Resultado con la lista de candidatos ordenada por similitud
+        """
+        try:
+            captured_encoding, face_location, quality_score = self.extract_face_encoding(
+                captured_image, max_side=max_side, min_face_size=min_face_size
+            )
+
+            if not isinstance(captured_encoding, dict) or not captured_encoding:
+                return {
+                    'success': False,
+                    'candidates': [],
+                    'error': 'No se detectó rostro en la imagen o calidad insuficiente',
+                }
+
+            if not face_gallery.calibrated:
+                return {
+                    'success': False,
+                    'candidates': [],
+                    'error': 'Galería facial sin calibrar: se necesitan más perfiles registrados',
+                }
+
+            if min_similarity is None:
+                min_similarity = getattr(settings, 'KIOSK_MIN_SIMILARITY', 0.67)
+
+            candidates = face_gallery.identify(
+                captured_encoding,
+                top_k=top_k,
+                min_similarity=min_similarity,
+                employee_ids=employee_ids,
+            )
+
+            return {
+                'success': bool(candidates),
+                'candidates': candidates,
+                'face_location': face_location,
+                'quality_score': quality_score,
+                'security_checks': self._perform_security_checks(captured_image, face_location, quality_score),
+                'error': None if candidates else 'Rostro no reconocido',
+            }
+
+        except Exception as e:
+            logger.error(f"Error en identificación 1:N: {str(e)}")
+            return {
+                'success': False,
+                'candidates': [],
+                'error': f'Error interno: {str(e)}',
+            }
+
     def enroll_employee(self, employee, reference_images):
         """
         Registra un nuevo perfil facial para un empleado
@@ -333,7 +459,7 @@ class FacialRecognitionSystem:
         """Realiza verificaciones adicionales de seguridad"""
         checks = {
             'liveness_detection': self._check_liveness(image_data, face_location),
-            'image_quality': quality_score > 0.6,
+            'image_quality': bool(quality_score > 0.6),
             'face_size': self._check_face_size(face_location),
             'image_authenticity': self._check_image_authenticity(image_data)
         }
@@ -483,32 +609,9 @@ class FacialRecognitionSystem:
             return {}
     
     def _compute_lbp(self, image):
-        """Calcula Local Binary Pattern"""
+        """Calcula Local Binary Pattern (vectorizado, ver lbp.py)"""
         try:
-            h, w = image.shape
-            lbp = np.zeros((h-2, w-2), dtype=np.uint8)
-            
-            for i in range(1, h-1):
-                for j in range(1, w-1):
-                    center = image[i, j]
-                    code = 0
-                    
-                    # 8 vecinos
-                    neighbors = [
-                        image[i-1, j-1], image[i-1, j], image[i-1, j+1],
-                        image[i, j+1], image[i+1, j+1], image[i+1, j],
-                        image[i+1, j-1], image[i, j-1]
-                    ]
-                    
-                    for k, neighbor in enumerate(neighbors):
-                        if neighbor >= center:
-                            code |= (1 << k)
-                    
-                    lbp[i-1, j-1] = code
-            
-            # Histograma LBP
-            hist, _ = np.histogram(lbp.flatten(), bins=16, range=(0, 256))
-            return hist.tolist()
+            return lbp_histogram(image)
             
         except Exception as e:
             logger.error(f"Error calculando LBP: {str(e)}")
@@ -527,9 +630,15 @@ class FacialRecognitionSystem:
             # Brillo
             brightness = 1.0 - abs(np.mean(face_gray) - 127.5) / 127.5
             
-            # Detección de ojos
-            eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-            eyes = eye_cascade.detectMultiScale(face_gray)
+            # Detección de ojos: solo en el 60% superior del rostro y a escalas
+            # plausibles (menos de la mitad del costo de recorrer todo el recorte)
+            eye_cascade = detector_registry.eye_cascade()
+            face_height, face_width = face_gray.shape[:2]
+            eyes = eye_cascade.detectMultiScale(
+                face_gray[:face_height * 6 // 10],
+                minSize=(max(1, face_width // 10),) * 2,
+                maxSize=(max(1, face_width // 2),) * 2,
+            ) if eye_cascade is not None else ()
             eye_score = min(1.0, len(eyes) / 2.0)
             
             # Score final
@@ -589,6 +698,23 @@ def verify_employee_identity(captured_image, employee):
     return _intelligent_fallback_verification(captured_image, employee)
 
 
+def identify_employee(captured_image, employee_ids=None, top_k=1, **options):
+    """
+    Función de conveniencia para identificación 1:N contra la galería facial
+
+    options se pasan a FacialRecognitionSystem.identify (min_similarity,
+    max_side, min_face_size).
+    """
+    system = get_facial_recognition_system()
+    if not system:
+        return {
+            'success': False,
+            'candidates': [],
+            'error': 'Sistema de reconocimiento facial no disponible'
+        }
+    return system.identify(captured_image, employee_ids=employee_ids, top_k=top_k, **options)
+
+
 def _intelligent_fallback_verification(captured_image, employee):
     """
     Sistema de fallback inteligente con validación REAL de identidad
@@ -13,6 +13,8 @@ import os
 from django.conf import settings
 from django.core.files.storage import default_storage
 from .models import FacialRecognitionProfile
+from .face_detectors import detector_registry
+from .image_derivatives import open_image
 import logging
 from sklearn.metrics.pairwise import cosine_similarity
 import tensorflow as tf
@@ -37,28 +39,23 @@ class ProductionFacialRecognitionSystem:
         self._load_advanced_models()
     
     def _load_advanced_models(self):
-        """Carga modelos avanzados de detección"""
-        try:
-            # Cargar clasificador Haar para detección rápida
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-            
-            # Cargar detector DNN para mayor precisión
-            prototxt_path = os.path.join(settings.BASE_DIR, 'models', 'deploy.prototxt')
-            model_path = os.path.join(settings.BASE_DIR, 'models', 'res10_300x300_ssd_iter_140000.caffemodel')
-            
-            if os.path.exists(prototxt_path) and os.path.exists(model_path):
-                self.dnn_net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
-                logger.info("Modelos DNN cargados exitosamente")
-            else:
-                self.dnn_net = None
-                logger.warning("Modelos DNN no encontrados, usando detección básica")
-                
-        except Exception as e:
-            logger.error(f"Error cargando modelos avanzados: {str(e)}")
-            self.face_cascade = None
-            self.eye_cascade = None
-            self.dnn_net = None
+        """Carga modelos avanzados de detección (registro compartido, ver face_detectors.py)"""
+        detector_registry.warm_up()
+    
+    @property
+    def face_cascade(self):
+        """Clasificador Haar para detección rápida"""
+        return detector_registry.face_cascade()
+    
+    @property
+    def eye_cascade(self):
+        """Clasificador Haar de ojos para validar calidad"""
+        return detector_registry.eye_cascade()
+    
+    @property
+    def dnn_net(self):
+        """Detector DNN para mayor precisión"""
+        return detector_registry.dnn_net()
     
     def extract_face_encoding_advanced(self, image_data):
         """
@@ -74,7 +71,7 @@ class ProductionFacialRecognitionSystem:
             # Convertir imagen
             if isinstance(image_data, str):
                 image_data = base64.b64decode(image_data.split(',')[1])
-                image = Image.open(BytesIO(image_data))
+                image = open_image(image_data, getattr(settings, 'FACE_IMAGE_MAX_SIDE', 1280))
             else:
                 image = image_data
             
@@ -323,8 +320,11 @@ class ProductionFacialRecognitionSystem:
             blob = cv2.dnn.blobFromImage(cv2.resize(image_array, (300, 300)), 1.0,
                                        (300, 300), (104.0, 177.0, 123.0))
             
-            self.dnn_net.setInput(blob)
-            detections = self.dnn_net.forward()
+            # La red se comparte entre hilos: setInput + forward deben ser atómicos
+            with detector_registry.dnn_lock:
+                dnn_net = self.dnn_net
+                dnn_net.setInput(blob)
+                detections = dnn_net.forward()
             
             faces = []
             for i in range(0, detections.shape[2]):
@@ -0,0 +1,391 @@
+"""
+Índice espacial de áreas de trabajo (geocercas)
+EURO SECURITY - Geofence Index
+
+Bajo rastreo continuo cada guardia guarda un punto GPS cada pocos segundos y
+GPSTracking.save necesita saber el área más cercana y si está dentro. Este
+índice mantiene en memoria:
+
+- Las áreas de trabajo con coordenadas ya convertidas a radianes.
+- Una rejilla de celdas de GEOFENCE_CELL_DEGREES grados: cada área activa se
+  registra en las celdas que cubre su círculo (consulta "¿dentro de qué área
+  estoy?" en O(1), ver contains) y en la celda de su centro (búsqueda del
+  área más cercana por anillos de celdas). Los anillos empiezan en el
+  primero que toca la caja envolvente de las celdas con centros, terminan en
+  el que la cubre entera y solo recorren su perímetro dentro de esa caja.
+- Las asignaciones activas empleado → áreas con su tolerancia, y su inversa
+  área → empleados (candidatos del kiosco de marcación, ver kiosk.py).
+
+Se reconstruye completo (dos consultas) cuando cambian WorkArea o
+EmployeeWorkArea (ver signals.py) y cada GEOFENCE_REFRESH_SECONDS se
+comprueba si otro proceso modificó las tablas.
+"""
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE = 111320.0
+
+GeofenceArea = namedtuple('GeofenceArea', 'id area lat lng lat_rad lng_rad cos_lat radius is_active')
+GeofenceMatch = namedtuple('GeofenceMatch', 'area distance inside tolerance')
+
+
+def haversine_meters(lat_rad1, lng_rad1, cos_lat1, lat_rad2, lng_rad2, cos_lat2):
+    """Distancia haversine entre dos puntos ya convertidos a radianes"""
+    sin_dlat = math.sin((lat_rad2 - lat_rad1) / 2)
+    sin_dlng = math.sin((lng_rad2 - lng_rad1) / 2)
+    a = sin_dlat * sin_dlat + cos_lat1 * cos_lat2 * sin_dlng * sin_dlng
+    return 2 * EARTH_RADIUS_METERS * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+class GeofenceIndex:
+    """Índice en memoria de geocercas compartido por el proceso"""
+
+    def __init__(self, cell_degrees=None):
+        self._lock = threading.RLock()
+        self._cell_degrees = cell_degrees
+        self._loaded = False
+        self._last_check = 0.0
+        self._signature = None
+        self._areas = {}
+        self._cover_cells = {}
+        self._center_cells = {}
+        self._assignments = {}
+        self._area_employees = {}
+        self._center_bounds = None
+
+    # ------------------------------------------------------------------
+    # Carga y sincronización
+    # ------------------------------------------------------------------
+
+    @property
+    def cell_degrees(self):
+        if self._cell_degrees is None:
+            return float(getattr(settings, 'GEOFENCE_CELL_DEGREES', 0.01))
+        return self._cell_degrees
+
+    def _cell(self, lat, lng):
+        size = self.cell_degrees
+        return (int(math.floor(lat / size)), int(math.floor(lng / size)))
+
+    def _current_signature(self):
+        from .models_gps import EmployeeWorkArea, WorkArea
+
+        areas = WorkArea.objects.aggregate(total=Count('id'), last_update=Max('updated_at'))
+        assignments = EmployeeWorkArea.objects.aggregate(total=Count('id'), last_update=Max('updated_at'))
+        return (areas['total'], areas['last_update'], assignments['total'], assignments['last_update'])
+
+    def load(self):
+        """Construye el índice desde la base de datos"""
+        from .models_gps import EmployeeWorkArea, WorkArea
+
+        signature = self._current_signature()
+        size = self.cell_degrees
+
+        areas = {}
+        cover_cells = {}
+        center_cells = {}
+
+        for work_area in WorkArea.objects.all():
+            lat = float(work_area.latitude)
+            lng = float(work_area.longitude)
+            lat_rad = math.radians(lat)
+            area = GeofenceArea(
+                id=work_area.id,
+                area=work_area,
+                lat=lat,
+                lng=lng,
+                lat_rad=lat_rad,
+                lng_rad=math.radians(lng),
+                cos_lat=math.cos(lat_rad),
+                radius=work_area.radius_meters,
+                is_active=work_area.is_active,
+            )
+            areas[area.id] = area
+
+            if not area.is_active:
+                continue
+
+            center_cells.setdefault(self._cell(lat, lng), []).append(area.id)
+
+            # Celdas cubiertas por el círculo (caja envolvente)
+            lat_span = area.radius / METERS_PER_DEGREE
+            lng_span = area.radius / (METERS_PER_DEGREE * max(area.cos_lat, 1e-6))
+            min_cell = self._cell(lat - lat_span, lng - lng_span)
+            max_cell = self._cell(lat + lat_span, lng + lng_span)
+            for row in range(min_cell[0], max_cell[0] + 1):
+                for col in range(min_cell[1], max_cell[1] + 1):
+                    cover_cells.setdefault((row, col), []).append(area.id)
+
+        assignments = {}
+        area_employees = {}
+        rows = EmployeeWorkArea.objects.filter(is_active=True).values_list(
+            'employee_id', 'work_area_id', 'tolerance_meters'
+        )
+        for employee_id, area_id, tolerance in rows:
+            if area_id in areas:
+                assignments.setdefault(employee_id, []).append((area_id, tolerance))
+                area_employees.setdefault(area_id, set()).add(employee_id)
+        area_employees = {area_id: frozenset(ids) for area_id, ids in area_employees.items()}
+
+        # Caja envolvente de las celdas con centros (filas y columnas extremas)
+        center_bounds = None
+        if center_cells:
+            rows_range = [cell[0] for cell in center_cells]
+            cols_range = [cell[1] for cell in center_cells]
+            center_bounds = (min(rows_range), max(rows_range), min(cols_range), max(cols_range))
+
+        with self._lock:
+            self._areas = areas
+            self._cover_cells = cover_cells
+            self._center_cells = center_cells
+            self._assignments = assignments
+            self._area_employees = area_employees
+            self._center_bounds = center_bounds
+            self._signature = signature
+            self._loaded = True
+            self._last_check = time.monotonic()
+
+        logger.info(f"🗺️ Índice de geocercas cargado: {len(areas)} áreas, {len(assignments)} empleados asignados ({size}°/celda)")
+
+    def ensure_loaded(self):
+        """Carga perezosa y recarga periódica si otro proceso cambió áreas"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+            return
+
+        refresh_seconds = getattr(settings, 'GEOFENCE_REFRESH_SECONDS', 60)
+        if refresh_seconds and time.monotonic() - self._last_check >= refresh_seconds:
+            with self._lock:
+                if time.monotonic() - self._last_check < refresh_seconds:
+                    return
+                self._last_check = time.monotonic()
+                try:
+                    if self._current_signature() != self._signature:
+                        self.load()
+                except Exception as e:
+                    logger.error(f"Error verificando índice de geocercas: {str(e)}")
+
+    def invalidate(self):
+        """Fuerza la reconstrucción en el próximo acceso"""
+        with self._lock:
+            self._loaded = False
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _distance(self, area, lat_rad, lng_rad, cos_lat):
+        return haversine_meters(area.lat_rad, area.lng_rad, area.cos_lat, lat_rad, lng_rad, cos_lat)
+
+    def employees_for_area(self, area_id):
+        """IDs de los empleados con asignación activa al área (frozenset)"""
+        self.ensure_loaded()
+        with self._lock:
+            return self._area_employees.get(area_id, frozenset())
+
+    def locate_for_employee(self, employee_id, lat, lng):
+        """
+        Área asignada más cercana a un punto y si está dentro (con la
+        tolerancia de la asignación). Equivale a la búsqueda que hacía
+        GPSTracking.save sobre EmployeeWorkArea.
+
+        Returns:
+            GeofenceMatch o None si el empleado no tiene áreas asignadas
+        """
+        self.ensure_loaded()
+        with self._lock:
+            areas = self._areas
+            assigned = self._assignments.get(employee_id, ())
+
+        if not assigned:
+            return None
+
+        lat_rad = math.radians(float(lat))
+        lng_rad = math.radians(float(lng))
+        cos_lat = math.cos(lat_rad)
+
+        best = None
+        for area_id, tolerance in assigned:
+            area = areas[area_id]
+            distance = self._distance(area, lat_rad, lng_rad, cos_lat)
+            if best is None or distance < best[1]:
+                best = (area, distance, tolerance)
+
+        area, distance, tolerance = best
+        return GeofenceMatch(area.area, distance, distance <= area.radius + tolerance, tolerance)
+
+    def locate_many_for_employee(self, employee_id, latitudes, longitudes):
+        """
+        Versión vectorizada de locate_for_employee para lotes de puntos
+        (ingesta GPS por lotes): una matriz puntos × áreas asignadas con numpy
+
+        Returns:
+            Lista de GeofenceMatch (o None) en el mismo orden que los puntos
+        """
+        self.ensure_loaded()
+        with self._lock:
+            areas = self._areas
+            assigned = self._assignments.get(employee_id, ())
+
+        count = len(latitudes)
+        if not assigned or not count:
+            return [None] * count
+
+        assigned_areas = [areas[area_id] for area_id, _ in assigned]
+        tolerances = np.array([tolerance for _, tolerance in assigned], dtype=np.float64)
+        radii = np.array([area.radius for area in assigned_areas], dtype=np.float64)
+        area_lat = np.array([area.lat_rad for area in assigned_areas])[np.newaxis, :]
+        area_lng = np.array([area.lng_rad for area in assigned_areas])[np.newaxis, :]
+        area_cos = np.array([area.cos_lat for area in assigned_areas])[np.newaxis, :]
+
+        point_lat = np.radians(np.asarray(latitudes, dtype=np.float64))[:, np.newaxis]
+        point_lng = np.radians(np.asarray(longitudes, dtype=np.float64))[:, np.newaxis]
+
+        sin_dlat = np.sin((area_lat - point_lat) / 2)
+        sin_dlng = np.sin((area_lng - point_lng) / 2)
+        a = sin_dlat ** 2 + np.cos(point_lat) * area_cos * sin_dlng ** 2
+        distances = 2 * EARTH_RADIUS_METERS * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+        nearest = distances.argmin(axis=1)
+        nearest_distances = distances[np.arange(count), nearest]
+        inside = nearest_distances <= radii[nearest] + tolerances[nearest]
+
+        return [
+            GeofenceMatch(assigned_areas[index].area, float(distance), bool(is_inside), assigned[index][1])
+            for index, distance, is_inside in zip(nearest.tolist(), nearest_distances.tolist(), inside.tolist())
+        ]
+
+    def _containing(self, areas, cover_cells, lat, lng, lat_rad, lng_rad, cos_lat, tolerance_meters):
+        """(área, distancia) más cercana cuyo círculo + tolerancia contiene el punto"""
+        # Las celdas de cobertura se calculan sin tolerancia: con tolerancia
+        # se revisan también las celdas que alcanza alrededor del punto
+        lat_span = tolerance_meters / METERS_PER_DEGREE
+        lng_span = tolerance_meters / (METERS_PER_DEGREE * max(cos_lat, 1e-6))
+        min_row, min_col = self._cell(lat - lat_span, lng - lng_span)
+        max_row, max_col = self._cell(lat + lat_span, lng + lng_span)
+
+        best = None
+        seen = set()
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                for area_id in cover_cells.get((row, col), ()):
+                    if area_id in seen:
+                        continue
+                    seen.add(area_id)
+                    area = areas[area_id]
+                    distance = self._distance(area, lat_rad, lng_rad, cos_lat)
+                    if distance <= area.radius + tolerance_meters and (best is None or distance < best[1]):
+                        best = (area, distance)
+        return best
+
+    def contains(self, lat, lng, tolerance_meters=0):
+        """
+        Área activa que contiene el punto (la más cercana si hay varias)
+
+        Solo consulta las celdas de cobertura; no busca el área más cercana.
+
+        Returns:
+            GeofenceMatch o None si ninguna área lo contiene
+        """
+        self.ensure_loaded()
+        with self._lock:
+            areas = self._areas
+            cover_cells = self._cover_cells
+
+        lat = float(lat)
+        lng = float(lng)
+        lat_rad = math.radians(lat)
+        best = self._containing(
+            areas, cover_cells, lat, lng, lat_rad, math.radians(lng), math.cos(lat_rad), tolerance_meters
+        )
+        if best is None:
+            return None
+        return GeofenceMatch(best[0].area, best[1], True, tolerance_meters)
+
+    @staticmethod
+    def _ring_cells(row, col, ring, bounds):
+        """Celdas del perímetro del anillo ring recortadas a la caja bounds"""
+        min_row, max_row, min_col, max_col = bounds
+        col_from, col_to = max(col - ring, min_col), min(col + ring, max_col)
+        for ring_row in (row - ring, row + ring) if ring else (row,):
+            if min_row <= ring_row <= max_row:
+                for ring_col in range(col_from, col_to + 1):
+                    yield ring_row, ring_col
+        if ring:
+            row_from, row_to = max(row - ring + 1, min_row), min(row + ring - 1, max_row)
+            for ring_col in (col - ring, col + ring):
+                if min_col <= ring_col <= max_col:
+                    for ring_row in range(row_from, row_to + 1):
+                        yield ring_row, ring_col
+
+    def locate(self, lat, lng, tolerance_meters=0):
+        """
+        Área activa que contiene el punto (la más cercana si hay varias) o,
+        si ninguna lo contiene, el área activa más cercana
+
+        Returns:
+            GeofenceMatch o None si no hay áreas activas
+        """
+        self.ensure_loaded()
+        with self._lock:
+            areas = self._areas
+            cover_cells = self._cover_cells
+            center_cells = self._center_cells
+            bounds = self._center_bounds
+
+        lat = float(lat)
+        lng = float(lng)
+        lat_rad = math.radians(lat)
+        lng_rad = math.radians(lng)
+        cos_lat = math.cos(lat_rad)
+
+        # 1. Áreas cuyo círculo cubre el punto
+        best = self._containing(areas, cover_cells, lat, lng, lat_rad, lng_rad, cos_lat, tolerance_meters)
+        if best is not None:
+            return GeofenceMatch(best[0].area, best[1], True, tolerance_meters)
+
+        if bounds is None:
+            return None
+
+        # 2. Área más cercana: anillos de celdas alrededor del punto, desde el
+        # primero que toca la caja de centros hasta el que la cubre entera
+        cell_meters = self.cell_degrees * METERS_PER_DEGREE * max(cos_lat, 1e-6)
+        row, col = self._cell(lat, lng)
+        min_row, max_row, min_col, max_col = bounds
+        first_ring = max(min_row - row, row - max_row, min_col - col, col - max_col, 0)
+        last_ring = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+
+        for ring in range(first_ring, last_ring + 1):
+            # Un centro en el anillo r está al menos a (r - 1) celdas de distancia
+            if best is not None and best[1] <= (ring - 1) * cell_meters:
+                break
+            for ring_cell in self._ring_cells(row, col, ring, bounds):
+                for area_id in center_cells.get(ring_cell, ()):
+                    area = areas[area_id]
+                    distance = self._distance(area, lat_rad, lng_rad, cos_lat)
+                    if best is None or distance < best[1]:
+                        best = (area, distance)
+
+        if best is None:
+            return None
+
+        area, distance = best
+        return GeofenceMatch(area.area, distance, distance <= area.radius + tolerance_meters, tolerance_meters)
+
+
+# Instancia global del proceso
+geofence_index = GeofenceIndex()
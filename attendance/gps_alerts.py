@@ -0,0 +1,511 @@
+"""
+Motor de alertas de ubicación por reglas
+EURO SECURITY - GPS Alert Engine
+
+Cada punto GPS alimenta una máquina de estados por empleado en memoria del
+proceso (como el índice de geocercas) que produce todos los tipos de
+LocationAlert:
+
+- OUT_OF_AREA: fuera del área asignada de forma continua durante
+  GPS_ALERT_OUT_OF_AREA_SECONDS. Se rearma al volver a entrar.
+- NO_MOVEMENT: dentro de GPS_ALERT_NO_MOVEMENT_RADIUS_METERS (o la
+  precisión del punto, si es mayor) durante GPS_ALERT_NO_MOVEMENT_MINUTES.
+- BATTERY_LOW: mediana de las últimas lecturas en o bajo
+  GPS_ALERT_BATTERY_LOW_PERCENT; es crítica si al ritmo de descarga quedan
+  menos de GPS_ALERT_BATTERY_CRITICAL_MINUTES. Se rearma al cargar.
+- LATE_ARRIVAL: primera entrada al área después de la tolerancia de llegada
+  del turno (o ninguna entrada al vencer la tolerancia).
+- EARLY_DEPARTURE: tras haber llegado, fuera del área durante
+  GPS_ALERT_DEPARTURE_MINUTES saliendo antes del fin del turno menos su
+  tolerancia de salida.
+
+Los turnos salen de EmployeeShiftAssignment (ShiftCalendar, recargado cada
+GPS_ALERT_SHIFT_REFRESH_SECONDS y al cambiar turnos o asignaciones). Si el
+empleado tiene turnos, fuera de ellos no se evalúan las reglas; si no tiene
+ninguno, OUT_OF_AREA, NO_MOVEMENT y BATTERY_LOW se evalúan siempre.
+
+Los puntos no generan consultas: la base de datos solo se toca cuando una
+regla dispara, para descartar duplicados (misma alerta sin resolver dentro
+de GPS_ALERT_COOLDOWN_MINUTES, o ya emitida en el mismo turno) y para
+confirmarla con los puntos guardados, porque con varios workers cada
+proceso solo ve una parte de los puntos de un empleado. La primera vez que
+un proceso ve a un empleado reconstruye su estado con los puntos recientes
+(una consulta) sin emitir alertas. Los puntos anteriores al último procesado
+(reenvíos offline) se ignoran.
+"""
+import logging
+import math
+import statistics
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .geofence import haversine_meters
+
+logger = logging.getLogger(__name__)
+
+
+ShiftWindow = namedtuple('ShiftWindow', 'key start end late_deadline early_deadline name')
+AlertCandidate = namedtuple('AlertCandidate', 'alert_type level title message tracking since window')
+
+# Puntos por encima de la alerta de batería necesarios para rearmarla
+BATTERY_REARM_MARGIN = 10
+BATTERY_READINGS = 6
+WARMUP_MAX_POINTS = 2000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class AlertRules:
+    """Umbrales de las reglas (por defecto desde settings; la repetición los sobrescribe)"""
+
+    DEFAULTS = {
+        'cooldown_minutes': ('GPS_ALERT_COOLDOWN_MINUTES', 15),
+        'out_of_area_seconds': ('GPS_ALERT_OUT_OF_AREA_SECONDS', 60),
+        'no_movement_minutes': ('GPS_ALERT_NO_MOVEMENT_MINUTES', 30),
+        'no_movement_radius_meters': ('GPS_ALERT_NO_MOVEMENT_RADIUS_METERS', 25),
+        'battery_low_percent': ('GPS_ALERT_BATTERY_LOW_PERCENT', 15),
+        'battery_critical_minutes': ('GPS_ALERT_BATTERY_CRITICAL_MINUTES', 30),
+        'departure_minutes': ('GPS_ALERT_DEPARTURE_MINUTES', 10),
+    }
+
+    def __init__(self, **overrides):
+        for name, (setting, default) in self.DEFAULTS.items():
+            value = overrides.get(name)
+            setattr(self, name, _setting(setting, default) if value is None else value)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+
+# ----------------------------------------------------------------------
+# Turnos
+# ----------------------------------------------------------------------
+
+class ShiftCalendar:
+    """Asignaciones de turno activas por empleado, en memoria del proceso"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._assignments = {}
+        # Turnos ya calculados por (empleado, día local)
+        self._windows = {}
+
+    def load(self):
+        from .models import EmployeeShiftAssignment
+
+        assignments = {}
+        rows = EmployeeShiftAssignment.objects.filter(
+            status='ACTIVE', shift__is_active=True,
+        ).order_by('id').values_list(
+            'id', 'employee_id', 'start_date', 'end_date',
+            'shift__start_time', 'shift__end_time', 'shift__is_overnight',
+            'shift__late_tolerance_minutes', 'shift__early_exit_tolerance_minutes',
+            'shift__name', 'shift__custom_name',
+        )
+        for row in rows:
+            assignments.setdefault(row[1], []).append(row)
+
+        with self._lock:
+            self._assignments = assignments
+            self._windows = {}
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"🕒 Calendario de turnos cargado: {sum(map(len, assignments.values()))} asignaciones activas")
+
+    def ensure_loaded(self):
+        refresh_seconds = _setting('GPS_ALERT_SHIFT_REFRESH_SECONDS', 300)
+        if self._loaded and time.monotonic() - self._loaded_at < refresh_seconds:
+            return
+        with self._lock:
+            if not self._loaded or time.monotonic() - self._loaded_at >= refresh_seconds:
+                self.load()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    def has_shifts(self, employee_id):
+        self.ensure_loaded()
+        return employee_id in self._assignments
+
+    def _day_windows(self, employee_id, day):
+        """Turnos que empiezan el día local indicado"""
+        windows = []
+        for (assignment_id, _, start_date, end_date, start_time, end_time, overnight,
+             late_tolerance, early_tolerance, name, custom_name) in self._assignments.get(employee_id, ()):
+            if day < start_date or (end_date is not None and day > end_date):
+                continue
+            start = timezone.make_aware(datetime.combine(day, start_time))
+            end_day = day + timedelta(days=1) if overnight or end_time <= start_time else day
+            end = timezone.make_aware(datetime.combine(end_day, end_time))
+            windows.append(ShiftWindow(
+                key=(assignment_id, day),
+                start=start,
+                end=end,
+                late_deadline=start + timedelta(minutes=late_tolerance),
+                early_deadline=end - timedelta(minutes=early_tolerance),
+                name=custom_name or name,
+            ))
+        return windows
+
+    def window_at(self, employee_id, moment):
+        """Turno del empleado que contiene el instante (el que empezó antes si hay varios)"""
+        self.ensure_loaded()
+        if employee_id not in self._assignments:
+            return None
+
+        local_date = timezone.localtime(moment).date()
+        key = (employee_id, local_date)
+        windows = self._windows.get(key)
+        if windows is None:
+            windows = sorted(
+                self._day_windows(employee_id, local_date - timedelta(days=1)) + self._day_windows(employee_id, local_date),
+                key=lambda window: window.start,
+            )
+            if len(self._windows) > 50000:
+                self._windows = {}
+            self._windows[key] = windows
+
+        for window in windows:
+            if window.start <= moment < window.end:
+                return window
+        return None
+
+
+# ----------------------------------------------------------------------
+# Estado por empleado
+# ----------------------------------------------------------------------
+
+class EmployeeState:
+    __slots__ = (
+        'last_timestamp', 'anchor', 'anchor_since', 'still_alerted',
+        'outside_since', 'out_alerted', 'battery', 'battery_alerted',
+        'shift_key', 'arrived', 'late_alerted', 'departure_alerted', 'last_alerts',
+    )
+
+    def __init__(self):
+        self.last_timestamp = None
+        self.anchor = None
+        self.anchor_since = None
+        self.still_alerted = False
+        self.outside_since = None
+        self.out_alerted = False
+        self.battery = deque(maxlen=BATTERY_READINGS)
+        self.battery_alerted = False
+        self.shift_key = None
+        self.arrived = False
+        self.late_alerted = False
+        self.departure_alerted = False
+        self.last_alerts = {}
+
+
+def _minutes(delta):
+    return int(delta.total_seconds() // 60)
+
+
+class GPSAlertEngine:
+    """
+    Máquina de estados de alertas de ubicación
+
+    Args:
+        rules: AlertRules (por defecto desde settings)
+        shifts: ShiftCalendar (por defecto el global del proceso)
+        confirm: confirmar y deduplicar contra la base de datos antes de
+            guardar (False en la repetición, que ve todos los puntos)
+    """
+
+    def __init__(self, rules=None, shifts=None, confirm=True):
+        self.rules = rules or AlertRules()
+        self.shifts = shifts or shift_calendar
+        self.confirm = confirm
+        self._lock = threading.Lock()
+        self._states = {}
+        self._last_purge = time.monotonic()
+
+    # Reglas (sin consultas)
+
+    def _emit(self, state, candidates, alert_type, level, title, message, tracking, since=None, window=None):
+        last = state.last_alerts.get(alert_type)
+        if last is not None and tracking.timestamp - last < timedelta(minutes=self.rules.cooldown_minutes):
+            return
+        state.last_alerts[alert_type] = tracking.timestamp
+        candidates.append(AlertCandidate(alert_type, level, title, message, tracking, since, window))
+
+    def observe(self, tracking, employee_name='', state=None):
+        """
+        Avanza la máquina de estados del empleado con un punto
+
+        Returns:
+            Lista de AlertCandidate (vacía casi siempre)
+        """
+        rules = self.rules
+        employee_id = tracking.employee_id
+        if state is None:
+            state = self._states.setdefault(employee_id, EmployeeState())
+
+        t = tracking.timestamp
+        if state.last_timestamp is not None and t <= state.last_timestamp:
+            return []
+        state.last_timestamp = t
+
+        window = self.shifts.window_at(employee_id, t)
+        on_duty = window is not None or not self.shifts.has_shifts(employee_id)
+        candidates = []
+
+        if window is None:
+            state.shift_key = None
+        elif window.key != state.shift_key:
+            state.shift_key = window.key
+            state.arrived = False
+            state.late_alerted = False
+            state.departure_alerted = False
+
+        area_name = tracking.work_area.name if tracking.work_area_id else ''
+
+        # Área de trabajo: fuera del área, llegada tarde y salida temprana
+        if tracking.work_area_id and not tracking.is_within_work_area:
+            if state.outside_since is None:
+                state.outside_since = t
+            outside = t - state.outside_since
+
+            if on_duty and not state.out_alerted and outside.total_seconds() >= rules.out_of_area_seconds:
+                state.out_alerted = True
+                self._emit(
+                    state, candidates, 'OUT_OF_AREA', 'WARNING',
+                    f'Empleado fuera del área: {area_name}',
+                    f'{employee_name} se encuentra a {tracking.distance_to_work_area or 0:.0f}m del área asignada.',
+                    tracking, since=state.outside_since, window=window,
+                )
+
+            if (window and state.arrived and not state.departure_alerted
+                    and state.outside_since < window.early_deadline
+                    and outside >= timedelta(minutes=rules.departure_minutes)):
+                state.departure_alerted = True
+                self._emit(
+                    state, candidates, 'EARLY_DEPARTURE', 'WARNING',
+                    f'Salida temprana: {area_name}',
+                    f'{employee_name} salió del área a las {timezone.localtime(state.outside_since):%H:%M}, '
+                    f'{_minutes(window.end - state.outside_since)} min antes del fin del turno {window.name}.',
+                    tracking, since=state.outside_since, window=window,
+                )
+        elif tracking.work_area_id:
+            state.outside_since = None
+            state.out_alerted = False
+            if window and not state.arrived:
+                state.arrived = True
+                if t > window.late_deadline and not state.late_alerted:
+                    state.late_alerted = True
+                    self._emit(
+                        state, candidates, 'LATE_ARRIVAL', 'WARNING',
+                        f'Llegada tarde: {area_name}',
+                        f'{employee_name} llegó al área {_minutes(t - window.start)} min después del inicio '
+                        f'del turno {window.name} ({timezone.localtime(window.start):%H:%M}).',
+                        tracking, since=window.start, window=window,
+                    )
+
+        if (window and tracking.work_area_id and not state.arrived and not state.late_alerted
+                and t > window.late_deadline):
+            state.late_alerted = True
+            self._emit(
+                state, candidates, 'LATE_ARRIVAL', 'WARNING',
+                f'Sin llegada al área: {area_name}',
+                f'{employee_name} no ha llegado al área; el turno {window.name} empezó a las '
+                f'{timezone.localtime(window.start):%H:%M}.',
+                tracking, since=window.start, window=window,
+            )
+
+        # Sin movimiento
+        lat_rad = math.radians(float(tracking.latitude))
+        lng_rad = math.radians(float(tracking.longitude))
+        point = (lat_rad, lng_rad, math.cos(lat_rad))
+        radius = max(rules.no_movement_radius_meters, float(tracking.accuracy or 0))
+        if state.anchor is None or haversine_meters(*state.anchor, *point) > radius:
+            state.anchor = point
+            state.anchor_since = t
+            state.still_alerted = False
+        elif on_duty and not state.still_alerted and t - state.anchor_since >= timedelta(minutes=rules.no_movement_minutes):
+            state.still_alerted = True
+            self._emit(
+                state, candidates, 'NO_MOVEMENT', 'CRITICAL',
+                'Empleado sin movimiento',
+                f'{employee_name} no se ha movido desde las {timezone.localtime(state.anchor_since):%H:%M} '
+                f'({_minutes(t - state.anchor_since)} min).',
+                tracking, since=state.anchor_since, window=window,
+            )
+
+        # Batería
+        if tracking.battery_level is not None:
+            level = tracking.battery_level
+            state.battery.append((t, level))
+            if state.battery_alerted and level >= rules.battery_low_percent + BATTERY_REARM_MARGIN:
+                state.battery_alerted = False
+            recent = [reading for _, reading in list(state.battery)[-3:]]
+            if on_duty and not state.battery_alerted and statistics.median(recent) <= rules.battery_low_percent:
+                state.battery_alerted = True
+                first_time, first_level = state.battery[0]
+                elapsed = (t - first_time).total_seconds() / 60
+                drain = (first_level - level) / elapsed if elapsed >= 5 and first_level > level else None
+                minutes_left = int(level / drain) if drain else None
+                critical = minutes_left is not None and minutes_left <= rules.battery_critical_minutes
+                estimate = f' (~{minutes_left} min restantes)' if minutes_left is not None else ''
+                self._emit(
+                    state, candidates, 'BATTERY_LOW', 'CRITICAL' if critical else 'WARNING',
+                    'Batería baja',
+                    f'El dispositivo de {employee_name} tiene {level}% de batería{estimate}.',
+                    tracking, window=window,
+                )
+
+        return candidates
+
+    # Persistencia (solo cuando una regla dispara)
+
+    def _is_confirmed(self, candidate):
+        """Confirma con los puntos guardados lo que este proceso pudo no ver"""
+        from .models_gps import GPSTracking
+
+        tracking = candidate.tracking
+        points = GPSTracking.objects.filter(employee_id=tracking.employee_id)
+
+        if candidate.alert_type in ('OUT_OF_AREA', 'EARLY_DEPARTURE'):
+            return not points.filter(
+                timestamp__gte=candidate.since, timestamp__lte=tracking.timestamp, is_within_work_area=True,
+            ).exists()
+        if candidate.alert_type == 'LATE_ARRIVAL':
+            return not points.filter(
+                timestamp__gte=candidate.window.start,
+                timestamp__lte=min(candidate.window.late_deadline, tracking.timestamp - timedelta(microseconds=1)),
+                is_within_work_area=True,
+            ).exists()
+        if candidate.alert_type == 'NO_MOVEMENT':
+            bounds = points.filter(timestamp__gte=candidate.since, timestamp__lte=tracking.timestamp).aggregate(
+                min_lat=Min('latitude'), max_lat=Max('latitude'), min_lng=Min('longitude'), max_lng=Max('longitude'),
+            )
+            if bounds['min_lat'] is None:
+                return True
+            corners = [
+                (math.radians(float(lat)), math.radians(float(lng)))
+                for lat, lng in ((bounds['min_lat'], bounds['min_lng']), (bounds['max_lat'], bounds['max_lng']))
+            ]
+            diagonal = haversine_meters(
+                corners[0][0], corners[0][1], math.cos(corners[0][0]),
+                corners[1][0], corners[1][1], math.cos(corners[1][0]),
+            )
+            return diagonal <= 2 * max(self.rules.no_movement_radius_meters, float(tracking.accuracy or 0))
+        return True
+
+    def _is_duplicate(self, candidate):
+        from .models_gps import LocationAlert
+
+        alerts = LocationAlert.objects.filter(
+            employee_id=candidate.tracking.employee_id, alert_type=candidate.alert_type,
+        )
+        if candidate.alert_type in ('LATE_ARRIVAL', 'EARLY_DEPARTURE'):
+            return alerts.filter(created_at__gte=candidate.window.start).exists()
+        return alerts.filter(
+            is_resolved=False,
+            created_at__gte=timezone.now() - timedelta(minutes=self.rules.cooldown_minutes),
+        ).exists()
+
+    def _create_alert(self, employee, candidate):
+        from .models_gps import LocationAlert
+
+        if self.confirm and (self._is_duplicate(candidate) or not self._is_confirmed(candidate)):
+            return None
+        tracking = candidate.tracking
+        return LocationAlert.objects.create(
+            employee=employee,
+            work_area_id=tracking.work_area_id,
+            gps_tracking=tracking,
+            alert_type=candidate.alert_type,
+            alert_level=candidate.level,
+            title=candidate.title,
+            message=candidate.message,
+        )
+
+    def _warm_up(self, employee_id, before):
+        """Reconstruye el estado con los puntos recientes, sin emitir alertas"""
+        from .models_gps import GPSTracking
+
+        rules = self.rules
+        lookback = timedelta(minutes=max(
+            rules.no_movement_minutes, rules.departure_minutes, rules.out_of_area_seconds / 60, rules.cooldown_minutes,
+        ))
+        since = before - lookback
+        window = self.shifts.window_at(employee_id, before)
+        if window is not None:
+            since = min(since, window.start)
+
+        recent = list(
+            GPSTracking.objects.filter(employee_id=employee_id, timestamp__gte=since, timestamp__lt=before)
+            .select_related('work_area').order_by('-timestamp')[:WARMUP_MAX_POINTS]
+        )
+        state = EmployeeState()
+        for tracking in reversed(recent):
+            self.observe(tracking, state=state)
+        return state
+
+    def _purge_idle(self, now):
+        idle = timedelta(hours=_setting('GPS_ALERT_STATE_IDLE_HOURS', 12))
+        with self._lock:
+            stale = [employee_id for employee_id, state in self._states.items()
+                     if state.last_timestamp is None or now - state.last_timestamp > idle]
+            for employee_id in stale:
+                del self._states[employee_id]
+
+    def process(self, employee, trackings):
+        """
+        Alimenta el motor con puntos ya guardados de un empleado y crea las
+        alertas que correspondan
+
+        Returns:
+            Lista de LocationAlert creadas
+        """
+        trackings = sorted((t for t in trackings if t.id), key=lambda tracking: tracking.timestamp)
+        if not trackings:
+            return []
+
+        if time.monotonic() - self._last_purge >= 600:
+            self._last_purge = time.monotonic()
+            self._purge_idle(timezone.now())
+
+        state = self._states.get(employee.id)
+        if state is None:
+            warmed = self._warm_up(employee.id, trackings[0].timestamp)
+            with self._lock:
+                state = self._states.setdefault(employee.id, warmed)
+
+        name = employee.get_full_name()
+        with self._lock:
+            candidates = [candidate for tracking in trackings for candidate in self.observe(tracking, name, state)]
+
+        alerts = []
+        for candidate in candidates:
+            try:
+                alert = self._create_alert(employee, candidate)
+            except Exception as e:
+                logger.error(f"Error creando alerta {candidate.alert_type} para {employee}: {str(e)}")
+                continue
+            if alert is not None:
+                alerts.append(alert)
+                logger.info(f"🚨 Alerta {alert.alert_type} ({alert.alert_level}) para {employee}")
+        return alerts
+
+    def reset(self):
+        with self._lock:
+            self._states.clear()
+
+
+# Instancias globales por proceso
+shift_calendar = ShiftCalendar()
+gps_alert_engine = GPSAlertEngine()
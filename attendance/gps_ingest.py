@@ -0,0 +1,231 @@
+"""
+Ingesta de puntos GPS por lotes
+EURO SECURITY - GPS Batch Ingest
+
+La PWA acumula puntos mientras el guardia está sin conexión (o entre envíos)
+y los manda en un solo POST. Por lote:
+
+- Se validan todos los puntos (coordenadas, fecha, campos numéricos).
+- Se descartan los ya recibidos por su client_id (reenvíos offline).
+- Las geocercas se resuelven de forma vectorizada con el índice en memoria.
+- Se insertan con bulk_create en una única transacción (junto con la última
+  posición del empleado, ver live_positions.py).
+- Los puntos guardados alimentan el motor de alertas (gps_alerts.py), igual
+  que en update_gps_location.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .geofence import geofence_index
+from .gps_alerts import gps_alert_engine
+from .live_positions import record_positions
+from .models_gps import GPSTracking
+
+logger = logging.getLogger(__name__)
+
+
+TRACKING_TYPES = {choice for choice, _ in GPSTracking.TRACKING_TYPES}
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class GPSBatchError(Exception):
+    """Lote GPS inválido en su conjunto (no por un punto concreto)"""
+
+
+def _optional_float(value, field):
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} inválido')
+
+
+def _parse_point(point, now, max_age):
+    """
+    Valida un punto del lote y devuelve un GPSTracking sin guardar
+
+    Raises:
+        ValueError con el motivo del rechazo
+    """
+    if not isinstance(point, dict):
+        raise ValueError('Formato de punto inválido')
+
+    try:
+        latitude = Decimal(str(point['latitude']))
+        longitude = Decimal(str(point['longitude']))
+    except KeyError as e:
+        raise ValueError(f'Campo requerido: {e.args[0]}')
+    except InvalidOperation:
+        raise ValueError('Coordenadas inválidas')
+
+    if not latitude.is_finite() or not longitude.is_finite():
+        raise ValueError('Coordenadas inválidas')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Coordenadas fuera de rango')
+
+    timestamp = now
+    if point.get('timestamp'):
+        timestamp = parse_datetime(str(point['timestamp']))
+        if timestamp is None:
+            raise ValueError('Fecha inválida')
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+        if timestamp > now + MAX_CLOCK_SKEW:
+            raise ValueError('Fecha en el futuro')
+        if timestamp < now - max_age:
+            raise ValueError('Punto demasiado antiguo')
+
+    tracking_type = point.get('tracking_type') or 'AUTO'
+    if tracking_type not in TRACKING_TYPES:
+        raise ValueError('Tipo de rastreo inválido')
+
+    battery_level = _optional_float(point.get('battery_level'), 'battery_level')
+
+    client_id = point.get('client_id')
+    if client_id is not None:
+        client_id = str(client_id)[:64] or None
+
+    return GPSTracking(
+        latitude=latitude,
+        longitude=longitude,
+        accuracy=_optional_float(point.get('accuracy'), 'accuracy'),
+        altitude=_optional_float(point.get('altitude'), 'altitude'),
+        tracking_type=tracking_type,
+        timestamp=timestamp,
+        battery_level=int(battery_level) if battery_level is not None else None,
+        device_info=str(point.get('device_info') or point.get('source') or ''),
+        notes=str(point.get('notes') or ''),
+        client_id=client_id,
+    )
+
+
+def _existing_client_ids(employee, client_ids):
+    if not client_ids:
+        return set()
+    return set(
+        GPSTracking.objects.filter(employee=employee, client_id__in=client_ids)
+        .values_list('client_id', flat=True)
+    )
+
+
+def ingest_gps_batch(employee, points):
+    """
+    Valida, deduplica y guarda un lote de puntos GPS de un empleado
+
+    Args:
+        employee: Employee al que pertenecen los puntos
+        points: lista de dicts con latitude, longitude y opcionalmente
+            client_id, timestamp, accuracy, altitude, battery_level,
+            tracking_type, device_info y notes
+
+    Returns:
+        dict con accepted, duplicates, rejected (lista de {index, client_id,
+        error}), latest (último punto guardado) y alert_generated
+
+    Raises:
+        GPSBatchError si el lote no es una lista o excede GPS_BATCH_MAX_POINTS
+    """
+    max_points = getattr(settings, 'GPS_BATCH_MAX_POINTS', 500)
+    max_age = timedelta(hours=getattr(settings, 'GPS_BATCH_MAX_AGE_HOURS', 72))
+
+    if not isinstance(points, list):
+        raise GPSBatchError('Se esperaba una lista de puntos')
+    if len(points) > max_points:
+        raise GPSBatchError(f'Máximo {max_points} puntos por lote')
+
+    now = timezone.now()
+    rejected = []
+    candidates = []
+    batch_ids = set()
+    duplicates = 0
+
+    for index, point in enumerate(points):
+        try:
+            tracking = _parse_point(point, now, max_age)
+        except ValueError as e:
+            rejected.append({
+                'index': index,
+                'client_id': point.get('client_id') if isinstance(point, dict) else None,
+                'error': str(e),
+            })
+            continue
+
+        # Duplicados dentro del propio lote
+        if tracking.client_id:
+            if tracking.client_id in batch_ids:
+                duplicates += 1
+                continue
+            batch_ids.add(tracking.client_id)
+
+        tracking.employee = employee
+        candidates.append(tracking)
+
+    # Geocercas de todo el lote en una sola operación vectorizada
+    matches = geofence_index.locate_many_for_employee(
+        employee.id,
+        [float(tracking.latitude) for tracking in candidates],
+        [float(tracking.longitude) for tracking in candidates],
+    )
+    for tracking, match in zip(candidates, matches):
+        if match:
+            tracking.work_area = match.area
+            tracking.distance_to_work_area = match.distance
+            tracking.is_within_work_area = match.inside
+
+    created = []
+    for attempt in range(2):
+        # Puntos ya guardados en envíos anteriores
+        existing = _existing_client_ids(employee, list(batch_ids))
+        pending = [tracking for tracking in candidates if tracking.client_id not in existing]
+
+        try:
+            with transaction.atomic():
+                created = GPSTracking.objects.bulk_create(pending)
+                if created:
+                    # bulk_create no emite post_save: actualizar la última posición aquí
+                    record_positions(created)
+            break
+        except IntegrityError:
+            # Otro envío del mismo lote se guardó en paralelo: recalcular
+            if attempt:
+                raise
+            logger.warning(f"⚠️ Lote GPS concurrente para {employee}, reintentando deduplicación")
+
+    duplicates += len(candidates) - len(created)
+
+    # Fuera de la transacción: un reintento no debe avanzar dos veces el estado
+    alerts = gps_alert_engine.process(employee, created)
+
+    latest_data = None
+    if created:
+        latest = max(created, key=lambda tracking: tracking.timestamp)
+        latest_data = {
+            'tracking_id': latest.id,
+            'timestamp': latest.timestamp.isoformat(),
+            'is_within_work_area': latest.is_within_work_area,
+            'distance_to_area': latest.distance_to_work_area,
+            'work_area': {
+                'id': latest.work_area.id,
+                'name': latest.work_area.name,
+                'type': latest.work_area.get_area_type_display(),
+            } if latest.work_area_id else None,
+        }
+
+    logger.info(
+        f"📍 Lote GPS {employee}: {len(created)} guardados, {duplicates} duplicados, {len(rejected)} rechazados"
+    )
+
+    return {
+        'accepted': len(created),
+        'duplicates': duplicates,
+        'rejected': rejected,
+        'latest': latest_data,
+        'alert_generated': bool(alerts),
+    }
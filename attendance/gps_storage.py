@@ -0,0 +1,442 @@
+"""
+Almacenamiento por niveles del rastreo GPS
+EURO SECURITY - GPS Tiered Storage
+
+Con un punto cada pocos segundos por guardia GPSTracking crece sin límite.
+Los datos se guardan en tres niveles según su antigüedad:
+
+- Crudos (GPSTracking): los últimos GPS_RAW_RETENTION_DAYS días.
+- Por minuto (GPSTrackRollup MINUTE): un resumen por empleado y minuto con el
+  recorrido completo como polilínea codificada; hasta
+  GPS_MINUTE_ROLLUP_RETENTION_DAYS días.
+- Por hora (GPSTrackRollup HOUR): un resumen por empleado y hora cuyo
+  recorrido son los centroides de cada minuto; se eliminan pasados
+  GPS_HOUR_ROLLUP_RETENTION_DAYS días (0 = se conservan).
+
+La compactación (manage.py compact_gps_tracking) avanza por ventanas de una
+hora: en una transacción crea los resúmenes de la ventana y borra por lotes
+los puntos ya resumidos. Se conservan siempre los puntos de los tipos de
+GPS_RETENTION_KEEP_TYPES (marcaciones, emergencias) y los referenciados por
+una LocationAlert, que se borraría en cascada.
+
+approximate_count evita el COUNT(*) completo en los dashboards usando las
+estadísticas de la tabla del motor de base de datos.
+"""
+import logging
+import math
+from collections import Counter, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .geofence import haversine_meters
+from .models_gps import GPSTracking, GPSTrackRollup, LocationAlert
+
+logger = logging.getLogger(__name__)
+
+
+TrackPoint = namedtuple('TrackPoint', 'timestamp latitude longitude source')
+
+WINDOW = timedelta(hours=1)
+RAW_FIELDS = (
+    'pk', 'employee_id', 'timestamp', 'latitude', 'longitude', 'accuracy',
+    'work_area_id', 'is_within_work_area', 'tracking_type',
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def keep_types():
+    value = _setting('GPS_RETENTION_KEEP_TYPES', 'ATTENDANCE,EMERGENCY')
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+# ----------------------------------------------------------------------
+# Polilíneas codificadas (algoritmo de Google, precisión 1e-5 ≈ 1 m)
+# ----------------------------------------------------------------------
+
+def _encode_signed(value, output):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        output.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    output.append(chr(value + 63))
+
+
+def _decode_signed(encoded, index):
+    result = shift = 0
+    while True:
+        byte = ord(encoded[index]) - 63
+        index += 1
+        result |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            break
+    return (~(result >> 1) if result & 1 else result >> 1), index
+
+
+def encode_polyline(coordinates, precision=5):
+    """[(lat, lng), ...] → polilínea codificada"""
+    factor = 10 ** precision
+    output = []
+    previous_lat = previous_lng = 0
+    for latitude, longitude in coordinates:
+        lat = int(round(float(latitude) * factor))
+        lng = int(round(float(longitude) * factor))
+        _encode_signed(lat - previous_lat, output)
+        _encode_signed(lng - previous_lng, output)
+        previous_lat, previous_lng = lat, lng
+    return ''.join(output)
+
+
+def decode_polyline(encoded, precision=5):
+    """Polilínea codificada → [(lat, lng), ...]"""
+    factor = float(10 ** precision)
+    coordinates = []
+    index = lat = lng = 0
+    while index < len(encoded):
+        delta, index = _decode_signed(encoded, index)
+        lat += delta
+        delta, index = _decode_signed(encoded, index)
+        lng += delta
+        coordinates.append((lat / factor, lng / factor))
+    return coordinates
+
+
+def encode_integers(values):
+    """Enteros (p. ej. segundos crecientes) codificados como diferencias"""
+    output = []
+    previous = 0
+    for value in values:
+        _encode_signed(int(value) - previous, output)
+        previous = int(value)
+    return ''.join(output)
+
+
+def decode_integers(encoded):
+    values = []
+    index = previous = 0
+    while index < len(encoded):
+        delta, index = _decode_signed(encoded, index)
+        previous += delta
+        values.append(previous)
+    return values
+
+
+def path_meters(coordinates):
+    """Longitud de un recorrido [(lat, lng), ...] en metros"""
+    total = 0.0
+    previous = None
+    for latitude, longitude in coordinates:
+        lat_rad, lng_rad = math.radians(latitude), math.radians(longitude)
+        current = (lat_rad, lng_rad, math.cos(lat_rad))
+        if previous:
+            total += haversine_meters(*previous, *current)
+        previous = current
+    return total
+
+
+# ----------------------------------------------------------------------
+# Construcción de resúmenes
+# ----------------------------------------------------------------------
+
+def floor_time(value, resolution):
+    value = value.replace(second=0, microsecond=0)
+    return value.replace(minute=0) if resolution == 'HOUR' else value
+
+
+def _decimal(value, places=8):
+    return Decimal(f'{value:.{places}f}')
+
+
+def build_rollup(employee_id, resolution, bucket_start, points, previous=None):
+    """
+    Resumen de una lista de puntos ordenados por fecha
+
+    Args:
+        points: tuplas (timestamp, lat, lng, accuracy, work_area_id, dentro, peso)
+            donde peso es el número de puntos originales que representa
+        previous: (lat, lng) del punto anterior del empleado; el tramo hasta
+            el primer punto cuenta en la distancia de este resumen
+
+    Returns:
+        GPSTrackRollup sin guardar
+    """
+    coordinates = [(float(point[1]), float(point[2])) for point in points]
+    weights = [point[6] for point in points]
+    total = sum(weights)
+    accuracies = [(point[3], point[6]) for point in points if point[3] is not None]
+    areas = Counter()
+    for point in points:
+        if point[4]:
+            areas[point[4]] += point[6]
+
+    return GPSTrackRollup(
+        employee_id=employee_id,
+        resolution=resolution,
+        bucket_start=bucket_start,
+        first_timestamp=points[0][0],
+        last_timestamp=points[-1][0],
+        point_count=total,
+        latitude=_decimal(sum(lat * w for (lat, _), w in zip(coordinates, weights)) / total),
+        longitude=_decimal(sum(lng * w for (_, lng), w in zip(coordinates, weights)) / total),
+        min_latitude=_decimal(min(lat for lat, _ in coordinates)),
+        max_latitude=_decimal(max(lat for lat, _ in coordinates)),
+        min_longitude=_decimal(min(lng for _, lng in coordinates)),
+        max_longitude=_decimal(max(lng for _, lng in coordinates)),
+        avg_accuracy=(
+            sum(accuracy * w for accuracy, w in accuracies) / sum(w for _, w in accuracies)
+            if accuracies else None
+        ),
+        distance_meters=path_meters(([previous] if previous else []) + coordinates),
+        work_area_id=areas.most_common(1)[0][0] if areas else None,
+        within_area_count=sum(point[6] for point in points if point[5]),
+        encoded_track=encode_polyline(coordinates),
+        encoded_offsets=encode_integers(int((point[0] - bucket_start).total_seconds()) for point in points),
+    )
+
+
+def _save_rollups(rollups, batch_size):
+    # Una ventana ya compactada conserva sus resúmenes: si quedan puntos crudos
+    # (tipos conservados) no deben reemplazar el resumen completo
+    GPSTrackRollup.objects.bulk_create(rollups, batch_size=batch_size, ignore_conflicts=True)
+
+
+def _delete_batches(queryset_model, ids, batch_size):
+    deleted = 0
+    for start in range(0, len(ids), batch_size):
+        deleted += queryset_model.objects.filter(pk__in=ids[start:start + batch_size]).delete()[1].get(
+            queryset_model._meta.label, 0
+        )
+    return deleted
+
+
+# ----------------------------------------------------------------------
+# Compactación
+# ----------------------------------------------------------------------
+
+def compact_raw_points(before, batch_size=None, dry_run=False, max_windows=None):
+    """
+    Resume por minuto y borra los puntos crudos anteriores a before
+
+    Returns:
+        dict con ventanas, resúmenes creados, puntos borrados y conservados
+    """
+    batch_size = batch_size or _setting('GPS_COMPACTION_BATCH_SIZE', 5000)
+    before = floor_time(before, 'MINUTE')
+    kept_types = keep_types()
+    stats = {'windows': 0, 'rollups': 0, 'deleted': 0, 'kept': 0}
+    cursor = None
+
+    while max_windows is None or stats['windows'] < max_windows:
+        pending = GPSTracking.objects.filter(timestamp__lt=before).exclude(tracking_type__in=kept_types)
+        if cursor:
+            pending = pending.filter(timestamp__gte=cursor)
+        first = pending.order_by('timestamp').values_list('timestamp', flat=True).first()
+        if first is None:
+            break
+
+        window_start = floor_time(first, 'HOUR')
+        window_end = min(window_start + WINDOW, before)
+        cursor = window_end
+
+        points = (
+            GPSTracking.objects.filter(timestamp__gte=window_start, timestamp__lt=window_end)
+            .order_by('employee_id', 'timestamp')
+            .values_list(*RAW_FIELDS)
+        )
+        alert_ids = set(
+            LocationAlert.objects.filter(
+                gps_tracking__timestamp__gte=window_start, gps_tracking__timestamp__lt=window_end,
+            ).values_list('gps_tracking_id', flat=True)
+        )
+
+        rollups, deletable = [], []
+        bucket_key, bucket_points, lead_in = None, [], None
+        for pk, employee_id, timestamp, lat, lng, accuracy, area_id, inside, tracking_type in points.iterator(
+            chunk_size=batch_size
+        ):
+            if tracking_type in kept_types or pk in alert_ids:
+                stats['kept'] += 1
+            else:
+                deletable.append(pk)
+            if employee_id is None:
+                continue
+            key = (employee_id, floor_time(timestamp, 'MINUTE'))
+            if key != bucket_key and bucket_points:
+                rollups.append(build_rollup(bucket_key[0], 'MINUTE', bucket_key[1], bucket_points, lead_in))
+                # Solo se enlaza con el minuto anterior del mismo empleado
+                lead_in = bucket_points[-1][1:3] if key[0] == bucket_key[0] else None
+                bucket_points = []
+            bucket_key = key
+            bucket_points.append((timestamp, lat, lng, accuracy, area_id, inside, 1))
+        if bucket_points:
+            rollups.append(build_rollup(bucket_key[0], 'MINUTE', bucket_key[1], bucket_points, lead_in))
+
+        stats['windows'] += 1
+        stats['rollups'] += len(rollups)
+        if dry_run:
+            stats['deleted'] += len(deletable)
+            continue
+
+        with transaction.atomic():
+            _save_rollups(rollups, batch_size)
+            stats['deleted'] += _delete_batches(GPSTracking, deletable, batch_size)
+        logger.info(f"🗜️ GPS {window_start:%Y-%m-%d %H:%M}: {len(rollups)} resúmenes, {len(deletable)} puntos compactados")
+
+    return stats
+
+
+def compact_minute_rollups(before, batch_size=None, dry_run=False, max_windows=None):
+    """
+    Resume por hora y borra los resúmenes por minuto anteriores a before
+
+    Returns:
+        dict con ventanas, resúmenes por hora creados y por minuto borrados
+    """
+    batch_size = batch_size or _setting('GPS_COMPACTION_BATCH_SIZE', 5000)
+    before = floor_time(before, 'HOUR')
+    stats = {'windows': 0, 'rollups': 0, 'deleted': 0}
+    minutes = GPSTrackRollup.objects.filter(resolution='MINUTE')
+    cursor = None
+
+    while max_windows is None or stats['windows'] < max_windows:
+        pending = minutes.filter(bucket_start__lt=before)
+        if cursor:
+            pending = pending.filter(bucket_start__gte=cursor)
+        first = pending.order_by('bucket_start').values_list('bucket_start', flat=True).first()
+        if first is None:
+            break
+
+        window_start = floor_time(first, 'HOUR')
+        window_end = window_start + WINDOW
+        cursor = window_end
+        rows = list(
+            minutes.filter(bucket_start__gte=window_start, bucket_start__lt=window_end)
+            .order_by('employee_id', 'bucket_start')
+            .values_list(
+                'pk', 'employee_id', 'first_timestamp', 'latitude', 'longitude',
+                'avg_accuracy', 'work_area_id', 'within_area_count', 'point_count', 'distance_meters',
+            )
+        )
+
+        rollups = []
+        by_employee = {}
+        for row in rows:
+            by_employee.setdefault(row[1], []).append(row)
+        for employee_id, employee_rows in by_employee.items():
+            # Un punto por minuto (su centroide) con el peso de sus puntos originales
+            points = [
+                (first_timestamp, lat, lng, accuracy, area_id, False, count)
+                for _, _, first_timestamp, lat, lng, accuracy, area_id, _, count, _ in employee_rows
+            ]
+            rollup = build_rollup(employee_id, 'HOUR', window_start, points)
+            rollup.within_area_count = sum(row[7] for row in employee_rows)
+            # Cada minuto ya incluye el tramo desde el minuto anterior
+            rollup.distance_meters = sum(row[9] for row in employee_rows)
+            rollups.append(rollup)
+
+        stats['windows'] += 1
+        stats['rollups'] += len(rollups)
+        stats['deleted'] += len(rows)
+        if dry_run:
+            continue
+
+        with transaction.atomic():
+            _save_rollups(rollups, batch_size)
+            _delete_batches(GPSTrackRollup, [row[0] for row in rows], batch_size)
+        logger.info(f"🗜️ GPS {window_start:%Y-%m-%d %H:%M}: {len(rollups)} resúmenes por hora")
+
+    return stats
+
+
+def purge_hour_rollups(before, batch_size=None, dry_run=False):
+    """Borra por lotes los resúmenes por hora anteriores a before"""
+    batch_size = batch_size or _setting('GPS_COMPACTION_BATCH_SIZE', 5000)
+    expired = GPSTrackRollup.objects.filter(resolution='HOUR', bucket_start__lt=before)
+    if dry_run:
+        return expired.count()
+
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += GPSTrackRollup.objects.filter(pk__in=ids).delete()[0]
+
+
+def retention_cutoffs(now=None, raw_days=None, minute_days=None, hour_days=None):
+    """Fechas límite de cada nivel (None si el nivel no caduca); los días por defecto vienen de settings"""
+    now = floor_time(now or timezone.now(), 'HOUR')
+    raw_days = _setting('GPS_RAW_RETENTION_DAYS', 30) if raw_days is None else raw_days
+    minute_days = _setting('GPS_MINUTE_ROLLUP_RETENTION_DAYS', 180) if minute_days is None else minute_days
+    hour_days = _setting('GPS_HOUR_ROLLUP_RETENTION_DAYS', 730) if hour_days is None else hour_days
+    return {
+        'raw': now - timedelta(days=raw_days),
+        'minute': now - timedelta(days=minute_days),
+        'hour': now - timedelta(days=hour_days) if hour_days else None,
+    }
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+
+def employee_track(employee_id, start, end):
+    """
+    Recorrido de un empleado entre start y end combinando los tres niveles
+
+    Returns:
+        Lista de TrackPoint ordenada por fecha; source es 'RAW', 'MINUTE' o 'HOUR'
+    """
+    points = [
+        TrackPoint(timestamp, float(lat), float(lng), 'RAW')
+        for timestamp, lat, lng in GPSTracking.objects.filter(
+            employee_id=employee_id, timestamp__gte=start, timestamp__lt=end,
+        ).order_by('timestamp').values_list('timestamp', 'latitude', 'longitude')
+    ]
+    raw_times = {point.timestamp for point in points}
+
+    rollups = GPSTrackRollup.objects.filter(
+        employee_id=employee_id, last_timestamp__gte=start, bucket_start__lt=end,
+    ).values_list('resolution', 'bucket_start', 'encoded_track', 'encoded_offsets')
+    for resolution, bucket_start, encoded_track, encoded_offsets in rollups:
+        for (lat, lng), offset in zip(decode_polyline(encoded_track), decode_integers(encoded_offsets)):
+            timestamp = bucket_start + timedelta(seconds=offset)
+            if start <= timestamp < end and timestamp not in raw_times:
+                points.append(TrackPoint(timestamp, lat, lng, resolution))
+
+    points.sort(key=lambda point: point.timestamp)
+    return points
+
+
+def approximate_count(model):
+    """
+    Filas de la tabla de model según las estadísticas del motor
+
+    PostgreSQL: pg_class.reltuples (actualizado por ANALYZE/autovacuum).
+    MySQL: information_schema.tables.table_rows. En otros motores, o si la
+    tabla aún no tiene estadísticas, se hace el COUNT(*) exacto.
+    """
+    table = model._meta.db_table
+    estimate = None
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            estimate = row[0] if row else None
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else None
+    if estimate is None or estimate < 0:
+        return model.objects.count()
+    return int(estimate)
@@ -0,0 +1,274 @@
+"""
+Procesamiento de recorridos GPS para mapas
+EURO SECURITY - GPS Track Processing
+
+Un turno completo de patrullaje son miles de puntos. Antes de enviarlos al
+mapa del supervisor:
+
+- Paradas: los tramos en que el guardia permanece dentro de
+  GPS_STOP_RADIUS_METERS durante al menos GPS_STOP_MIN_SECONDS se reducen a
+  su centroide (inicio y fin), eliminando el ruido del GPS estando quieto, y
+  se devuelven como segmentos de permanencia.
+- Simplificación: Douglas-Peucker (por defecto) o Visvalingam-Whyatt con una
+  tolerancia en metros; con zoom se usa la distancia que cubre
+  GPS_TRACK_TOLERANCE_PIXELS píxeles a ese nivel del mapa.
+- Codificación: polilínea codificada (ver gps_storage.py) más los segundos
+  de cada punto desde el inicio, también codificados.
+
+Las coordenadas se proyectan a metros con una proyección equirectangular
+local, suficiente para recorridos de algunos kilómetros.
+"""
+import heapq
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from django.conf import settings
+
+from .geofence import EARTH_RADIUS_METERS
+from .gps_storage import encode_integers, encode_polyline, path_meters
+
+StopSegment = namedtuple('StopSegment', 'start end latitude longitude points')
+
+METHODS = ('dp', 'vw')
+# Metros por píxel en el ecuador a zoom 0 (teselas de 256 px, Web Mercator)
+METERS_PER_PIXEL_ZOOM_0 = 156543.03392
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def tolerance_for_zoom(zoom, latitude, pixels=None):
+    """Metros que ocupan `pixels` píxeles en el mapa a ese zoom y latitud"""
+    pixels = _setting('GPS_TRACK_TOLERANCE_PIXELS', 1.5) if pixels is None else pixels
+    meters_per_pixel = METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(latitude)) / (2 ** zoom)
+    return meters_per_pixel * pixels
+
+
+def project(coordinates):
+    """[(lat, lng), ...] → array (n, 2) en metros alrededor de la latitud media"""
+    array = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    if not len(array):
+        return array
+    lat_rad = np.radians(array[:, 0])
+    lng_rad = np.radians(array[:, 1])
+    cos_lat = math.cos(float(lat_rad.mean()))
+    return np.column_stack((lng_rad * cos_lat * EARTH_RADIUS_METERS, lat_rad * EARTH_RADIUS_METERS))
+
+
+# ----------------------------------------------------------------------
+# Simplificación
+# ----------------------------------------------------------------------
+
+def douglas_peucker(xy, tolerance):
+    """
+    Índices conservados por Douglas-Peucker (iterativo, sin recursión)
+
+    Un punto se conserva si se aleja más de tolerance metros del segmento que
+    une los extremos de su tramo.
+    """
+    count = len(xy)
+    if count <= 2:
+        return list(range(count))
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = xy[first], xy[last]
+        segment = end - start
+        length = math.hypot(segment[0], segment[1])
+        inner = xy[first + 1:last] - start
+        if length == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep).tolist()
+
+
+def _triangle_area(xy, a, b, c):
+    return abs((xy[b][0] - xy[a][0]) * (xy[c][1] - xy[a][1]) - (xy[c][0] - xy[a][0]) * (xy[b][1] - xy[a][1])) / 2
+
+
+def visvalingam(xy, tolerance):
+    """
+    Índices conservados por Visvalingam-Whyatt
+
+    Elimina repetidamente el punto cuyo triángulo con sus vecinos tiene menor
+    área mientras ésta sea menor que tolerance² (m²).
+    """
+    count = len(xy)
+    if count <= 2:
+        return list(range(count))
+
+    threshold = tolerance * tolerance
+    previous = list(range(-1, count - 1))
+    following = list(range(1, count + 1))
+    removed = [False] * count
+    heap = [(_triangle_area(xy, i - 1, i, i + 1), i) for i in range(1, count - 1)]
+    heapq.heapify(heap)
+    current_area = {i: area for area, i in heap}
+
+    while heap:
+        area, index = heapq.heappop(heap)
+        if removed[index] or current_area.get(index) != area:
+            continue
+        if area >= threshold:
+            break
+        removed[index] = True
+        before, after = previous[index], following[index]
+        following[before] = after
+        previous[after] = before
+        for neighbour in (before, after):
+            if 0 < neighbour < count - 1 and not removed[neighbour]:
+                # El área de un vecino no puede bajar de la del punto eliminado
+                new_area = max(area, _triangle_area(xy, previous[neighbour], neighbour, following[neighbour]))
+                current_area[neighbour] = new_area
+                heapq.heappush(heap, (new_area, neighbour))
+
+    return [i for i in range(count) if not removed[i]]
+
+
+def simplify(xy, tolerance, method='dp'):
+    if method == 'vw':
+        return visvalingam(xy, tolerance)
+    return douglas_peucker(xy, tolerance)
+
+
+# ----------------------------------------------------------------------
+# Paradas
+# ----------------------------------------------------------------------
+
+def detect_stops(timestamps, xy, radius=None, min_seconds=None):
+    """
+    Tramos (inicio, fin) de índices en que el recorrido permanece dentro de
+    radius metros del centroide del tramo durante al menos min_seconds
+    """
+    radius = _setting('GPS_STOP_RADIUS_METERS', 30) if radius is None else radius
+    min_seconds = _setting('GPS_STOP_MIN_SECONDS', 300) if min_seconds is None else min_seconds
+    # Escalares de Python: en este bucle son mucho más rápidos que los de numpy
+    xs, ys = xy[:, 0].tolist(), xy[:, 1].tolist()
+    origin = timestamps[0] if timestamps else None
+    seconds = [(timestamp - origin).total_seconds() for timestamp in timestamps]
+    radius_squared = radius * radius
+    stops = []
+    count = len(xs)
+    i = 0
+    while i < count:
+        sum_x, sum_y = xs[i], ys[i]
+        j = i + 1
+        while j < count:
+            size = j - i
+            dx = xs[j] - sum_x / size
+            dy = ys[j] - sum_y / size
+            if dx * dx + dy * dy > radius_squared:
+                break
+            sum_x += xs[j]
+            sum_y += ys[j]
+            j += 1
+        if seconds[j - 1] - seconds[i] >= min_seconds:
+            stops.append((i, j - 1))
+            i = j
+        else:
+            i += 1
+    return stops
+
+
+# ----------------------------------------------------------------------
+# Recorrido completo
+# ----------------------------------------------------------------------
+
+def process_track(points, zoom=None, tolerance=None, method='dp'):
+    """
+    Recorrido listo para el mapa
+
+    Args:
+        points: secuencia ordenada con timestamp, latitude y longitude
+            (p. ej. TrackPoint de gps_storage.employee_track)
+        zoom: nivel de zoom del mapa para calcular la tolerancia
+        tolerance: tolerancia en metros (tiene prioridad sobre zoom)
+        method: 'dp' (Douglas-Peucker) o 'vw' (Visvalingam-Whyatt)
+
+    Returns:
+        dict con polyline, offsets (segundos desde start), paradas y conteos
+    """
+    result = {
+        'start': None,
+        'end': None,
+        'points': len(points),
+        'simplified': 0,
+        'tolerance_meters': None,
+        'distance_meters': 0,
+        'bounds': None,
+        'polyline': '',
+        'offsets': '',
+        'stops': [],
+    }
+    if not points:
+        return result
+
+    timestamps = [point.timestamp for point in points]
+    coordinates = [(float(point.latitude), float(point.longitude)) for point in points]
+    xy = project(coordinates)
+
+    if tolerance is None:
+        tolerance = (
+            tolerance_for_zoom(zoom, coordinates[0][0]) if zoom is not None
+            else _setting('GPS_TRACK_DEFAULT_TOLERANCE_METERS', 5)
+        )
+
+    # Cada parada se reduce a su centroide al inicio y al final
+    clean_times, clean_coordinates, anchors, stops = [], [], set(), []
+    cursor = 0
+    for first, last in detect_stops(timestamps, xy):
+        clean_times.extend(timestamps[cursor:first])
+        clean_coordinates.extend(coordinates[cursor:first])
+        latitude = sum(lat for lat, _ in coordinates[first:last + 1]) / (last - first + 1)
+        longitude = sum(lng for _, lng in coordinates[first:last + 1]) / (last - first + 1)
+        anchors.update((len(clean_times), len(clean_times) + 1))
+        clean_times.extend((timestamps[first], timestamps[last]))
+        clean_coordinates.extend(((latitude, longitude), (latitude, longitude)))
+        stops.append(StopSegment(timestamps[first], timestamps[last], latitude, longitude, last - first + 1))
+        cursor = last + 1
+    clean_times.extend(timestamps[cursor:])
+    clean_coordinates.extend(coordinates[cursor:])
+
+    kept = sorted(set(simplify(project(clean_coordinates), tolerance, method)) | anchors)
+    kept_coordinates = [clean_coordinates[i] for i in kept]
+    start = clean_times[0]
+
+    latitudes = [lat for lat, _ in coordinates]
+    longitudes = [lng for _, lng in coordinates]
+    result.update({
+        'start': start.isoformat(),
+        'end': clean_times[-1].isoformat(),
+        'simplified': len(kept),
+        'tolerance_meters': round(tolerance, 2),
+        'distance_meters': round(path_meters(clean_coordinates)),
+        'bounds': [min(latitudes), min(longitudes), max(latitudes), max(longitudes)],
+        'polyline': encode_polyline(kept_coordinates),
+        'offsets': encode_integers(int((clean_times[i] - start).total_seconds()) for i in kept),
+        'stops': [
+            {
+                'start': stop.start.isoformat(),
+                'end': stop.end.isoformat(),
+                'duration_seconds': int((stop.end - stop.start).total_seconds()),
+                'lat': round(stop.latitude, 6),
+                'lng': round(stop.longitude, 6),
+                'points': stop.points,
+            }
+            for stop in stops
+        ],
+    })
+    return result
@@ -7,18 +7,27 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+from django.utils.cache import patch_cache_control
 from django.utils import timezone
 from django.db.models import Q, Count, Avg, Max
 from django.conf import settings
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
+import logging
 
 from core.permissions import employee_required
-from .models_gps import WorkArea, EmployeeWorkArea, GPSTracking, LocationAlert
+from .models_gps import WorkArea, EmployeeWorkArea, GPSTracking, LocationAlert, EmployeeLastPosition
+from .gps_alerts import gps_alert_engine
+from .gps_ingest import GPSBatchError, ingest_gps_batch
+from .live_positions import fleet_etag
 from .permissions import AttendancePermissions
 from employees.models import Employee
 
+logger = logging.getLogger(__name__)
+
+
 @login_required
 def real_time_tracking_dashboard(request):
     """Dashboard de rastreo en tiempo real"""
@@ -96,14 +105,13 @@ def real_time_tracking_dashboard(request):
     
     return render(request, 'attendance/real_time_tracking.html', context)
 
-@login_required
-def gps_tracking_api(request):
-    """API para obtener ubicaciones GPS en tiempo real"""
+def _tracking_positions(request):
+    """Últimas posiciones visibles para el usuario según los filtros de la petición"""
     
     # SUPERUSUARIOS: Acceso automático sin restricciones
     if not (request.user.is_superuser or request.user.is_staff):
         if not AttendancePermissions.can_view_location_maps(request.user):
-            return JsonResponse({'error': 'Sin permisos'}, status=403)
+            return None
     
     # Parámetros
     minutes_ago = int(request.GET.get('minutes', 30))
@@ -113,44 +121,64 @@ def gps_tracking_api(request):
     time_filter = timezone.now() - timedelta(minutes=minutes_ago)
     viewable_employees = AttendancePermissions.get_viewable_employees(request.user)
     
-    # Query base
-    tracking_query = GPSTracking.objects.filter(
+    positions = EmployeeLastPosition.objects.filter(
         employee__in=viewable_employees,
         timestamp__gte=time_filter,
         is_active_session=True
-    ).select_related('employee', 'work_area')
+    )
     
     if employee_id:
-        tracking_query = tracking_query.filter(employee_id=employee_id)
+        positions = positions.filter(employee_id=employee_id)
+    
+    return positions
+
+
+def _tracking_positions_etag(request):
+    positions = _tracking_positions(request)
+    if positions is None:
+        return None
+    return fleet_etag(positions, request.user.id, request.GET.urlencode())
+
+
+@login_required
+@condition(etag_func=_tracking_positions_etag)
+def gps_tracking_api(request):
+    """API para obtener ubicaciones GPS en tiempo real"""
+    
+    positions = _tracking_positions(request)
+    if positions is None:
+        return JsonResponse({'error': 'Sin permisos'}, status=403)
     
-    # Obtener última ubicación por empleado
+    # Toda la flota en una sola consulta (tabla de última posición)
     latest_locations = []
-    for employee in viewable_employees:
-        latest_tracking = tracking_query.filter(employee=employee).first()
-        if latest_tracking:
-            latest_locations.append({
-                'employee_id': employee.id,
-                'employee_name': employee.get_full_name(),
-                'employee_position': employee.position.title,
-                'latitude': float(latest_tracking.latitude),
-                'longitude': float(latest_tracking.longitude),
-                'accuracy': latest_tracking.accuracy,
-                'timestamp': latest_tracking.timestamp.isoformat(),
-                'work_area': {
-                    'id': latest_tracking.work_area.id if latest_tracking.work_area else None,
-                    'name': latest_tracking.work_area.name if latest_tracking.work_area else None,
-                    'is_within': latest_tracking.is_within_work_area,
-                    'distance': latest_tracking.distance_to_work_area,
-                } if latest_tracking.work_area else None,
-                'battery_level': latest_tracking.battery_level,
-                'tracking_type': latest_tracking.get_tracking_type_display(),
-            })
+    for position in positions.select_related('employee__position', 'work_area'):
+        employee = position.employee
+        latest_locations.append({
+            'employee_id': employee.id,
+            'employee_name': employee.get_full_name(),
+            'employee_position': employee.position.title,
+            'latitude': float(position.latitude),
+            'longitude': float(position.longitude),
+            'accuracy': position.accuracy,
+            'timestamp': position.timestamp.isoformat(),
+            'work_area': {
+                'id': position.work_area.id,
+                'name': position.work_area.name,
+                'is_within': position.is_within_work_area,
+                'distance': position.distance_to_work_area,
+            } if position.work_area else None,
+            'battery_level': position.battery_level,
+            'tracking_type': position.get_tracking_type_display(),
+        })
     
-    return JsonResponse({
+    response = JsonResponse({
         'locations': latest_locations,
         'timestamp': timezone.now().isoformat(),
         'total_active': len(latest_locations)
     })
+    # El navegador revalida con If-None-Match en cada sondeo
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @login_required
 def work_areas_api(request):
@@ -161,24 +189,23 @@ def work_areas_api(request):
         if not AttendancePermissions.can_view_location_maps(request.user):
             return JsonResponse({'error': 'Sin permisos'}, status=403)
     
-    areas = WorkArea.objects.filter(is_active=True)
+    # Asignados y presentes de todas las áreas en dos consultas (no dos por área)
+    thirty_minutes_ago = timezone.now() - timedelta(minutes=30)
+    current_by_area = dict(GPSTracking.objects.filter(
+        work_area__isnull=False,
+        is_within_work_area=True,
+        timestamp__gte=thirty_minutes_ago,
+        is_active_session=True
+    ).values('work_area').annotate(total=Count('id')).values_list('work_area', 'total'))
+    
+    areas = WorkArea.objects.filter(is_active=True).annotate(
+        assigned_count=Count('assigned_employees', filter=Q(assigned_employees__is_active=True))
+    )
     
     areas_data = []
     for area in areas:
-        # Contar empleados asignados
-        assigned_count = EmployeeWorkArea.objects.filter(
-            work_area=area,
-            is_active=True
-        ).count()
-        
-        # Empleados actualmente en el área
-        thirty_minutes_ago = timezone.now() - timedelta(minutes=30)
-        current_employees = GPSTracking.objects.filter(
-            work_area=area,
-            is_within_work_area=True,
-            timestamp__gte=thirty_minutes_ago,
-            is_active_session=True
-        ).count()
+        assigned_count = area.assigned_count
+        current_employees = current_by_area.get(area.id, 0)
         
         areas_data.append({
             'id': area.id,
@@ -198,168 +225,114 @@ def work_areas_api(request):
         'total': len(areas_data)
     })
 
-@csrf_exempt
-@login_required
-def update_gps_location(request):
-    """API para actualizar ubicación GPS del empleado"""
+def _viewable_employee(request, employee_id):
+    viewable_employees = AttendancePermissions.get_viewable_employees(request.user)
+    return get_object_or_404(Employee, id=employee_id, id__in=viewable_employees.values_list('id', flat=True))
+
+
+def _date_range(request):
+    """Fechas date_from/date_to (por defecto hoy) y su rango [inicio, fin) con zona horaria"""
+    today = timezone.localdate()
+    date_from = request.GET.get('date_from') or today
+    date_to = request.GET.get('date_to') or today
     
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    if isinstance(date_from, str):
+        date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
+    if isinstance(date_to, str):
+        date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
     
-    try:
-        data = json.loads(request.body)
-        
-        # Debug logging
-        print(f"🔍 GPS Update - Usuario: {request.user.username} (ID: {request.user.id})")
-        print(f"🔍 GPS Data: lat={data.get('latitude')}, lng={data.get('longitude')}")
-        
-        # Obtener empleado
-        from core.permissions import get_employee_from_user
-        employee = get_employee_from_user(request.user)
-        
-        print(f"🔍 Empleado encontrado: {employee}")
-        
-        # SUPERUSUARIOS: Permitir GPS sin perfil de empleado
-        if not employee:
-            if request.user.is_superuser or request.user.is_staff:
-                print(f"✅ Superusuario/Staff: Buscando empleado existente")
-                
-                # Buscar si ya existe un empleado para este usuario
-                from employees.models import Employee
-                try:
-                    employee = Employee.objects.filter(user=request.user).first()
-                    if employee:
-                        print(f"✅ Empleado encontrado: {employee.employee_id} - {employee.get_full_name()}")
-                    else:
-                        print(f"❌ No se encontró empleado para superusuario {request.user.username}")
-                        return JsonResponse({
-                            'error': 'Superusuario sin perfil',
-                            'message': f'Superusuario {request.user.username} necesita un perfil de empleado. Crea uno desde el admin.',
-                            'suggestion': 'Ir a /admin/employees/employee/add/ y crear un perfil'
-                        }, status=400)
-                except Exception as e:
-                    print(f"❌ Error buscando empleado: {e}")
-                    return JsonResponse({
-                        'error': 'Error de base de datos',
-                        'message': str(e)
-                    }, status=500)
-            else:
-                print(f"❌ No se encontró perfil de empleado para {request.user.username}")
-                return JsonResponse({
-                    'error': 'Usuario sin perfil de empleado',
-                    'message': f'Usuario {request.user.username} necesita tener un perfil de empleado para el rastreo GPS',
-                    'user_id': request.user.id,
-                    'username': request.user.username,
-                    'debug': 'No employee profile found'
-                }, status=400)
-        
-        # Validar datos requeridos
-        required_fields = ['latitude', 'longitude']
-        for field in required_fields:
-            if field not in data:
-                return JsonResponse({'error': f'Campo requerido: {field}'}, status=400)
-        
-        # Crear registro de tracking
-        tracking = GPSTracking.objects.create(
-            employee=employee,
-            latitude=data['latitude'],
-            longitude=data['longitude'],
-            accuracy=data.get('accuracy'),
-            altitude=data.get('altitude'),
-            tracking_type=data.get('tracking_type', 'AUTO'),
-            battery_level=data.get('battery_level'),
-            device_info=data.get('device_info', ''),
-            notes=data.get('notes', ''),
-        )
-        
-        # Verificar si está en área de trabajo
-        response_data = {
-            'success': True,
-            'tracking_id': tracking.id,
-            'timestamp': tracking.timestamp.isoformat(),
-            'is_within_work_area': tracking.is_within_work_area,
-            'work_area': None,
-            'distance_to_area': tracking.distance_to_work_area,
-        }
-        
-        if tracking.work_area:
-            response_data['work_area'] = {
-                'id': tracking.work_area.id,
-                'name': tracking.work_area.name,
-                'type': tracking.work_area.get_area_type_display(),
-            }
-        
-        # Generar alertas si es necesario
-        if not tracking.is_within_work_area and tracking.work_area:
-            # Verificar si ya existe una alerta reciente
-            recent_alert = LocationAlert.objects.filter(
-                employee=employee,
-                alert_type='OUT_OF_AREA',
-                is_resolved=False,
-                created_at__gte=timezone.now() - timedelta(minutes=15)
-            ).first()
-            
-            if not recent_alert:
-                LocationAlert.objects.create(
-                    employee=employee,
-                    work_area=tracking.work_area,
-                    gps_tracking=tracking,
-                    alert_type='OUT_OF_AREA',
-                    alert_level='WARNING',
-                    title=f'Empleado fuera del área: {tracking.work_area.name}',
-                    message=f'{employee.get_full_name()} se encuentra a {tracking.distance_to_work_area:.0f}m del área asignada.'
-                )
-                response_data['alert_generated'] = True
-        
-        return JsonResponse(response_data)
-        
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'JSON inválido'}, status=400)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+    start = timezone.make_aware(datetime.combine(date_from, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(date_to, datetime.min.time())) + timedelta(days=1)
+    return date_from, date_to, start, end
+
 
 @login_required
 @employee_required
 def employee_tracking_history(request, employee_id):
     """Historial de tracking de un empleado específico"""
     
-    viewable_employees = AttendancePermissions.get_viewable_employees(request.user)
-    employee = get_object_or_404(Employee, id=employee_id, id__in=viewable_employees.values_list('id', flat=True))
-    
-    # Filtros de fecha
-    date_from = request.GET.get('date_from', timezone.now().date())
-    date_to = request.GET.get('date_to', timezone.now().date())
+    employee = _viewable_employee(request, employee_id)
+    date_from, date_to, start, end = _date_range(request)
+    today = timezone.localdate()
+    today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
     
-    if isinstance(date_from, str):
-        date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-    if isinstance(date_to, str):
-        date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-    
-    # Obtener tracking del período
+    # Obtener tracking del período (rango de fechas para usar el índice por empleado)
     tracking_records = GPSTracking.objects.filter(
-        employee=employee,
-        timestamp__date__range=[date_from, date_to]
-    ).select_related('work_area').order_by('-timestamp')
-    
-    # Estadísticas del período
+        employee=employee, timestamp__gte=start, timestamp__lt=end,
+    )
+    if request.GET.get('tracking_type'):
+        tracking_records = tracking_records.filter(tracking_type=request.GET['tracking_type'])
+    tracking_records = tracking_records.select_related('work_area').order_by('-timestamp')
+    
+    # Estadísticas del período en una sola consulta
+    totals = tracking_records.aggregate(
+        total=Count('id'),
+        in_area=Count('id', filter=Q(is_within_work_area=True)),
+        today=Count('id', filter=Q(timestamp__gte=today_start)),
+        areas=Count('work_area', distinct=True),
+        avg_accuracy=Avg('accuracy'),
+    )
     stats = {
-        'total_records': tracking_records.count(),
-        'time_in_area': tracking_records.filter(is_within_work_area=True).count(),
-        'time_out_area': tracking_records.filter(is_within_work_area=False).count(),
-        'areas_visited': tracking_records.values('work_area').distinct().count(),
+        'total_records': totals['total'],
+        'time_in_area': totals['in_area'],
+        'time_out_area': totals['total'] - totals['in_area'],
+        'areas_visited': totals['areas'],
     }
     
     context = {
         'employee': employee,
         'tracking_records': tracking_records[:100],  # Limitar a 100 registros
+        'gps_locations': tracking_records[:100],
         'stats': stats,
+        'total_locations': totals['total'],
+        'locations_today': totals['today'],
+        'avg_accuracy': totals['avg_accuracy'] or 0,
+        'in_area_percentage': totals['in_area'] * 100.0 / totals['total'] if totals['total'] else 0,
+        'days_tracked': (date_to - date_from).days + 1,
         'date_from': date_from,
         'date_to': date_to,
+        'today': today.isoformat(),
         'google_maps_api_key': getattr(settings, 'GOOGLE_MAPS_API_KEY', ''),
     }
     
     return render(request, 'attendance/employee_tracking_history.html', context)
 
+
+@login_required
+@employee_required
+def employee_track_api(request, employee_id):
+    """
+    Recorrido simplificado de un empleado (polilínea codificada y paradas)
+    
+    Parámetros: date_from, date_to (YYYY-MM-DD), zoom (0-22) o tolerance
+    (metros) y method (dp o vw). Combina puntos crudos y resúmenes antiguos.
+    """
+    from .gps_storage import employee_track
+    from .gps_tracks import METHODS, process_track
+    
+    employee = _viewable_employee(request, employee_id)
+    try:
+        date_from, date_to, start, end = _date_range(request)
+        zoom = int(request.GET['zoom']) if request.GET.get('zoom') else None
+        tolerance = float(request.GET['tolerance']) if request.GET.get('tolerance') else None
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    
+    method = request.GET.get('method', 'dp')
+    if method not in METHODS or (zoom is not None and not 0 <= zoom <= 22) or (tolerance is not None and tolerance < 0):
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    if date_to < date_from or (date_to - date_from).days >= getattr(settings, 'GPS_TRACK_MAX_DAYS', 31):
+        return JsonResponse({'error': 'Rango de fechas inválido'}, status=400)
+    
+    track = process_track(employee_track(employee.id, start, end), zoom=zoom, tolerance=tolerance, method=method)
+    track['employee_id'] = employee.id
+    
+    response = JsonResponse(track)
+    # Los días cerrados ya no cambian
+    if end <= timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time())):
+        patch_cache_control(response, private=True, max_age=3600)
+    return response
+
 @login_required
 @employee_required
 def location_alerts_view(request):
@@ -697,7 +670,8 @@ def work_area_assign_employees(request, pk):
 def update_gps_location(request):
     """
     API para actualizar ubicación GPS desde JavaScript en segundo plano
-    Usado por background-gps.js
+    Usado por sw.js, sw-background-gps.js y pwa-simple.js (un punto por
+    petición; background-gps.js envía lotes a update_gps_batch)
     """
     
     if request.method != 'POST':
@@ -744,6 +718,9 @@ def update_gps_location(request):
         
         print(f"✅ GPS guardado - ID: {tracking.id}, Empleado: {employee.get_full_name()}")
         
+        # Alertas de ubicación (motor por reglas, mismo estado que los lotes)
+        alerts = gps_alert_engine.process(employee, [tracking])
+        
         # Respuesta exitosa
         return JsonResponse({
             'success': True,
@@ -754,7 +731,8 @@ def update_gps_location(request):
                 'name': tracking.work_area.name if tracking.work_area else None,
                 'is_within': tracking.is_within_work_area,
                 'distance': float(tracking.distance_to_work_area) if tracking.distance_to_work_area else None,
-            } if tracking.work_area else None
+            } if tracking.work_area else None,
+            'alert_generated': bool(alerts),
         })
         
     except json.JSONDecodeError:
@@ -769,3 +747,53 @@ def update_gps_location(request):
             'success': False,
             'error': f'Error interno: {str(e)}'
         }, status=500)
+
+
+@csrf_exempt
+@login_required
+def update_gps_batch(request):
+    """
+    API para enviar varios puntos GPS en una sola petición
+    Usado por background-gps.js para vaciar la cola de puntos acumulados offline
+    """
+    
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'JSON inválido'
+        }, status=400)
+    
+    from core.permissions import get_employee_from_user
+    employee = get_employee_from_user(request.user)
+    
+    if not employee:
+        return JsonResponse({
+            'success': False,
+            'error': 'Usuario no tiene perfil de empleado'
+        }, status=400)
+    
+    points = data.get('points') if isinstance(data, dict) else data
+    
+    try:
+        result = ingest_gps_batch(employee, points)
+    except GPSBatchError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    except Exception as e:
+        logger.error(f"❌ Error guardando lote GPS de {employee}: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'error': f'Error interno: {str(e)}'
+        }, status=500)
+    
+    return JsonResponse({
+        'success': True,
+        **result
+    })
@@ -0,0 +1,142 @@
+"""
+Derivados de imagen con bajo consumo de memoria
+EURO SECURITY - Image Derivatives
+
+SecurityPhoto.create_thumbnail abría la foto completa (12 MP ≈ 36 MB en
+RGB), la reducía con LANCZOS sobre la decodificación completa y volvía a
+guardar el modelo con thumbnail.save(save=True), es decir, un segundo
+save() con sus señales. Este módulo:
+
+- Decodifica los JPEG en modo draft: libjpeg reduce a 1/2, 1/4 o 1/8
+  durante la decodificación, así que nunca se materializa la imagen
+  completa si no hace falta.
+- Genera todas las versiones (miniatura, vista previa, tamaño de análisis)
+  en una sola pasada, cada una a partir de la anterior.
+- Corrige la orientación EXIF y descarta los metadatos (ubicación GPS del
+  teléfono, modelo del dispositivo) al re-codificar.
+
+open_image también se usa para los rostros de marcación, que antes se
+decodificaban siempre a resolución completa.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def rendition_sizes():
+    """Lado mayor de cada versión derivada de SecurityPhoto"""
+    return {
+        'analysis_image': _setting('IMAGE_ANALYSIS_MAX_SIDE', 1280),
+        'preview': _setting('IMAGE_PREVIEW_MAX_SIDE', 1024),
+        'thumbnail': _setting('IMAGE_THUMBNAIL_MAX_SIDE', 300),
+    }
+
+
+def open_image(source, max_side=None):
+    """
+    Abre una imagen reducida a `max_side` píxeles en su lado mayor
+
+    Args:
+        source: bytes o archivo abierto en modo binario
+        max_side: lado mayor máximo; None para tamaño original
+
+    Returns:
+        PIL.Image en RGB con la orientación EXIF ya aplicada (sin EXIF)
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+
+    image = Image.open(source)
+    if max_side:
+        # Decodificación reducida en JPEG (sin efecto en otros formatos)
+        image.draft('RGB', (max_side, max_side))
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    return image
+
+
+def encode_jpeg(image, quality=None):
+    """Codifica a JPEG sin metadatos"""
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        format='JPEG',
+        quality=quality or _setting('IMAGE_DERIVATIVE_QUALITY', 85),
+    )
+    return buffer.getvalue()
+
+
+def render_derivatives(source, sizes=None):
+    """
+    Genera varias versiones JPEG de una imagen con una sola decodificación
+
+    Args:
+        source: bytes o archivo abierto en modo binario
+        sizes: dict nombre → lado mayor (por defecto rendition_sizes())
+
+    Returns:
+        dict nombre → bytes JPEG
+    """
+    sizes = sizes or rendition_sizes()
+    ordered = sorted(sizes.items(), key=lambda item: item[1], reverse=True)
+
+    # Una sola decodificación al tamaño de la versión más grande
+    image = open_image(source, ordered[0][1])
+
+    renditions = {}
+    for name, max_side in ordered:
+        if max(image.size) > max_side:
+            # Cada versión sale de la anterior, no de la original
+            image = image.copy()
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        renditions[name] = encode_jpeg(image)
+
+    return renditions
+
+
+def save_derivatives(instance, source_field, sizes=None):
+    """
+    Genera y guarda las versiones derivadas de un ImageField del modelo
+
+    Los archivos se escriben directamente en el storage de cada campo y las
+    rutas se guardan con un único UPDATE (sin volver a llamar a save()).
+
+    Returns:
+        dict campo → ruta guardada
+    """
+    source = getattr(instance, source_field)
+    with source.open('rb') as f:
+        renditions = render_derivatives(f, sizes)
+
+    base_name = os.path.splitext(os.path.basename(source.name))[0]
+    names = {}
+    for field_name, content in renditions.items():
+        field = instance._meta.get_field(field_name)
+        filename = field.generate_filename(instance, f'{field_name}_{base_name}.jpg')
+        names[field_name] = field.storage.save(filename, ContentFile(content))
+
+    type(instance)._default_manager.filter(pk=instance.pk).update(**names)
+    for field_name, name in names.items():
+        setattr(instance, field_name, name)
+
+    logger.info(
+        f"🖼️ Derivados de {source.name}: "
+        + ', '.join(f'{name} {len(content) // 1024} KB' for name, content in renditions.items())
+    )
+    return names
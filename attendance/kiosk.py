@@ -0,0 +1,255 @@
+"""
+Kiosco de marcación por reconocimiento facial
+EURO SECURITY - Attendance Kiosk
+
+Una tablet fija en el área de trabajo permite marcar sin que cada guardia
+inicie sesión en su teléfono. En el cambio de turno se forma una fila, así
+que cada captura debe resolverse en decenas de milisegundos:
+
+- El kiosco se autentica con su propio token (AttendanceKiosk), no con una
+  sesión de usuario.
+- La identificación es 1:N pero solo contra los empleados asignados al área
+  del kiosco (índice de geocercas en memoria, sin consultas) y con una sola
+  extracción de características: no se repite la verificación 1:1.
+- Si los dos mejores candidatos quedan a menos de KIOSK_AMBIGUITY_MARGIN se
+  rechaza la captura en lugar de adivinar.
+- KIOSK_IDENTIFICATION_ENABLED es el interruptor de despliegue: cada
+  instalación lo habilita cuando calibrate_face_matching, con fotos de su
+  personal, da valores de KIOSK_MIN_SIMILARITY y KIOSK_AMBIGUITY_MARGIN que
+  separan a las personas. En los datos sintéticos de calibración las
+  características actuales no lo hacen, por eso viene apagado.
+- El tipo de marcación se deduce de la última del día, y una segunda captura
+  del mismo guardia dentro de KIOSK_REPEAT_SECONDS no crea otro registro.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from employees.models import Employee
+from .facial_recognition import identify_employee
+from .geofence import geofence_index
+from .models import AttendanceRecord
+from .models_gps import AttendanceKiosk
+
+logger = logging.getLogger(__name__)
+
+# Próxima marcación según la última del día (misma regla que attendance_clock)
+NEXT_ATTENDANCE_TYPE = {
+    None: 'IN',
+    'IN': 'OUT',
+    'OUT': 'IN',
+    'BREAK_OUT': 'BREAK_IN',
+    'BREAK_IN': 'OUT',
+}
+
+TOKEN_HEADER = 'HTTP_X_KIOSK_TOKEN'
+AUTHORIZATION_SCHEME = 'kiosk'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def token_from_request(request):
+    """Token enviado como 'Authorization: Kiosk <token>' o 'X-Kiosk-Token'"""
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() == AUTHORIZATION_SCHEME and token.strip():
+        return token.strip()
+    return request.META.get(TOKEN_HEADER, '').strip()
+
+
+def authenticate_kiosk(request):
+    """
+    Kiosco activo que hace la petición, o None
+
+    last_seen_at se actualiza como mucho una vez por minuto para no escribir
+    en cada captura.
+    """
+    kiosk = AttendanceKiosk.authenticate(token_from_request(request))
+    if kiosk is None:
+        return None
+
+    now = timezone.now()
+    if kiosk.last_seen_at is None or now - kiosk.last_seen_at >= timedelta(seconds=60):
+        AttendanceKiosk.objects.filter(id=kiosk.id).update(last_seen_at=now)
+        kiosk.last_seen_at = now
+    return kiosk
+
+
+def identification_enabled():
+    """True si la identificación 1:N está habilitada y la galería calibrada"""
+    from .face_gallery import face_gallery
+
+    return bool(_setting('KIOSK_IDENTIFICATION_ENABLED', False)) and face_gallery.calibrated
+
+
+def kiosk_candidates(kiosk):
+    """IDs de los empleados que el kiosco puede identificar"""
+    return geofence_index.employees_for_area(kiosk.work_area_id)
+
+
+def _identify(kiosk, facial_image):
+    """
+    Empleado en la captura entre los asignados al área del kiosco
+
+    Returns:
+        tuple: (candidato, resultado de identify) o (None, dict de error)
+    """
+    candidates = kiosk_candidates(kiosk)
+    if not candidates:
+        return None, {
+            'success': False,
+            'error': 'No hay empleados asignados al área de este kiosco',
+        }
+
+    min_face = _setting('KIOSK_MIN_FACE_PIXELS', 100)
+    # Sin umbral en la galería: el segundo candidato hace falta aunque no lo supere
+    result = identify_employee(
+        facial_image,
+        employee_ids=candidates,
+        top_k=2,
+        min_similarity=0.0,
+        max_side=_setting('KIOSK_IMAGE_MAX_SIDE', 640),
+        min_face_size=(min_face, min_face),
+    )
+
+    matches = result.get('candidates') or []
+    if not matches:
+        return None, {
+            'success': False,
+            'error': result.get('error') or 'Rostro no reconocido',
+            'help_text': 'Mire a la cámara, sin gorra ni lentes oscuros, a menos de un metro.',
+        }
+
+    best = matches[0]
+    if best['similarity'] < _setting('KIOSK_MIN_SIMILARITY', 0.67):
+        logger.info(f"🔍 Kiosco {kiosk.id}: rostro no reconocido (similitud {best['similarity']:.2f})")
+        return None, {
+            'success': False,
+            'error': 'Rostro no reconocido',
+            'confidence': best['similarity'],
+            'help_text': 'Si no está asignado a esta área, marque desde su teléfono.',
+        }
+
+    if len(matches) > 1 and best['similarity'] - matches[1]['similarity'] < _setting('KIOSK_AMBIGUITY_MARGIN', 0.18):
+        logger.warning(
+            f"⚠️ Kiosco {kiosk.id}: identificación ambigua entre empleados "
+            f"{best['employee_id']} ({best['similarity']:.2f}) y "
+            f"{matches[1]['employee_id']} ({matches[1]['similarity']:.2f})"
+        )
+        return None, {
+            'success': False,
+            'error': 'Identificación ambigua. Acérquese a la cámara e intente de nuevo.',
+            'confidence': best['similarity'],
+        }
+
+    security_checks = result.get('security_checks') or {}
+    if not security_checks.get('overall_security', True):
+        logger.warning(f"Kiosco {kiosk.id}: checks de seguridad fallidos: {security_checks}")
+        return None, {
+            'success': False,
+            'error': 'Verificación de seguridad fallida. Intente con mejor iluminación.',
+            'security_details': security_checks,
+        }
+
+    return best, result
+
+
+def _record_payload(record):
+    return {
+        'id': record.id,
+        'type': record.get_attendance_type_display(),
+        'timestamp': timezone.localtime(record.timestamp).strftime('%H:%M:%S'),
+        'confidence': record.facial_confidence,
+    }
+
+
+def kiosk_clock_in(kiosk, facial_image, attendance_type=None, ip_address=None):
+    """
+    Identifica al guardia de la captura y registra su marcación
+
+    Args:
+        kiosk: AttendanceKiosk autenticado (con work_area cargada)
+        facial_image: Captura en base64
+        attendance_type: Tipo forzado (IN, OUT, ...); por defecto el siguiente
+            según la última marcación del día
+        ip_address: IP de la tablet
+
+    Returns:
+        dict: Respuesta para el kiosco (misma estructura que record_attendance
+        más los datos del empleado identificado)
+    """
+    from .views import register_attendance
+
+    if not identification_enabled():
+        return {
+            'success': False,
+            'error': 'Identificación por kiosco deshabilitada: marque desde su teléfono',
+        }
+
+    match, result = _identify(kiosk, facial_image)
+    if match is None:
+        return result
+
+    similarity = match['similarity']
+    area = kiosk.work_area
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Bloquear al empleado serializa las capturas simultáneas del mismo
+        # guardia (varios workers) antes de decidir si la marcación es repetida
+        employee = Employee.objects.select_for_update().filter(id=match['employee_id']).first()
+        if employee is None:
+            return {'success': False, 'error': 'Empleado no encontrado'}
+
+        last_record = AttendanceRecord.objects.filter(
+            employee=employee,
+            timestamp__date=timezone.localdate(now),
+        ).order_by('-timestamp').first()
+        last_type = last_record.attendance_type if last_record else None
+
+        employee_payload = {
+            'id': employee.id,
+            'employee_id': employee.employee_id,
+            'name': employee.get_full_name(),
+        }
+
+        repeat_window = timedelta(seconds=_setting('KIOSK_REPEAT_SECONDS', 60))
+        if (last_record and now - last_record.timestamp < repeat_window
+                and attendance_type in (None, last_type)):
+            return {
+                'success': True,
+                'duplicate': True,
+                'message': f'{last_record.get_attendance_type_display()} ya registrada',
+                'employee': employee_payload,
+                'record': _record_payload(last_record),
+            }
+
+        attendance_type = attendance_type or NEXT_ATTENDANCE_TYPE.get(last_type, 'IN')
+        logger.info(
+            f"🖥️ Kiosco {kiosk.name}: {employee.get_full_name()} identificado "
+            f"(similitud {similarity:.2f}) → {attendance_type}"
+        )
+
+        response = register_attendance(
+            employee=employee,
+            attendance_type=attendance_type,
+            latitude=area.latitude,
+            longitude=area.longitude,
+            location_accuracy=None,
+            facial_confidence=similarity,
+            facial_image_path=f'attendance/faces/{employee.employee_id}_{now.strftime("%Y%m%d_%H%M%S")}.jpg',
+            device_info=f'Kiosco: {kiosk.name} (#{kiosk.id})',
+            ip_address=ip_address,
+            timestamp=now,
+        )
+
+    response.update({
+        'duplicate': False,
+        'attendance_type': attendance_type,
+        'employee': employee_payload,
+    })
+    return response
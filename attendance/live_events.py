@@ -0,0 +1,360 @@
+"""
+Canal de eventos en vivo para el centro de operaciones
+EURO SECURITY - Live Events
+
+Los dashboards ya no sondean cada pocos segundos: se suscriben a un flujo
+Server-Sent Events (views_operations.live_events_stream) y el servidor solo
+trabaja cuando algo ocurre, así la carga pasa de O(clientes × frecuencia de
+sondeo) a O(eventos).
+
+- EventBus: publicación/suscripción en memoria del proceso con un búfer
+  circular (LIVE_EVENTS_BUFFER_SIZE) para reanudar con Last-Event-ID. Los
+  identificadores son marcas de tiempo en nanosegundos, comparables entre
+  procesos, así un cliente puede reconectarse a otro worker.
+- PostgreSQL: cada evento se difunde además con NOTIFY y un hilo por proceso
+  (arranca con el primer suscriptor) lo recibe con LISTEN, de modo que lo
+  publicado en cualquier worker o en run_attendance_worker llega a todos.
+  Con otros motores solo se entregan los eventos del propio proceso.
+- Los productores publican con transaction.on_commit (signals.py y
+  live_positions.record_positions): nunca se anuncia algo que se revierte.
+
+Canales: positions (deltas de posición), alerts (SecurityAlert y
+LocationAlert nuevas) y video (solicitudes de video, solo para el usuario
+del empleado). El evento resync (canal '*') pide al cliente recargar todo
+porque pudo perder eventos.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple('Event', 'id channel type data user_id')
+
+CHANNELS = ('positions', 'alerts', 'video')
+ALL_CHANNELS = '*'
+NOTIFY_CHANNEL = 'attendance_live_events'
+# PostgreSQL rechaza cargas de NOTIFY de 8000 bytes o más
+NOTIFY_MAX_BYTES = 7900
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class EventBus:
+    """Bus de eventos del proceso con búfer para reanudar suscripciones"""
+
+    def __init__(self, buffer_size=None):
+        self._condition = threading.Condition()
+        self._buffer = deque(maxlen=buffer_size or _setting('LIVE_EVENTS_BUFFER_SIZE', 2000))
+        # Orden de llegada al proceso (los ids pueden llegar desordenados desde otros procesos)
+        self._sequence = 0
+        self._last_id = 0
+        # Antes de este id pudieron ocurrir eventos que este proceso no vio
+        self._complete_since = time.time_ns()
+        self._async_waiters = set()
+        self._origin = uuid.uuid4().hex
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    # Publicación
+
+    def _next_id(self):
+        with self._condition:
+            self._last_id = max(time.time_ns(), self._last_id + 1)
+            return self._last_id
+
+    def _append(self, event):
+        with self._condition:
+            self._sequence += 1
+            self._buffer.append((self._sequence, event))
+            self._condition.notify_all()
+            waiters = list(self._async_waiters)
+        for loop, ready in waiters:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # Bucle de eventos ya cerrado
+                pass
+        return event
+
+    def publish(self, channel, event_type, data, user_id=None):
+        """Entrega un evento a los suscriptores de este proceso y de los demás"""
+        event = self._append(Event(self._next_id(), channel, event_type, data, user_id))
+        self._notify_peers(event)
+        return event
+
+    def publish_on_commit(self, channel, event_type, data, user_id=None):
+        transaction.on_commit(lambda: self.publish(channel, event_type, data, user_id=user_id))
+
+    # Suscripción
+
+    def now(self):
+        """Id a partir del cual reanudar si no se ha recibido ningún evento"""
+        return max(time.time_ns(), self._last_id)
+
+    def resume(self, last_event_id):
+        """
+        Eventos posteriores a last_event_id y posición para seguir leyendo
+
+        Returns:
+            (eventos, posición, completo): completo es False si pudieron
+            perderse eventos y el cliente debe recargar todo
+        """
+        with self._condition:
+            sequence = self._sequence
+            if last_event_id is None:
+                return [], sequence, True
+            if last_event_id < self._complete_since:
+                return [], sequence, False
+            if len(self._buffer) == self._buffer.maxlen and self._buffer[0][1].id > last_event_id:
+                # El búfer ya descartó eventos que el cliente no recibió
+                return [], sequence, False
+            events = [event for _, event in self._buffer if event.id > last_event_id]
+        return events, sequence, True
+
+    def read(self, position):
+        """Eventos llegados después de position"""
+        with self._condition:
+            if position >= self._sequence:
+                return [], position
+            oldest = self._buffer[0][0]
+            events = [event for sequence, event in self._buffer if sequence > position]
+            if oldest > position + 1:
+                # Suscriptor demasiado lento: el búfer dio la vuelta
+                events.insert(0, Event(self._last_id, ALL_CHANNELS, 'resync', {}, None))
+            return events, self._sequence
+
+    def wait(self, position, timeout):
+        """Espera (bloqueante) hasta que haya eventos nuevos o venza timeout"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > position, timeout)
+        return self.read(position)
+
+    async def wait_async(self, position, timeout):
+        """Igual que wait sin bloquear el bucle de eventos (ASGI)"""
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Event())
+        with self._condition:
+            if self._sequence > position:
+                return self.read(position)
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+        return self.read(position)
+
+    # Difusión entre procesos (PostgreSQL LISTEN/NOTIFY)
+
+    def _relay_enabled(self):
+        return _setting('LIVE_EVENTS_DB_NOTIFY', True) and connections['default'].vendor == 'postgresql'
+
+    def _notify_peers(self, event):
+        if not self._relay_enabled():
+            return
+        payload = json.dumps({
+            'o': self._origin,
+            'i': event.id,
+            'c': event.channel,
+            't': event.type,
+            'd': event.data,
+            'u': event.user_id,
+        }, cls=DjangoJSONEncoder, separators=(',', ':'))
+        if len(payload.encode('utf-8')) > NOTIFY_MAX_BYTES:
+            logger.warning(f"⚠️ Evento {event.type} demasiado grande para NOTIFY; solo se entrega en este proceso")
+            return
+        try:
+            with connections['default'].cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, payload])
+        except DatabaseError as e:
+            logger.warning(f"⚠️ No se pudo difundir el evento {event.type}: {e}")
+
+    def ensure_listener(self):
+        """Arranca (una vez por proceso) el hilo que recibe eventos de otros procesos"""
+        if self._listener is not None or not self._relay_enabled():
+            return
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen_forever, name='live-events-listener', daemon=True)
+                self._listener.start()
+
+    def _listen_forever(self):
+        backoff = 1
+        while True:
+            wrapper = connections.create_connection('default')
+            try:
+                wrapper.ensure_connection()
+                raw = wrapper.connection
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                self._mark_gap()
+                logger.info(f"📡 Escuchando eventos en vivo de otros procesos ({NOTIFY_CHANNEL})")
+                backoff = 1
+                while True:
+                    select.select([raw], [], [], 30)
+                    raw.poll()
+                    while raw.notifies:
+                        self._receive(raw.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning(f"⚠️ Conexión LISTEN perdida, reintentando en {backoff} s: {e}")
+            finally:
+                try:
+                    wrapper.close()
+                except Exception:
+                    pass
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _mark_gap(self):
+        """Lo ocurrido antes de (re)conectar LISTEN no llegó a este proceso"""
+        with self._condition:
+            self._complete_since = time.time_ns()
+        self._append(Event(self._next_id(), ALL_CHANNELS, 'resync', {}, None))
+
+    def _receive(self, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get('o') == self._origin:
+            return
+        self._append(Event(message['i'], message['c'], message['t'], message['d'], message.get('u')))
+
+
+# Instancia global por proceso
+event_bus = EventBus()
+
+
+# ----------------------------------------------------------------------
+# Cargas de cada evento (las mismas claves que las APIs de sondeo)
+# ----------------------------------------------------------------------
+
+def position_payload(tracking):
+    return {
+        'employee_id': tracking.employee_id,
+        'latitude': float(tracking.latitude),
+        'longitude': float(tracking.longitude),
+        'accuracy': float(tracking.accuracy) if tracking.accuracy else None,
+        'timestamp': tracking.timestamp.isoformat(),
+        'work_area_id': tracking.work_area_id,
+        'is_within_area': tracking.is_within_work_area,
+        'battery_level': tracking.battery_level,
+    }
+
+
+def security_alert_payload(alert):
+    """Misma forma que cada alerta de get_active_alerts"""
+    return {
+        'id': alert.id,
+        'employee_id': alert.employee_id,
+        'employee_name': alert.employee.get_full_name(),
+        'alert_type': alert.alert_type,
+        'severity': alert.severity,
+        'message': alert.message,
+        'status': alert.status,
+        'created_at': alert.created_at.isoformat(),
+        'photo_url': alert.photo.thumbnail.url if alert.photo and alert.photo.thumbnail else None,
+        'acknowledged_by': alert.acknowledged_by.get_full_name() if alert.acknowledged_by else None,
+    }
+
+
+def location_alert_payload(alert):
+    return {
+        'id': alert.id,
+        'employee_id': alert.employee_id,
+        'employee_name': alert.employee.get_full_name(),
+        'alert_type': alert.alert_type,
+        'alert_level': alert.alert_level,
+        'title': alert.title,
+        'message': alert.message,
+        'work_area_id': alert.work_area_id,
+        'created_at': alert.created_at.isoformat(),
+    }
+
+
+def publish_positions(trackings):
+    """Publica al confirmar la transacción un delta por empleado"""
+    for tracking in trackings:
+        event_bus.publish_on_commit('positions', 'position', position_payload(tracking))
+
+
+# ----------------------------------------------------------------------
+# Server-Sent Events
+# ----------------------------------------------------------------------
+
+def format_sse(event):
+    data = json.dumps(event.data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n"
+
+
+def parse_event_id(value):
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class Subscription:
+    """Canales y filtro de visibilidad de un cliente"""
+
+    def __init__(self, user, channels):
+        self.user_id = user.id
+        self.channels = set(channels)
+
+    def visible(self, event):
+        if event.channel == ALL_CHANNELS:
+            return True
+        if event.channel not in self.channels:
+            return False
+        return event.user_id is None or event.user_id == self.user_id
+
+    def render(self, events):
+        return ''.join(format_sse(event) for event in events if self.visible(event))
+
+
+def _opening(subscription, last_event_id):
+    """Primer bloque del flujo: reintento, id de reanudación y pendientes"""
+    events, position, complete = event_bus.resume(last_event_id)
+    chunk = f"retry: {_setting('LIVE_EVENTS_RETRY_MS', 5000)}\n"
+    # Un id sin datos fija el Last-Event-ID del navegador sin despachar evento
+    chunk += f"id: {last_event_id if complete and last_event_id else event_bus.now()}\n\n"
+    if not complete:
+        chunk += format_sse(Event(event_bus.now(), ALL_CHANNELS, 'resync', {}, None))
+    return chunk + subscription.render(events), position
+
+
+def stream(subscription, last_event_id, seconds):
+    """Flujo SSE para WSGI: bloquea un hilo, por eso seconds suele ser corto"""
+    heartbeat = _setting('LIVE_EVENTS_HEARTBEAT_SECONDS', 15)
+    chunk, position = _opening(subscription, last_event_id)
+    yield chunk
+    deadline = time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        events, position = event_bus.wait(position, min(remaining, heartbeat))
+        yield subscription.render(events) or ': ping\n\n'
+
+
+async def stream_async(subscription, last_event_id, seconds):
+    """Flujo SSE para ASGI: miles de conexiones abiertas sin hilos"""
+    heartbeat = _setting('LIVE_EVENTS_HEARTBEAT_SECONDS', 15)
+    chunk, position = _opening(subscription, last_event_id)
+    yield chunk
+    deadline = time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        events, position = await event_bus.wait_async(position, min(remaining, heartbeat))
+        yield subscription.render(events) or ': ping\n\n'
@@ -0,0 +1,123 @@
+"""
+Última posición conocida de cada empleado
+EURO SECURITY - Live Positions
+
+Los mapas en vivo (gps_tracking_api y get_live_locations) consultan cada
+pocos segundos la posición de toda la flota. En lugar de buscar el último
+GPSTracking de cada empleado, se mantiene la tabla EmployeeLastPosition:
+
+- record_positions: al insertar puntos (save o bulk_create) se actualiza la
+  fila del empleado solo si el punto es más reciente que el guardado, así
+  los reenvíos offline no retroceden la posición.
+- record_photo: enlaza la última SecurityPhoto (y refresca la versión cuando
+  el análisis de IA la modifica).
+- fleet_etag: ETag barato (COUNT + MAX(updated_at)) para responder 304 a los
+  dashboards cuando nada se movió.
+
+Cada posición que cambia se publica además en el canal positions de
+live_events para los dashboards suscritos.
+"""
+import hashlib
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .live_events import publish_positions
+from .models_gps import EmployeeLastPosition
+
+logger = logging.getLogger(__name__)
+
+
+def _position_values(tracking, now):
+    return {
+        'gps_tracking_id': tracking.id,
+        'latitude': tracking.latitude,
+        'longitude': tracking.longitude,
+        'accuracy': tracking.accuracy,
+        'battery_level': tracking.battery_level,
+        'tracking_type': tracking.tracking_type,
+        'timestamp': tracking.timestamp,
+        'is_active_session': tracking.is_active_session,
+        'work_area_id': tracking.work_area_id,
+        'is_within_work_area': tracking.is_within_work_area,
+        'distance_to_work_area': tracking.distance_to_work_area,
+        'updated_at': now,
+    }
+
+
+def record_positions(trackings):
+    """
+    Actualiza la última posición con puntos GPS ya guardados
+
+    Args:
+        trackings: iterable de GPSTracking con id (uno o un lote)
+
+    Returns:
+        Número de empleados cuya posición cambió
+    """
+    latest = {}
+    for tracking in trackings:
+        if not tracking.employee_id or not tracking.id:
+            continue
+        current = latest.get(tracking.employee_id)
+        if current is None or tracking.timestamp >= current.timestamp:
+            latest[tracking.employee_id] = tracking
+
+    now = timezone.now()
+    changed = []
+
+    for employee_id, tracking in latest.items():
+        values = _position_values(tracking, now)
+
+        # UPDATE condicional: no reemplazar una posición más reciente
+        updated = EmployeeLastPosition.objects.filter(
+            employee_id=employee_id,
+            timestamp__lte=tracking.timestamp,
+        ).update(**values)
+
+        if not updated:
+            try:
+                with transaction.atomic():
+                    EmployeeLastPosition.objects.create(employee_id=employee_id, **values)
+            except IntegrityError:
+                # Ya existe con un punto más reciente
+                continue
+
+        changed.append(tracking)
+
+    publish_positions(changed)
+    return len(changed)
+
+
+def record_photo(photo):
+    """Enlaza la foto de seguridad más reciente a la última posición del empleado"""
+    if not photo.employee_id or not photo.id:
+        return 0
+
+    return EmployeeLastPosition.objects.filter(
+        Q(last_photo_at__isnull=True) | Q(last_photo_at__lte=photo.timestamp),
+        employee_id=photo.employee_id,
+    ).update(
+        last_photo_id=photo.id,
+        last_photo_at=photo.timestamp,
+        updated_at=timezone.now(),
+    )
+
+
+def fleet_etag(queryset, *parts, photo_since=None):
+    """
+    ETag de un conjunto de posiciones en una sola consulta agregada
+
+    Cambia cuando se mueve alguien, cuando un empleado entra o sale del filtro
+    (por ejemplo la ventana de minutos) o, con photo_since, cuando una foto
+    deja de ser reciente.
+    """
+    aggregates = {'total': Count('pk'), 'version': Max('updated_at')}
+    if photo_since is not None:
+        aggregates['photos'] = Count('pk', filter=Q(last_photo_at__gte=photo_since))
+
+    values = queryset.order_by().aggregate(**aggregates)
+    raw = '|'.join(str(value) for value in (*parts, *sorted(values.items())))
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
@@ -0,0 +1,14 @@
+"""
+Pruebas de carga repetibles para marcación y GPS
+EURO SECURITY - Load Test Suite
+
+- dataset: siembra un conjunto de datos realista (empleados, áreas de
+  trabajo, turnos y perfiles faciales con imágenes de referencia) marcado con
+  el prefijo LOADTEST_PREFIX para poder eliminarlo después.
+- scenarios: peticiones de cada endpoint (record_attendance,
+  update_gps_location, gps_tracking_api, get_live_locations).
+- runner: usuarios virtuales concurrentes contra un servidor HTTP local,
+  percentiles p50/p95/p99, throughput y comparación con líneas base.
+
+Se ejecuta con manage.py loadtest (seed, run, clean).
+"""
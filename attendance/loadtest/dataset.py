@@ -0,0 +1,336 @@
+"""
+Conjunto de datos de la prueba de carga
+
+Todo lo que se crea lleva el prefijo LOADTEST_PREFIX (usuarios, códigos de
+empleado, áreas, departamento y cargo) para que clean_dataset lo elimine sin
+tocar datos reales.
+"""
+import base64
+import glob
+import logging
+import os
+from datetime import time
+from decimal import Decimal
+from io import BytesIO
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from departments.models import Department
+from employees.models import Employee
+from positions.models import Position
+
+from ..models import (
+    AttendanceRecord, AttendanceVerificationTask, EmployeeShiftAssignment, FacialRecognitionProfile,
+    Shift, ShiftTemplate, WorkSchedule,
+)
+from ..models_gps import EmployeeWorkArea, GPSTracking, WorkArea
+
+logger = logging.getLogger(__name__)
+
+
+LOADTEST_PREFIX = 'loadtest'
+LOADTEST_PASSWORD = 'loadtest-password'
+SUPERVISOR_USERNAME = f'{LOADTEST_PREFIX}-supervisor'
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.JPG', '*.JPEG', '*.PNG')
+
+# Centro de Guayaquil; las áreas se reparten en una rejilla alrededor
+BASE_LATITUDE = -2.1894
+BASE_LONGITUDE = -79.8891
+AREA_SPACING_DEGREES = 0.01
+
+
+def employee_code(index):
+    return f'LT{index:05d}'
+
+
+def username(index):
+    return f'{LOADTEST_PREFIX}-guard-{index:05d}'
+
+
+def area_center(index, per_row=10):
+    """Centro del área index en una rejilla alrededor del centro de la ciudad"""
+    row, col = divmod(index, per_row)
+    return (
+        BASE_LATITUDE + (row - per_row / 2) * AREA_SPACING_DEGREES,
+        BASE_LONGITUDE + (col - per_row / 2) * AREA_SPACING_DEGREES,
+    )
+
+
+# Imágenes de referencia
+
+def synthetic_face(seed, size=(640, 480)):
+    """Rostro dibujado (óvalo, ojos, cejas, nariz y boca) con color y ruido variables"""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    width, height = size
+    image = np.empty((height, width, 3), np.uint8)
+    image[:] = rng.integers(150, 220, 3)
+    cx, cy = width // 2, height // 2
+    skin = tuple(int(value) for value in rng.integers(120, 220, 3))
+    cv2.ellipse(image, (cx, cy), (95, 125), 0, 0, 360, skin, -1)
+    for dx in (-38, 38):
+        cv2.ellipse(image, (cx + dx, cy - 30), (18, 9), 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(image, (cx + dx, cy - 30), 7, (40, 30, 20), -1)
+        cv2.line(image, (cx + dx - 22, cy - 55), (cx + dx + 22, cy - 58), (60, 40, 30), 5)
+    cv2.line(image, (cx, cy - 20), (cx - 8, cy + 25), (100, 80, 70), 3)
+    cv2.ellipse(image, (cx, cy + 55), (32, 12), 0, 0, 180, (90, 40, 50), 5)
+    image = cv2.GaussianBlur(image, (5, 5), 0)
+    image = np.clip(image + rng.normal(0, 6, image.shape), 0, 255).astype(np.uint8)
+    return Image.fromarray(image)
+
+
+def synthetic_identity(seed, capture, size=(640, 480)):
+    """
+    Captura capture de la identidad sintética seed
+
+    La geometría del rostro (proporciones, ojos, cejas, nariz, boca y colores)
+    depende solo de seed; la posición, escala, fondo, iluminación y ruido
+    cambian con cada captura. Sirve para medir similitudes de la misma persona
+    frente a personas distintas (calibrate_face_matching).
+    """
+    import cv2
+
+    identity = np.random.default_rng([seed])
+    shot = np.random.default_rng([seed, capture, 7])
+    width, height = size
+    image = np.empty((height, width, 3), np.uint8)
+    image[:] = shot.integers(150, 220, 3)
+
+    skin = tuple(int(value) for value in identity.integers(120, 220, 3))
+    axes = (int(identity.integers(88, 103)), int(identity.integers(118, 132)))
+    eye_dx, eye_y = int(identity.integers(33, 44)), int(identity.integers(25, 36))
+    eye_axes = (int(identity.integers(15, 21)), int(identity.integers(7, 11)))
+    brow_width, brow_tilt, brow_gap = (int(identity.integers(4, 7)), int(identity.integers(-4, 5)),
+                                       int(identity.integers(21, 29)))
+    nose = int(identity.integers(38, 52))
+    mouth_width, mouth_y, mouth_curve = (int(identity.integers(26, 40)), int(identity.integers(48, 62)),
+                                         int(identity.integers(8, 16)))
+    brow_color = tuple(int(value) for value in identity.integers(30, 80, 3))
+
+    cx = width // 2 + int(shot.integers(-20, 21))
+    cy = height // 2 + int(shot.integers(-15, 16))
+    scale = float(shot.uniform(0.94, 1.06))
+
+    def px(value):
+        return max(1, int(round(value * scale)))
+
+    cv2.ellipse(image, (cx, cy), (px(axes[0]), px(axes[1])), 0, 0, 360, skin, -1)
+    for side in (-1, 1):
+        ex, ey = cx + side * px(eye_dx), cy - px(eye_y)
+        cv2.ellipse(image, (ex, ey), (px(eye_axes[0]), px(eye_axes[1])), 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(image, (ex, ey), px(7), (40, 30, 20), -1)
+        cv2.line(image, (ex - px(22), ey - px(brow_gap) + brow_tilt),
+                 (ex + px(22), ey - px(brow_gap) - brow_tilt), brow_color, px(brow_width))
+    cv2.line(image, (cx, cy - px(20)), (cx - px(8), cy - px(20) + px(nose)), (100, 80, 70), 3)
+    cv2.ellipse(image, (cx, cy + px(mouth_y)), (px(mouth_width), px(mouth_curve)), 0, 0, 180, (90, 40, 50), 5)
+
+    image = cv2.GaussianBlur(image, (5, 5), 0)
+    gain, offset = shot.uniform(0.9, 1.1), shot.uniform(-10, 10)
+    image = np.clip(image * gain + offset + shot.normal(0, 6, image.shape), 0, 255).astype(np.uint8)
+    return Image.fromarray(image)
+
+
+def image_to_data_url(image):
+    buffer = BytesIO()
+    image.convert('RGB').save(buffer, format='JPEG', quality=85)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def load_reference_faces(faces_dir=None, count=8, max_seeds=200):
+    """
+    Imágenes de rostro con características extraíbles por el sistema facial
+
+    Usa las fotos de faces_dir (por defecto MEDIA_ROOT/facial_references) y,
+    si no hay suficientes, rostros sintéticos cuyos seeds sí detecta el
+    clasificador.
+
+    Returns:
+        Lista de (imagen PIL, características)
+    """
+    from ..facial_recognition import get_facial_recognition_system
+
+    system = get_facial_recognition_system()
+    faces = []
+
+    faces_dir = faces_dir or os.path.join(settings.MEDIA_ROOT, 'facial_references')
+    paths = []
+    if os.path.isdir(faces_dir):
+        for pattern in IMAGE_EXTENSIONS:
+            paths.extend(glob.glob(os.path.join(faces_dir, '**', pattern), recursive=True))
+
+    candidates = (Image.open(path).convert('RGB') for path in sorted(set(paths)))
+    synthetic = (synthetic_face(seed) for seed in range(max_seeds))
+
+    for source in (candidates, synthetic):
+        for image in source:
+            if len(faces) >= count:
+                return faces
+            features, _, quality = system.extract_face_encoding(image)
+            if features and quality > 0.3:
+                faces.append((image, features))
+    return faces
+
+
+# Siembra
+
+def _organization():
+    department, _ = Department.objects.get_or_create(
+        code='LTEST',
+        defaults={'name': 'Prueba de Carga', 'department_type': 'SEGURIDAD'},
+    )
+    position, _ = Position.objects.get_or_create(
+        code='LTEST-GUARD',
+        defaults={
+            'title': 'Guardia (prueba de carga)',
+            'department': department,
+            'description': 'Cargo generado por manage.py loadtest',
+            'min_salary': Decimal('500'),
+            'max_salary': Decimal('800'),
+            'level': 'ENTRY',
+            'employment_type': 'FULL_TIME',
+        },
+    )
+    return department, position
+
+
+def _shift():
+    template, _ = ShiftTemplate.objects.get_or_create(
+        name=f'{LOADTEST_PREFIX} 24/7',
+        defaults={'category': 'SECURITY', 'shift_type': 'ROTATING', 'shift_code': 'LT'},
+    )
+    schedule, _ = WorkSchedule.objects.get_or_create(
+        name=f'{LOADTEST_PREFIX} horario',
+        defaults={'schedule_type': 'GLOBAL', 'shift_template': template, 'start_date': timezone.localdate()},
+    )
+    shift, _ = Shift.objects.get_or_create(
+        work_schedule=schedule, order=1,
+        defaults={'name': 'MORNING', 'start_time': time(6, 0), 'end_time': time(18, 0)},
+    )
+    return shift
+
+
+def seed_dataset(employees=200, work_areas=20, faces=None, stdout=None):
+    """
+    Crea (o completa) el conjunto de datos de la prueba
+
+    Args:
+        employees: número de guardias
+        work_areas: número de áreas de trabajo (cada guardia se asigna a una)
+        faces: lista de (imagen, características) de load_reference_faces
+
+    Returns:
+        dict con los conteos creados
+    """
+    department, position = _organization()
+    shift = _shift()
+    today = timezone.localdate()
+    created = {'employees': 0, 'work_areas': 0, 'profiles': 0}
+
+    with transaction.atomic():
+        areas = []
+        for index in range(work_areas):
+            latitude, longitude = area_center(index)
+            area, was_created = WorkArea.objects.get_or_create(
+                name=f'{LOADTEST_PREFIX} área {index:03d}',
+                defaults={
+                    'area_type': 'BUILDING',
+                    'latitude': Decimal(f'{latitude:.8f}'),
+                    'longitude': Decimal(f'{longitude:.8f}'),
+                    'radius_meters': 150,
+                },
+            )
+            areas.append(area)
+            created['work_areas'] += int(was_created)
+
+        existing = set(
+            Employee.objects.filter(employee_id__startswith='LT').values_list('employee_id', flat=True)
+        )
+        for index in range(employees):
+            code = employee_code(index)
+            if code in existing:
+                continue
+
+            user = User.objects.create_user(username(index), password=LOADTEST_PASSWORD)
+            employee = Employee.objects.create(
+                employee_id=code,
+                user=user,
+                first_name='Guardia',
+                last_name=f'Carga {index:05d}',
+                email=f'{username(index)}@loadtest.invalid',
+                phone='0000000000',
+                national_id=f'LT{index:08d}',
+                department=department,
+                position=position,
+                hire_date=today,
+                current_salary=Decimal('600'),
+            )
+            EmployeeWorkArea.objects.create(
+                employee=employee, work_area=areas[index % len(areas)], is_primary=True,
+            )
+            EmployeeShiftAssignment.objects.create(employee=employee, shift=shift, start_date=today)
+
+            if faces:
+                _, features = faces[index % len(faces)]
+                profile = FacialRecognitionProfile(
+                    employee=employee, confidence_threshold=0.60, is_active=True,
+                    needs_retraining=False, reference_images='1',
+                )
+                profile.set_face_features(features)
+                profile.save()
+                created['profiles'] += 1
+
+            created['employees'] += 1
+            if stdout and created['employees'] % 100 == 0:
+                stdout.write(f"   ... {created['employees']} empleados")
+
+        supervisor, was_created = User.objects.get_or_create(
+            username=SUPERVISOR_USERNAME, defaults={'is_staff': True},
+        )
+        if was_created:
+            supervisor.set_password(LOADTEST_PASSWORD)
+            supervisor.save()
+
+    return created
+
+
+def dataset_users():
+    """(empleados sembrados con usuario y áreas, usuario supervisor)"""
+    employees = list(
+        Employee.objects.filter(employee_id__startswith='LT', user__username__startswith=LOADTEST_PREFIX)
+        .select_related('user').prefetch_related('work_areas__work_area').order_by('employee_id')
+    )
+    supervisor = User.objects.filter(username=SUPERVISOR_USERNAME).first()
+    return employees, supervisor
+
+
+def clean_dataset():
+    """Elimina todo lo creado por seed_dataset y las marcaciones/puntos de la prueba"""
+    employees = Employee.objects.filter(employee_id__startswith='LT', user__username__startswith=LOADTEST_PREFIX)
+    employee_ids = list(employees.values_list('id', flat=True))
+    user_ids = list(employees.values_list('user_id', flat=True))
+
+    counts = {}
+    with transaction.atomic():
+        # delete() cuenta también las filas en cascada; se reportan solo las del modelo
+        counts['gps'] = GPSTracking.objects.filter(employee_id__in=employee_ids).delete()[1].get(GPSTracking._meta.label, 0)
+        counts['records'] = AttendanceRecord.objects.filter(employee_id__in=employee_ids).delete()[1].get(
+            AttendanceRecord._meta.label, 0
+        )
+        AttendanceVerificationTask.objects.filter(employee_id__in=employee_ids).delete()
+        counts['employees'] = employees.delete()[1].get(Employee._meta.label, 0)
+        User.objects.filter(id__in=user_ids).delete()
+        User.objects.filter(username=SUPERVISOR_USERNAME).delete()
+        counts['work_areas'] = WorkArea.objects.filter(name__startswith=f'{LOADTEST_PREFIX} área').delete()[1].get(
+            WorkArea._meta.label, 0
+        )
+        WorkSchedule.objects.filter(name=f'{LOADTEST_PREFIX} horario').delete()
+        ShiftTemplate.objects.filter(name=f'{LOADTEST_PREFIX} 24/7').delete()
+        Position.objects.filter(code='LTEST-GUARD').delete()
+        Department.objects.filter(code='LTEST').delete()
+    return counts
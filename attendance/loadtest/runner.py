@@ -0,0 +1,257 @@
+"""
+Ejecución de la prueba de carga y líneas base
+
+Los usuarios virtuales son hilos con su propia sesión HTTP (requests) que
+eligen un escenario según los pesos de la mezcla y repiten hasta agotar la
+duración. Sin base_url se levanta un servidor WSGI con hilos dentro del
+proceso; con base_url se apunta a un servidor real (runserver, gunicorn)
+que use la misma base de datos, ya que las sesiones se crean directamente
+en el backend de sesiones.
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from datetime import datetime
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.wsgi import get_wsgi_application
+from django.utils.module_loading import import_string
+
+from .scenarios import GUARD, SCENARIOS, SUPERVISOR
+
+
+def percentile(values, percent):
+    """Percentil por rango más cercano (valores en cualquier orden)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Servidor local
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """Servidor WSGI de la aplicación en un puerto libre de localhost"""
+
+    def __init__(self):
+        self.httpd = make_server(
+            '127.0.0.1', 0, get_wsgi_application(),
+            server_class=_ThreadingWSGIServer, handler_class=_QuietHandler,
+        )
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='loadtest-server', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def session_cookie(user):
+    """Crea una sesión autenticada para el usuario y retorna su clave"""
+    engine = import_string(f'{settings.SESSION_ENGINE}.SessionStore')
+    session = engine()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
+
+
+# Resultados
+
+class ScenarioStats:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.status_codes = {}
+        self.errors = 0
+
+    def add(self, latency_ms, status_code, error):
+        self.latencies.append(latency_ms)
+        self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+        self.errors += int(error)
+
+    def summary(self, seconds):
+        requests_count = len(self.latencies)
+        return {
+            'requests': requests_count,
+            'throughput_rps': round(requests_count / seconds, 2) if seconds else 0.0,
+            'p50_ms': round(percentile(self.latencies, 50), 1),
+            'p95_ms': round(percentile(self.latencies, 95), 1),
+            'p99_ms': round(percentile(self.latencies, 99), 1),
+            'max_ms': round(max(self.latencies), 1) if self.latencies else 0.0,
+            'mean_ms': round(statistics.fmean(self.latencies), 1) if self.latencies else 0.0,
+            'error_rate': round(self.errors / requests_count, 4) if requests_count else 0.0,
+            'status_codes': {str(code): count for code, count in sorted(self.status_codes.items(), key=str)},
+        }
+
+
+def run_load(virtual_users, mix, duration, base_url=None, think_ms=0, timeout=30):
+    """
+    Ejecuta la prueba
+
+    Args:
+        virtual_users: lista de VirtualUser
+        mix: pesos por escenario
+        duration: segundos de carga
+        base_url: servidor objetivo (None = servidor local en el proceso)
+        think_ms: pausa entre peticiones de cada usuario virtual
+
+    Returns:
+        dict con el resumen por escenario y total
+    """
+    stats = {name: ScenarioStats(name) for name in mix}
+    lock = threading.Lock()
+
+    for virtual_user in virtual_users:
+        virtual_user.session_key = session_cookie(virtual_user.user)
+
+    def worker(virtual_user, target, deadline):
+        names = [name for name in mix if SCENARIOS[name].role == virtual_user.role]
+        weights = [mix[name] for name in names]
+        if not names:
+            return
+
+        http = requests.Session()
+        http.cookies.set(settings.SESSION_COOKIE_NAME, virtual_user.session_key)
+        urls = {name: target + SCENARIOS[name].url() for name in names}
+
+        while time.perf_counter() < deadline:
+            name = virtual_user.rng.choices(names, weights)[0]
+            scenario = SCENARIOS[name]
+            headers = {}
+            if scenario.conditional and name in virtual_user.etags:
+                headers['If-None-Match'] = virtual_user.etags[name]
+
+            start = time.perf_counter()
+            try:
+                if scenario.method == 'POST':
+                    response = http.post(urls[name], json=scenario.payload(virtual_user), headers=headers, timeout=timeout)
+                else:
+                    response = http.get(urls[name], headers=headers, timeout=timeout)
+                latency_ms = (time.perf_counter() - start) * 1000
+                status_code = response.status_code
+                error = scenario.is_error(status_code, response.content)
+                if scenario.conditional and response.headers.get('ETag'):
+                    virtual_user.etags[name] = response.headers['ETag']
+            except requests.RequestException:
+                latency_ms = (time.perf_counter() - start) * 1000
+                status_code, error = 'conexión', True
+
+            with lock:
+                stats[name].add(latency_ms, status_code, error)
+            if think_ms:
+                time.sleep(think_ms / 1000.0)
+
+    def drive(target):
+        deadline = time.perf_counter() + duration
+        threads = [
+            threading.Thread(target=worker, args=(virtual_user, target, deadline), name=f'loadtest-vu-{index}', daemon=True)
+            for index, virtual_user in enumerate(virtual_users)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    if base_url:
+        elapsed = drive(base_url.rstrip('/'))
+    else:
+        with LocalServer() as server:
+            elapsed = drive(server.base_url)
+
+    scenarios = {name: scenario_stats.summary(elapsed) for name, scenario_stats in stats.items()}
+    total = sum(len(scenario_stats.latencies) for scenario_stats in stats.values())
+    all_latencies = [latency for scenario_stats in stats.values() for latency in scenario_stats.latencies]
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'duration_s': round(elapsed, 2),
+        'virtual_users': {
+            GUARD: sum(1 for virtual_user in virtual_users if virtual_user.role == GUARD),
+            SUPERVISOR: sum(1 for virtual_user in virtual_users if virtual_user.role == SUPERVISOR),
+        },
+        'mix': mix,
+        'server': base_url or 'local',
+        'total': {
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(all_latencies, 50), 1),
+            'p95_ms': round(percentile(all_latencies, 95), 1),
+            'p99_ms': round(percentile(all_latencies, 99), 1),
+            'error_rate': round(sum(s.errors for s in stats.values()) / total, 4) if total else 0.0,
+        },
+        'scenarios': scenarios,
+    }
+
+
+# Líneas base
+
+def baseline_path(name):
+    return os.path.join(settings.LOADTEST_BASELINE_DIR, f'{name}.json')
+
+
+def save_baseline(name, results):
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_baseline(name):
+    with open(baseline_path(name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_with_baseline(results, baseline, tolerance=0.2, noise_floor_ms=5.0):
+    """
+    Regresiones frente a una línea base
+
+    Por escenario: p95 o p99 más de tolerance por encima (y más de
+    noise_floor_ms en valor absoluto), throughput más de tolerance por
+    debajo o tasa de errores más de un punto porcentual por encima.
+
+    Returns:
+        Lista de mensajes (vacía si no hay regresiones)
+    """
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or not current['requests']:
+            continue
+        for metric in ('p95_ms', 'p99_ms'):
+            limit = previous[metric] * (1 + tolerance)
+            if current[metric] > limit and current[metric] - previous[metric] > noise_floor_ms:
+                regressions.append(f"{name}: {metric} {current[metric]} ms (línea base {previous[metric]} ms)")
+        if previous['throughput_rps'] and current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput_rps']} req/s (línea base {previous['throughput_rps']} req/s)"
+            )
+        if current['error_rate'] > previous['error_rate'] + 0.01:
+            regressions.append(
+                f"{name}: errores {current['error_rate']:.1%} (línea base {previous['error_rate']:.1%})"
+            )
+    return regressions
@@ -0,0 +1,134 @@
+"""
+Escenarios de la prueba de carga
+
+Cada escenario arma una petición HTTP para un usuario virtual. Los guardias
+marcan y envían puntos GPS; los supervisores consultan los mapas en vivo
+revalidando con If-None-Match como el navegador (un 304 cuenta como éxito).
+"""
+import random
+
+from django.urls import reverse
+
+from .dataset import area_center
+
+
+GUARD = 'guard'
+SUPERVISOR = 'supervisor'
+
+
+class Scenario:
+    """Petición de un endpoint; role indica qué usuarios virtuales la ejecutan"""
+
+    name = ''
+    role = GUARD
+    url_name = ''
+    method = 'GET'
+    conditional = False
+
+    def url(self):
+        return reverse(self.url_name)
+
+    def payload(self, user):
+        return None
+
+    def is_error(self, status_code, body):
+        if status_code in (200, 201, 202):
+            return False
+        return not (self.conditional and status_code == 304)
+
+
+class ClockIn(Scenario):
+    name = 'record_attendance'
+    url_name = 'attendance:record'
+    method = 'POST'
+
+    def payload(self, user):
+        user.clock_ins += 1
+        latitude, longitude = user.position()
+        return {
+            'attendance_type': 'IN' if user.clock_ins % 2 else 'OUT',
+            'facial_image': user.face,
+            'latitude': latitude,
+            'longitude': longitude,
+            'location_accuracy': 10,
+            'device_info': 'loadtest',
+        }
+
+    def is_error(self, status_code, body):
+        # Una verificación facial rechazada (200 con success=False) no es un error del servidor
+        return status_code >= 500 or (status_code >= 400 and status_code != 503)
+
+
+class GPSUpdate(Scenario):
+    name = 'update_gps_location'
+    url_name = 'attendance:update_gps_location'
+    method = 'POST'
+
+    def payload(self, user):
+        latitude, longitude = user.position()
+        return {
+            'latitude': latitude,
+            'longitude': longitude,
+            'accuracy': round(user.rng.uniform(5, 25), 1),
+            'source': 'loadtest',
+        }
+
+
+class GPSTrackingMap(Scenario):
+    name = 'gps_tracking_api'
+    role = SUPERVISOR
+    url_name = 'attendance:gps_tracking_api'
+    conditional = True
+
+
+class LiveLocations(Scenario):
+    name = 'get_live_locations'
+    role = SUPERVISOR
+    url_name = 'attendance:get_live_locations'
+    conditional = True
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (ClockIn(), GPSUpdate(), GPSTrackingMap(), LiveLocations())}
+
+# Peso relativo por defecto: en ronda cada guardia envía muchos más puntos GPS que marcaciones
+DEFAULT_MIX = {
+    'record_attendance': 1,
+    'update_gps_location': 12,
+    'gps_tracking_api': 3,
+    'get_live_locations': 3,
+}
+
+
+def parse_mix(value):
+    """'record_attendance=1,update_gps_location=12' → dict de pesos"""
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Escenario desconocido: {name} (disponibles: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class VirtualUser:
+    """Estado de un usuario virtual (guardia o supervisor)"""
+
+    def __init__(self, user, role, center=None, face=None, seed=0):
+        self.user = user
+        self.role = role
+        self.center = center or area_center(0)
+        self.face = face
+        self.rng = random.Random(seed)
+        self.clock_ins = 0
+        self.etags = {}
+
+    def position(self):
+        """Punto dentro (o cerca) de su área asignada"""
+        latitude, longitude = self.center
+        return (
+            round(latitude + self.rng.uniform(-0.001, 0.001), 6),
+            round(longitude + self.rng.uniform(-0.001, 0.001), 6),
+        )
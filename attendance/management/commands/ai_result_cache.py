@@ -0,0 +1,45 @@
+"""
+Comando para consultar y mantener la caché de resultados de IA
+"""
+from django.core.management.base import BaseCommand
+
+from attendance import ai_cache
+from attendance.models_security_photos import AIResultCache, AIResultCacheStats
+
+
+class Command(BaseCommand):
+    help = 'Muestra la tasa de aciertos de la caché de IA y permite expulsar o vaciar entradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--evict',
+            action='store_true',
+            help='Eliminar entradas caducadas y las menos usadas por encima del máximo',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Vaciar la caché y reiniciar los contadores',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = ai_cache.clear()
+            self.stdout.write(self.style.SUCCESS(f"🧹 Caché de IA vaciada: {deleted} entradas"))
+            return
+
+        if options['evict']:
+            deleted = ai_cache.evict()
+            self.stdout.write(f"🧹 Entradas expulsadas: {deleted}")
+
+        self.stdout.write(f"\n🗄️ Caché de IA - entradas: {AIResultCache.objects.count()}")
+
+        stats = AIResultCacheStats.objects.order_by('model_key')
+        if not stats:
+            self.stdout.write("   Sin consultas registradas")
+            return
+
+        for stat in stats:
+            self.stdout.write(
+                f"   - {stat.model_key:40} aciertos {stat.hits:6}  fallos {stat.misses:6}  ({stat.hit_rate:.0%})"
+            )
@@ -0,0 +1,120 @@
+"""
+Comando para medir el análisis de IA secuencial frente al concurrente
+
+Levanta el servidor de inferencia simulado de attendance/tests/fakes.py
+(respuestas con la forma de Roboflow y Face++ y una latencia configurable),
+por lo que no usa las APIs reales ni consume créditos. Resultados, timeouts
+y errores por detector se verifican en attendance/tests/test_ai_analysis.py.
+"""
+import time
+from io import BytesIO
+
+import numpy as np
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from attendance.ai_analysis import (
+    DETECTORS, FACE_ATTRIBUTES, ROBOFLOW_DETECTORS, AIAnalysisEngine, merge_results,
+)
+from attendance.ai_services import FacePlusPlusService, RoboflowService
+from attendance.tests.fakes import STUB_MODELS, make_stub_handler, start_server
+
+
+class Command(BaseCommand):
+    help = 'Compara el análisis de IA secuencial contra el motor concurrente usando un servidor simulado'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.3,
+            help='Latencia simulada por llamada en segundos (por defecto: 0.3)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5,
+            help='Fotos analizadas en cada modo (por defecto: 5)',
+        )
+        parser.add_argument(
+            '--slow-detector',
+            choices=['weapon', 'vehicle', 'ppe', 'person', 'detect'],
+            default=None,
+            help='Detector que responde más lento que el timeout, para probar el corte',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=2.0,
+            help='Timeout por detector en segundos (por defecto: 2)',
+        )
+
+    def _image_bytes(self):
+        rng = np.random.default_rng(0)
+        buffer = BytesIO()
+        Image.fromarray(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)).save(buffer, format='JPEG', quality=80)
+        return buffer.getvalue()
+
+    def _sequential(self, roboflow, facepp, image_bytes, timeout):
+        """Flujo original: un detector tras otro"""
+        raw = {}
+        for name, model_type in ROBOFLOW_DETECTORS.items():
+            raw[name] = roboflow._detect(image_bytes, model_type, timeout=timeout)
+        raw[FACE_ATTRIBUTES] = facepp.analyze_face_attributes(image_bytes, timeout=timeout)
+        return raw
+
+    def handle(self, *args, **options):
+        latency = options['latency']
+        timeout = options['timeout']
+        handler = make_stub_handler(latency, options['slow_detector'], slow_latency=timeout + 1)
+        server, base_url = start_server(handler)
+        models = STUB_MODELS
+
+        # Secuencial sin sesión compartida (una conexión nueva por llamada)
+        no_pool = requests
+        sequential_roboflow = RoboflowService(api_url=base_url, api_key='stub', models=models, session=no_pool)
+        sequential_facepp = FacePlusPlusService(api_url=base_url, api_key='stub', api_secret='stub', session=no_pool)
+
+        session = requests.Session()
+        engine = AIAnalysisEngine(
+            roboflow=RoboflowService(api_url=base_url, api_key='stub', models=models, session=session),
+            facepp=FacePlusPlusService(api_url=base_url, api_key='stub', api_secret='stub', session=session),
+            use_cache=False,
+        )
+
+        image_bytes = self._image_bytes()
+        iterations = options['iterations']
+
+        self.stdout.write(f"\n🤖 Benchmark de análisis IA ({len(DETECTORS)} detectores, latencia simulada {latency * 1000:.0f} ms)")
+        self.stdout.write(f"   Servidor simulado: {base_url}")
+
+        try:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                sequential_raw = self._sequential(sequential_roboflow, sequential_facepp, image_bytes, timeout)
+            sequential_ms = (time.perf_counter() - start) / iterations * 1000
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                parallel_raw = engine.run(image_bytes, timeout=timeout)
+            parallel_ms = (time.perf_counter() - start) / iterations * 1000
+        finally:
+            engine.shutdown()
+            server.shutdown()
+
+        sequential_results = merge_results(sequential_raw, '')
+        parallel_results = merge_results(parallel_raw, '')
+
+        self.stdout.write(self.style.SUCCESS("\n📊 Resultados por foto:"))
+        self.stdout.write(f"   - Secuencial:  {sequential_ms:8.1f} ms")
+        self.stdout.write(f"   - Concurrente: {parallel_ms:8.1f} ms")
+        self.stdout.write(f"   - Aceleración: {sequential_ms / parallel_ms:8.1f}x")
+        self.stdout.write(f"   - Alertas:     {parallel_results[1]} ({parallel_results[2]})")
+
+        if parallel_results[0].get('errors'):
+            self.stdout.write(self.style.WARNING(f"   ⚠️ Errores: {parallel_results[0]['errors']}"))
+
+        if sequential_results != parallel_results:
+            raise CommandError("❌ Los resultados difieren entre el modo secuencial y el concurrente")
+        self.stdout.write(self.style.SUCCESS("   ✅ Ambos modos producen el mismo resultado"))
@@ -0,0 +1,85 @@
+"""
+Comando para medir CloudinaryStorage contra un Cloudinary simulado
+
+Levanta en localhost el servidor simulado de attendance/tests/fakes.py, por
+lo que no usa la cuenta real ni consume cuota. Las verificaciones de
+comportamiento (nombres repetidos, caché de metadatos, subidas por partes,
+reintentos, archivos locales) están en attendance/tests/test_storage.py.
+"""
+import shutil
+import tempfile
+import time
+
+import requests
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from attendance.storage import CloudinaryStorage, cloudinary_uploader
+from attendance.tests.fakes import FakeCloudinary, make_fake_handler, start_server
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia de save() de CloudinaryStorage (síncrono frente a spool local) con un servidor simulado'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.15,
+            help='Latencia simulada por llamada a la API en segundos (por defecto: 0.15)',
+        )
+        parser.add_argument(
+            '--files',
+            type=int,
+            default=10,
+            help='Archivos pequeños subidos en cada modo (por defecto: 10)',
+        )
+
+    def handle(self, *args, **options):
+        state = FakeCloudinary('demo', 'secret', latency=options['latency'])
+        server, base_url = start_server(make_fake_handler(state))
+        spool_dir = tempfile.mkdtemp(prefix='cloudinary-spool-')
+
+        def make_storage(async_uploads):
+            return CloudinaryStorage(
+                cloud_name='demo', api_key='key', api_secret='secret',
+                api_url=f'{base_url}/v1_1', delivery_url=base_url, spool_dir=spool_dir,
+                async_uploads=async_uploads, chunk_size=5 * 1024 * 1024, session=requests.Session(),
+            )
+
+        payload = b'\xff\xd8' + bytes(200 * 1024)
+        count = options['files']
+
+        self.stdout.write(f"\n☁️ Benchmark CloudinaryStorage (latencia simulada {options['latency'] * 1000:.0f} ms)")
+
+        try:
+            with override_settings(CLOUDINARY_SPOOL_STALE_SECONDS=0):
+                # 1. Subida síncrona
+                storage = make_storage(async_uploads=False)
+                start = time.perf_counter()
+                for i in range(count):
+                    storage.save(f'bench/sync/foto_{i}.jpg', ContentFile(payload))
+                sync_ms = (time.perf_counter() - start) / count * 1000
+
+                # 2. Spool local + subida en segundo plano
+                async_storage = make_storage(async_uploads=True)
+                start = time.perf_counter()
+                for i in range(count):
+                    async_storage.save(f'bench/async/foto_{i}.jpg', ContentFile(payload))
+                async_ms = (time.perf_counter() - start) / count * 1000
+                start = time.perf_counter()
+                uploaded, failed = cloudinary_uploader.flush(async_storage, timeout=30)
+                drain_ms = (time.perf_counter() - start) * 1000
+        finally:
+            cloudinary_uploader.shutdown()
+            server.shutdown()
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+        self.stdout.write(self.style.SUCCESS("\n📊 Latencia de save() por archivo:"))
+        self.stdout.write(f"   - Síncrono:           {sync_ms:8.1f} ms")
+        self.stdout.write(f"   - Spool local:        {async_ms:8.1f} ms (cola vaciada en {drain_ms:.0f} ms)")
+        self.stdout.write(f"\n   Llamadas al servidor simulado: {state.requests}")
+
+        if failed:
+            raise CommandError(f"❌ {failed} subidas en segundo plano fallidas ({uploaded} subidas)")
@@ -0,0 +1,120 @@
+"""
+Comando para comparar la detección directa contra miniatura + refinamiento en ROI
+"""
+import glob
+import os
+import time
+
+import cv2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.face_detectors import detect_largest_face, detector_registry
+
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.JPG', '*.JPEG', '*.PNG')
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia y tasa de detección del pipeline de detección facial'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'images_dir',
+            nargs='?',
+            default=None,
+            help='Directorio con las imágenes de prueba (por defecto: MEDIA_ROOT/facial_references)',
+        )
+        parser.add_argument(
+            '--max-dimension',
+            type=int,
+            default=None,
+            help='Lado mayor de la miniatura (por defecto: FACE_DETECTION_MAX_DIMENSION)',
+        )
+        parser.add_argument(
+            '--upscale',
+            type=float,
+            default=1.0,
+            help='Escalar las imágenes antes de medir para simular fotos de móvil (ej. 4.0)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=3,
+            help='Repeticiones por imagen (por defecto: 3)',
+        )
+
+    def _collect_images(self, images_dir):
+        paths = []
+        for pattern in IMAGE_EXTENSIONS:
+            paths.extend(glob.glob(os.path.join(images_dir, '**', pattern), recursive=True))
+        return sorted(set(paths))
+
+    def _time(self, func, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            result = func()
+        return (time.perf_counter() - start) / iterations * 1000, result
+
+    def handle(self, *args, **options):
+        images_dir = options['images_dir'] or os.path.join(settings.MEDIA_ROOT, 'facial_references')
+        if not os.path.isdir(images_dir):
+            raise CommandError(f"❌ Directorio no encontrado: {images_dir}")
+
+        paths = self._collect_images(images_dir)
+        if not paths:
+            raise CommandError(f"❌ No hay imágenes en {images_dir}")
+
+        cascade = detector_registry.face_cascade()
+        if cascade is None:
+            raise CommandError("❌ No se pudo cargar el clasificador de rostros")
+
+        iterations = options['iterations']
+        self.stdout.write(f"\n🔬 Benchmark de detección facial ({len(paths)} imágenes)")
+
+        totals = {'full': 0.0, 'pyramid': 0.0}
+        detected = {'full': 0, 'pyramid': 0}
+        max_offset = 0
+
+        for path in paths:
+            gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                self.stdout.write(self.style.WARNING(f"   ⚠️ No se pudo leer {path}"))
+                continue
+
+            if options['upscale'] != 1.0:
+                gray = cv2.resize(gray, None, fx=options['upscale'], fy=options['upscale'],
+                                  interpolation=cv2.INTER_CUBIC)
+
+            # Ruta actual: detección sobre la imagen completa
+            full_ms, full_face = self._time(
+                lambda: detect_largest_face(gray, cascade, max_dimension=0), iterations
+            )
+            # Nueva ruta: miniatura + refinamiento en ROI
+            pyramid_ms, pyramid_face = self._time(
+                lambda: detect_largest_face(gray, cascade, max_dimension=options['max_dimension']),
+                iterations,
+            )
+
+            totals['full'] += full_ms
+            totals['pyramid'] += pyramid_ms
+            detected['full'] += full_face is not None
+            detected['pyramid'] += pyramid_face is not None
+
+            if full_face is not None and pyramid_face is not None:
+                offset = max(abs(a - b) for a, b in zip(full_face, pyramid_face))
+                max_offset = max(max_offset, offset)
+
+            self.stdout.write(
+                f"   - {os.path.basename(path)} {gray.shape[1]}x{gray.shape[0]}: "
+                f"{full_ms:8.1f} ms → {pyramid_ms:7.1f} ms "
+                f"({'✅' if full_face is not None else '❌'}/{'✅' if pyramid_face is not None else '❌'})"
+            )
+
+        count = len(paths)
+        self.stdout.write(self.style.SUCCESS("\n✅ Resultados:"))
+        self.stdout.write(f"   - Latencia media directa:  {totals['full'] / count:8.1f} ms")
+        self.stdout.write(f"   - Latencia media pirámide: {totals['pyramid'] / count:8.1f} ms")
+        self.stdout.write(f"   - Detección directa:       {detected['full']}/{count}")
+        self.stdout.write(f"   - Detección pirámide:      {detected['pyramid']}/{count}")
+        self.stdout.write(f"   - Desviación máx. de caja: {max_offset} px")
@@ -0,0 +1,93 @@
+"""
+Comando para medir la generación de derivados de imagen
+"""
+import time
+from io import BytesIO
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from attendance.image_derivatives import open_image, render_derivatives, rendition_sizes
+
+
+class Command(BaseCommand):
+    help = 'Compara la miniatura original (decodificación completa) contra los derivados con decodificación reducida'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--width',
+            type=int,
+            default=4000,
+            help='Ancho de la foto de prueba en píxeles (por defecto: 4000, 12 MP con 3000 de alto)',
+        )
+        parser.add_argument(
+            '--height',
+            type=int,
+            default=3000,
+            help='Alto de la foto de prueba en píxeles (por defecto: 3000)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=3,
+            help='Repeticiones de cada modo (por defecto: 3)',
+        )
+
+    def _photo_bytes(self, width, height):
+        # Degradado con ruido: se comprime como una foto real, no como ruido puro
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[0:height, 0:width]
+        base = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+        pixels = np.clip(base + rng.integers(-20, 20, base.shape), 0, 255).astype(np.uint8)
+        buffer = BytesIO()
+        Image.fromarray(pixels).save(buffer, format='JPEG', quality=90)
+        return buffer.getvalue()
+
+    def _original_thumbnail(self, photo_bytes):
+        """Flujo anterior de SecurityPhoto.create_thumbnail"""
+        img = Image.open(BytesIO(photo_bytes))
+        img.load()
+        decoded = img.size
+        img.thumbnail((300, 300), Image.Resampling.LANCZOS)
+        thumb_io = BytesIO()
+        img.save(thumb_io, format='JPEG', quality=85)
+        return decoded
+
+    def _time(self, func, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            result = func()
+        return (time.perf_counter() - start) / iterations * 1000, result
+
+    def handle(self, *args, **options):
+        width, height = options['width'], options['height']
+        iterations = options['iterations']
+        photo_bytes = self._photo_bytes(width, height)
+        sizes = rendition_sizes()
+
+        self.stdout.write(
+            f"\n🖼️ Benchmark de derivados ({width}x{height}, {len(photo_bytes) // 1024} KB, versiones {sizes})"
+        )
+
+        original_ms, decoded = self._time(lambda: self._original_thumbnail(photo_bytes), iterations)
+        derivatives_ms, renditions = self._time(lambda: render_derivatives(photo_bytes, sizes), iterations)
+
+        draft = open_image(photo_bytes, max(sizes.values()))
+        # Tamaño de la decodificación JPEG reducida, antes del ajuste final
+        with Image.open(BytesIO(photo_bytes)) as probe:
+            probe.draft('RGB', (max(sizes.values()),) * 2)
+            draft_size = probe.size
+
+        original_mb = decoded[0] * decoded[1] * 3 / 1024 / 1024
+        draft_mb = draft_size[0] * draft_size[1] * 3 / 1024 / 1024
+
+        self.stdout.write(self.style.SUCCESS("\n📊 Resultados por foto:"))
+        self.stdout.write(f"   - Original (solo miniatura):   {original_ms:8.1f} ms, decodifica {decoded[0]}x{decoded[1]} ({original_mb:.1f} MB)")
+        self.stdout.write(f"   - Derivados ({len(renditions)} versiones):    {derivatives_ms:8.1f} ms, decodifica {draft_size[0]}x{draft_size[1]} ({draft_mb:.1f} MB)")
+        self.stdout.write(f"   - Memoria de decodificación:   {original_mb / draft_mb:8.1f}x menor")
+        for name, content in renditions.items():
+            with Image.open(BytesIO(content)) as rendition:
+                has_exif = bool(rendition.getexif())
+                self.stdout.write(f"   - {name:15} {rendition.size[0]}x{rendition.size[1]}  {len(content) // 1024} KB  EXIF: {'sí' if has_exif else 'no'}")
+        self.stdout.write(f"   - Imagen de análisis final:   {draft.size[0]}x{draft.size[1]}")
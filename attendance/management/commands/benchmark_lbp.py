@@ -0,0 +1,78 @@
+"""
+Comando para medir el rendimiento del extractor LBP
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.lbp import (
+    lbp_histogram, lbp_histogram_reference, multi_radius_lbp_histogram,
+)
+
+
+class Command(BaseCommand):
+    help = 'Compara el LBP vectorizado contra la implementación original píxel a píxel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=128,
+            help='Lado de la imagen de prueba en píxeles (por defecto: 128, como el rostro normalizado)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Repeticiones de la versión vectorizada (por defecto: 200)',
+        )
+        parser.add_argument(
+            '--reference-iterations',
+            type=int,
+            default=5,
+            help='Repeticiones de la versión original (por defecto: 5)',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=20,
+            help='Imágenes aleatorias usadas para verificar que los histogramas coinciden',
+        )
+
+    def _time(self, func, image, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func(image)
+        return (time.perf_counter() - start) / iterations * 1000
+
+    def handle(self, *args, **options):
+        size = options['size']
+        rng = np.random.default_rng(42)
+
+        self.stdout.write(f"\n🔬 Benchmark LBP ({size}x{size})")
+
+        # 1. Verificar que los histogramas son idénticos
+        images = [rng.integers(0, 256, (size, size), dtype=np.uint8) for _ in range(options['samples'])]
+        # Imágenes planas y con muchos empates entre vecinos
+        images.append(np.full((size, size), 128, dtype=np.uint8))
+        images.append((rng.integers(0, 4, (size, size)) * 64).astype(np.uint8))
+
+        for index, image in enumerate(images):
+            if lbp_histogram(image) != lbp_histogram_reference(image):
+                raise CommandError(f"❌ Histograma distinto en la muestra {index}")
+
+        self.stdout.write(self.style.SUCCESS(f"   ✅ {len(images)} histogramas idénticos a la versión original"))
+
+        # 2. Tiempos
+        image = images[0]
+        reference_ms = self._time(lbp_histogram_reference, image, options['reference_iterations'])
+        vectorized_ms = self._time(lbp_histogram, image, options['iterations'])
+        uniform_ms = self._time(lambda img: lbp_histogram(img, method='uniform'), image, options['iterations'])
+        multi_ms = self._time(multi_radius_lbp_histogram, image, options['iterations'])
+
+        self.stdout.write(f"   - Original (Python):      {reference_ms:8.3f} ms")
+        self.stdout.write(f"   - Vectorizado:            {vectorized_ms:8.3f} ms")
+        self.stdout.write(f"   - Uniforme (59 bins):     {uniform_ms:8.3f} ms")
+        self.stdout.write(f"   - Multirradio (1, 2, 3):  {multi_ms:8.3f} ms")
+        self.stdout.write(self.style.SUCCESS(f"\n🚀 Aceleración: {reference_ms / vectorized_ms:.0f}x"))
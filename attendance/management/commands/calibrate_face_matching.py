@@ -0,0 +1,233 @@
+"""
+Comando para calibrar los umbrales de verificación e identificación facial
+
+    python manage.py calibrate_face_matching                      # fotos de los perfiles registrados
+    python manage.py calibrate_face_matching --faces-dir fotos/   # fotos/<persona>/*.jpg
+    python manage.py calibrate_face_matching --synthetic 120      # identidades sintéticas
+
+Mide la similitud estandarizada (la misma que usa la galería) entre capturas
+de la misma persona y de personas distintas, y recomienda:
+
+- FACE_VERIFY_THRESHOLD: umbral 1:1 con tasa de falsa aceptación --target-far
+- KIOSK_MIN_SIMILARITY: mejor candidato de alguien que no está en la galería
+  por debajo de este valor con tasa --target-far-identify
+- KIOSK_AMBIGUITY_MARGIN: diferencia con el segundo candidato que descarta
+  las identificaciones erróneas que superan KIOSK_MIN_SIMILARITY
+
+Cada persona se registra con el promedio de sus primeras --enroll capturas
+(como FacialRecognitionProfile._combine_features) y el resto son sondas.
+"""
+import glob
+import os
+from collections import defaultdict
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from attendance.face_encoding import (
+    feature_statistics, features_to_vector, normalize_vector, standardize_vectors,
+)
+from attendance.facial_recognition import get_facial_recognition_system
+from attendance.loadtest.dataset import IMAGE_EXTENSIONS, synthetic_identity
+from attendance.models import FacialRecognitionProfile
+
+PROFILE_IMAGE_FIELDS = ('image_1', 'image_2', 'image_3', 'image_4', 'image_5')
+
+
+class Command(BaseCommand):
+    help = 'Mide similitudes de la misma persona y de personas distintas y recomienda umbrales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--faces-dir',
+            default=None,
+            help='Directorio con un subdirectorio de fotos por persona',
+        )
+        parser.add_argument(
+            '--synthetic',
+            type=int,
+            default=0,
+            help='Número de identidades sintéticas en lugar de fotos reales',
+        )
+        parser.add_argument(
+            '--captures',
+            type=int,
+            default=12,
+            help='Capturas por identidad sintética (por defecto: 12)',
+        )
+        parser.add_argument(
+            '--enroll',
+            type=int,
+            default=3,
+            help='Capturas promediadas para registrar a cada persona (por defecto: 3)',
+        )
+        parser.add_argument(
+            '--target-far',
+            type=float,
+            default=0.01,
+            help='Tasa de falsa aceptación objetivo en verificación 1:1 (por defecto: 0.01)',
+        )
+        parser.add_argument(
+            '--target-far-identify',
+            type=float,
+            default=0.001,
+            help='Tasa de falsa aceptación objetivo en identificación 1:N (por defecto: 0.001)',
+        )
+
+    # ------------------------------------------------------------------
+    # Capturas por persona
+    # ------------------------------------------------------------------
+
+    def _vector(self, system, image):
+        features, _, _ = system.extract_face_encoding(image)
+        if not isinstance(features, dict) or not features:
+            return None
+        return features_to_vector(features)
+
+    def _from_directory(self, system, faces_dir):
+        people = {}
+        for person in sorted(os.listdir(faces_dir)):
+            person_dir = os.path.join(faces_dir, person)
+            if not os.path.isdir(person_dir):
+                continue
+            paths = []
+            for pattern in IMAGE_EXTENSIONS:
+                paths.extend(glob.glob(os.path.join(person_dir, pattern)))
+            people[person] = [
+                vector for vector in (
+                    self._vector(system, Image.open(path).convert('RGB')) for path in sorted(set(paths))
+                ) if vector is not None
+            ]
+        return people
+
+    def _from_profiles(self, system):
+        people = defaultdict(list)
+        for profile in FacialRecognitionProfile.objects.filter(is_active=True).select_related('employee'):
+            for field in PROFILE_IMAGE_FIELDS:
+                image_file = getattr(profile, field)
+                if not image_file:
+                    continue
+                try:
+                    with image_file.open('rb') as handle:
+                        vector = self._vector(system, Image.open(handle).convert('RGB'))
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"   ⚠️ {image_file.name}: {e}"))
+                    continue
+                if vector is not None:
+                    people[profile.employee.employee_id].append(vector)
+        return people
+
+    def _synthetic(self, system, identities, captures):
+        return {
+            f'sintetico-{seed}': [
+                vector for vector in (
+                    self._vector(system, synthetic_identity(seed, capture)) for capture in range(captures)
+                ) if vector is not None
+            ]
+            for seed in range(identities)
+        }
+
+    # ------------------------------------------------------------------
+    # Medición
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _percentiles(values):
+        return ' '.join(
+            f"p{q}={np.percentile(values, q):.3f}" for q in (1, 5, 50, 95, 99)
+        ) + f" máx={np.max(values):.3f}"
+
+    def handle(self, *args, **options):
+        system = get_facial_recognition_system()
+        if not system:
+            raise CommandError("❌ Sistema de reconocimiento facial no disponible (OpenCV)")
+
+        if options['synthetic']:
+            source = f"{options['synthetic']} identidades sintéticas × {options['captures']} capturas"
+            people = self._synthetic(system, options['synthetic'], options['captures'])
+        elif options['faces_dir']:
+            if not os.path.isdir(options['faces_dir']):
+                raise CommandError(f"❌ Directorio no encontrado: {options['faces_dir']}")
+            source = options['faces_dir']
+            people = self._from_directory(system, options['faces_dir'])
+        else:
+            source = 'imágenes de referencia de los perfiles activos'
+            people = self._from_profiles(system)
+
+        enroll = options['enroll']
+        people = {name: vectors for name, vectors in people.items() if len(vectors) > enroll}
+        if len(people) < 3:
+            raise CommandError(
+                f"❌ Se necesitan al menos 3 personas con más de {enroll} rostros detectados "
+                f"(hay {len(people)})"
+            )
+
+        names = sorted(people)
+        gallery = normalize_vector(np.vstack([np.mean(people[name][:enroll], axis=0) for name in names]))
+        statistics = feature_statistics(gallery)
+        gallery = standardize_vectors(gallery, statistics)
+
+        probe_owner = np.concatenate([
+            np.full(len(people[name]) - enroll, index) for index, name in enumerate(names)
+        ])
+        probes = standardize_vectors(
+            normalize_vector(np.vstack([vector for name in names for vector in people[name][enroll:]])),
+            statistics,
+        )
+        scores = probes @ gallery.T
+
+        rows = np.arange(len(probe_owner))
+        genuine = scores[rows, probe_owner]
+        impostor_mask = np.ones_like(scores, dtype=bool)
+        impostor_mask[rows, probe_owner] = False
+        impostor = scores[impostor_mask]
+
+        # 1:N con la persona registrada: mejor y segundo candidato
+        order = np.argsort(-scores, axis=1)
+        top1, top2 = order[:, 0], order[:, 1]
+        best = scores[rows, top1]
+        margin = best - scores[rows, top2]
+        correct = top1 == probe_owner
+
+        # 1:N sin la persona en la galería: mejor candidato de otra persona
+        unenrolled = np.where(impostor_mask, scores, -np.inf).max(axis=1)
+
+        verify_threshold = float(np.quantile(impostor, 1 - options['target_far']))
+        identify_threshold = float(np.quantile(unenrolled, 1 - options['target_far_identify']))
+        wrong_accepted = ~correct & (best >= identify_threshold)
+        ambiguity_margin = float(np.max(margin[wrong_accepted])) if wrong_accepted.any() else 0.0
+        accepted = correct & (best >= identify_threshold) & (margin > ambiguity_margin)
+
+        self.stdout.write(f"\n🔬 Calibración facial: {source}")
+        self.stdout.write(
+            f"   Personas: {len(names)}, sondas: {len(probe_owner)}, "
+            f"comparaciones de personas distintas: {impostor.size}"
+        )
+        self.stdout.write("\n📊 Similitud estandarizada:")
+        self.stdout.write(f"   - Misma persona:    {self._percentiles(genuine)}")
+        self.stdout.write(f"   - Personas distintas: {self._percentiles(impostor)}")
+        self.stdout.write(f"   - Mejor candidato sin registrar: {self._percentiles(unenrolled)}")
+        self.stdout.write(f"   - Acierto rank-1:   {correct.mean():.1%}")
+
+        self.stdout.write("\n🎯 Umbrales recomendados:")
+        self.stdout.write(
+            f"   FACE_VERIFY_THRESHOLD={verify_threshold:.2f} "
+            f"(FAR {np.mean(impostor >= verify_threshold):.2%}, "
+            f"FRR {np.mean(genuine < verify_threshold):.1%})"
+        )
+        self.stdout.write(
+            f"   KIOSK_MIN_SIMILARITY={identify_threshold:.2f} "
+            f"(falsa identificación sin registrar {np.mean(unenrolled >= identify_threshold):.2%})"
+        )
+        self.stdout.write(
+            f"   KIOSK_AMBIGUITY_MARGIN={ambiguity_margin:.2f} "
+            f"(identificaciones erróneas sobre el umbral: {int(wrong_accepted.sum())})"
+        )
+        self.stdout.write(f"   Marcaciones de kiosco aceptadas con esos valores: {accepted.mean():.1%}")
+
+        if accepted.mean() < 0.9:
+            self.stdout.write(self.style.WARNING(
+                "\n⚠️ Menos del 90% de las capturas se identificarían: no habilite "
+                "KIOSK_IDENTIFICATION_ENABLED con estas características"
+            ))
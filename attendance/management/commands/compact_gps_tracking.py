@@ -0,0 +1,91 @@
+"""
+Comando para compactar y purgar el rastreo GPS por niveles
+
+Pensado para ejecutarse a diario (cron): resume por minuto los puntos
+crudos vencidos, por hora los resúmenes por minuto vencidos y elimina los
+resúmenes por hora fuera de retención. Cada ventana de una hora se procesa
+en su propia transacción, así que puede interrumpirse y reanudarse.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from attendance.gps_storage import (
+    approximate_count, compact_minute_rollups, compact_raw_points, purge_hour_rollups, retention_cutoffs,
+)
+from attendance.models_gps import GPSTracking, GPSTrackRollup
+
+
+class Command(BaseCommand):
+    help = 'Resume y purga puntos GPS antiguos según GPS_*_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--raw-days',
+            type=int,
+            default=None,
+            help='Días de puntos crudos a conservar (por defecto: GPS_RAW_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--minute-days',
+            type=int,
+            default=None,
+            help='Días de resúmenes por minuto a conservar (por defecto: GPS_MINUTE_ROLLUP_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--hour-days',
+            type=int,
+            default=None,
+            help='Días de resúmenes por hora a conservar, 0 = siempre (por defecto: GPS_HOUR_ROLLUP_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Filas por lote de lectura y borrado (por defecto: GPS_COMPACTION_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--max-windows',
+            type=int,
+            default=None,
+            help='Máximo de ventanas de una hora por nivel en esta ejecución',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo mostrar lo que se compactaría',
+        )
+
+    def handle(self, *args, **options):
+        cutoffs = retention_cutoffs(
+            raw_days=options['raw_days'], minute_days=options['minute_days'], hour_days=options['hour_days'],
+        )
+
+        common = {
+            'batch_size': options['batch_size'],
+            'dry_run': options['dry_run'],
+        }
+        prefix = '🔎 (simulación) ' if options['dry_run'] else ''
+
+        self.stdout.write(f"\n🗜️ {prefix}Compactando rastreo GPS")
+        self.stdout.write(f"   Puntos GPS (aprox.): {approximate_count(GPSTracking):,}")
+        self.stdout.write(f"   Resúmenes (aprox.):  {approximate_count(GPSTrackRollup):,}")
+
+        start = time.perf_counter()
+        raw = compact_raw_points(cutoffs['raw'], max_windows=options['max_windows'], **common)
+        self.stdout.write(
+            f"   - Crudos < {cutoffs['raw']:%Y-%m-%d %H:%M}: {raw['windows']} ventanas, "
+            f"{raw['rollups']} resúmenes por minuto, {raw['deleted']} puntos borrados, {raw['kept']} conservados"
+        )
+
+        minutes = compact_minute_rollups(cutoffs['minute'], max_windows=options['max_windows'], **common)
+        self.stdout.write(
+            f"   - Por minuto < {cutoffs['minute']:%Y-%m-%d %H:%M}: {minutes['windows']} ventanas, "
+            f"{minutes['rollups']} resúmenes por hora, {minutes['deleted']} resúmenes por minuto borrados"
+        )
+
+        if cutoffs['hour']:
+            purged = purge_hour_rollups(cutoffs['hour'], **common)
+            self.stdout.write(f"   - Por hora < {cutoffs['hour']:%Y-%m-%d %H:%M}: {purged} resúmenes borrados")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {prefix}Compactación terminada en {time.perf_counter() - start:.1f} s"))
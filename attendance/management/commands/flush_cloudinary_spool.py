@@ -0,0 +1,36 @@
+"""
+Comando para subir a Cloudinary los archivos pendientes del spool local
+"""
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.storage import CloudinaryStorage, cloudinary_uploader
+
+
+class Command(BaseCommand):
+    help = 'Sube a Cloudinary los archivos que quedaron en el spool de subidas en segundo plano'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=None,
+            help='Segundos máximos de espera por archivo (por defecto: sin límite)',
+        )
+
+    def handle(self, *args, **options):
+        storage = storages['default']
+        if not isinstance(storage, CloudinaryStorage):
+            raise CommandError('El almacenamiento por defecto no es CloudinaryStorage')
+
+        pending = storage.spooled_names()
+        self.stdout.write(f"\n📤 Spool de Cloudinary ({storage.spool_dir}): {len(pending)} archivos pendientes")
+        if not pending:
+            return
+
+        uploaded, failed = cloudinary_uploader.flush(storage, timeout=options['timeout'])
+        cloudinary_uploader.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"   ✅ Subidos: {uploaded}"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"   ⚠️ Fallidos (siguen en el spool): {failed}"))
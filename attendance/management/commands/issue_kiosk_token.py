@@ -0,0 +1,70 @@
+"""
+Comando para dar de alta un kiosco de marcación o regenerar su token
+
+    python manage.py issue_kiosk_token --work-area 3 --name "Recepción Mall del Sol"
+    python manage.py issue_kiosk_token --kiosk 7
+
+El token se muestra una sola vez: en la base de datos solo queda su hash.
+La tablet lo envía en la cabecera 'Authorization: Kiosk <token>'.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from attendance.geofence import geofence_index
+from attendance.models_gps import AttendanceKiosk, WorkArea
+
+
+class Command(BaseCommand):
+    help = 'Crea un kiosco de marcación por rostro para un área de trabajo o regenera su token'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--work-area',
+            type=int,
+            default=None,
+            help='ID del área de trabajo del nuevo kiosco',
+        )
+        parser.add_argument(
+            '--name',
+            default=None,
+            help='Nombre del nuevo kiosco (por defecto: "Kiosco <área>")',
+        )
+        parser.add_argument(
+            '--kiosk',
+            type=int,
+            default=None,
+            help='ID de un kiosco existente cuyo token se regenera (el anterior deja de funcionar)',
+        )
+
+    def handle(self, *args, **options):
+        if bool(options['kiosk']) == bool(options['work_area']):
+            raise CommandError("❌ Indica --work-area para crear un kiosco o --kiosk para regenerar su token")
+
+        if options['kiosk']:
+            kiosk = AttendanceKiosk.objects.select_related('work_area').filter(id=options['kiosk']).first()
+            if kiosk is None:
+                raise CommandError(f"❌ Kiosco {options['kiosk']} no encontrado")
+            token = kiosk.set_new_token()
+            kiosk.save(update_fields=['token_hash', 'token_prefix', 'updated_at'])
+            self.stdout.write(f"\n🔄 Token regenerado para {kiosk}")
+        else:
+            work_area = WorkArea.objects.filter(id=options['work_area']).first()
+            if work_area is None:
+                raise CommandError(f"❌ Área de trabajo {options['work_area']} no encontrada")
+            kiosk = AttendanceKiosk(work_area=work_area, name=options['name'] or f"Kiosco {work_area.name}")
+            token = kiosk.set_new_token()
+            kiosk.save()
+            self.stdout.write(f"\n🖥️ Kiosco creado: {kiosk} (ID {kiosk.id})")
+
+        candidates = len(geofence_index.employees_for_area(kiosk.work_area_id))
+        self.stdout.write(f"   Empleados asignados al área: {candidates}")
+        if not candidates:
+            self.stdout.write(self.style.WARNING("   ⚠️ Sin empleados asignados: el kiosco no podrá identificar a nadie"))
+        if not settings.KIOSK_IDENTIFICATION_ENABLED:
+            self.stdout.write(self.style.WARNING(
+                "   ⚠️ KIOSK_IDENTIFICATION_ENABLED=False: el kiosco rechazará capturas "
+                "hasta calibrar los umbrales (calibrate_face_matching)"
+            ))
+        self.stdout.write(f"   Endpoint: POST {reverse('attendance:kiosk_record')}")
+        self.stdout.write(self.style.SUCCESS(f"\n🔑 Token (se muestra una sola vez):\n   {token}\n"))
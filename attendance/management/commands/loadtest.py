@@ -0,0 +1,219 @@
+"""
+Comando de pruebas de carga repetibles para marcación y GPS
+
+    python manage.py loadtest seed --employees 200 --work-areas 20
+    python manage.py loadtest run --users 50 --duration 60 --save-baseline main
+    python manage.py loadtest run --users 50 --duration 60 --baseline main
+    python manage.py loadtest clean
+
+Solo para entornos de prueba: todo lo sembrado y lo generado durante la
+carga (marcaciones y puntos GPS) se elimina con clean.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from attendance.loadtest.dataset import (
+    clean_dataset, dataset_users, image_to_data_url, load_reference_faces, seed_dataset,
+)
+from attendance.loadtest.runner import compare_with_baseline, load_baseline, run_load, save_baseline
+from attendance.loadtest.scenarios import GUARD, SCENARIOS, SUPERVISOR, VirtualUser, parse_mix
+
+
+class Command(BaseCommand):
+    help = 'Siembra datos y ejecuta pruebas de carga de marcación y GPS con líneas base'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['seed', 'run', 'clean'],
+            help='seed: crear datos; run: ejecutar la carga; clean: eliminar datos y resultados',
+        )
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=200,
+            help='Guardias a sembrar (por defecto: 200)',
+        )
+        parser.add_argument(
+            '--work-areas',
+            type=int,
+            default=20,
+            help='Áreas de trabajo a sembrar (por defecto: 20)',
+        )
+        parser.add_argument(
+            '--faces',
+            type=int,
+            default=8,
+            help='Imágenes de referencia distintas para los perfiles faciales (por defecto: 8)',
+        )
+        parser.add_argument(
+            '--faces-dir',
+            default=None,
+            help='Carpeta con fotos de rostro (por defecto: MEDIA_ROOT/facial_references y rostros sintéticos)',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Guardias virtuales concurrentes (por defecto: 50)',
+        )
+        parser.add_argument(
+            '--supervisors',
+            type=int,
+            default=5,
+            help='Supervisores virtuales consultando los mapas (por defecto: 5)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=60,
+            help='Segundos de carga (por defecto: 60)',
+        )
+        parser.add_argument(
+            '--mix',
+            default=None,
+            help="Pesos por escenario, p. ej. 'record_attendance=1,update_gps_location=12' "
+                 f"(escenarios: {', '.join(SCENARIOS)})",
+        )
+        parser.add_argument(
+            '--think-ms',
+            type=int,
+            default=0,
+            help='Pausa entre peticiones de cada usuario virtual (por defecto: 0)',
+        )
+        parser.add_argument(
+            '--base-url',
+            default=None,
+            help='Servidor objetivo, p. ej. http://127.0.0.1:8000 (por defecto: servidor local en el proceso)',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            default=None,
+            metavar='NOMBRE',
+            help='Guardar el resultado como línea base',
+        )
+        parser.add_argument(
+            '--baseline',
+            default=None,
+            metavar='NOMBRE',
+            help='Comparar con una línea base y fallar si hay regresiones',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Degradación tolerada frente a la línea base (por defecto: 0.2 = 20%%)',
+        )
+        parser.add_argument(
+            '--yes',
+            action='store_true',
+            help='Confirmar ejecución con DEBUG=False',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['yes']:
+            raise CommandError("❌ DEBUG=False: usa --yes para confirmar que es un entorno de prueba")
+
+        getattr(self, f"_{options['action']}")(options)
+
+    def _faces(self, options):
+        faces = load_reference_faces(options['faces_dir'], count=options['faces'])
+        if not faces:
+            raise CommandError("❌ No se obtuvieron rostros detectables para los perfiles faciales")
+        return faces
+
+    def _seed(self, options):
+        self.stdout.write(f"\n🌱 Sembrando {options['employees']} guardias en {options['work_areas']} áreas")
+        faces = self._faces(options)
+        self.stdout.write(f"   Rostros de referencia: {len(faces)}")
+        created = seed_dataset(options['employees'], options['work_areas'], faces=faces, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Creados: {created['employees']} empleados, {created['work_areas']} áreas, "
+            f"{created['profiles']} perfiles faciales"
+        ))
+
+    def _clean(self, options):
+        counts = clean_dataset()
+        self.stdout.write(self.style.SUCCESS(
+            f"🧹 Eliminados: {counts['employees']} empleados, {counts['work_areas']} áreas, "
+            f"{counts['records']} marcaciones, {counts['gps']} puntos GPS"
+        ))
+
+    def _run(self, options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(f"❌ {e}")
+
+        employees, supervisor = dataset_users()
+        if not employees or supervisor is None:
+            raise CommandError("❌ No hay datos de prueba: ejecuta primero 'manage.py loadtest seed'")
+
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = load_baseline(options['baseline'])
+            except FileNotFoundError:
+                raise CommandError(f"❌ No existe la línea base '{options['baseline']}'")
+
+        # Los guardias envían la misma imagen con la que se sembró su perfil
+        faces = [image_to_data_url(image) for image, _ in self._faces(options)]
+        virtual_users = []
+        for index, employee in enumerate(employees[:options['users']]):
+            assignment = next(iter(employee.work_areas.all()), None)
+            center = (float(assignment.work_area.latitude), float(assignment.work_area.longitude)) if assignment else None
+            virtual_users.append(VirtualUser(
+                employee.user, GUARD, center=center, face=faces[index % len(faces)], seed=index,
+            ))
+        for index in range(options['supervisors']):
+            virtual_users.append(VirtualUser(supervisor, SUPERVISOR, seed=10_000 + index))
+
+        self.stdout.write(
+            f"\n🏋️ Carga de {options['duration']:.0f} s: {min(len(employees), options['users'])} guardias, "
+            f"{options['supervisors']} supervisores contra {options['base_url'] or 'servidor local'}"
+        )
+        self.stdout.write(f"   Mezcla: {mix}")
+
+        with override_settings(ALLOWED_HOSTS=['*']):
+            results = run_load(
+                virtual_users, mix, options['duration'],
+                base_url=options['base_url'], think_ms=options['think_ms'],
+            )
+
+        self._report(results, baseline)
+
+        if options['save_baseline']:
+            path = save_baseline(options['save_baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"\n💾 Línea base guardada: {path}"))
+
+        if baseline is not None:
+            regressions = compare_with_baseline(results, baseline, tolerance=options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f"   ❌ {regression}"))
+                raise CommandError(f"Regresión frente a la línea base '{options['baseline']}'")
+            self.stdout.write(self.style.SUCCESS(
+                f"\n✅ Sin regresiones frente a '{options['baseline']}' (tolerancia {options['tolerance']:.0%})"
+            ))
+
+    def _report(self, results, baseline):
+        previous = (baseline or {}).get('scenarios', {})
+        self.stdout.write(self.style.SUCCESS("\n📊 Resultados:"))
+        self.stdout.write(
+            f"   {'Escenario':22} {'Peticiones':>10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'Errores':>8} {'p95 base':>9}"
+        )
+        for name, stats in results['scenarios'].items():
+            base_p95 = previous.get(name, {}).get('p95_ms')
+            self.stdout.write(
+                f"   {name:22} {stats['requests']:10d} {stats['throughput_rps']:8.1f} {stats['p50_ms']:8.1f} "
+                f"{stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f} {stats['error_rate']:8.1%} "
+                f"{base_p95 if base_p95 is not None else '-':>9}"
+            )
+            self.stdout.write(f"      Códigos HTTP: {stats['status_codes']}")
+        total = results['total']
+        self.stdout.write(
+            f"   {'TOTAL':22} {total['requests']:10d} {total['throughput_rps']:8.1f} {total['p50_ms']:8.1f} "
+            f"{total['p95_ms']:8.1f} {total['p99_ms']:8.1f} {total['error_rate']:8.1%}"
+        )
@@ -0,0 +1,176 @@
+"""
+Comando para simular un cambio de turno contra el endpoint de marcación
+
+Solo para entornos de prueba: las marcaciones se envían con empleados reales
+de la base de datos. Se marcan con device_info='loadtest-shift-change' y se
+eliminan al terminar (salvo --keep).
+"""
+import base64
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from attendance.models import AttendanceRecord, AttendanceVerificationTask
+from employees.models import Employee
+
+
+LOADTEST_DEVICE = 'loadtest-shift-change'
+
+
+class Command(BaseCommand):
+    help = 'Simula un cambio de turno: muchos guardias marcando en pocos segundos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=100,
+            help='Número de empleados que marcan (por defecto: 100)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=20,
+            help='Peticiones simultáneas (por defecto: 20)',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['async', 'sync'],
+            default='async',
+            help='Modo de marcación a probar (por defecto: async)',
+        )
+        parser.add_argument(
+            '--image',
+            type=str,
+            default=None,
+            help='Foto de rostro a enviar (por defecto: imagen sintética)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=300,
+            help='Segundos máximos esperando a que se vacíe la cola (por defecto: 300)',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='No eliminar las marcaciones generadas',
+        )
+        parser.add_argument(
+            '--yes',
+            action='store_true',
+            help='Confirmar ejecución con DEBUG=False',
+        )
+
+    def _load_image(self, path):
+        if path:
+            image = Image.open(path).convert('RGB')
+        else:
+            rng = np.random.default_rng(0)
+            image = Image.fromarray(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8))
+
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=80)
+        return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+    def _percentile(self, values, percent):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['yes']:
+            raise CommandError("❌ DEBUG=False: usa --yes para confirmar que es un entorno de prueba")
+
+        employees = list(
+            Employee.objects.filter(is_active=True, user__isnull=False)
+            .select_related('user')[:options['employees']]
+        )
+        if not employees:
+            raise CommandError("❌ No hay empleados activos con usuario")
+
+        facial_image = self._load_image(options['image'])
+        url = reverse('attendance:record')
+        is_async = options['mode'] == 'async'
+        started_at = timezone.now()
+
+        self.stdout.write(f"\n🚦 Simulando cambio de turno ({options['mode']})")
+        self.stdout.write(f"   Empleados: {len(employees)} - Concurrencia: {options['concurrency']}")
+
+        def clock_in(employee):
+            close_old_connections()
+            client = Client()
+            client.force_login(employee.user)
+            start = time.perf_counter()
+            response = client.post(url, data={
+                'attendance_type': 'IN',
+                'facial_image': facial_image,
+                'latitude': 19.4326,
+                'longitude': -99.1332,
+                'location_accuracy': 10,
+                'device_info': LOADTEST_DEVICE,
+            }, content_type='application/json')
+            elapsed = (time.perf_counter() - start) * 1000
+            close_old_connections()
+            return response.status_code, elapsed
+
+        with override_settings(ATTENDANCE_ASYNC_ENABLED=is_async, ALLOWED_HOSTS=['*']):
+            wall_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                results = list(executor.map(clock_in, employees))
+            accept_seconds = time.perf_counter() - wall_start
+
+            latencies = [elapsed for _, elapsed in results]
+            status_codes = {}
+            for status_code, _ in results:
+                status_codes[status_code] = status_codes.get(status_code, 0) + 1
+
+            self.stdout.write(self.style.SUCCESS("\n📨 Recepción:"))
+            self.stdout.write(f"   - Tiempo total:  {accept_seconds:8.2f} s")
+            self.stdout.write(f"   - Latencia p50:  {statistics.median(latencies):8.1f} ms")
+            self.stdout.write(f"   - Latencia p95:  {self._percentile(latencies, 95):8.1f} ms")
+            self.stdout.write(f"   - Latencia p99:  {self._percentile(latencies, 99):8.1f} ms")
+            self.stdout.write(f"   - Latencia máx.: {max(latencies):8.1f} ms")
+            self.stdout.write(f"   - Códigos HTTP:  {dict(sorted(status_codes.items()))}")
+
+            tasks = AttendanceVerificationTask.objects.filter(
+                device_info=LOADTEST_DEVICE, created_at__gte=started_at
+            )
+
+            if is_async:
+                deadline = time.perf_counter() + options['timeout']
+                while tasks.filter(status__in=('PENDING', 'PROCESSING')).exists():
+                    if time.perf_counter() > deadline:
+                        self.stdout.write(self.style.WARNING("   ⚠️ Tiempo de espera agotado"))
+                        break
+                    time.sleep(0.5)
+
+                drain_seconds = time.perf_counter() - wall_start
+                finished = {
+                    status: tasks.filter(status=status).count()
+                    for status in ('DONE', 'FAILED', 'PENDING', 'PROCESSING')
+                }
+
+                self.stdout.write(self.style.SUCCESS("\n⚙️ Verificación en segundo plano:"))
+                self.stdout.write(f"   - Cola vaciada en: {drain_seconds:8.2f} s")
+                self.stdout.write(f"   - Throughput:      {sum(finished.values()) / drain_seconds:8.2f} marcaciones/s")
+                self.stdout.write(f"   - Estados:         {finished}")
+
+        if not options['keep']:
+            tasks.delete()
+            deleted, _ = AttendanceRecord.objects.filter(
+                device_info=LOADTEST_DEVICE, created_at__gte=started_at
+            ).delete()
+            self.stdout.write(f"\n🧹 Marcaciones de prueba eliminadas: {deleted}")
@@ -0,0 +1,79 @@
+"""
+Comando para reconstruir resúmenes de asistencia en bloque
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.summary_service import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes diarios de un rango de fechas a partir de las marcaciones (SQL agregado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            type=str,
+            help='Fecha de inicio (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--end-date',
+            type=str,
+            help='Fecha de fin (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Número de días hacia atrás desde hoy si no se indica rango (por defecto: 7)',
+        )
+        parser.add_argument(
+            '--employee-id',
+            type=int,
+            action='append',
+            dest='employee_ids',
+            help='ID del empleado (se puede repetir; por defecto todos)',
+        )
+        parser.add_argument(
+            '--keep-empty',
+            action='store_true',
+            help='No eliminar resúmenes de días sin marcaciones',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['start_date']:
+                start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+                end_date = (
+                    datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+                    if options['end_date'] else timezone.localdate()
+                )
+            else:
+                end_date = timezone.localdate()
+                start_date = end_date - timedelta(days=options['days'])
+        except ValueError:
+            raise CommandError("❌ Formato de fecha inválido, usa YYYY-MM-DD")
+
+        if start_date > end_date:
+            raise CommandError("❌ La fecha de inicio es posterior a la fecha de fin")
+
+        self.stdout.write(f"\n🔄 Reconstruyendo resúmenes de asistencia...")
+        self.stdout.write(f"   Rango: {start_date} a {end_date}")
+        if options['employee_ids']:
+            self.stdout.write(f"   Empleados: {options['employee_ids']}")
+
+        start = time.perf_counter()
+        result = rebuild_summaries(
+            start_date,
+            end_date,
+            employee_ids=options['employee_ids'],
+            delete_empty=not options['keep_empty'],
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Reconstrucción completada en {elapsed:.2f} s:"))
+        self.stdout.write(f"   - Resúmenes escritos: {result['written']}")
+        self.stdout.write(f"   - Resúmenes eliminados: {result['deleted']}")
@@ -0,0 +1,133 @@
+"""
+Comando para repetir el rastreo GPS histórico a través del motor de alertas
+
+    python manage.py replay_gps_alerts --start 2025-01-01 --end 2025-01-07
+    python manage.py replay_gps_alerts --employee 12 --no-movement-minutes 20 --show 20
+
+Sirve para ajustar los umbrales de attendance/gps_alerts.py: procesa los
+puntos en orden por empleado con los umbrales indicados (por defecto los de
+settings), cuenta las alertas que se habrían generado y las compara con las
+LocationAlert registradas en el mismo periodo. No guarda nada.
+"""
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.gps_alerts import AlertRules, GPSAlertEngine
+from attendance.models_gps import GPSTracking, LocationAlert
+from employees.models import Employee
+
+
+class Command(BaseCommand):
+    help = 'Repite puntos GPS históricos por el motor de alertas para ajustar sus umbrales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            default=None,
+            help='Primer día (YYYY-MM-DD, por defecto: ayer)',
+        )
+        parser.add_argument(
+            '--end',
+            default=None,
+            help='Último día incluido (YYYY-MM-DD, por defecto: igual a --start)',
+        )
+        parser.add_argument(
+            '--employee',
+            type=int,
+            action='append',
+            default=None,
+            help='ID de empleado (puede repetirse; por defecto: todos)',
+        )
+        parser.add_argument('--cooldown-minutes', type=int, default=None)
+        parser.add_argument('--out-of-area-seconds', type=int, default=None)
+        parser.add_argument('--no-movement-minutes', type=int, default=None)
+        parser.add_argument('--no-movement-radius-meters', type=float, default=None)
+        parser.add_argument('--battery-low-percent', type=int, default=None)
+        parser.add_argument('--battery-critical-minutes', type=int, default=None)
+        parser.add_argument('--departure-minutes', type=int, default=None)
+        parser.add_argument(
+            '--show',
+            type=int,
+            default=0,
+            help='Mostrar las primeras N alertas generadas',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Puntos leídos por consulta (por defecto: 2000)',
+        )
+
+    def _date(self, value, default):
+        if not value:
+            return default
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"❌ Fecha inválida: {value} (usa YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        first_day = self._date(options['start'], timezone.localdate() - timedelta(days=1))
+        last_day = self._date(options['end'], first_day)
+        if last_day < first_day:
+            raise CommandError("❌ --end no puede ser anterior a --start")
+
+        start = timezone.make_aware(datetime.combine(first_day, datetime.min.time()))
+        end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), datetime.min.time()))
+
+        rules = AlertRules(**{name: options[name] for name in AlertRules.DEFAULTS})
+        engine = GPSAlertEngine(rules=rules, confirm=False)
+
+        points = GPSTracking.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        alerts = LocationAlert.objects.filter(created_at__gte=start, created_at__lt=end)
+        if options['employee']:
+            points = points.filter(employee_id__in=options['employee'])
+            alerts = alerts.filter(employee_id__in=options['employee'])
+
+        self.stdout.write(f"\n🔁 Repitiendo rastreo GPS del {first_day} al {last_day}")
+        self.stdout.write(f"   Umbrales: {rules.as_dict()}")
+
+        names = {}
+        generated = []
+        processed = 0
+        begin = time.perf_counter()
+        for tracking in points.select_related('work_area').order_by('employee_id', 'timestamp').iterator(
+            chunk_size=options['chunk_size']
+        ):
+            processed += 1
+            if tracking.employee_id not in names:
+                employee = Employee.objects.filter(id=tracking.employee_id).first()
+                names[tracking.employee_id] = employee.get_full_name() if employee else str(tracking.employee_id)
+            generated.extend(engine.observe(tracking, names[tracking.employee_id]))
+        elapsed = time.perf_counter() - begin
+
+        replayed = Counter(candidate.alert_type for candidate in generated)
+        recorded = Counter(alerts.values_list('alert_type', flat=True))
+
+        self.stdout.write(
+            f"   {processed:,} puntos de {len(names)} empleados en {elapsed:.1f} s "
+            f"({processed / elapsed if elapsed else 0:,.0f} puntos/s)"
+        )
+        self.stdout.write(self.style.SUCCESS("\n📊 Alertas por tipo:"))
+        self.stdout.write(f"   {'Tipo':18} {'Repetición':>10} {'Registradas':>12}")
+        for alert_type, label in LocationAlert.ALERT_TYPES:
+            self.stdout.write(f"   {label:18} {replayed.get(alert_type, 0):10d} {recorded.get(alert_type, 0):12d}")
+        self.stdout.write(f"   {'TOTAL':18} {sum(replayed.values()):10d} {sum(recorded.values()):12d}")
+
+        per_employee = Counter(candidate.tracking.employee_id for candidate in generated)
+        if per_employee:
+            self.stdout.write(self.style.SUCCESS("\n👥 Empleados con más alertas:"))
+            for employee_id, count in per_employee.most_common(10):
+                self.stdout.write(f"   {names[employee_id]:40} {count:5d}")
+
+        if options['show']:
+            self.stdout.write(self.style.SUCCESS(f"\n🚨 Primeras {options['show']} alertas:"))
+            for candidate in generated[:options['show']]:
+                self.stdout.write(
+                    f"   {timezone.localtime(candidate.tracking.timestamp):%Y-%m-%d %H:%M} "
+                    f"{candidate.alert_type:16} {candidate.level:8} {candidate.message}"
+                )
@@ -0,0 +1,56 @@
+"""
+Comando para procesar la cola de análisis de IA de fotos de seguridad
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from attendance.ai_queue import ai_worker_pool, purge_finished_jobs, queue_depth
+
+
+class Command(BaseCommand):
+    help = 'Procesa los análisis de IA pendientes de las fotos de seguridad'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=2,
+            help='Número de hilos de análisis (por defecto: 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesar la cola hasta vaciarla y terminar',
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=None,
+            help='Eliminar análisis terminados con más de N días antes de empezar',
+        )
+
+    def handle(self, *args, **options):
+        if options['purge_days'] is not None:
+            deleted = purge_finished_jobs(options['purge_days'])
+            self.stdout.write(f"🧹 Análisis terminados eliminados: {deleted}")
+
+        self.stdout.write(f"\n👷 Worker de análisis IA - pendientes: {queue_depth()}")
+
+        if options['once']:
+            ai_worker_pool.run(ai_worker_pool.worker_name(0), once=True)
+            self.stdout.write(self.style.SUCCESS(f"✅ Cola procesada - pendientes: {queue_depth()}"))
+            return
+
+        def shutdown(signum, frame):
+            self.stdout.write("\n⏹️ Deteniendo workers...")
+            ai_worker_pool.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        ai_worker_pool.ensure_started(options['threads'])
+        while ai_worker_pool.is_running():
+            ai_worker_pool.join(timeout=1)
+
+        self.stdout.write(self.style.SUCCESS("✅ Workers detenidos"))
@@ -0,0 +1,56 @@
+"""
+Comando para procesar la cola de verificación de marcaciones
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from attendance.attendance_queue import purge_finished_tasks, queue_depth, worker_pool
+
+
+class Command(BaseCommand):
+    help = 'Procesa las marcaciones pendientes de verificación facial (modo asíncrono)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=2,
+            help='Número de hilos de verificación (por defecto: 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesar la cola hasta vaciarla y terminar',
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=None,
+            help='Eliminar tareas terminadas con más de N días antes de empezar',
+        )
+
+    def handle(self, *args, **options):
+        if options['purge_days'] is not None:
+            deleted = purge_finished_tasks(options['purge_days'])
+            self.stdout.write(f"🧹 Tareas terminadas eliminadas: {deleted}")
+
+        self.stdout.write(f"\n👷 Worker de marcaciones - pendientes: {queue_depth()}")
+
+        if options['once']:
+            worker_pool.run(worker_pool.worker_name(0), once=True)
+            self.stdout.write(self.style.SUCCESS(f"✅ Cola procesada - pendientes: {queue_depth()}"))
+            return
+
+        def shutdown(signum, frame):
+            self.stdout.write("\n⏹️ Deteniendo workers...")
+            worker_pool.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        worker_pool.ensure_started(options['threads'])
+        while worker_pool.is_running():
+            worker_pool.join(timeout=1)
+
+        self.stdout.write(self.style.SUCCESS("✅ Workers detenidos"))
@@ -0,0 +1,56 @@
+"""
+Comando para preparar las exportaciones CSV/Excel en segundo plano
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from attendance.exports import export_worker_pool, purge_expired_exports, queue_depth
+
+
+class Command(BaseCommand):
+    help = 'Prepara las exportaciones grandes pendientes y elimina las vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=1,
+            help='Número de hilos de exportación (por defecto: 1)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesar la cola hasta vaciarla y terminar',
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=None,
+            help='Eliminar exportaciones (y archivos) con más de N días antes de empezar',
+        )
+
+    def handle(self, *args, **options):
+        if options['purge_days'] is not None:
+            deleted = purge_expired_exports(options['purge_days'])
+            self.stdout.write(f"🧹 Exportaciones vencidas eliminadas: {deleted}")
+
+        self.stdout.write(f"\n👷 Worker de exportaciones - pendientes: {queue_depth()}")
+
+        if options['once']:
+            export_worker_pool.run(export_worker_pool.worker_name(0), once=True)
+            self.stdout.write(self.style.SUCCESS(f"✅ Cola procesada - pendientes: {queue_depth()}"))
+            return
+
+        def shutdown(signum, frame):
+            self.stdout.write("\n⏹️ Deteniendo workers...")
+            export_worker_pool.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        export_worker_pool.ensure_started(options['threads'])
+        while export_worker_pool.is_running():
+            export_worker_pool.join(timeout=1)
+
+        self.stdout.write(self.style.SUCCESS("✅ Workers detenidos"))
@@ -37,6 +37,7 @@ from .models import (
     Employee, MedicalDocument, MedicalLeave, DrClaudeConversation,
     MedicalDocumentType, MedicalLeaveStatus
 )
+from . import exports
 # from .dr_claude_service import dr_claude
 # Importar dinámicamente para evitar import circular
 def get_dr_claude():
@@ -666,95 +667,21 @@ def generate_medical_report(request):
 @login_required
 @permission_required('supervisor')
 def export_medical_data(request):
-    """Exportar datos médicos a Excel"""
+    """
+    Exportar datos médicos a Excel
+    
+    El workbook se escribe en modo write-only sobre un archivo temporal; con
+    más de EXPORT_ASYNC_THRESHOLD_ROWS filas (o ?async=1) se prepara en
+    segundo plano.
+    """
     try:
-        from django.http import HttpResponse
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill
-        import io
-        
-        # Crear workbook
-        wb = openpyxl.Workbook()
+        filename = f"datos_medicos_{timezone.now().strftime('%Y%m%d')}.xlsx"
         
-        # Hoja 1: Documentos Médicos
-        ws1 = wb.active
-        ws1.title = "Documentos Médicos"
-        
-        # Encabezados
-        headers1 = [
-            'Empleado', 'Tipo Documento', 'Fecha Subida', 'Estado',
-            'Confianza IA', 'Diagnóstico', 'Médico', 'Centro Médico'
-        ]
-        
-        for col, header in enumerate(headers1, 1):
-            cell = ws1.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
-        # Datos de documentos
-        documents = MedicalDocument.objects.all().order_by('-uploaded_at')
-        for row, doc in enumerate(documents, 2):
-            ws1.cell(row=row, column=1, value=doc.employee.get_full_name())
-            ws1.cell(row=row, column=2, value=doc.get_document_type_display())
-            ws1.cell(row=row, column=3, value=doc.uploaded_at.strftime('%d/%m/%Y %H:%M'))
-            ws1.cell(row=row, column=4, value='Procesado' if doc.processed_by_ai else 'Pendiente')
-            ws1.cell(row=row, column=5, value=f"{doc.ai_confidence_score:.1%}" if doc.ai_confidence_score else 'N/A')
-            ws1.cell(row=row, column=6, value=doc.diagnosis or 'N/A')
-            ws1.cell(row=row, column=7, value=doc.doctor_name or 'N/A')
-            ws1.cell(row=row, column=8, value=doc.medical_center or 'N/A')
-        
-        # Hoja 2: Permisos Médicos
-        ws2 = wb.create_sheet("Permisos Médicos")
-        
-        headers2 = [
-            'Empleado', 'Fecha Inicio', 'Fecha Fin', 'Días Totales',
-            'Estado', 'Recomendación IA', 'Revisado Por', 'Fecha Revisión'
-        ]
+        if request.GET.get('async') == '1' or exports.should_prepare_async(exports.medical_row_count()):
+            job = exports.enqueue_export(request.user, 'MEDICAL', filename=filename)
+            return redirect('attendance:export_job_status', job_id=job.id)
         
-        for col, header in enumerate(headers2, 1):
-            cell = ws2.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
-        # Datos de permisos
-        leaves = MedicalLeave.objects.all().order_by('-created_at')
-        for row, leave in enumerate(leaves, 2):
-            ws2.cell(row=row, column=1, value=leave.employee.get_full_name())
-            ws2.cell(row=row, column=2, value=leave.start_date.strftime('%d/%m/%Y'))
-            ws2.cell(row=row, column=3, value=leave.end_date.strftime('%d/%m/%Y'))
-            ws2.cell(row=row, column=4, value=leave.total_days)
-            ws2.cell(row=row, column=5, value=leave.get_status_display())
-            ws2.cell(row=row, column=6, value=leave.ai_recommendation or 'N/A')
-            ws2.cell(row=row, column=7, value=leave.reviewed_by.get_full_name() if leave.reviewed_by else 'N/A')
-            ws2.cell(row=row, column=8, value=leave.reviewed_at.strftime('%d/%m/%Y %H:%M') if leave.reviewed_at else 'N/A')
-        
-        # Ajustar ancho de columnas
-        for ws in [ws1, ws2]:
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Guardar en buffer
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        # Preparar respuesta
-        response = HttpResponse(
-            buffer,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="datos_medicos_{timezone.now().strftime("%Y%m%d")}.xlsx"'
-        
-        return response
+        return exports.xlsx_response(exports.medical_sheets(), filename)
         
     except Exception as e:
         return JsonResponse({
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+
+def encode_face_vectors(apps, schema_editor):
+    """Convierte los perfiles base64-JSON al formato binario versionado"""
+    from attendance.face_encoding import decode_profile_encoding, pack_vector
+
+    FacialRecognitionProfile = apps.get_model('attendance', 'FacialRecognitionProfile')
+
+    profiles = FacialRecognitionProfile.objects.filter(face_vector__isnull=True).exclude(face_encoding='')
+    for profile in profiles.iterator(chunk_size=500):
+        vector = decode_profile_encoding(profile.face_encoding)
+        if vector is None:
+            # Perfiles heredados con hashes: se mantienen en texto
+            continue
+
+        profile.face_vector = pack_vector(vector)
+        profile.face_encoding = ''
+        profile.save(update_fields=['face_vector', 'face_encoding'])
+
+
+def decode_face_vectors(apps, schema_editor):
+    """Reconstruye face_encoding (base64-JSON) a partir del vector binario"""
+    import base64
+    import json
+
+    from attendance.face_encoding import unpack_vector, vector_to_features
+
+    FacialRecognitionProfile = apps.get_model('attendance', 'FacialRecognitionProfile')
+
+    for profile in FacialRecognitionProfile.objects.filter(face_vector__isnull=False).iterator(chunk_size=500):
+        vector = unpack_vector(profile.face_vector)
+        if vector is None:
+            continue
+
+        features_json = json.dumps(vector_to_features(vector))
+        profile.face_encoding = base64.b64encode(features_json.encode('utf-8')).decode('utf-8')
+        profile.save(update_fields=['face_encoding'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_add_security_ai_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facialrecognitionprofile',
+            name='face_vector',
+            field=models.BinaryField(blank=True, editable=False, help_text='Vector de características en formato binario versionado (float32)', null=True),
+        ),
+        migrations.RunPython(encode_face_vectors, decode_face_vectors),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0012_facialrecognitionprofile_face_vector'),
+        ('employees', '0002_alter_employee_address_alter_employee_city_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceVerificationTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('DONE', 'Completada'), ('FAILED', 'Rechazada')], default='PENDING', max_length=12)),
+                ('attendance_type', models.CharField(choices=[('IN', 'Entrada'), ('OUT', 'Salida'), ('BREAK_OUT', 'Salida a Descanso'), ('BREAK_IN', 'Regreso de Descanso')], max_length=10)),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=8, max_digits=10, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=8, max_digits=11, null=True)),
+                ('location_accuracy', models.FloatField(blank=True, null=True)),
+                ('facial_image', models.TextField(blank=True, help_text='Imagen en base64 (se borra al procesar)')),
+                ('device_info', models.TextField(blank=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('result', models.TextField(blank=True, help_text='Respuesta JSON para el cliente')),
+                ('error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Verificación de Marcación',
+                'verbose_name_plural': 'Verificaciones de Marcación',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='attendanceverificationtask',
+            name='attendance_record',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='verification_tasks', to='attendance.attendancerecord'),
+        ),
+        migrations.AddField(
+            model_name='attendanceverificationtask',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_tasks', to='employees.employee'),
+        ),
+        migrations.AddIndex(
+            model_name='attendanceverificationtask',
+            index=models.Index(fields=['status', 'created_at'], name='attendance__status_4662f3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendanceverificationtask',
+            index=models.Index(fields=['employee', 'status'], name='attendance__employe_d2d856_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0013_attendanceverificationtask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gpstracking',
+            name='client_id',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='ID del Cliente'),
+        ),
+        migrations.AddConstraint(
+            model_name='gpstracking',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_id__isnull', False)), fields=('employee', 'client_id'), name='unique_gps_client_id_per_employee'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_last_positions(apps, schema_editor):
+    """Última posición y última foto de cada empleado a partir del historial"""
+    GPSTracking = apps.get_model('attendance', 'GPSTracking')
+    SecurityPhoto = apps.get_model('attendance', 'SecurityPhoto')
+    EmployeeLastPosition = apps.get_model('attendance', 'EmployeeLastPosition')
+
+    positions = []
+    employee_ids = (
+        GPSTracking.objects.filter(employee__isnull=False)
+        .values_list('employee_id', flat=True).distinct()
+    )
+    for employee_id in employee_ids.iterator():
+        tracking = GPSTracking.objects.filter(employee_id=employee_id).order_by('-timestamp', '-id').first()
+        photo = SecurityPhoto.objects.filter(employee_id=employee_id).order_by('-timestamp', '-id').first()
+        positions.append(EmployeeLastPosition(
+            employee_id=employee_id,
+            gps_tracking_id=tracking.id,
+            latitude=tracking.latitude,
+            longitude=tracking.longitude,
+            accuracy=tracking.accuracy,
+            battery_level=tracking.battery_level,
+            tracking_type=tracking.tracking_type,
+            timestamp=tracking.timestamp,
+            is_active_session=tracking.is_active_session,
+            work_area_id=tracking.work_area_id,
+            is_within_work_area=tracking.is_within_work_area,
+            distance_to_work_area=tracking.distance_to_work_area,
+            last_photo_id=photo.id if photo else None,
+            last_photo_at=photo.timestamp if photo else None,
+        ))
+
+    EmployeeLastPosition.objects.bulk_create(positions, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0014_gpstracking_client_id'),
+        ('employees', '0002_alter_employee_address_alter_employee_city_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeLastPosition',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='last_position', serialize=False, to='employees.employee')),
+                ('latitude', models.DecimalField(decimal_places=8, max_digits=10, verbose_name='Latitud')),
+                ('longitude', models.DecimalField(decimal_places=8, max_digits=11, verbose_name='Longitud')),
+                ('accuracy', models.FloatField(blank=True, null=True, verbose_name='Precisión GPS (metros)')),
+                ('battery_level', models.IntegerField(blank=True, null=True, verbose_name='Nivel de Batería (%)')),
+                ('tracking_type', models.CharField(choices=[('AUTO', 'Automático'), ('MANUAL', 'Manual'), ('ATTENDANCE', 'Marcación'), ('PATROL', 'Patrullaje'), ('EMERGENCY', 'Emergencia'), ('SUPERUSER', 'Superusuario')], default='AUTO', max_length=20, verbose_name='Tipo de Rastreo')),
+                ('timestamp', models.DateTimeField(db_index=True, verbose_name='Fecha y Hora')),
+                ('is_active_session', models.BooleanField(default=True, verbose_name='Sesión Activa')),
+                ('is_within_work_area', models.BooleanField(default=False, verbose_name='Dentro del Área')),
+                ('distance_to_work_area', models.FloatField(blank=True, null=True, verbose_name='Distancia al Área (metros)')),
+                ('last_photo_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha Última Foto')),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Última Posición',
+                'verbose_name_plural': 'Últimas Posiciones',
+            },
+        ),
+        migrations.AddField(
+            model_name='employeelastposition',
+            name='gps_tracking',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='attendance.gpstracking'),
+        ),
+        migrations.AddField(
+            model_name='employeelastposition',
+            name='last_photo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='attendance.securityphoto'),
+        ),
+        migrations.AddField(
+            model_name='employeelastposition',
+            name='work_area',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='attendance.workarea'),
+        ),
+        migrations.RunPython(backfill_last_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0015_employeelastposition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIAnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('DONE', 'Completado'), ('FAILED', 'Fallido')], default='PENDING', max_length=12, verbose_name='Estado')),
+                ('priority', models.PositiveSmallIntegerField(choices=[(0, 'Alta'), (10, 'Normal'), (20, 'Baja')], default=10, verbose_name='Prioridad')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Ejecutar Después de')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('alerts_created', models.PositiveIntegerField(default=0, verbose_name='Alertas Generadas')),
+                ('error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Análisis IA en Cola',
+                'verbose_name_plural': 'Análisis IA en Cola',
+                'ordering': ['priority', 'run_after'],
+            },
+        ),
+        migrations.AddField(
+            model_name='aianalysisjob',
+            name='photo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_jobs', to='attendance.securityphoto'),
+        ),
+        migrations.AddIndex(
+            model_name='aianalysisjob',
+            index=models.Index(fields=['status', 'priority', 'run_after'], name='attendance__status_01de53_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aianalysisjob',
+            index=models.Index(fields=['photo', 'status'], name='attendance__photo_i_8f4373_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0016_aianalysisjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIResultCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_key', models.CharField(max_length=150, verbose_name='Modelo')),
+                ('image_hash', models.CharField(max_length=16, verbose_name='Hash Perceptual')),
+                ('result', models.JSONField(default=dict, verbose_name='Resultado')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Aciertos')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Caché de Resultado IA',
+                'verbose_name_plural': 'Caché de Resultados IA',
+            },
+        ),
+        migrations.CreateModel(
+            name='AIResultCacheStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_key', models.CharField(max_length=150, unique=True, verbose_name='Modelo')),
+                ('hits', models.PositiveBigIntegerField(default=0, verbose_name='Aciertos')),
+                ('misses', models.PositiveBigIntegerField(default=0, verbose_name='Fallos')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estadística de Caché IA',
+                'verbose_name_plural': 'Estadísticas de Caché IA',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='airesultcache',
+            index=models.Index(fields=['model_key', '-created_at'], name='attendance__model_k_f88de9_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='airesultcache',
+            constraint=models.UniqueConstraint(fields=('model_key', 'image_hash'), name='unique_ai_result_per_model_hash'),
+        ),
+    ]
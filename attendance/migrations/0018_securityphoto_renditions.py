@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0017_airesultcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='securityphoto',
+            name='analysis_image',
+            field=models.ImageField(blank=True, null=True, upload_to='security_photos/analysis/%Y/%m/%d/', verbose_name='Imagen para IA'),
+        ),
+        migrations.AddField(
+            model_name='securityphoto',
+            name='preview',
+            field=models.ImageField(blank=True, null=True, upload_to='security_photos/previews/%Y/%m/%d/', verbose_name='Vista Previa'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0018_securityphoto_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('export_type', models.CharField(choices=[('ATTENDANCE', 'Asistencias (CSV)'), ('MEDICAL', 'Datos Médicos (Excel)')], max_length=20)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('DONE', 'Lista'), ('FAILED', 'Fallida')], default='PENDING', max_length=12)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('file', models.FileField(blank=True, upload_to='exports/%Y/%m/%d/')),
+                ('filename', models.CharField(blank=True, max_length=200)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Exportación',
+                'verbose_name_plural': 'Exportaciones',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='requested_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='exportjob',
+            index=models.Index(fields=['status', 'created_at'], name='attendance__status_82520a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exportjob',
+            index=models.Index(fields=['requested_by', '-created_at'], name='attendance__request_72e402_idx'),
+        ),
+    ]
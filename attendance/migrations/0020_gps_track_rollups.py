@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0019_exportjob'),
+        ('employees', '0002_alter_employee_address_alter_employee_city_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GPSTrackRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('MINUTE', 'Minuto'), ('HOUR', 'Hora')], max_length=10, verbose_name='Resolución')),
+                ('bucket_start', models.DateTimeField(verbose_name='Inicio del Intervalo')),
+                ('first_timestamp', models.DateTimeField(verbose_name='Primer Punto')),
+                ('last_timestamp', models.DateTimeField(verbose_name='Último Punto')),
+                ('point_count', models.PositiveIntegerField(verbose_name='Puntos Originales')),
+                ('latitude', models.DecimalField(decimal_places=8, max_digits=10, verbose_name='Latitud Media')),
+                ('longitude', models.DecimalField(decimal_places=8, max_digits=11, verbose_name='Longitud Media')),
+                ('min_latitude', models.DecimalField(decimal_places=8, max_digits=10, verbose_name='Latitud Mínima')),
+                ('max_latitude', models.DecimalField(decimal_places=8, max_digits=10, verbose_name='Latitud Máxima')),
+                ('min_longitude', models.DecimalField(decimal_places=8, max_digits=11, verbose_name='Longitud Mínima')),
+                ('max_longitude', models.DecimalField(decimal_places=8, max_digits=11, verbose_name='Longitud Máxima')),
+                ('avg_accuracy', models.FloatField(blank=True, null=True, verbose_name='Precisión Media (metros)')),
+                ('distance_meters', models.FloatField(default=0, verbose_name='Distancia Recorrida (metros)')),
+                ('within_area_count', models.PositiveIntegerField(default=0, verbose_name='Puntos Dentro del Área')),
+                ('encoded_track', models.TextField(verbose_name='Recorrido (polilínea)')),
+                ('encoded_offsets', models.TextField(verbose_name='Segundos desde el inicio (codificados)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Rastreo GPS',
+                'verbose_name_plural': 'Resúmenes de Rastreo GPS',
+                'ordering': ['-bucket_start'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='gpstracking',
+            index=models.Index(fields=['timestamp'], name='attendance_gps_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='gpstrackrollup',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gps_rollups', to='employees.employee'),
+        ),
+        migrations.AddField(
+            model_name='gpstrackrollup',
+            name='work_area',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='attendance.workarea'),
+        ),
+        migrations.AddIndex(
+            model_name='gpstrackrollup',
+            index=models.Index(fields=['resolution', 'bucket_start'], name='attendance__resolut_5920ec_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='gpstrackrollup',
+            constraint=models.UniqueConstraint(fields=('employee', 'resolution', 'bucket_start'), name='unique_gps_rollup_per_bucket'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0020_gps_track_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceKiosk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+                ('name', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('token_hash', models.CharField(editable=False, max_length=64, unique=True, verbose_name='Hash del Token')),
+                ('token_prefix', models.CharField(editable=False, max_length=8, verbose_name='Prefijo del Token')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activo')),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True, verbose_name='Última Conexión')),
+            ],
+            options={
+                'verbose_name': 'Kiosco de Marcación',
+                'verbose_name_plural': 'Kioscos de Marcación',
+                'ordering': ['work_area__name', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='attendancekiosk',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_created', to=settings.AUTH_USER_MODEL, verbose_name='Creado por'),
+        ),
+        migrations.AddField(
+            model_name='attendancekiosk',
+            name='updated_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_updated', to=settings.AUTH_USER_MODEL, verbose_name='Actualizado por'),
+        ),
+        migrations.AddField(
+            model_name='attendancekiosk',
+            name='work_area',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kiosks', to='attendance.workarea'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:50
+
+import attendance.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0021_attendance_kiosk'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, storage=attendance.models.export_storage, upload_to=attendance.models.export_upload_to),
+        ),
+    ]
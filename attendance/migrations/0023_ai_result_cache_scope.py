@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0022_export_job_private_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airesultcache',
+            name='scope',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='Ámbito'),
+        ),
+        migrations.AddIndex(
+            model_name='airesultcache',
+            index=models.Index(fields=['model_key', 'scope', '-created_at'], name='attendance__model_k_817bfb_idx'),
+        ),
+    ]
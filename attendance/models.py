@@ -76,36 +76,14 @@ class AttendanceRecord(models.Model):
             return f"{self.latitude}, {self.longitude}"
         return "Ubicación no disponible"
     
-    def is_within_work_location(self, tolerance_meters=100):
-        """Verifica si la marcación está dentro del área de trabajo permitida"""
-        # Coordenadas de ejemplo de EURO SECURITY (se pueden configurar)
-        WORK_LOCATIONS = [
-            {'name': 'Oficina Principal', 'lat': 19.4326, 'lng': -99.1332, 'radius': 50},
-            {'name': 'Sucursal Norte', 'lat': 19.4969, 'lng': -99.1276, 'radius': 30},
-        ]
-        
+    def is_within_work_location(self, tolerance_meters=0):
+        """Verifica si la marcación está dentro de alguna área de trabajo activa"""
         if not self.latitude or not self.longitude:
             return False
-            
-        from math import radians, cos, sin, asin, sqrt
         
-        def haversine(lon1, lat1, lon2, lat2):
-            """Calcula la distancia entre dos puntos en la Tierra"""
-            lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * asin(sqrt(a))
-            r = 6371000  # Radio de la Tierra en metros
-            return c * r
+        from .geofence import geofence_index
         
-        for location in WORK_LOCATIONS:
-            distance = haversine(float(self.longitude), float(self.latitude), 
-                               location['lng'], location['lat'])
-            if distance <= location['radius']:
-                return True
-        
-        return False
+        return geofence_index.contains(self.latitude, self.longitude, tolerance_meters=tolerance_meters) is not None
 
 
 class AttendanceSummary(models.Model):
@@ -176,6 +154,12 @@ class FacialRecognitionProfile(models.Model):
         blank=True,
         help_text="Codificación facial serializada en base64"
     )
+    face_vector = models.BinaryField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Vector de características en formato binario versionado (float32)"
+    )
     confidence_threshold = models.FloatField(
         default=0.75,
         help_text="Umbral de confianza para reconocimiento (0.0-1.0)"
@@ -261,6 +245,28 @@ class FacialRecognitionProfile(models.Model):
             count += 1
         return count
     
+    def set_face_features(self, features):
+        """
+        Guarda las características faciales en formato binario
+
+        Los perfiles con diccionario de características se almacenan solo en
+        face_vector; face_encoding queda para perfiles heredados (hashes).
+        """
+        from .face_encoding import pack_features
+
+        packed = pack_features(features)
+        if packed is None:
+            raise ValueError("Características faciales inválidas")
+
+        self.face_vector = packed
+        self.face_encoding = ''
+
+    def get_face_vector(self):
+        """Vector float32 de características (vista sin copia) o None"""
+        from .face_encoding import decode_profile
+
+        return decode_profile(self.face_vector, self.face_encoding)
+
     def get_success_rate(self):
         """Calcula la tasa de éxito del reconocimiento"""
         if self.total_recognitions == 0:
@@ -271,8 +277,6 @@ class FacialRecognitionProfile(models.Model):
         """Procesa las imágenes subidas y genera codificación facial"""
         from .facial_recognition import facial_recognition_system
         from PIL import Image
-        import json
-        import base64
         
         images = [self.image_1, self.image_2, self.image_3, self.image_4, self.image_5]
         valid_images = [img for img in images if img and img.name]
@@ -308,9 +312,8 @@ class FacialRecognitionProfile(models.Model):
                 # Combinar todas las características
                 combined_features = self._combine_features(all_features)
                 
-                # Codificar en base64
-                features_json = json.dumps(combined_features)
-                self.face_encoding = base64.b64encode(features_json.encode('utf-8')).decode('utf-8')
+                # Codificar en formato binario
+                self.set_face_features(combined_features)
                 self.reference_images = str(processed_count)
                 self.save()
                 
@@ -410,6 +413,159 @@ class AttendanceSettings(models.Model):
             return []
 
 
+class AttendanceVerificationTask(models.Model):
+    """
+    Marcación pendiente de verificación facial (cola en base de datos)
+
+    En modo asíncrono record_attendance solo guarda esta fila y responde de
+    inmediato; un worker (ver attendance_queue.py) verifica la identidad y
+    crea el AttendanceRecord con la hora original de la marcación.
+    """
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('PROCESSING', 'Procesando'),
+        ('DONE', 'Completada'),
+        ('FAILED', 'Rechazada'),
+    ]
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendance_tasks')
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='PENDING')
+
+    # Datos de la marcación
+    attendance_type = models.CharField(max_length=10, choices=AttendanceRecord.ATTENDANCE_TYPES)
+    requested_at = models.DateTimeField(default=timezone.now)
+    latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
+    location_accuracy = models.FloatField(null=True, blank=True)
+    facial_image = models.TextField(blank=True, help_text="Imagen en base64 (se borra al procesar)")
+    device_info = models.TextField(blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+
+    # Control del worker
+    attempts = models.PositiveIntegerField(default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+
+    # Resultado
+    attendance_record = models.ForeignKey(
+        AttendanceRecord, on_delete=models.SET_NULL, null=True, blank=True, related_name='verification_tasks'
+    )
+    result = models.TextField(blank=True, help_text="Respuesta JSON para el cliente")
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = "Verificación de Marcación"
+        verbose_name_plural = "Verificaciones de Marcación"
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['employee', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.get_full_name()} - {self.get_attendance_type_display()} - {self.get_status_display()}"
+
+    def get_result(self):
+        """Retorna el resultado como diccionario"""
+        if self.result:
+            try:
+                return json.loads(self.result)
+            except json.JSONDecodeError:
+                return {}
+        return {}
+
+    @property
+    def is_finished(self):
+        return self.status in ('DONE', 'FAILED')
+
+
+def export_storage():
+    """
+    Storage privado de las exportaciones (fuera de MEDIA_ROOT)
+
+    Contienen datos médicos: no pueden quedar en el storage por defecto
+    (Cloudinary raw/upload es público). El directorio no se sirve como
+    MEDIA_URL: el único acceso es la vista download_export, que comprueba el
+    usuario.
+    """
+    from django.conf import settings
+    from django.core.files.storage import FileSystemStorage
+
+    return FileSystemStorage(location=settings.EXPORT_STORAGE_ROOT)
+
+
+def export_upload_to(instance, filename):
+    """Nombre aleatorio: el nombre visible se guarda aparte en ExportJob.filename"""
+    import os
+    import uuid
+
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{timezone.now():%Y/%m/%d}/{uuid.uuid4().hex}{extension}"
+
+
+class ExportJob(models.Model):
+    """
+    Exportación preparada en segundo plano (ver exports.py)
+
+    Los rangos grandes no se generan dentro de la petición: se guarda este
+    job, un worker escribe el archivo en el storage privado y el usuario lo
+    descarga cuando está listo.
+    """
+
+    EXPORT_TYPES = [
+        ('ATTENDANCE', 'Asistencias (CSV)'),
+        ('MEDICAL', 'Datos Médicos (Excel)'),
+    ]
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('PROCESSING', 'Procesando'),
+        ('DONE', 'Lista'),
+        ('FAILED', 'Fallida'),
+    ]
+
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    export_type = models.CharField(max_length=20, choices=EXPORT_TYPES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='PENDING')
+
+    # Control del worker
+    attempts = models.PositiveIntegerField(default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+
+    # Resultado
+    file = models.FileField(upload_to=export_upload_to, storage=export_storage, blank=True)
+    filename = models.CharField(max_length=200, blank=True)
+    rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Exportación"
+        verbose_name_plural = "Exportaciones"
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['requested_by', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_export_type_display()} - {self.requested_by} - {self.get_status_display()}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('DONE', 'FAILED')
+
+
 # ============================================================================
 # MODELOS PARA SISTEMA DE TURNOS Y HORARIOS - EURO SECURITY
 # Actualizado: 2025-09-26 - Sistema profesional de gestión de turnos
@@ -7,7 +7,9 @@ from django.contrib.auth.models import User
 from employees.models import Employee
 from core.models import BaseModel
 from django.utils import timezone
+import hashlib
 import math
+import secrets
 
 class WorkArea(BaseModel):
     """Áreas de trabajo definidas geográficamente"""
@@ -160,6 +162,9 @@ class GPSTracking(BaseModel):
     # Estado
     is_active_session = models.BooleanField('Sesión Activa', default=True)
     
+    # Identificador generado por el dispositivo (deduplicación de reenvíos offline)
+    client_id = models.CharField('ID del Cliente', max_length=64, null=True, blank=True, editable=False)
+    
     class Meta:
         verbose_name = 'Rastreo GPS'
         verbose_name_plural = 'Rastreos GPS'
@@ -168,6 +173,15 @@ class GPSTracking(BaseModel):
             models.Index(fields=['employee', '-timestamp']),
             models.Index(fields=['work_area', '-timestamp']),
             models.Index(fields=['is_active_session', '-timestamp']),
+            # Recorrido por ventanas de tiempo al compactar (ver gps_storage.py)
+            models.Index(fields=['timestamp'], name='attendance_gps_ts_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['employee', 'client_id'],
+                condition=models.Q(client_id__isnull=False),
+                name='unique_gps_client_id_per_employee',
+            ),
         ]
     
     def __str__(self):
@@ -175,30 +189,15 @@ class GPSTracking(BaseModel):
     
     def save(self, *args, **kwargs):
         """Verificar automáticamente si está dentro del área de trabajo"""
-        if not self.work_area:
-            # Buscar el área de trabajo más cercana del empleado
-            employee_areas = EmployeeWorkArea.objects.filter(
-                employee=self.employee,
-                is_active=True
-            ).select_related('work_area')
-            
-            closest_area = None
-            min_distance = float('inf')
-            
-            for emp_area in employee_areas:
-                distance = emp_area.work_area.calculate_distance(self.latitude, self.longitude)
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_area = emp_area.work_area
-            
-            if closest_area:
-                self.work_area = closest_area
-                self.distance_to_work_area = min_distance
-                self.is_within_work_area = closest_area.is_within_area(
-                    self.latitude, 
-                    self.longitude,
-                    tolerance_meters=employee_areas.filter(work_area=closest_area).first().tolerance_meters
-                )
+        if not self.work_area_id and self.employee_id:
+            # Área asignada más cercana desde el índice de geocercas en memoria
+            from .geofence import geofence_index
+
+            match = geofence_index.locate_for_employee(self.employee_id, self.latitude, self.longitude)
+            if match:
+                self.work_area = match.area
+                self.distance_to_work_area = match.distance
+                self.is_within_work_area = match.inside
         
         super().save(*args, **kwargs)
 
@@ -246,3 +245,151 @@ class LocationAlert(BaseModel):
     
     def __str__(self):
         return f"{self.get_alert_type_display()} - {self.employee.get_full_name()}"
+
+
+class EmployeeLastPosition(models.Model):
+    """
+    Última posición conocida por empleado (tabla desnormalizada)
+    
+    Se actualiza en cada inserción de GPSTracking (ver live_positions.py) para
+    que los mapas en vivo lean toda la flota en una sola consulta.
+    """
+    
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, primary_key=True, related_name='last_position')
+    gps_tracking = models.ForeignKey(GPSTracking, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    # Copia del último punto
+    latitude = models.DecimalField('Latitud', max_digits=10, decimal_places=8)
+    longitude = models.DecimalField('Longitud', max_digits=11, decimal_places=8)
+    accuracy = models.FloatField('Precisión GPS (metros)', null=True, blank=True)
+    battery_level = models.IntegerField('Nivel de Batería (%)', null=True, blank=True)
+    tracking_type = models.CharField('Tipo de Rastreo', max_length=20, choices=GPSTracking.TRACKING_TYPES, default='AUTO')
+    timestamp = models.DateTimeField('Fecha y Hora', db_index=True)
+    is_active_session = models.BooleanField('Sesión Activa', default=True)
+    
+    work_area = models.ForeignKey(WorkArea, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    is_within_work_area = models.BooleanField('Dentro del Área', default=False)
+    distance_to_work_area = models.FloatField('Distancia al Área (metros)', null=True, blank=True)
+    
+    # Última foto de seguridad del empleado
+    last_photo = models.ForeignKey('attendance.SecurityPhoto', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_photo_at = models.DateTimeField('Fecha Última Foto', null=True, blank=True)
+    
+    # Se usa como versión para el ETag de las APIs de mapa
+    updated_at = models.DateTimeField('Última Actualización', default=timezone.now, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Última Posición'
+        verbose_name_plural = 'Últimas Posiciones'
+    
+    def __str__(self):
+        return f"{self.employee.get_full_name()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class GPSTrackRollup(models.Model):
+    """
+    Resumen de puntos GPS por empleado y minuto u hora
+    
+    Los puntos crudos más antiguos que GPS_RAW_RETENTION_DAYS se compactan en
+    resúmenes por minuto y éstos, pasado GPS_MINUTE_ROLLUP_RETENTION_DAYS, en
+    resúmenes por hora (ver gps_storage.py). El recorrido se guarda como
+    polilínea codificada con los segundos desde bucket_start de cada punto.
+    """
+    
+    RESOLUTIONS = [
+        ('MINUTE', 'Minuto'),
+        ('HOUR', 'Hora'),
+    ]
+    
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='gps_rollups')
+    resolution = models.CharField('Resolución', max_length=10, choices=RESOLUTIONS)
+    bucket_start = models.DateTimeField('Inicio del Intervalo')
+    
+    first_timestamp = models.DateTimeField('Primer Punto')
+    last_timestamp = models.DateTimeField('Último Punto')
+    point_count = models.PositiveIntegerField('Puntos Originales')
+    
+    # Centroide y caja envolvente
+    latitude = models.DecimalField('Latitud Media', max_digits=10, decimal_places=8)
+    longitude = models.DecimalField('Longitud Media', max_digits=11, decimal_places=8)
+    min_latitude = models.DecimalField('Latitud Mínima', max_digits=10, decimal_places=8)
+    max_latitude = models.DecimalField('Latitud Máxima', max_digits=10, decimal_places=8)
+    min_longitude = models.DecimalField('Longitud Mínima', max_digits=11, decimal_places=8)
+    max_longitude = models.DecimalField('Longitud Máxima', max_digits=11, decimal_places=8)
+    avg_accuracy = models.FloatField('Precisión Media (metros)', null=True, blank=True)
+    distance_meters = models.FloatField('Distancia Recorrida (metros)', default=0)
+    
+    # Área predominante y puntos dentro de un área
+    work_area = models.ForeignKey(WorkArea, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    within_area_count = models.PositiveIntegerField('Puntos Dentro del Área', default=0)
+    
+    # Recorrido comprimido
+    encoded_track = models.TextField('Recorrido (polilínea)')
+    encoded_offsets = models.TextField('Segundos desde el inicio (codificados)')
+    
+    created_at = models.DateTimeField('Fecha de Creación', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Resumen de Rastreo GPS'
+        verbose_name_plural = 'Resúmenes de Rastreo GPS'
+        ordering = ['-bucket_start']
+        indexes = [
+            models.Index(fields=['resolution', 'bucket_start']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['employee', 'resolution', 'bucket_start'],
+                name='unique_gps_rollup_per_bucket',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee.get_full_name()} - {self.get_resolution_display()} {self.bucket_start.strftime('%Y-%m-%d %H:%M')}"
+
+
+class AttendanceKiosk(BaseModel):
+    """
+    Tablet fija en un área de trabajo para marcar asistencia por rostro
+    
+    El kiosco se autentica con un token propio (no con la sesión de un
+    guardia) y solo identifica a los empleados asignados a su área. Del token
+    se guarda únicamente su hash SHA-256; el valor se muestra una sola vez al
+    emitirlo (manage.py issue_kiosk_token).
+    """
+    
+    TOKEN_PREFIX_LENGTH = 8
+    
+    name = models.CharField('Nombre', max_length=100)
+    work_area = models.ForeignKey(WorkArea, on_delete=models.CASCADE, related_name='kiosks')
+    token_hash = models.CharField('Hash del Token', max_length=64, unique=True, editable=False)
+    token_prefix = models.CharField('Prefijo del Token', max_length=TOKEN_PREFIX_LENGTH, editable=False)
+    is_active = models.BooleanField('Activo', default=True)
+    last_seen_at = models.DateTimeField('Última Conexión', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Kiosco de Marcación'
+        verbose_name_plural = 'Kioscos de Marcación'
+        ordering = ['work_area__name', 'name']
+    
+    def __str__(self):
+        return f"{self.name} - {self.work_area.name}"
+    
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    def set_new_token(self):
+        """Genera un token nuevo (invalida el anterior) y lo retorna en claro"""
+        token = secrets.token_urlsafe(32)
+        self.token_hash = self.hash_token(token)
+        self.token_prefix = token[:self.TOKEN_PREFIX_LENGTH]
+        return token
+    
+    @classmethod
+    def authenticate(cls, token):
+        """Kiosco activo (con su área) correspondiente al token, o None"""
+        if not token:
+            return None
+        return cls.objects.select_related('work_area').filter(
+            token_hash=cls.hash_token(token), is_active=True
+        ).first()
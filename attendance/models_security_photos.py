@@ -1,12 +1,15 @@
 """
 Modelos para Sistema de Fotos de Seguridad con IA
 """
+import logging
 
 from django.db import models
 from django.utils import timezone
 from employees.models import Employee
 from .models_gps import WorkArea
 
+logger = logging.getLogger(__name__)
+
 
 class BaseModel(models.Model):
     """Modelo base abstracto"""
@@ -37,6 +40,8 @@ class SecurityPhoto(BaseModel):
     # Foto
     photo = models.ImageField('Foto', upload_to='security_photos/%Y/%m/%d/', storage=None)
     thumbnail = models.ImageField('Miniatura', upload_to='security_photos/thumbnails/%Y/%m/%d/', null=True, blank=True)
+    preview = models.ImageField('Vista Previa', upload_to='security_photos/previews/%Y/%m/%d/', null=True, blank=True)
+    analysis_image = models.ImageField('Imagen para IA', upload_to='security_photos/analysis/%Y/%m/%d/', null=True, blank=True)
     
     # Ubicación
     latitude = models.DecimalField('Latitud', max_digits=10, decimal_places=8, null=True, blank=True)
@@ -80,55 +85,22 @@ class SecurityPhoto(BaseModel):
     
     def analyze_with_ai(self):
         """Analizar foto con todos los servicios de IA"""
-        from .ai_services import roboflow_service, facepp_service
+        from .ai_analysis import ai_analysis_engine, merge_results
         
         try:
-            # Leer imagen
-            with self.photo.open('rb') as f:
+            # Leer imagen una sola vez (versión reducida si ya existe)
+            source = self.analysis_image or self.photo
+            with source.open('rb') as f:
                 image_bytes = f.read()
             
-            results = {
-                'weapons': [],
-                'vehicles': [],
-                'ppe': [],
-                'persons': [],
-                'face_attributes': None,
-                'analyzed_at': timezone.now().isoformat()
-            }
-            
-            # 1. Detectar armas
-            weapons_result = roboflow_service.detect_weapons(image_bytes)
-            if weapons_result.get('predictions'):
-                results['weapons'] = weapons_result['predictions']
-                if len(results['weapons']) > 0:
-                    self.has_alerts = True
-                    self.alert_level = 'CRITICAL'
-            
-            # 2. Detectar vehículos
-            vehicles_result = roboflow_service.detect_vehicles(image_bytes)
-            if vehicles_result.get('predictions'):
-                results['vehicles'] = vehicles_result['predictions']
-            
-            # 3. Detectar EPP
-            ppe_result = roboflow_service.detect_ppe(image_bytes)
-            if ppe_result.get('predictions'):
-                results['ppe'] = ppe_result['predictions']
-                # Verificar si falta EPP
-                for pred in results['ppe']:
-                    if 'no-' in pred.get('class', '').lower():
-                        self.has_alerts = True
-                        if self.alert_level == 'NONE':
-                            self.alert_level = 'MEDIUM'
+            # Armas, vehículos, EPP, personas y análisis facial en paralelo
+            raw_results = ai_analysis_engine.run(image_bytes, scope=f'employee:{self.employee_id}')
+            results, has_alerts, alert_level = merge_results(raw_results, timezone.now().isoformat())
             
-            # 4. Detectar personas
-            persons_result = roboflow_service.detect_persons(image_bytes)
-            if persons_result.get('predictions'):
-                results['persons'] = persons_result['predictions']
-            
-            # 5. Análisis facial
-            face_attrs = facepp_service.analyze_face_attributes(image_bytes)
-            if face_attrs:
-                results['face_attributes'] = face_attrs
+            if has_alerts:
+                self.has_alerts = True
+                if alert_level == 'CRITICAL' or self.alert_level == 'NONE':
+                    self.alert_level = alert_level
             
             # Guardar resultados
             self.ai_results = results
@@ -169,42 +141,21 @@ class SecurityPhoto(BaseModel):
             )
     
     def save(self, *args, **kwargs):
-        """Crear thumbnail al guardar"""
+        """Crear versiones derivadas al guardar"""
         super().save(*args, **kwargs)
         
-        # Crear thumbnail si no existe
+        # Crear miniatura, vista previa e imagen para IA si no existen
         if self.photo and not self.thumbnail:
-            self.create_thumbnail()
+            self.create_derivatives()
     
-    def create_thumbnail(self):
-        """Crear miniatura de la foto"""
+    def create_derivatives(self):
+        """Crear miniatura, vista previa e imagen para IA (ver image_derivatives.py)"""
+        from .image_derivatives import save_derivatives
+        
         try:
-            from PIL import Image
-            from io import BytesIO
-            from django.core.files.uploadedfile import InMemoryUploadedFile
-            import sys
-            
-            # Abrir imagen
-            img = Image.open(self.photo)
-            
-            # Redimensionar
-            img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-            
-            # Guardar en memoria
-            thumb_io = BytesIO()
-            img.save(thumb_io, format='JPEG', quality=85)
-            thumb_io.seek(0)
-            
-            # Crear archivo
-            thumb_file = InMemoryUploadedFile(
-                thumb_io, None, f'thumb_{self.photo.name}',
-                'image/jpeg', sys.getsizeof(thumb_io), None
-            )
-            
-            self.thumbnail.save(f'thumb_{self.photo.name}', thumb_file, save=True)
-            
+            save_derivatives(self, 'photo')
         except Exception as e:
-            print(f"❌ Error creando thumbnail: {str(e)}")
+            logger.error(f"❌ Error creando derivados de la foto {self.id}: {str(e)}")
 
 
 class SecurityAlert(BaseModel):
@@ -343,3 +294,113 @@ class VideoSession(BaseModel):
             duration = (self.ended_at - self.started_at).total_seconds()
             self.duration_seconds = int(duration)
         self.save()
+
+
+class AIAnalysisJob(BaseModel):
+    """
+    Análisis de IA pendiente de una foto de seguridad (cola en base de datos)
+    
+    capture_security_photo solo guarda la foto y esta fila; un worker (ver
+    ai_queue.py) ejecuta los detectores y genera las SecurityAlert.
+    """
+    
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('PROCESSING', 'Procesando'),
+        ('DONE', 'Completado'),
+        ('FAILED', 'Fallido'),
+    ]
+    
+    # Carriles de prioridad: menor valor se procesa antes
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 10
+    PRIORITY_LOW = 20
+    PRIORITY_CHOICES = [
+        (PRIORITY_HIGH, 'Alta'),
+        (PRIORITY_NORMAL, 'Normal'),
+        (PRIORITY_LOW, 'Baja'),
+    ]
+    
+    photo = models.ForeignKey(SecurityPhoto, on_delete=models.CASCADE, related_name='ai_jobs')
+    status = models.CharField('Estado', max_length=12, choices=STATUS_CHOICES, default='PENDING')
+    priority = models.PositiveSmallIntegerField('Prioridad', choices=PRIORITY_CHOICES, default=PRIORITY_NORMAL)
+    run_after = models.DateTimeField('Ejecutar Después de', default=timezone.now)
+    
+    # Control del worker
+    attempts = models.PositiveIntegerField('Intentos', default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    
+    # Resultado
+    alerts_created = models.PositiveIntegerField('Alertas Generadas', default=0)
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Análisis IA en Cola'
+        verbose_name_plural = 'Análisis IA en Cola'
+        ordering = ['priority', 'run_after']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after']),
+            models.Index(fields=['photo', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"Foto #{self.photo_id} - {self.get_priority_display()} - {self.get_status_display()}"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('DONE', 'FAILED')
+
+
+class AIResultCache(models.Model):
+    """
+    Resultado de un detector de IA para una imagen (caché compartida)
+    
+    La clave es el hash perceptual de la imagen y el modelo, así que reenvíos
+    de la misma foto no repiten la inferencia remota (ver ai_cache.py).
+    """
+    
+    model_key = models.CharField('Modelo', max_length=150)
+    image_hash = models.CharField('Hash Perceptual', max_length=16)
+    # Ámbito de la foto (empleado): los casi-duplicados no cruzan ámbitos
+    scope = models.CharField('Ámbito', max_length=50, blank=True, default='')
+    result = models.JSONField('Resultado', default=dict)
+    hits = models.PositiveIntegerField('Aciertos', default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Caché de Resultado IA'
+        verbose_name_plural = 'Caché de Resultados IA'
+        constraints = [
+            models.UniqueConstraint(fields=['model_key', 'image_hash'], name='unique_ai_result_per_model_hash'),
+        ]
+        indexes = [
+            models.Index(fields=['model_key', '-created_at']),
+            models.Index(fields=['model_key', 'scope', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.model_key} - {self.image_hash}"
+
+
+class AIResultCacheStats(models.Model):
+    """Contadores de aciertos y fallos de la caché de IA por modelo"""
+    
+    model_key = models.CharField('Modelo', max_length=150, unique=True)
+    hits = models.PositiveBigIntegerField('Aciertos', default=0)
+    misses = models.PositiveBigIntegerField('Fallos', default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Estadística de Caché IA'
+        verbose_name_plural = 'Estadísticas de Caché IA'
+    
+    def __str__(self):
+        return f"{self.model_key}: {self.hits} aciertos / {self.misses} fallos"
+    
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
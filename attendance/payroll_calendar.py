@@ -0,0 +1,185 @@
+"""
+Matriz de calendario para la nómina mensual
+EURO SECURITY - Payroll Calendar
+
+monthly_payroll_report consultaba EmployeeShiftAssignment y
+AttendanceSummary por cada empleado y cada día del mes (~60 consultas por
+empleado, más de 6.000 para un departamento de 100 guardias). El constructor:
+
+- Trae todas las asignaciones activas que se solapan con el mes en una sola
+  consulta y todos los resúmenes del mes en otra.
+- Resuelve qué asignación cubre cada día en memoria, recortando cada
+  intervalo [start_date, end_date] al mes. Si varias asignaciones cubren
+  el mismo día gana la más reciente (-created_at, el orden que declara
+  EmployeeShiftAssignment) y a igual created_at la de mayor id: la nueva
+  asignación reemplaza a la anterior en los días que se solapan. La consulta
+  por día original usaba .first() y, como el segundo Meta del modelo anula
+  ese orden, resolvía por id.
+
+La misma matriz alimenta la vista HTML y la exportación CSV/Excel.
+"""
+import calendar
+from datetime import date
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AttendanceSummary, EmployeeShiftAssignment
+
+
+MONTH_NAMES = [
+    '', 'ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO',
+    'JULIO', 'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE'
+]
+DEFAULT_SHIFT_COLOR = '#f3f4f6'  # Gris por defecto
+
+
+def _shift_display(shift):
+    """Código, color y nombre con que se muestra un turno en el calendario"""
+    template = shift.work_schedule.shift_template
+
+    # Usar código de turno si existe, si no la primera letra del nombre del turno
+    if getattr(template, 'shift_code', None):
+        code = template.shift_code
+    else:
+        code = shift.name[:1].upper()
+
+    if getattr(template, 'color', None):
+        color = template.color
+    elif shift.color:
+        color = shift.color
+    else:
+        color = DEFAULT_SHIFT_COLOR
+
+    return code, color, template.name
+
+
+def _coverage(assignments, first_day, days_in_month):
+    """
+    Asignación que cubre cada día del mes (None si ninguna)
+
+    Las asignaciones deben venir de la más reciente a la más antigua: cada
+    una solo ocupa los días que las anteriores dejaron libres.
+    """
+    covering = [None] * days_in_month
+    free = days_in_month
+    for assignment in assignments:
+        start = max((assignment.start_date - first_day).days, 0)
+        end = days_in_month - 1
+        if assignment.end_date is not None:
+            end = min((assignment.end_date - first_day).days, end)
+        for index in range(start, end + 1):
+            if covering[index] is None:
+                covering[index] = assignment
+                free -= 1
+        if not free:
+            break
+    return covering
+
+
+def build_payroll_calendar(employees, year, month, today=None):
+    """
+    Construye la matriz empleados × días del mes
+
+    Args:
+        employees: iterable de Employee (en el orden de las filas)
+        year, month: mes del reporte
+        today: fecha de referencia para marcar ausencias (por defecto hoy)
+
+    Returns:
+        dict con days_list, employees_data (lista de {'employee', 'days',
+        'stats'}), first_day, last_day y month_name
+    """
+    today = today or timezone.localdate()
+    employees = list(employees)
+    days_in_month = calendar.monthrange(year, month)[1]
+    first_day = date(year, month, 1)
+    last_day = date(year, month, days_in_month)
+    employee_ids = [employee.id for employee in employees]
+
+    # 1 consulta: asignaciones activas que se solapan con el mes
+    assignments_by_employee = {employee_id: [] for employee_id in employee_ids}
+    assignments = EmployeeShiftAssignment.objects.filter(
+        employee_id__in=employee_ids,
+        status='ACTIVE',
+        start_date__lte=last_day,
+    ).filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=first_day)
+    ).select_related('shift', 'shift__work_schedule__shift_template').order_by('-created_at', '-id')
+    for assignment in assignments:
+        assignments_by_employee[assignment.employee_id].append(assignment)
+
+    # 1 consulta: resúmenes del mes (sin el orden por defecto, que hace JOIN con empleados)
+    summaries = {
+        (employee_id, summary_date): (is_present, is_late)
+        for employee_id, summary_date, is_present, is_late in AttendanceSummary.objects.filter(
+            employee_id__in=employee_ids,
+            date__range=(first_day, last_day),
+        ).order_by().values_list('employee_id', 'date', 'is_present', 'is_late')
+    }
+
+    shift_displays = {}
+    employees_data = []
+
+    for employee in employees:
+        covering = _coverage(assignments_by_employee[employee.id], first_day, days_in_month)
+        days = []
+
+        for index, assignment in enumerate(covering):
+            current_date = date(year, month, index + 1)
+            day_info = {
+                'day': index + 1,
+                'date': current_date,
+                'shift_code': None,
+                'shift_color': DEFAULT_SHIFT_COLOR,
+                'shift_name': '',
+                'present': False,
+                'late': False,
+                'absent': False,
+            }
+
+            if assignment is not None:
+                if assignment.shift_id not in shift_displays:
+                    shift_displays[assignment.shift_id] = _shift_display(assignment.shift)
+                day_info['shift_code'], day_info['shift_color'], day_info['shift_name'] = shift_displays[assignment.shift_id]
+
+            # Información de asistencia
+            attendance = summaries.get((employee.id, current_date))
+            if attendance is not None:
+                day_info['present'], day_info['late'] = attendance
+                day_info['absent'] = not attendance[0]
+            elif assignment is not None and current_date < today:
+                # Si hay turno asignado pero no hay registro y ya pasó la fecha
+                day_info['absent'] = True
+
+            days.append(day_info)
+
+        employees_data.append({
+            'employee': employee,
+            'days': days,
+            'stats': {
+                'total_days': sum(1 for day in days if day['shift_code']),
+                'days_present': sum(1 for day in days if day['present']),
+                'days_late': sum(1 for day in days if day['late']),
+                'days_absent': sum(1 for day in days if day['absent']),
+            },
+        })
+
+    return {
+        'days_list': list(range(1, days_in_month + 1)),
+        'employees_data': employees_data,
+        'first_day': first_day,
+        'last_day': last_day,
+        'month_name': MONTH_NAMES[month],
+    }
+
+
+def day_status(day_info):
+    """Letra de estado de un día para las exportaciones (P, T, A o vacío)"""
+    if day_info['present']:
+        return 'P'
+    if day_info['late']:
+        return 'T'
+    if day_info['absent']:
+        return 'A'
+    return ''
@@ -2,74 +2,45 @@
 Sistema de permisos para asistencias
 EURO SECURITY - Attendance Permissions
 """
-from django.db.models import Q
+from core.permission_scope import get_scope
 from employees.models import Employee
 from departments.models import Department
 
 class AttendancePermissions:
-    """Manejo de permisos para visualización de asistencias"""
+    """
+    Manejo de permisos para visualización de asistencias
+    
+    Los conjuntos visibles se resuelven una vez por usuario y se guardan en
+    la caché de alcance de permisos (core/permission_scope.py).
+    """
     
     @staticmethod
     def get_viewable_employees(user):
         """
         Retorna los empleados cuyas asistencias puede ver el usuario
         según su nivel jerárquico
+        
+        DIRECTOR ve todos, MANAGER su departamento y subordinados, LEAD su
+        equipo directo, SENIOR los junior de su departamento y el resto solo
+        a sí mismo.
         """
         # SUPERUSUARIOS: Acceso completo automático
         if user.is_superuser or user.is_staff:
             return Employee.objects.all()
-            
-        try:
-            employee = Employee.objects.get(user=user)
-            level = employee.position.level
-            
-            # DIRECTOR - Ve todos los empleados
-            if level == 'full':
-                return Employee.objects.all()
-            
-            # MANAGER - Ve su departamento y subordinados
-            elif level == 'management':
-                # Empleados del mismo departamento
-                same_dept = Employee.objects.filter(department=employee.department)
-                
-                # Empleados de departamentos subordinados (si los hay)
-                subordinate_depts = Department.objects.filter(
-                    parent_department=employee.department
-                )
-                subordinate_employees = Employee.objects.filter(
-                    department__in=subordinate_depts
-                )
-                
-                return same_dept.union(subordinate_employees)
-            
-            # LEAD/SUPERVISOR - Ve su equipo directo
-            elif level == 'supervisor':
-                # Empleados del mismo departamento con nivel inferior
-                return Employee.objects.filter(
-                    department=employee.department,
-                    position__level__in=['advanced', 'standard', 'basic']
-                )
-            
-            # SENIOR - Ve empleados junior del mismo departamento
-            elif level == 'advanced':
-                return Employee.objects.filter(
-                    department=employee.department,
-                    position__level__in=['standard', 'basic']
-                )
-            
-            # JUNIOR/ENTRY - Solo se ve a sí mismo
-            else:
-                return Employee.objects.filter(id=employee.id)
-                
-        except Employee.DoesNotExist:
-            # Si no es empleado, no ve nada
-            return Employee.objects.none()
+        
+        employee_ids = get_scope(user).attendance_employee_ids
+        if employee_ids is None:
+            return Employee.objects.all()
+        return Employee.objects.filter(id__in=employee_ids)
     
     @staticmethod
     def can_view_employee_attendance(user, target_employee):
         """Verifica si el usuario puede ver la asistencia de un empleado específico"""
-        viewable_employees = AttendancePermissions.get_viewable_employees(user)
-        return target_employee in viewable_employees
+        if user.is_superuser or user.is_staff:
+            return True
+        
+        employee_ids = get_scope(user).attendance_employee_ids
+        return employee_ids is None or target_employee.pk in employee_ids
     
     @staticmethod
     def get_viewable_departments(user):
@@ -77,43 +48,12 @@ class AttendancePermissions:
         # SUPERUSUARIOS: Acceso completo automático
         if user.is_superuser or user.is_staff:
             return Department.objects.all()
-            
-        try:
-            employee = Employee.objects.get(user=user)
-            
-            # EXCEPCIÓN: Jefa de Operaciones puede ver Control de Calidad
-            if employee.employee_id == 'EMP13807414':
-                # Mayra Alejandra Espinoza Ponce - Jefa de Operaciones
-                # Puede ver Operaciones + Control de Calidad
-                return Department.objects.filter(
-                    code__in=['OPE', 'CC']  # OPE = Operaciones, CC = Control de Calidad
-                )
-            
-            level = employee.position.level
-            
-            # DIRECTOR - Ve todos los departamentos
-            if level == 'full':
-                return Department.objects.all()
-            
-            # MANAGER - Ve su departamento y subordinados
-            elif level == 'management':
-                departments = [employee.department]
-                subordinate_depts = Department.objects.filter(
-                    parent_department=employee.department
-                )
-                departments.extend(list(subordinate_depts))
-                return Department.objects.filter(id__in=[d.id for d in departments])
-            
-            # LEAD/SUPERVISOR/SENIOR - Solo su departamento
-            elif level in ['supervisor', 'advanced']:
-                return Department.objects.filter(id=employee.department.id)
-            
-            # JUNIOR/ENTRY - No ve departamentos completos
-            else:
-                return Department.objects.none()
-                
-        except Employee.DoesNotExist:
-            return Department.objects.none()
+        
+        # Incluye la excepción de la Jefa de Operaciones (Operaciones + Control de Calidad)
+        department_ids = get_scope(user).attendance_department_ids
+        if department_ids is None:
+            return Department.objects.all()
+        return Department.objects.filter(id__in=department_ids)
     
     @staticmethod
     def can_view_location_maps(user):
@@ -121,14 +61,9 @@ class AttendancePermissions:
         # SUPERUSUARIOS: Acceso automático
         if user.is_superuser or user.is_staff:
             return True
-            
-        try:
-            employee = Employee.objects.get(user=user)
-            level = employee.position.level
-            # Solo DIRECTOR, MANAGER y LEAD pueden ver mapas
-            return level in ['full', 'management', 'supervisor']
-        except Employee.DoesNotExist:
-            return False
+        
+        # Solo DIRECTOR, MANAGER y LEAD pueden ver mapas
+        return get_scope(user).position_level in ['full', 'management', 'supervisor']
     
     @staticmethod
     def can_export_reports(user):
@@ -136,14 +71,9 @@ class AttendancePermissions:
         # SUPERUSUARIOS: Acceso automático
         if user.is_superuser or user.is_staff:
             return True
-            
-        try:
-            employee = Employee.objects.get(user=user)
-            level = employee.position.level
-            # Solo DIRECTOR y MANAGER pueden exportar
-            return level in ['full', 'management']
-        except Employee.DoesNotExist:
-            return False
+        
+        # Solo DIRECTOR y MANAGER pueden exportar
+        return get_scope(user).position_level in ['full', 'management']
     
     @staticmethod
     def get_permission_level(user):
@@ -153,12 +83,11 @@ class AttendancePermissions:
             return 'superuser'
         if user.is_staff:
             return 'staff'
-            
-        try:
-            employee = Employee.objects.get(user=user)
-            return employee.position.level
-        except Employee.DoesNotExist:
+        
+        scope = get_scope(user)
+        if scope.employee_id is None:
             return 'none'
+        return scope.position_level
     
     @staticmethod
     def get_permission_description(user):
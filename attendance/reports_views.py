@@ -2,9 +2,10 @@
 Vistas para reportes de asistencia y mapas
 EURO SECURITY - Attendance Reports & Maps
 """
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse, HttpResponseForbidden
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, FileResponse, Http404
 from django.db.models import Count, Avg, Q
 from django.utils import timezone
 from django.conf import settings
@@ -12,11 +13,13 @@ from datetime import datetime, date, timedelta
 import json
 
 from core.permissions import employee_required
-from .models import AttendanceRecord, AttendanceSummary
+from .models import AttendanceRecord, AttendanceSummary, ExportJob
 from .permissions import AttendancePermissions, attendance_permission_required
 from employees.models import Employee
 from departments.models import Department
 from .models import EmployeeShiftAssignment, WorkSchedule, Shift
+from .payroll_calendar import build_payroll_calendar, day_status
+from . import exports
 import calendar
 
 @login_required
@@ -167,12 +170,16 @@ def attendance_locations_map(request):
     print(f"🔍 MAPA DEBUG - Es superusuario: {request.user.is_superuser}")
     print(f"🔍 MAPA DEBUG - Fecha filtro: {date_filter}")
     
-    # Contar todos los registros GPS sin filtro de fecha
-    total_gps_records = GPSTracking.objects.count()
-    print(f"🔍 MAPA DEBUG - Total registros GPS en BD: {total_gps_records}")
+    # Total aproximado (estadísticas de la tabla): un COUNT(*) recorre millones de filas
+    from .gps_storage import approximate_count
+    total_gps_records = approximate_count(GPSTracking)
+    print(f"🔍 MAPA DEBUG - Total registros GPS en BD (aprox.): {total_gps_records}")
     
-    # Contar registros GPS de hoy
-    today_records = GPSTracking.objects.filter(timestamp__date=timezone.now().date()).count()
+    # Contar registros GPS del día por rango (usa el índice de timestamp)
+    today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+    today_records = GPSTracking.objects.filter(
+        timestamp__gte=today_start, timestamp__lt=today_start + timedelta(days=1)
+    ).count()
     print(f"🔍 MAPA DEBUG - Registros GPS de hoy: {today_records}")
     
     # Filtrar por empleados visibles (incluyendo registros sin empleado para superusuarios)
@@ -314,12 +321,12 @@ def attendance_locations_api(request):
 @employee_required
 @attendance_permission_required('management')
 def export_attendance_report(request):
-    """Exportar reporte de asistencias (solo para MANAGER y DIRECTOR)"""
-    import csv
-    from django.http import HttpResponse
-    
-    viewable_employees = AttendancePermissions.get_viewable_employees(request.user)
+    """
+    Exportar reporte de asistencias (solo para MANAGER y DIRECTOR)
     
+    El CSV se envía en streaming; los rangos con más de
+    EXPORT_ASYNC_THRESHOLD_ROWS filas (o ?async=1) se preparan en segundo plano.
+    """
     # Filtros
     start_date = request.GET.get('start_date', timezone.now().date().replace(day=1))
     end_date = request.GET.get('end_date', timezone.now().date())
@@ -329,167 +336,178 @@ def export_attendance_report(request):
     if isinstance(end_date, str):
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
-    # Crear respuesta CSV
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="asistencias_{start_date}_{end_date}.csv"'
+    filename = f"asistencias_{start_date}_{end_date}.csv"
     
-    writer = csv.writer(response)
-    writer.writerow([
-        'Empleado', 'Departamento', 'Fecha', 'Primera Entrada', 'Última Salida',
-        'Horas Trabajadas', 'Presente', 'Tarde', 'Salida Temprana'
-    ])
+    if request.GET.get('async') == '1' or exports.should_prepare_async(
+        exports.attendance_queryset(request.user, start_date, end_date).count()
+    ):
+        job = exports.enqueue_export(
+            request.user, 'ATTENDANCE',
+            params={'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()},
+            filename=filename,
+        )
+        return redirect('attendance:export_job_status', job_id=job.id)
     
-    summaries = AttendanceSummary.objects.filter(
-        employee__in=viewable_employees,
-        date__range=[start_date, end_date]
-    ).select_related('employee', 'employee__department').order_by('employee__first_name', 'date')
-    
-    for summary in summaries:
-        writer.writerow([
-            summary.employee.get_full_name(),
-            summary.employee.department.name if summary.employee.department else 'Sin departamento',
-            summary.date.strftime('%Y-%m-%d'),
-            summary.first_entry.strftime('%H:%M:%S') if summary.first_entry else '',
-            summary.last_exit.strftime('%H:%M:%S') if summary.last_exit else '',
-            summary.get_work_hours_display(),
-            'Sí' if summary.is_present else 'No',
-            'Sí' if summary.is_late else 'No',
-            'Sí' if summary.is_early_exit else 'No',
-        ])
+    return exports.streaming_csv_response(exports.attendance_sheet(request.user, start_date, end_date), filename)
+
+
+@login_required
+def export_job_status(request, job_id):
+    """Estado de una exportación preparada en segundo plano (HTML o JSON)"""
+    job = get_object_or_404(ExportJob, id=job_id, requested_by=request.user)
     
-    return response
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': job.id,
+            'status': job.status,
+            'status_display': job.get_status_display(),
+            'rows': job.rows,
+            'error': job.error,
+            'download_url': reverse('attendance:download_export', args=[job.id]) if job.status == 'DONE' else None,
+        })
+    
+    return render(request, 'attendance/export_job.html', {'job': job})
 
 
 @login_required
-@employee_required
-@attendance_permission_required('supervisor')
-def monthly_payroll_report(request, department_id):
-    """
-    Reporte mensual tipo nómina con calendario y códigos de turno coloreados
-    Formato: Empleados en filas, días del mes en columnas
-    """
+def download_export(request, job_id):
+    """Descarga el archivo de una exportación lista (solo para quien la pidió)"""
+    job = get_object_or_404(ExportJob, id=job_id, requested_by=request.user, status='DONE')
+    if not job.file:
+        raise Http404('La exportación no tiene archivo')
+    
+    content_type = 'text/csv' if job.filename.endswith('.csv') else exports.XLSX_CONTENT_TYPE
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename, content_type=content_type)
+
+
+def _payroll_department_and_month(request, department_id):
+    """Departamento (con permisos verificados) y mes pedidos para la nómina mensual"""
     department = get_object_or_404(Department, id=department_id)
     
     # Verificar permisos
     if not (request.user.is_superuser or request.user.is_staff):
         viewable_departments = AttendancePermissions.get_viewable_departments(request.user)
         if department not in viewable_departments:
-            return HttpResponseForbidden("No tienes permisos para ver este departamento")
+            return department, None, None
     
     # Obtener mes y año de los parámetros o usar actual
     today = timezone.now().date()
     month = int(request.GET.get('month', today.month))
     year = int(request.GET.get('year', today.year))
-    
-    # Calcular primer y último día del mes
-    first_day = date(year, month, 1)
-    last_day = date(year, month, calendar.monthrange(year, month)[1])
-    
-    # Obtener empleados del departamento activos
+    return department, year, month
+
+
+def _payroll_calendar(department, year, month):
+    """Matriz de la nómina con los empleados activos del departamento"""
     employees = Employee.objects.filter(
         department=department,
         is_active=True
-    ).order_by('first_name', 'last_name')
-    
-    # Nombres de meses en español
-    month_names = [
-        '', 'ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO',
-        'JULIO', 'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE'
-    ]
-    
-    # Generar lista de días del mes
-    days_in_month = calendar.monthrange(year, month)[1]
-    days_list = list(range(1, days_in_month + 1))
+    ).select_related('position').order_by('first_name', 'last_name')
     
-    # Construir datos para cada empleado
-    employees_data = []
+    return build_payroll_calendar(employees, year, month, today=timezone.now().date())
+
+
+@login_required
+@employee_required
+@attendance_permission_required('supervisor')
+def monthly_payroll_report(request, department_id):
+    """
+    Reporte mensual tipo nómina con calendario y códigos de turno coloreados
+    Formato: Empleados en filas, días del mes en columnas
+    """
+    department, year, month = _payroll_department_and_month(request, department_id)
+    if month is None:
+        return HttpResponseForbidden("No tienes permisos para ver este departamento")
     
-    for employee in employees:
-        employee_info = {
-            'employee': employee,
-            'days': []
-        }
-        
-        # Para cada día del mes
-        for day in days_list:
-            current_date = date(year, month, day)
-            
-            # Buscar asignación de turno para ese día
-            assignment = EmployeeShiftAssignment.objects.filter(
-                employee=employee,
-                start_date__lte=current_date,
-                status='ACTIVE'
-            ).filter(
-                Q(end_date__isnull=True) | Q(end_date__gte=current_date)
-            ).select_related('shift', 'shift__work_schedule__shift_template').first()
-            
-            # Buscar registro de asistencia
-            attendance = AttendanceSummary.objects.filter(
-                employee=employee,
-                date=current_date
-            ).first()
-            
-            day_info = {
-                'day': day,
-                'date': current_date,
-                'shift_code': None,
-                'shift_color': '#f3f4f6',  # Gris por defecto
-                'shift_name': '',
-                'present': False,
-                'late': False,
-                'absent': False,
-            }
-            
-            if assignment and assignment.shift:
-                # Obtener template del turno
-                template = assignment.shift.work_schedule.shift_template
-                
-                # Usar código de turno si existe
-                if hasattr(template, 'shift_code') and template.shift_code:
-                    day_info['shift_code'] = template.shift_code
-                else:
-                    # Usar primera letra del nombre del turno
-                    day_info['shift_code'] = assignment.shift.name[:1].upper()
-                
-                # Obtener color del turno
-                if hasattr(template, 'color') and template.color:
-                    day_info['shift_color'] = template.color
-                elif assignment.shift.color:
-                    day_info['shift_color'] = assignment.shift.color
-                
-                day_info['shift_name'] = template.name
-            
-            # Información de asistencia
-            if attendance:
-                day_info['present'] = attendance.is_present
-                day_info['late'] = attendance.is_late
-                day_info['absent'] = not attendance.is_present
-            elif assignment and current_date < today:
-                # Si hay turno asignado pero no hay registro y ya pasó la fecha
-                day_info['absent'] = True
-            
-            employee_info['days'].append(day_info)
-        
-        # Calcular estadísticas del empleado
-        employee_info['stats'] = {
-            'total_days': len([d for d in employee_info['days'] if d['shift_code']]),
-            'days_present': len([d for d in employee_info['days'] if d['present']]),
-            'days_late': len([d for d in employee_info['days'] if d['late']]),
-            'days_absent': len([d for d in employee_info['days'] if d['absent']]),
-        }
-        
-        employees_data.append(employee_info)
+    # Asignaciones y resúmenes del mes en dos consultas (ver payroll_calendar.py)
+    payroll = _payroll_calendar(department, year, month)
     
     context = {
         'department': department,
         'month': month,
         'year': year,
-        'month_name': month_names[month],
-        'days_list': days_list,
-        'employees_data': employees_data,
-        'first_day': first_day,
-        'last_day': last_day,
-        'page_title': f'Nómina Mensual - {department.name} - {month_names[month]} {year}',
+        'month_name': payroll['month_name'],
+        'days_list': payroll['days_list'],
+        'employees_data': payroll['employees_data'],
+        'first_day': payroll['first_day'],
+        'last_day': payroll['last_day'],
+        'page_title': f"Nómina Mensual - {department.name} - {payroll['month_name']} {year}",
     }
     
     return render(request, 'attendance/monthly_payroll_report.html', context)
+
+
+@login_required
+@employee_required
+@attendance_permission_required('supervisor')
+def export_monthly_payroll(request, department_id):
+    """Exportar la nómina mensual (misma matriz que el reporte) a Excel o CSV"""
+    import csv
+    
+    department, year, month = _payroll_department_and_month(request, department_id)
+    if month is None:
+        return HttpResponseForbidden("No tienes permisos para ver este departamento")
+    
+    payroll = _payroll_calendar(department, year, month)
+    export_format = request.GET.get('format', 'xlsx')
+    filename = f"nomina_{department.name}_{year}_{month:02d}".replace(' ', '_')
+    
+    headers = ['Empleado', 'ID Empleado'] + [str(day) for day in payroll['days_list']] + [
+        'Días', 'Asistencias', 'Tardanzas', 'Ausencias'
+    ]
+    
+    def employee_row(emp_data):
+        return [emp_data['employee'].get_full_name(), emp_data['employee'].employee_id] + [
+            f"{day_info['shift_code'] or ''} {day_status(day_info)}".strip()
+            for day_info in emp_data['days']
+        ] + [
+            emp_data['stats']['total_days'], emp_data['stats']['days_present'],
+            emp_data['stats']['days_late'], emp_data['stats']['days_absent'],
+        ]
+    
+    if export_format == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        writer = csv.writer(response)
+        writer.writerow(headers)
+        for emp_data in payroll['employees_data']:
+            writer.writerow(employee_row(emp_data))
+        return response
+    
+    import openpyxl
+    from openpyxl.styles import Alignment, Font, PatternFill
+    
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = f"{payroll['month_name']} {year}"
+    
+    ws.cell(row=1, column=1, value=f"Nómina Mensual - {department.name} - {payroll['month_name']} {year}").font = Font(bold=True)
+    ws.cell(row=2, column=1, value='P = Presente, T = Tarde, A = Ausente')
+    
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=4, column=col, value=header)
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    
+    fills = {}
+    for row, emp_data in enumerate(payroll['employees_data'], 5):
+        for col, value in enumerate(employee_row(emp_data), 1):
+            ws.cell(row=row, column=col, value=value)
+        
+        # Celdas de los días con el color del turno
+        for offset, day_info in enumerate(emp_data['days']):
+            cell = ws.cell(row=row, column=3 + offset)
+            cell.alignment = Alignment(horizontal='center')
+            if day_info['shift_code']:
+                color = day_info['shift_color'].lstrip('#').upper()
+                if color not in fills:
+                    fills[color] = PatternFill(start_color=color, end_color=color, fill_type="solid")
+                cell.fill = fills[color]
+    
+    ws.column_dimensions['A'].width = 30
+    ws.freeze_panes = 'C5'
+    
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
+    wb.save(response)
+    return response
@@ -0,0 +1,83 @@
+"""
+Señales del sistema de asistencia
+EURO SECURITY - Attendance Signals
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import EmployeeShiftAssignment, FacialRecognitionProfile, Shift
+from .models_gps import EmployeeWorkArea, GPSTracking, LocationAlert, WorkArea
+from .models_security_photos import SecurityAlert, SecurityPhoto, VideoSession
+from .face_gallery import face_gallery
+from .geofence import geofence_index
+from .gps_alerts import shift_calendar
+from .live_events import event_bus, location_alert_payload, security_alert_payload
+from .live_positions import record_photo, record_positions
+
+
+@receiver(post_save, sender=FacialRecognitionProfile)
+def sync_face_gallery_on_save(sender, instance, created, **kwargs):
+    """Mantener la galería facial en memoria sincronizada al guardar perfiles"""
+    transaction.on_commit(lambda: face_gallery.upsert(instance, created=created))
+
+
+@receiver(post_delete, sender=FacialRecognitionProfile)
+def sync_face_gallery_on_delete(sender, instance, **kwargs):
+    """Retirar de la galería facial los perfiles eliminados"""
+    profile_id = instance.id
+    transaction.on_commit(lambda: face_gallery.remove(profile_id, deleted=True))
+
+
+@receiver(post_save, sender=WorkArea)
+@receiver(post_delete, sender=WorkArea)
+@receiver(post_save, sender=EmployeeWorkArea)
+@receiver(post_delete, sender=EmployeeWorkArea)
+def invalidate_geofence_index(sender, **kwargs):
+    """Reconstruir el índice de geocercas cuando cambian áreas o asignaciones"""
+    transaction.on_commit(geofence_index.invalidate)
+
+
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+@receiver(post_save, sender=EmployeeShiftAssignment)
+@receiver(post_delete, sender=EmployeeShiftAssignment)
+def invalidate_shift_calendar(sender, **kwargs):
+    """Recargar los turnos del motor de alertas cuando cambian turnos o asignaciones"""
+    transaction.on_commit(shift_calendar.invalidate)
+
+
+@receiver(post_save, sender=GPSTracking)
+def update_last_position(sender, instance, created, **kwargs):
+    """Mantener la última posición del empleado para los mapas en vivo"""
+    if created:
+        transaction.on_commit(lambda: record_positions([instance]))
+
+
+@receiver(post_save, sender=SecurityPhoto)
+def update_last_photo(sender, instance, **kwargs):
+    """Enlazar la última foto de seguridad (y su análisis) a la posición del empleado"""
+    transaction.on_commit(lambda: record_photo(instance))
+
+
+@receiver(post_save, sender=SecurityAlert)
+def publish_security_alert(sender, instance, created, **kwargs):
+    """Anunciar las alertas de seguridad nuevas al centro de operaciones"""
+    if created:
+        transaction.on_commit(lambda: event_bus.publish('alerts', 'security_alert', security_alert_payload(instance)))
+
+
+@receiver(post_save, sender=LocationAlert)
+def publish_location_alert(sender, instance, created, **kwargs):
+    """Anunciar las alertas de ubicación nuevas al centro de operaciones"""
+    if created:
+        transaction.on_commit(lambda: event_bus.publish('alerts', 'location_alert', location_alert_payload(instance)))
+
+
+@receiver(post_save, sender=VideoSession)
+def publish_video_request(sender, instance, created, **kwargs):
+    """Avisar al empleado de una solicitud de video (sin tokens: los obtiene de check_pending_video)"""
+    if created and instance.status == 'REQUESTED' and instance.employee.user_id:
+        transaction.on_commit(lambda: event_bus.publish(
+            'video', 'video_request', {'session_id': instance.id}, user_id=instance.employee.user_id,
+        ))
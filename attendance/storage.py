@@ -1,98 +1,470 @@
 """
-Custom Cloudinary Storage Backend
+Backend de almacenamiento en Cloudinary
+EURO SECURITY - Cloudinary Storage
+
+La versión anterior subía cada archivo con el SDK de forma síncrona
+(resource_type='auto'), exists() retornaba siempre False (Cloudinary
+sobrescribía archivos con el mismo nombre) y size() retornaba 0. Ahora:
+
+- Las llamadas a la API usan una sesión HTTP compartida (pool keep-alive) y
+  se reintentan con backoff exponencial ante errores de red, 429 y 5xx.
+- Los archivos mayores que CLOUDINARY_CHUNK_SIZE se suben por partes
+  (Content-Range + X-Unique-Upload-Id) leyendo del archivo por bloques, sin
+  cargarlo entero en memoria.
+- Con CLOUDINARY_ASYNC_UPLOADS el archivo se escribe en un directorio spool
+  local y la petición retorna; CloudinaryUploader lo sube en segundo plano.
+  Lo que quede en el spool (proceso reiniciado, Cloudinary caído) se sube
+  al arrancar el uploader o con python manage.py flush_cloudinary_spool.
+- exists() y size() usan una caché de metadatos en memoria y, si no hay
+  dato, un HEAD a la URL de entrega.
+
+Los nombres guardados son rutas relativas (carpeta/archivo.ext) y url() arma
+la URL de entrega; los registros antiguos con la URL completa siguen
+funcionando. Mientras un archivo está en el spool, open() lo lee del disco
+local pero su URL pública aún no responde.
+
+Al configurar las credenciales de Cloudinary los archivos subidos antes
+siguen en MEDIA_ROOT con el mismo nombre relativo. Con
+CLOUDINARY_LOCAL_FALLBACK (activo por defecto) url(), open(), exists(),
+size() y delete() los resuelven en MEDIA_ROOT cuando existen ahí, en lugar
+de buscarlos en Cloudinary (404).
 """
-from django.core.files.storage import Storage
-from django.conf import settings
-import cloudinary
-import cloudinary.uploader
-from urllib.parse import urlparse
+import logging
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from urllib.parse import urlparse
+
+import requests
+from cloudinary.utils import api_sign_request
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.utils.deconstruct import deconstructible
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff', '.heic', '.svg'}
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.webm', '.avi', '.mkv', '.mp3', '.wav', '.ogg', '.m4a'}
+# Cloudinary exige partes de al menos 5 MB (salvo la última)
+MIN_CHUNK_SIZE = 5 * 1024 * 1024
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class CloudinaryUploadError(Exception):
+    """La API de Cloudinary rechazó la operación o no respondió tras los reintentos"""
+
+
+def resource_type_for(name):
+    """Tipo de recurso de Cloudinary según la extensión"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        return 'image'
+    if extension in VIDEO_EXTENSIONS:
+        return 'video'
+    return 'raw'
+
+
+def public_id_for(name):
+    """public_id de Cloudinary: sin extensión, salvo en archivos raw"""
+    if resource_type_for(name) == 'raw':
+        return name
+    return os.path.splitext(name)[0]
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Sesión HTTP compartida por las subidas (CLOUDINARY_HTTP_POOL_SIZE conexiones por host)"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                pool_size = _setting('CLOUDINARY_HTTP_POOL_SIZE', 10)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _http_session = session
+    return _http_session
+
+
+class MetadataCache:
+    """Tamaño de los archivos conocidos, con expiración y límite de entradas (LRU)"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
 
+    def get(self, name):
+        """Tamaño en bytes o None si no se conoce o expiró"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            size, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[name]
+                return None
+            self._entries.move_to_end(name)
+            return size
 
+    def set(self, name, size):
+        ttl = _setting('CLOUDINARY_METADATA_TTL_SECONDS', 86400)
+        with self._lock:
+            self._entries[name] = (size, time.monotonic() + ttl)
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@deconstructible
 class CloudinaryStorage(Storage):
     """
-    Custom storage backend for Cloudinary
+    Storage de Django sobre la API de subida de Cloudinary
+
+    Los parámetros por defecto salen de settings.CLOUDINARY_STORAGE y de los
+    ajustes CLOUDINARY_*; se pueden pasar explícitos (OPTIONS de STORAGES o
+    un servidor simulado en las pruebas).
     """
-    
-    def __init__(self):
-        print("🔧 Inicializando CloudinaryStorage custom...")
-        # Configurar cloudinary desde settings
-        if hasattr(settings, 'CLOUDINARY_STORAGE'):
-            cloudinary.config(
-                cloud_name=settings.CLOUDINARY_STORAGE['CLOUD_NAME'],
-                api_key=settings.CLOUDINARY_STORAGE['API_KEY'],
-                api_secret=settings.CLOUDINARY_STORAGE['API_SECRET'],
-                secure=settings.CLOUDINARY_STORAGE.get('SECURE', True)
-            )
-            print(f"✅ CloudinaryStorage configurado: {settings.CLOUDINARY_STORAGE['CLOUD_NAME']}")
-        else:
-            print("❌ CLOUDINARY_STORAGE no encontrado en settings")
-    
-    def _save(self, name, content):
+
+    def __init__(self, cloud_name=None, api_key=None, api_secret=None, api_url=None,
+                 delivery_url=None, spool_dir=None, async_uploads=None, chunk_size=None, session=None,
+                 local_root=None):
+        options = _setting('CLOUDINARY_STORAGE', {})
+        self.cloud_name = cloud_name or options.get('CLOUD_NAME', '')
+        self.api_key = api_key or options.get('API_KEY', '')
+        self.api_secret = api_secret or options.get('API_SECRET', '')
+        self.api_url = (api_url or _setting('CLOUDINARY_API_URL', 'https://api.cloudinary.com/v1_1')).rstrip('/')
+        self.delivery_url = (delivery_url or _setting('CLOUDINARY_DELIVERY_URL', 'https://res.cloudinary.com')).rstrip('/')
+        self.spool_dir = Path(spool_dir or _setting('CLOUDINARY_SPOOL_DIR', settings.BASE_DIR / 'media_spool'))
+        self.async_uploads = _setting('CLOUDINARY_ASYNC_UPLOADS', False) if async_uploads is None else async_uploads
+        self.chunk_size = max(MIN_CHUNK_SIZE, chunk_size or _setting('CLOUDINARY_CHUNK_SIZE', 20 * 1024 * 1024))
+        self._session = session
+        self.metadata = MetadataCache()
+        # Archivos anteriores a Cloudinary que siguen en MEDIA_ROOT
+        self.local = None
+        if local_root or _setting('CLOUDINARY_LOCAL_FALLBACK', True):
+            self.local = FileSystemStorage(location=local_root or settings.MEDIA_ROOT, base_url=settings.MEDIA_URL)
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = get_http_session()
+        return self._session
+
+    # API de Cloudinary
+
+    def _signed_params(self, **params):
+        params['timestamp'] = int(time.time())
+        params['signature'] = api_sign_request(params, self.api_secret)
+        params['api_key'] = self.api_key
+        return params
+
+    def _post(self, path, data, files=None, headers=None):
+        """POST a la API con reintentos y backoff exponencial"""
+        url = f"{self.api_url}/{self.cloud_name}/{path}"
+        retries = _setting('CLOUDINARY_UPLOAD_RETRIES', 3)
+        backoff = _setting('CLOUDINARY_RETRY_BACKOFF_SECONDS', 0.5)
+        timeout = _setting('CLOUDINARY_TIMEOUT_SECONDS', 60)
+
+        for attempt in range(retries + 1):
+            try:
+                response = self.session.post(url, data=data, files=files, headers=headers, timeout=timeout)
+                if response.status_code not in RETRYABLE_STATUS:
+                    if response.status_code >= 400:
+                        raise CloudinaryUploadError(f"HTTP {response.status_code}: {response.text[:200]}")
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+
+            if attempt < retries:
+                delay = backoff * (2 ** attempt)
+                logger.warning(f"⚠️ Cloudinary {path}: {error}, reintento {attempt + 1}/{retries} en {delay:.1f}s")
+                time.sleep(delay)
+
+        raise CloudinaryUploadError(f"{path}: {error} tras {retries + 1} intentos")
+
+    def upload_file(self, fileobj, name, size):
         """
-        Guardar archivo en Cloudinary
+        Sube un archivo abierto a Cloudinary con `name` como public_id
+
+        Los archivos mayores que chunk_size se envían por partes; cada parte
+        se reintenta por separado.
         """
-        print(f"📤 CloudinaryStorage._save() llamado para: {name}")
+        resource_type = resource_type_for(name)
+        params = self._signed_params(public_id=public_id_for(name))
+        path = f"{resource_type}/upload"
+        filename = os.path.basename(name)
+
+        if size <= self.chunk_size:
+            result = self._post(path, params, files={'file': (filename, fileobj.read())})
+        else:
+            upload_id = uuid.uuid4().hex
+            start = 0
+            while start < size:
+                chunk = fileobj.read(self.chunk_size)
+                if not chunk:
+                    raise CloudinaryUploadError(f"{name}: archivo truncado en {start}/{size} bytes")
+                end = start + len(chunk) - 1
+                result = self._post(path, params, files={'file': (filename, chunk)}, headers={
+                    'Content-Range': f'bytes {start}-{end}/{size}',
+                    'X-Unique-Upload-Id': upload_id,
+                })
+                start = end + 1
+
+        self.metadata.set(name, size)
+        logger.info(f"📤 Subido a Cloudinary: {name} ({size // 1024} KB)")
+        return result
+
+    # Spool local para subidas en segundo plano
+
+    def spool_path(self, name):
+        return self.spool_dir / name
+
+    def upload_spooled(self, name):
+        """Sube un archivo del spool y lo elimina del disco local"""
+        path = self.spool_path(name)
+        with open(path, 'rb') as f:
+            self.upload_file(f, name, os.fstat(f.fileno()).st_size)
         try:
-            # Subir a Cloudinary
-            print(f"   Subiendo a Cloudinary...")
-            upload_result = cloudinary.uploader.upload(
-                content,
-                folder=os.path.dirname(name),
-                public_id=os.path.splitext(os.path.basename(name))[0],
-                resource_type='auto'
-            )
-            
-            print(f"✅ Subido exitosamente: {upload_result['secure_url']}")
-            # Retornar la URL pública
-            return upload_result['secure_url']
-        except Exception as e:
-            print(f"❌ Error subiendo a Cloudinary: {e}")
-            raise
-    
+            path.unlink()
+        except FileNotFoundError:
+            # Otro proceso subió el mismo archivo (flush concurrente)
+            pass
+
+    def spooled_names(self, older_than=0):
+        """Nombres pendientes de subir en el spool"""
+        if not self.spool_dir.exists():
+            return []
+        cutoff = time.time() - older_than
+        return sorted(
+            path.relative_to(self.spool_dir).as_posix()
+            for path in self.spool_dir.rglob('*')
+            if path.is_file() and path.stat().st_mtime <= cutoff
+        )
+
+    def _spool(self, name, content):
+        path = self.spool_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = 0
+        with open(path, 'wb') as f:
+            for chunk in content.chunks():
+                f.write(chunk)
+                size += len(chunk)
+        return size
+
+    # Storage de Django
+
+    def _is_local(self, name):
+        """True si el archivo es anterior a Cloudinary y sigue en MEDIA_ROOT"""
+        if self.local is None or name.startswith('http'):
+            return False
+        try:
+            return self.local.exists(name)
+        except Exception:
+            # Nombres que escapan de MEDIA_ROOT (SuspiciousFileOperation)
+            return False
+
+    def _save(self, name, content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        if self.async_uploads:
+            size = self._spool(name, content)
+            self.metadata.set(name, size)
+            cloudinary_uploader.submit(self, name)
+            return name
+
+        self.upload_file(content, name, content.size)
+        return name
+
+    def _open(self, name, mode='rb'):
+        path = self.spool_path(name)
+        if not name.startswith('http') and path.exists():
+            return File(open(path, mode), name=name)
+        if self._is_local(name):
+            return self.local.open(name, mode)
+
+        response = self.session.get(self.url(name), stream=True, timeout=_setting('CLOUDINARY_TIMEOUT_SECONDS', 60))
+        response.raise_for_status()
+
+        # En memoria hasta 5 MB, en disco a partir de ahí
+        buffer = SpooledTemporaryFile(max_size=MIN_CHUNK_SIZE)
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            buffer.write(chunk)
+        self.metadata.set(name, buffer.tell())
+        buffer.seek(0)
+        return File(buffer, name=name)
+
     def url(self, name):
-        """
-        Retornar URL del archivo
-        """
-        # Si ya es una URL completa, retornarla
+        # Registros antiguos guardaban la URL completa
         if name.startswith('http'):
             return name
-        
-        # Si no, construir URL de Cloudinary
-        return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/{name}"
-    
+        if self._is_local(name):
+            return self.local.url(name)
+        return f"{self.delivery_url}/{self.cloud_name}/{resource_type_for(name)}/upload/{name}"
+
+    def _remote_size(self, name):
+        """Tamaño según un HEAD a la URL de entrega, o None si no existe"""
+        try:
+            response = self.session.head(
+                self.url(name), allow_redirects=True, timeout=_setting('CLOUDINARY_TIMEOUT_SECONDS', 60)
+            )
+        except requests.RequestException as e:
+            logger.warning(f"⚠️ No se pudo verificar {name} en Cloudinary: {e}")
+            return None
+
+        if response.status_code != 200:
+            return None
+        size = int(response.headers.get('Content-Length') or 0)
+        self.metadata.set(name, size)
+        return size
+
     def exists(self, name):
-        """
-        Verificar si el archivo existe
-        """
-        # Para Cloudinary, siempre retornar False para forzar subida
-        return False
-    
+        if self.metadata.get(name) is not None:
+            return True
+        if not name.startswith('http') and self.spool_path(name).exists():
+            return True
+        if self._is_local(name):
+            return True
+        return self._remote_size(name) is not None
+
+    def size(self, name):
+        size = self.metadata.get(name)
+        if size is None and not name.startswith('http') and self.spool_path(name).exists():
+            size = self.spool_path(name).stat().st_size
+        if size is None and self._is_local(name):
+            size = self.local.size(name)
+        if size is None:
+            size = self._remote_size(name)
+        return size or 0
+
     def delete(self, name):
-        """
-        Eliminar archivo de Cloudinary
-        """
+        self.metadata.discard(name)
+        if not name.startswith('http'):
+            try:
+                self.spool_path(name).unlink()
+            except FileNotFoundError:
+                pass
+            if self._is_local(name):
+                self.local.delete(name)
+
         try:
-            # Extraer public_id de la URL
             if name.startswith('http'):
-                parsed = urlparse(name)
-                path_parts = parsed.path.split('/')
-                # Encontrar el public_id (después de /upload/)
-                if 'upload' in path_parts:
-                    upload_index = path_parts.index('upload')
-                    public_id = '/'.join(path_parts[upload_index + 1:])
-                    public_id = os.path.splitext(public_id)[0]  # Quitar extensión
-                else:
-                    public_id = name
+                # Extraer tipo y public_id de la URL (.../<tipo>/upload/v123/<public_id>.<ext>)
+                path_parts = urlparse(name).path.split('/')
+                upload_index = path_parts.index('upload')
+                resource_type = path_parts[upload_index - 1]
+                parts = path_parts[upload_index + 1:]
+                if parts and parts[0].startswith('v') and parts[0][1:].isdigit():
+                    parts = parts[1:]
+                public_id = '/'.join(parts)
+                if resource_type != 'raw':
+                    public_id = os.path.splitext(public_id)[0]
             else:
-                public_id = os.path.splitext(name)[0]
-            
-            cloudinary.uploader.destroy(public_id)
+                resource_type = resource_type_for(name)
+                public_id = public_id_for(name)
+
+            self._post(f"{resource_type}/destroy", self._signed_params(public_id=public_id))
         except Exception as e:
-            print(f"⚠️ Error eliminando de Cloudinary: {e}")
-    
-    def size(self, name):
+            logger.warning(f"⚠️ Error eliminando de Cloudinary: {e}")
+
+
+class CloudinaryUploader:
+    """
+    Sube en segundo plano los archivos del spool de CloudinaryStorage
+
+    Si una subida falla tras los reintentos el archivo permanece en el spool
+    y se vuelve a intentar en el siguiente flush.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self, storage):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=_setting('CLOUDINARY_UPLOAD_WORKERS', 2),
+                thread_name_prefix='cloudinary-upload',
+            )
+            # Archivos que dejó un proceso anterior (los recientes pueden ser de otro worker)
+            for name in storage.spooled_names(older_than=_setting('CLOUDINARY_SPOOL_STALE_SECONDS', 300)):
+                self._submit(storage, name)
+        return self._executor
+
+    def _submit(self, storage, name):
+        if name not in self._pending:
+            self._pending[name] = self._executor.submit(self._upload, storage, name)
+        return self._pending[name]
+
+    def submit(self, storage, name):
+        with self._lock:
+            self._get_executor(storage)
+            return self._submit(storage, name)
+
+    def _upload(self, storage, name):
+        try:
+            storage.upload_spooled(name)
+            return True
+        except FileNotFoundError:
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error subiendo {name} a Cloudinary (queda en el spool): {str(e)}")
+            return False
+        finally:
+            with self._lock:
+                self._pending.pop(name, None)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, storage, timeout=None):
         """
-        Retornar tamaño del archivo
+        Encola todo el spool y espera a que termine
+
+        Returns:
+            (subidos, fallidos)
         """
-        return 0  # No implementado
+        with self._lock:
+            self._get_executor(storage)
+            futures = [self._submit(storage, name) for name in storage.spooled_names()]
+
+        results = [future.result(timeout=timeout) for future in futures]
+        return sum(results), len(results) - sum(results)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+# Instancia global del proceso
+cloudinary_uploader = CloudinaryUploader()
@@ -0,0 +1,199 @@
+"""
+Mantenimiento de resúmenes diarios de asistencia
+EURO SECURITY - Summary Service
+
+- apply_record_to_summary: actualización incremental al registrar una
+  marcación. Bloquea la fila del resumen (select_for_update) y aplica los
+  contadores con expresiones F() en un único UPDATE, por lo que marcaciones
+  simultáneas del mismo empleado no se pisan.
+- rebuild_summaries: reconstrucción masiva de un rango de fechas agregando
+  las marcaciones en SQL (una fila por empleado y día) y escribiendo con
+  bulk_create(update_conflicts=True).
+
+La fecha del resumen es la fecha local (TIME_ZONE) de la marcación, igual
+que los filtros timestamp__date del resto del sistema.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AttendanceRecord, AttendanceSettings, AttendanceSummary
+
+logger = logging.getLogger(__name__)
+
+
+BREAK_TYPES = ('BREAK_OUT', 'BREAK_IN')
+
+
+def _active_settings():
+    return AttendanceSettings.objects.filter(is_active=True).first()
+
+
+def _is_late(date, first_entry, attendance_settings):
+    """Entrada posterior al inicio de jornada más la tolerancia"""
+    if not attendance_settings or not first_entry:
+        return False
+    work_start = timezone.make_aware(datetime.combine(date, attendance_settings.work_start_time))
+    tolerance = timedelta(minutes=attendance_settings.late_tolerance_minutes)
+    return first_entry > work_start + tolerance
+
+
+def _is_early_exit(date, exit_time, attendance_settings):
+    """Salida anterior al fin de jornada menos la tolerancia"""
+    if not attendance_settings or not exit_time:
+        return False
+    work_end = timezone.make_aware(datetime.combine(date, attendance_settings.work_end_time))
+    tolerance = timedelta(minutes=attendance_settings.early_exit_tolerance_minutes)
+    return exit_time < work_end - tolerance
+
+
+def apply_record_to_summary(attendance_record, attendance_settings=None):
+    """
+    Incorpora una marcación al resumen diario del empleado
+
+    Es independiente del orden de llegada: la primera entrada y la última
+    salida se comparan contra las ya registradas (relevante en el modo
+    asíncrono, donde los workers pueden procesar marcaciones desordenadas).
+
+    Returns:
+        AttendanceSummary actualizado
+    """
+    timestamp = attendance_record.timestamp
+    date = timezone.localdate(timestamp)
+    attendance_type = attendance_record.attendance_type
+
+    if attendance_settings is None and attendance_type in ('IN', 'OUT'):
+        attendance_settings = _active_settings()
+
+    with transaction.atomic():
+        summary, created = AttendanceSummary.objects.select_for_update().get_or_create(
+            employee_id=attendance_record.employee_id,
+            date=date,
+        )
+
+        first_entry = summary.first_entry
+        last_exit = summary.last_exit
+        changes = {}
+
+        if attendance_type == 'IN':
+            changes['entries_count'] = F('entries_count') + 1
+            if first_entry is None or timestamp < first_entry:
+                first_entry = timestamp
+                changes['first_entry'] = first_entry
+                changes['is_present'] = True
+                changes['is_late'] = _is_late(date, first_entry, attendance_settings)
+
+        elif attendance_type == 'OUT':
+            changes['exits_count'] = F('exits_count') + 1
+            if last_exit is None or timestamp > last_exit:
+                last_exit = timestamp
+                changes['last_exit'] = last_exit
+            if _is_early_exit(date, timestamp, attendance_settings):
+                changes['is_early_exit'] = True
+
+        elif attendance_type in BREAK_TYPES:
+            changes['break_count'] = F('break_count') + 1
+
+        if first_entry and last_exit and ('first_entry' in changes or 'last_exit' in changes):
+            changes['total_work_hours'] = last_exit - first_entry
+
+        if changes:
+            changes['updated_at'] = timezone.now()
+            AttendanceSummary.objects.filter(pk=summary.pk).update(**changes)
+            summary.refresh_from_db()
+
+    return summary
+
+
+def rebuild_summaries(start_date, end_date, employee_ids=None, delete_empty=True, batch_size=1000):
+    """
+    Reconstruye los resúmenes de un rango de fechas a partir de las marcaciones
+
+    Args:
+        start_date, end_date: rango inclusivo de fechas locales
+        employee_ids: limitar a estos empleados (opcional)
+        delete_empty: eliminar resúmenes de días sin marcaciones
+        batch_size: tamaño de lote para bulk_create
+
+    Returns:
+        dict con 'written' (resúmenes creados/actualizados) y 'deleted'
+    """
+    attendance_settings = _active_settings()
+
+    records = AttendanceRecord.objects.annotate(
+        local_date=TruncDate('timestamp', tzinfo=timezone.get_current_timezone()),
+    ).filter(local_date__gte=start_date, local_date__lte=end_date)
+    if employee_ids is not None:
+        records = records.filter(employee_id__in=employee_ids)
+
+    # Una fila por empleado y día, calculada en la base de datos
+    rows = (
+        records.order_by()
+        .values('employee_id', 'local_date')
+        .annotate(
+            entries=Count('id', filter=Q(attendance_type='IN')),
+            exits=Count('id', filter=Q(attendance_type='OUT')),
+            breaks=Count('id', filter=Q(attendance_type__in=BREAK_TYPES)),
+            first_in=Min('timestamp', filter=Q(attendance_type='IN')),
+            first_out=Min('timestamp', filter=Q(attendance_type='OUT')),
+            last_out=Max('timestamp', filter=Q(attendance_type='OUT')),
+        )
+    )
+
+    now = timezone.now()
+    summaries = []
+    seen = set()
+
+    for row in rows.iterator(chunk_size=batch_size):
+        date = row['local_date']
+        first_entry = row['first_in']
+        last_exit = row['last_out']
+        seen.add((row['employee_id'], date))
+
+        summaries.append(AttendanceSummary(
+            employee_id=row['employee_id'],
+            date=date,
+            first_entry=first_entry,
+            last_exit=last_exit,
+            total_work_hours=(last_exit - first_entry) if first_entry and last_exit else None,
+            entries_count=row['entries'],
+            exits_count=row['exits'],
+            break_count=row['breaks'],
+            is_present=first_entry is not None,
+            is_late=_is_late(date, first_entry, attendance_settings),
+            is_early_exit=_is_early_exit(date, row['first_out'], attendance_settings),
+            created_at=now,
+            updated_at=now,
+        ))
+
+    deleted = 0
+    with transaction.atomic():
+        if delete_empty:
+            stale = AttendanceSummary.objects.filter(date__gte=start_date, date__lte=end_date)
+            if employee_ids is not None:
+                stale = stale.filter(employee_id__in=employee_ids)
+            stale_ids = [
+                pk for pk, employee_id, date in stale.values_list('id', 'employee_id', 'date')
+                if (employee_id, date) not in seen
+            ]
+            if stale_ids:
+                deleted, _ = AttendanceSummary.objects.filter(id__in=stale_ids).delete()
+
+        AttendanceSummary.objects.bulk_create(
+            summaries,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['employee', 'date'],
+            update_fields=[
+                'first_entry', 'last_exit', 'total_work_hours', 'entries_count',
+                'exits_count', 'break_count', 'is_present', 'is_late', 'is_early_exit',
+                'updated_at',
+            ],
+        )
+
+    logger.info(f"📊 Resúmenes reconstruidos {start_date} → {end_date}: {len(summaries)} escritos, {deleted} eliminados")
+    return {'written': len(summaries), 'deleted': deleted}
@@ -0,0 +1,195 @@
+"""
+Servidores HTTP simulados para las pruebas y los benchmarks
+
+- Cloudinary: API de subida (firmas, subidas por partes, destroy) y URL de
+  entrega (GET/HEAD).
+- Inferencia: respuestas con la forma de Roboflow y Face++ con latencia,
+  detectores lentos y detectores que fallan configurables.
+
+Se levantan en localhost en un puerto libre, así que las pruebas no usan
+cuentas reales ni consumen cuota.
+"""
+import email.policy
+import json
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+from cloudinary.utils import api_sign_request
+
+
+def start_server(handler):
+    """Servidor en un hilo daemon; retorna (servidor, URL base)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# Cloudinary (API de subida y URL de entrega)
+
+class FakeCloudinary:
+    """Estado del servidor simulado"""
+
+    def __init__(self, cloud_name, api_secret, latency=0.0):
+        self.cloud_name = cloud_name
+        self.api_secret = api_secret
+        self.latency = latency
+        self.resources = {}
+        self.partial = {}
+        self.fail_next = 0
+        self.requests = {'upload': 0, 'destroy': 0, 'GET': 0, 'HEAD': 0, 'failed': 0}
+        self.lock = threading.Lock()
+
+
+def make_fake_handler(state):
+    class FakeCloudinaryHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, status, body=b'', content_type='application/json', length=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body) if length is None else length))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def _json(self, status, data):
+            self._reply(status, json.dumps(data).encode('utf-8'))
+
+        def _form(self):
+            length = int(self.headers.get('Content-Length', 0))
+            raw = self.rfile.read(length)
+            if self.headers['Content-Type'].startswith('application/x-www-form-urlencoded'):
+                return dict(parse_qsl(raw.decode('utf-8')))
+            message = BytesParser(policy=email.policy.HTTP).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + raw
+            )
+            fields = {}
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                payload = part.get_payload(decode=True)
+                fields[name] = payload if part.get_filename() else payload.decode('utf-8')
+            return fields
+
+        def do_POST(self):
+            time.sleep(state.latency)
+            fields = self._form()
+            _, _, cloud_name, resource_type, action = self.path.split('/')
+
+            with state.lock:
+                if state.fail_next:
+                    state.fail_next -= 1
+                    state.requests['failed'] += 1
+                    return self._json(503, {'error': {'message': 'Servicio no disponible'}})
+
+            signed = {key: value for key, value in fields.items() if key not in ('file', 'api_key', 'signature')}
+            if cloud_name != state.cloud_name or api_sign_request(signed, state.api_secret) != fields.get('signature'):
+                return self._json(401, {'error': {'message': 'Firma inválida'}})
+
+            key = (resource_type, fields['public_id'])
+            with state.lock:
+                state.requests[action] += 1
+                if action == 'destroy':
+                    found = state.resources.pop(key, None) is not None
+                    return self._json(200, {'result': 'ok' if found else 'not found'})
+
+                content_range = self.headers.get('Content-Range')
+                if content_range:
+                    span, total = content_range.split(' ')[1].split('/')
+                    parts = state.partial.setdefault(self.headers['X-Unique-Upload-Id'], {})
+                    parts[int(span.split('-')[0])] = fields['file']
+                    if sum(len(chunk) for chunk in parts.values()) < int(total):
+                        return self._json(200, {'done': False})
+                    data = b''.join(parts[start] for start in sorted(parts))
+                    del state.partial[self.headers['X-Unique-Upload-Id']]
+                else:
+                    data = fields['file']
+                state.resources[key] = data
+
+            self._json(200, {
+                'public_id': fields['public_id'],
+                'resource_type': resource_type,
+                'bytes': len(data),
+                'secure_url': f"http://{self.headers['Host']}/{cloud_name}/{resource_type}/upload/{fields['public_id']}",
+            })
+
+        def _delivery(self):
+            state.requests[self.command] += 1
+            _, cloud_name, resource_type, _, name = self.path.split('/', 4)
+            public_id = name if resource_type == 'raw' else name.rsplit('.', 1)[0]
+            data = state.resources.get((resource_type, public_id))
+            if data is None:
+                return self._reply(404, b'')
+            self._reply(200, data, content_type='application/octet-stream')
+
+        def do_GET(self):
+            self._delivery()
+
+        def do_HEAD(self):
+            self._delivery()
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeCloudinaryHandler
+
+
+# Inferencia (Roboflow y Face++)
+
+STUB_RESPONSES = {
+    'weapon': {'predictions': [{'class': 'knife', 'confidence': 0.91, 'x': 10, 'y': 10, 'width': 5, 'height': 5}]},
+    'vehicle': {'predictions': []},
+    'ppe': {'predictions': [{'class': 'no-helmet', 'confidence': 0.77, 'x': 20, 'y': 20, 'width': 8, 'height': 8}]},
+    'person': {'predictions': [{'class': 'person', 'confidence': 0.98, 'x': 30, 'y': 30, 'width': 40, 'height': 90}]},
+    'detect': {'faces': [{'attributes': {'age': {'value': 31}, 'gender': {'value': 'Male'}, 'emotion': {}, 'facequality': {'value': 80}}}]},
+}
+
+# Modelos de Roboflow que responde el servidor simulado (ROBOFLOW_MODELS)
+STUB_MODELS = {
+    'weapon_detection': 'weapon/1',
+    'vehicle_detection': 'vehicle/1',
+    'ppe_detection': 'ppe/1',
+    'person_detection': 'person/1',
+}
+
+
+def make_stub_handler(latency, slow_detector=None, slow_latency=0, failing_detector=None, calls=None):
+    """
+    Handler del servidor de inferencia simulado
+
+    Args:
+        latency: segundos por respuesta
+        slow_detector: clave de STUB_RESPONSES que tarda slow_latency
+        failing_detector: clave de STUB_RESPONSES que responde 500
+        calls: lista donde se anota la clave de cada petición recibida
+    """
+    class StubInferenceHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            self.rfile.read(length)
+
+            key = next((name for name in STUB_RESPONSES if name in self.path), None)
+            if calls is not None:
+                calls.append(key)
+            time.sleep(slow_latency if slow_detector and slow_detector in self.path else latency)
+
+            if failing_detector and failing_detector == key:
+                status, body = 500, {'error': 'Fallo simulado'}
+            else:
+                status, body = (200 if key else 404), STUB_RESPONSES.get(key, {'predictions': []})
+
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubInferenceHandler
@@ -0,0 +1,185 @@
+"""
+Pruebas de AIAnalysisEngine contra el servidor de inferencia simulado (tests/fakes.py)
+"""
+import time
+from io import BytesIO
+
+import numpy as np
+import requests
+from django.test import SimpleTestCase, TestCase
+from PIL import Image
+
+from attendance.ai_analysis import DETECTORS, FACE_ATTRIBUTES, ROBOFLOW_DETECTORS, AIAnalysisEngine, merge_results
+from attendance.ai_services import FacePlusPlusService, RoboflowService
+from attendance.tests.fakes import STUB_MODELS, make_stub_handler, start_server
+
+
+def image_bytes(seed=0):
+    rng = np.random.default_rng(seed)
+    buffer = BytesIO()
+    Image.fromarray(rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)).save(buffer, format='JPEG', quality=80)
+    return buffer.getvalue()
+
+
+class StubServerMixin:
+    """Servidor de inferencia simulado por clase de prueba y motor apuntando a él"""
+
+    latency = 0.0
+    slow_detector = None
+    slow_latency = 0
+    failing_detector = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.calls = []
+        cls.server, cls.base_url = start_server(make_stub_handler(
+            cls.latency, cls.slow_detector, cls.slow_latency, cls.failing_detector, calls=cls.calls,
+        ))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def make_engine(self, use_cache=False, **services):
+        session = requests.Session()
+        engine = AIAnalysisEngine(
+            roboflow=services.get('roboflow') or RoboflowService(
+                api_url=self.base_url, api_key='stub', models=STUB_MODELS, session=session,
+            ),
+            facepp=services.get('facepp') or FacePlusPlusService(
+                api_url=self.base_url, api_key='stub', api_secret='stub', session=session,
+            ),
+            use_cache=use_cache,
+        )
+        self.addCleanup(engine.shutdown)
+        return engine
+
+
+class AIAnalysisEngineTests(StubServerMixin, SimpleTestCase):
+    latency = 0.2
+
+    def test_all_detectors_merged(self):
+        raw = self.make_engine().run(image_bytes(), timeout=2)
+        results, has_alerts, alert_level = merge_results(raw, 'ahora')
+
+        self.assertEqual(set(raw), set(DETECTORS))
+        self.assertEqual(results['weapons'][0]['class'], 'knife')
+        self.assertEqual(results['vehicles'], [])
+        self.assertEqual(results['ppe'][0]['class'], 'no-helmet')
+        self.assertEqual(results['persons'][0]['class'], 'person')
+        self.assertEqual(results['face_attributes']['age'], 31)
+        self.assertNotIn('errors', results)
+        self.assertTrue(has_alerts)
+        self.assertEqual(alert_level, 'CRITICAL')
+
+    def test_detectors_run_concurrently(self):
+        engine = self.make_engine()
+        engine.run(image_bytes(), timeout=2)  # Conexiones del pool ya abiertas
+
+        start = time.perf_counter()
+        engine.run(image_bytes(), timeout=2)
+        elapsed = time.perf_counter() - start
+
+        # Cinco llamadas de 0.2 s en serie tardarían 1 s
+        self.assertLess(elapsed, self.latency * len(DETECTORS) / 2)
+
+    def test_same_result_as_sequential(self):
+        roboflow = RoboflowService(api_url=self.base_url, api_key='stub', models=STUB_MODELS, session=requests)
+        facepp = FacePlusPlusService(api_url=self.base_url, api_key='stub', api_secret='stub', session=requests)
+        data = image_bytes()
+
+        sequential = {name: roboflow._detect(data, model_type, timeout=2)
+                      for name, model_type in ROBOFLOW_DETECTORS.items()}
+        sequential[FACE_ATTRIBUTES] = facepp.analyze_face_attributes(data, timeout=2)
+
+        self.assertEqual(
+            merge_results(self.make_engine().run(data, timeout=2), ''),
+            merge_results(sequential, ''),
+        )
+
+    def test_detector_exception_reported_without_losing_others(self):
+        class BrokenFacePlusPlus:
+            def detect_face(self, image_bytes, timeout=None):
+                raise RuntimeError('Face++ caído')
+
+        raw = self.make_engine(facepp=BrokenFacePlusPlus()).run(image_bytes(), timeout=2)
+        results, has_alerts, _ = merge_results(raw, '')
+
+        self.assertEqual(results['errors'], {FACE_ATTRIBUTES: 'Face++ caído'})
+        self.assertIsNone(results['face_attributes'])
+        self.assertEqual(results['weapons'][0]['class'], 'knife')
+        self.assertTrue(has_alerts)
+
+    def test_detector_past_engine_timeout_is_cut(self):
+        class HangingRoboflow(RoboflowService):
+            def infer_base64(self, image_base64, model_type, timeout=None):
+                if model_type == 'vehicle_detection':
+                    time.sleep(3)
+                return super().infer_base64(image_base64, model_type, timeout=timeout)
+
+        roboflow = HangingRoboflow(api_url=self.base_url, api_key='stub', models=STUB_MODELS, session=requests.Session())
+        start = time.perf_counter()
+        raw = self.make_engine(roboflow=roboflow).run(image_bytes(), timeout=0.5)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(raw['vehicles'], {'error': 'timeout', 'predictions': []})
+        self.assertEqual(raw['weapons']['predictions'][0]['class'], 'knife')
+        self.assertLess(elapsed, 2.5)
+
+
+class SlowDetectorTests(StubServerMixin, SimpleTestCase):
+    slow_detector = 'person'
+    slow_latency = 2.0
+
+    def test_http_timeout_reported_per_detector(self):
+        start = time.perf_counter()
+        raw = self.make_engine().run(image_bytes(), timeout=0.5)
+        elapsed = time.perf_counter() - start
+        results, _, _ = merge_results(raw, '')
+
+        self.assertLess(elapsed, self.slow_latency)
+        self.assertEqual(set(results['errors']), {'persons'})
+        self.assertEqual(results['persons'], [])
+        self.assertEqual(results['weapons'][0]['class'], 'knife')
+
+
+class FailingDetectorTests(StubServerMixin, SimpleTestCase):
+    failing_detector = 'ppe'
+
+    def test_http_error_reported_per_detector(self):
+        raw = self.make_engine().run(image_bytes(), timeout=2)
+        results, has_alerts, alert_level = merge_results(raw, '')
+
+        self.assertEqual(set(results['errors']), {'ppe'})
+        self.assertIn('500', results['errors']['ppe'])
+        self.assertEqual(results['ppe'], [])
+        self.assertEqual(alert_level, 'CRITICAL')
+        self.assertTrue(has_alerts)
+
+
+class AIAnalysisCacheTests(StubServerMixin, TestCase):
+
+    def test_repeated_photo_served_from_cache(self):
+        engine = self.make_engine(use_cache=True)
+        data = image_bytes()
+
+        first = engine.run(data, timeout=2)
+        calls = len(self.calls)
+        second = engine.run(data, timeout=2)
+
+        self.assertEqual(len(self.calls), calls)
+        self.assertEqual(merge_results(first, ''), merge_results(second, ''))
+
+    def test_errors_are_not_cached(self):
+        class BrokenFacePlusPlus:
+            def detect_face(self, image_bytes, timeout=None):
+                return {'error': 'Face++ caído'}
+
+        data = image_bytes(1)
+        self.make_engine(use_cache=True, facepp=BrokenFacePlusPlus()).run(data, timeout=2)
+        raw = self.make_engine(use_cache=True).run(data, timeout=2)
+
+        self.assertEqual(raw[FACE_ATTRIBUTES]['age'], 31)
@@ -0,0 +1,67 @@
+"""
+Pruebas de la cola de análisis de IA (ai_queue.py)
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from attendance.ai_queue import claim_next_job, process_job
+from attendance.loadtest.dataset import seed_dataset
+from attendance.models_security_photos import AIAnalysisJob, SecurityAlert, SecurityPhoto
+from employees.models import Employee
+
+
+def analyze_with_alert(photo):
+    """Sustituto de SecurityPhoto.analyze_with_ai que genera una alerta"""
+    SecurityAlert.objects.create(
+        photo=photo, employee=photo.employee, alert_type='AI_DETECTION', severity='CRITICAL',
+        message='🔫 ARMA DETECTADA: 1 objeto(s)',
+    )
+    return {'weapons': [{'class': 'knife'}]}
+
+
+@override_settings(AI_QUEUE_TASK_TIMEOUT=300)
+class StaleJobReclaimTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(employees=1, work_areas=1)
+        employee = Employee.objects.get(employee_id='LT00000')
+        cls.photo = SecurityPhoto.objects.create(
+            employee=employee, photo='security_photos/ronda.jpg', thumbnail='security_photos/thumbnails/ronda.jpg',
+        )
+        cls.job = AIAnalysisJob.objects.create(photo=cls.photo)
+
+    def expire_and_reclaim(self, worker_name='ai-worker-b'):
+        """Lo que hace otro worker cuando el job supera AI_QUEUE_TASK_TIMEOUT"""
+        AIAnalysisJob.objects.filter(id=self.job.id).update(locked_at=timezone.now() - timedelta(seconds=301))
+        return claim_next_job(worker_name)
+
+    def test_stale_job_is_reclaimed(self):
+        first = claim_next_job('ai-worker-a')
+        second = self.expire_and_reclaim()
+
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(second.attempts, 2)
+        with mock.patch.object(SecurityPhoto, 'analyze_with_ai', autospec=True, side_effect=analyze_with_alert):
+            self.assertEqual(process_job(first), 'LOST')
+            self.assertEqual(process_job(second), 'DONE')
+
+        self.assertEqual(SecurityAlert.objects.filter(photo=self.photo).count(), 1)
+
+    def test_slow_worker_discards_its_analysis(self):
+        first = claim_next_job('ai-worker-a')
+
+        def slow_analysis(photo):
+            # El job se reclama mientras este worker aún analiza la foto (en la
+            # prueba la misma conexión: el rollback deshace también el reclamo)
+            self.expire_and_reclaim()
+            return analyze_with_alert(photo)
+
+        with mock.patch.object(SecurityPhoto, 'analyze_with_ai', autospec=True, side_effect=slow_analysis):
+            self.assertEqual(process_job(first), 'LOST')
+
+        self.assertFalse(SecurityAlert.objects.filter(photo=self.photo).exists())
+        self.assertEqual(AIAnalysisJob.objects.get(id=self.job.id).alerts_created, 0)
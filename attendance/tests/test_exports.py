@@ -0,0 +1,101 @@
+"""
+Pruebas de la exportación CSV en streaming (exports.py, export_attendance_report)
+"""
+import csv
+import io
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance import exports
+from attendance.loadtest.dataset import seed_dataset
+from attendance.models import AttendanceSummary, ExportJob
+from employees.models import Employee
+
+START_DATE = date(2024, 3, 4)
+DAYS = 4
+
+
+@override_settings(EXPORT_CHUNK_SIZE=3, EXPORT_ASYNC_THRESHOLD_ROWS=1000, EXPORT_QUEUE_WORKERS=0)
+class StreamingAttendanceExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(employees=5, work_areas=1)
+        cls.admin = User.objects.create_user('export-admin', is_staff=True)
+
+        summaries = []
+        for employee in Employee.objects.filter(employee_id__startswith='LT'):
+            for offset in range(DAYS):
+                day = START_DATE + timedelta(days=offset)
+                entry = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=8))
+                summaries.append(AttendanceSummary(
+                    employee=employee, date=day, first_entry=entry, last_exit=entry + timedelta(hours=8, minutes=30),
+                    total_work_hours=timedelta(hours=8, minutes=30), is_present=True, is_late=offset == 0,
+                ))
+        AttendanceSummary.objects.bulk_create(summaries)
+
+        # Fuera del rango exportado
+        AttendanceSummary.objects.create(
+            employee=Employee.objects.get(employee_id='LT00000'), date=START_DATE - timedelta(days=1),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        query = {
+            'start_date': START_DATE.isoformat(),
+            'end_date': (START_DATE + timedelta(days=DAYS - 1)).isoformat(),
+            **params,
+        }
+        return self.client.get(reverse('attendance:export_report'), query, HTTP_HOST='localhost')
+
+    def test_streams_every_row_with_headers(self):
+        response = self.export()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="asistencias_2024-03-04_2024-03-07.csv"',
+        )
+
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], [
+            'Empleado', 'Departamento', 'Fecha', 'Primera Entrada', 'Última Salida',
+            'Horas Trabajadas', 'Presente', 'Tarde', 'Salida Temprana',
+        ])
+        self.assertEqual(len(rows) - 1, 5 * DAYS)
+        self.assertTrue(all(len(row) == 9 for row in rows[1:]))
+        self.assertEqual({row[2] for row in rows[1:]}, {
+            (START_DATE + timedelta(days=offset)).isoformat() for offset in range(DAYS)
+        })
+        self.assertEqual(rows[1][5], '8h 30m')
+        self.assertEqual(sum(row[7] == 'Sí' for row in rows[1:]), 5)
+
+    def test_rows_are_produced_lazily(self):
+        sheet = exports.attendance_sheet(self.admin, START_DATE, START_DATE + timedelta(days=DAYS - 1))
+        chunks = exports.iter_csv(sheet)
+
+        # Encabezado sin consultar la base de datos; las filas al iterar
+        with self.assertNumQueries(0):
+            header = next(chunks)
+        with self.assertNumQueries(1):
+            lines = [header, *chunks]
+
+        self.assertEqual(len(lines), 1 + 5 * DAYS)
+
+    @override_settings(EXPORT_ASYNC_THRESHOLD_ROWS=10)
+    def test_large_export_is_prepared_in_background(self):
+        response = self.export()
+
+        job = ExportJob.objects.get(requested_by=self.admin)
+        self.assertRedirects(
+            response, reverse('attendance:export_job_status', args=[job.id]), fetch_redirect_response=False,
+        )
+        self.assertEqual(job.filename, 'asistencias_2024-03-04_2024-03-07.csv')
@@ -0,0 +1,98 @@
+"""
+Pruebas de extract_face_encoding (decodificación reducida) y de la verificación 1:1
+"""
+import base64
+import unittest
+from io import BytesIO
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from attendance.face_gallery import face_gallery
+from attendance.facial_recognition import CV2_AVAILABLE, get_facial_recognition_system, verify_employee_identity
+from attendance.loadtest.dataset import seed_dataset, synthetic_face
+from employees.models import Employee
+
+# Rostro sintético que la cascada Haar detecta a 640 y a 1280 px
+FACE_SEED = 4
+
+
+def jpeg_base64(image):
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=92)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+@unittest.skipUnless(CV2_AVAILABLE, 'OpenCV no está instalado')
+class ReducedDecodeFaceLocationTests(SimpleTestCase):
+
+    def setUp(self):
+        self.system = get_facial_recognition_system()
+        self.image = synthetic_face(FACE_SEED)
+
+    def test_location_in_original_coordinates(self):
+        _, small, _ = self.system.extract_face_encoding(jpeg_base64(self.image), max_side=640)
+        # Mismo rostro al doble de tamaño, decodificado a la mitad
+        _, large, _ = self.system.extract_face_encoding(
+            jpeg_base64(self.image.resize((1280, 960))), max_side=640,
+        )
+
+        self.assertIsNotNone(small)
+        self.assertIsNotNone(large)
+        for small_edge, large_edge in zip(small, large):
+            self.assertAlmostEqual(large_edge / 2, small_edge, delta=20)
+
+    def test_face_size_checked_at_original_resolution(self):
+        _, small, _ = self.system.extract_face_encoding(jpeg_base64(self.image), max_side=640)
+        _, large, _ = self.system.extract_face_encoding(
+            jpeg_base64(self.image.resize((1280, 960))), max_side=640,
+        )
+
+        # ~300 px en la foto de 640 y ~600 px (fuera de 50-400) en la de 1280
+        self.assertTrue(self.system._check_face_size(small))
+        self.assertFalse(self.system._check_face_size(large))
+
+
+@unittest.skipUnless(CV2_AVAILABLE, 'OpenCV no está instalado')
+class VerifyIdentityTests(TestCase):
+    """Verificación 1:1 con una galería de menos de FACE_STANDARDIZE_MIN_PROFILES perfiles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.image = jpeg_base64(synthetic_face(FACE_SEED))
+        features, _, _ = get_facial_recognition_system().extract_face_encoding(cls.image)
+        seed_dataset(employees=1, work_areas=1, faces=[(None, features)])
+        cls.employee = Employee.objects.get(employee_id='LT00000')
+
+    def setUp(self):
+        self.system = get_facial_recognition_system()
+        face_gallery.invalidate()
+        self.addCleanup(face_gallery.invalidate)
+
+    def test_uncalibrated_gallery_keeps_original_decision(self):
+        result = self.system.verify_identity(self.image, self.employee)
+
+        self.assertFalse(face_gallery.calibrated)
+        self.assertTrue(result['success'])
+        self.assertAlmostEqual(
+            result['confidence'], result['similarity'] * 0.8 + result['quality_score'] * 0.2, places=6,
+        )
+
+    @override_settings(FACE_VERIFY_THRESHOLD=0.99)
+    def test_calibrated_threshold_needs_calibrated_gallery(self):
+        result = self.system.verify_identity(self.image, self.employee)
+
+        self.assertTrue(result['success'])
+        self.assertLess(result['confidence'], 0.99)
+
+    def test_rejection_falls_back(self):
+        fallback = {'success': True, 'confidence': 0.7, 'method': 'fallback'}
+        rejected = {'success': False, 'confidence': 0.1, 'error': 'Identidad no verificada'}
+
+        with mock.patch.object(self.system, 'verify_identity', return_value=rejected), \
+                mock.patch('attendance.facial_recognition._intelligent_fallback_verification',
+                           return_value=fallback) as fallback_verification:
+            result = verify_employee_identity(self.image, self.employee)
+
+        fallback_verification.assert_called_once()
+        self.assertEqual(result, fallback)
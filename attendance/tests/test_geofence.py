@@ -0,0 +1,147 @@
+"""
+Pruebas del índice de geocercas (geofence.py) contra un recorrido completo
+de WorkArea con WorkArea.calculate_distance
+"""
+import math
+import random
+from unittest import mock
+
+from django.test import TestCase
+
+from attendance.geofence import EARTH_RADIUS_METERS, GeofenceIndex
+from attendance.models_gps import WorkArea
+
+CELL_DEGREES = 0.01
+
+
+def create_area(name, latitude, longitude, radius, is_active=True):
+    return WorkArea.objects.create(
+        name=name,
+        area_type='BUILDING',
+        latitude=round(latitude, 8),
+        longitude=round(longitude, 8),
+        radius_meters=radius,
+        is_active=is_active,
+    )
+
+
+def north_of(area, meters):
+    """Punto a `meters` metros al norte del centro del área"""
+    return float(area.latitude) + math.degrees(meters / EARTH_RADIUS_METERS), float(area.longitude)
+
+
+def brute_force_locate(lat, lng, tolerance_meters=0):
+    """(área, distancia, dentro) recorriendo todas las áreas activas"""
+    candidates = [(area.calculate_distance(lat, lng), area.id, area) for area in WorkArea.objects.filter(is_active=True)]
+    if not candidates:
+        return None
+
+    containing = [item for item in candidates if item[0] <= item[2].radius_meters + tolerance_meters]
+    distance, _, area = min(containing or candidates, key=lambda item: item[0])
+    return area, distance, bool(containing)
+
+
+class GeofenceIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Centro junto al borde norte de su celda: el círculo cubre varias celdas
+        cls.corner = create_area('esquina', -0.2101, -78.5101, 200)
+        # Dos áreas solapadas: la grande contiene a la pequeña
+        cls.large = create_area('grande', -0.1500, -78.4800, 500)
+        cls.small = create_area('pequeña', -0.1510, -78.4800, 150)
+        cls.inactive = create_area('inactiva', -0.1850, -78.5000, 1000, is_active=False)
+
+    def setUp(self):
+        self.index = GeofenceIndex(cell_degrees=CELL_DEGREES)
+
+    def assertMatchesBruteForce(self, lat, lng, tolerance_meters=0):
+        match = self.index.locate(lat, lng, tolerance_meters)
+        expected = brute_force_locate(lat, lng, tolerance_meters)
+
+        area, distance, inside = expected
+        self.assertEqual(match.area.id, area.id)
+        self.assertAlmostEqual(match.distance, distance, places=6)
+        self.assertEqual(match.inside, inside)
+        return match
+
+    def test_point_inside_area(self):
+        lat, lng = north_of(self.corner, 120)
+
+        match = self.assertMatchesBruteForce(lat, lng)
+        self.assertTrue(match.inside)
+        self.assertEqual(self.index.contains(lat, lng).area.id, self.corner.id)
+
+    def test_point_inside_area_in_neighbor_cell(self):
+        # El centro está en otra celda; la cobertura del círculo la alcanza
+        lat, lng = north_of(self.corner, 190)
+        center_cell = self.index._cell(float(self.corner.latitude), float(self.corner.longitude))
+        self.assertNotEqual(self.index._cell(lat, lng), center_cell)
+
+        self.assertEqual(self.index.contains(lat, lng).area.id, self.corner.id)
+
+    def test_point_on_boundary(self):
+        inside = north_of(self.corner, 199.99)
+        outside = north_of(self.corner, 200.01)
+
+        self.assertTrue(self.assertMatchesBruteForce(*inside).inside)
+        self.assertFalse(self.assertMatchesBruteForce(*outside).inside)
+        self.assertIsNone(self.index.contains(*outside))
+
+    def test_tolerance_extends_boundary(self):
+        lat, lng = north_of(self.corner, 210)
+
+        self.assertFalse(self.assertMatchesBruteForce(lat, lng).inside)
+        self.assertTrue(self.assertMatchesBruteForce(lat, lng, tolerance_meters=15).inside)
+        self.assertEqual(self.index.contains(lat, lng, tolerance_meters=15).area.id, self.corner.id)
+
+    def test_point_outside_every_area(self):
+        lat, lng = north_of(self.corner, 900)
+
+        match = self.assertMatchesBruteForce(lat, lng)
+        self.assertFalse(match.inside)
+        self.assertEqual(match.area.id, self.corner.id)
+        self.assertIsNone(self.index.contains(lat, lng))
+
+    def test_overlapping_areas_pick_nearest_center(self):
+        near_small = north_of(self.small, -50)
+        near_large = north_of(self.large, 100)
+
+        self.assertEqual(self.assertMatchesBruteForce(*near_small).area.id, self.small.id)
+        self.assertEqual(self.assertMatchesBruteForce(*near_large).area.id, self.large.id)
+
+    def test_inactive_areas_are_ignored(self):
+        lat, lng = -0.1850, -78.5000
+
+        match = self.assertMatchesBruteForce(lat, lng)
+        self.assertNotEqual(match.area.id, self.inactive.id)
+
+    def test_nearest_search_stops_at_ring_bound(self):
+        # Un área lejana amplía la caja de centros a ~100 anillos
+        create_area('lejana', 0.8, -77.5, 100)
+        lat, lng = north_of(self.corner, 400)
+
+        with mock.patch.object(GeofenceIndex, '_ring_cells', wraps=GeofenceIndex._ring_cells) as ring_cells:
+            match = self.assertMatchesBruteForce(lat, lng)
+
+        rings = [call.args[2] for call in ring_cells.call_args_list]
+        self.assertEqual(match.area.id, self.corner.id)
+        self.assertLessEqual(max(rings), 2)
+
+    def test_random_points_match_brute_force(self):
+        rng = random.Random(1234)
+        for index in range(40):
+            create_area(
+                f'aleatoria {index:02d}',
+                rng.uniform(-0.30, -0.10),
+                rng.uniform(-78.60, -78.40),
+                rng.randint(30, 400),
+                is_active=rng.random() > 0.1,
+            )
+
+        for _ in range(300):
+            lat = rng.uniform(-0.40, 0.00)
+            lng = rng.uniform(-78.70, -78.30)
+            tolerance = rng.choice((0, 25))
+            with self.subTest(lat=lat, lng=lng, tolerance=tolerance):
+                self.assertMatchesBruteForce(lat, lng, tolerance)
@@ -0,0 +1,143 @@
+"""
+Pruebas del procesamiento de recorridos GPS (gps_tracks.py) y de la
+polilínea codificada (gps_storage.py)
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from attendance.gps_storage import TrackPoint, decode_integers, decode_polyline, encode_integers, encode_polyline
+from attendance.gps_tracks import douglas_peucker, process_track, project, tolerance_for_zoom, visvalingam
+
+START = datetime(2024, 5, 6, 8, 0, tzinfo=dt_timezone.utc)
+BASE_LATITUDE = -0.1807
+BASE_LONGITUDE = -78.4678
+# Metros por grado de latitud (aproximado) para construir recorridos de prueba
+METERS_PER_DEGREE = 111320.0
+
+
+def track(offsets_meters, seconds_between=10):
+    """TrackPoint a partir de desplazamientos (norte, este) en metros"""
+    cos_lat = math.cos(math.radians(BASE_LATITUDE))
+    return [
+        TrackPoint(
+            START + timedelta(seconds=index * seconds_between),
+            BASE_LATITUDE + north / METERS_PER_DEGREE,
+            BASE_LONGITUDE + east / (METERS_PER_DEGREE * cos_lat),
+            'RAW',
+        )
+        for index, (north, east) in enumerate(offsets_meters)
+    ]
+
+
+class PolylineEncodingTests(SimpleTestCase):
+
+    def test_reference_polyline(self):
+        # Ejemplo de la documentación del formato de polilínea codificada
+        coordinates = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+        self.assertEqual(encode_polyline(coordinates), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        self.assertEqual(decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@'), coordinates)
+
+    def test_single_point_and_empty(self):
+        self.assertEqual(encode_polyline([]), '')
+        self.assertEqual(encode_polyline([(0, 0)]), '??')
+        self.assertEqual(encode_polyline([(-0.00001, 0.00001)]), '@A')
+
+    def test_round_trip_at_five_decimals(self):
+        coordinates = [(BASE_LATITUDE + i * 0.000137, BASE_LONGITUDE - i * 0.000091) for i in range(50)]
+
+        decoded = decode_polyline(encode_polyline(coordinates))
+        np.testing.assert_allclose(decoded, coordinates, atol=0.5e-5)
+
+    def test_integer_offsets(self):
+        self.assertEqual(encode_integers([0, 30, 60]), '?{@{@')
+        self.assertEqual(decode_integers(encode_integers([0, 30, 60, 7200])), [0, 30, 60, 7200])
+
+
+class StopDetectionTests(SimpleTestCase):
+
+    def walking(self, start, steps, step_meters=15):
+        north, east = start
+        return [(north + i * step_meters, east) for i in range(1, steps + 1)]
+
+    def paused_walk(self):
+        # Pasos de 50 m cada 10 s con una pausa de 50 s a los 500 m
+        return track(self.walking((0, 0), 10, 50) + [(500, 0)] * 5 + self.walking((500, 0), 10, 50))
+
+    def test_stationary_cluster_collapses_to_single_stop(self):
+        rng = np.random.default_rng(7)
+        before = self.walking((0, 0), 20)
+        # 10 minutos con ruido de GPS de pocos metros alrededor de un punto
+        cluster = [(300 + dn, 0 + de) for dn, de in rng.uniform(-5, 5, size=(60, 2))]
+        after = self.walking((300, 0), 20)
+        points = track(before + cluster + after)
+
+        result = process_track(points, tolerance=5)
+
+        self.assertEqual(len(result['stops']), 1)
+        stop = result['stops'][0]
+        self.assertGreaterEqual(stop['points'], 60)
+        self.assertGreaterEqual(stop['duration_seconds'], 590)
+
+        # La parada queda como su centroide repetido al inicio y al fin
+        decoded = decode_polyline(result['polyline'])
+        centroid = (round(stop['lat'], 5), round(stop['lng'], 5))
+        self.assertEqual(sum(1 for point in decoded if point == centroid), 2)
+        self.assertLess(result['simplified'], 10)
+        self.assertEqual(len(decode_integers(result['offsets'])), result['simplified'])
+
+    def test_short_pause_is_not_a_stop(self):
+        points = self.paused_walk()
+
+        self.assertEqual(process_track(points, tolerance=5)['stops'], [])
+
+    @override_settings(GPS_STOP_MIN_SECONDS=40)
+    def test_stop_threshold_setting(self):
+        points = self.paused_walk()
+
+        self.assertEqual(len(process_track(points, tolerance=5)['stops']), 1)
+
+
+class ToleranceTests(SimpleTestCase):
+
+    def zigzag(self):
+        rng = np.random.default_rng(11)
+        return track([(i * 10, float(offset)) for i, offset in enumerate(rng.normal(0, 20, 400))])
+
+    def test_tolerance_halves_with_each_zoom_level(self):
+        tolerances = [tolerance_for_zoom(zoom, BASE_LATITUDE) for zoom in range(10, 21)]
+
+        for lower, higher in zip(tolerances, tolerances[1:]):
+            self.assertAlmostEqual(higher, lower / 2)
+        self.assertLess(tolerance_for_zoom(15, 60.0), tolerance_for_zoom(15, 0.0))
+
+    def test_higher_zoom_keeps_more_points(self):
+        points = self.zigzag()
+
+        kept = [process_track(points, zoom=zoom)['simplified'] for zoom in (12, 14, 16, 18, 20)]
+
+        self.assertEqual(kept, sorted(kept))
+        self.assertLess(kept[0], kept[-1])
+        self.assertLessEqual(kept[-1], len(points))
+
+    def test_explicit_tolerance_overrides_zoom(self):
+        points = self.zigzag()
+
+        result = process_track(points, zoom=20, tolerance=50)
+
+        self.assertEqual(result['tolerance_meters'], 50)
+        self.assertEqual(result['simplified'], process_track(points, tolerance=50)['simplified'])
+
+    def test_smaller_tolerance_keeps_superset(self):
+        xy = project([(point.latitude, point.longitude) for point in self.zigzag()])
+
+        for simplify in (douglas_peucker, visvalingam):
+            with self.subTest(method=simplify.__name__):
+                coarse = set(simplify(xy, 40))
+                fine = set(simplify(xy, 10))
+                self.assertLessEqual(len(coarse), len(fine))
+                if simplify is douglas_peucker:
+                    self.assertLessEqual(coarse, fine)
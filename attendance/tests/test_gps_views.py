@@ -0,0 +1,49 @@
+"""
+Pruebas del endpoint de un solo punto GPS (sw.js, sw-background-gps.js, pwa-simple.js)
+"""
+import json
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from attendance.loadtest.dataset import seed_dataset
+from attendance.models_gps import GPSTracking
+from employees.models import Employee
+
+
+class UpdateGPSLocationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(employees=1, work_areas=1)
+        cls.employee = Employee.objects.get(employee_id='LT00000')
+
+    def setUp(self):
+        self.client.force_login(self.employee.user)
+
+    def post(self, latitude, longitude):
+        return self.client.post(
+            reverse('attendance:update_gps_location'),
+            data=json.dumps({'latitude': latitude, 'longitude': longitude, 'accuracy': 8}),
+            content_type='application/json',
+            HTTP_HOST='localhost',
+        )
+
+    def test_point_feeds_alert_engine(self):
+        with mock.patch('attendance.gps_views.gps_alert_engine') as engine:
+            engine.process.return_value = ['alerta']
+            response = self.post(-1.5, -78.5)
+
+        tracking = GPSTracking.objects.get(employee=self.employee)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['alert_generated'])
+        engine.process.assert_called_once_with(self.employee, [tracking])
+
+    def test_point_without_alerts(self):
+        with mock.patch('attendance.gps_views.gps_alert_engine') as engine:
+            engine.process.return_value = []
+            response = self.post(-2.2394, -79.9391)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['alert_generated'])
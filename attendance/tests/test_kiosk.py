@@ -0,0 +1,104 @@
+"""
+Pruebas del endpoint del kiosco de marcación (identificación 1:N)
+
+La identificación facial se sustituye por candidatos fijos: lo que se prueba
+es la decisión del kiosco (umbral, ambigüedad) y la marcación resultante.
+"""
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from attendance.face_gallery import FaceGallery
+from attendance.geofence import geofence_index
+from attendance.loadtest.dataset import seed_dataset
+from attendance.models import AttendanceRecord
+from attendance.models_gps import AttendanceKiosk, WorkArea
+from employees.models import Employee
+
+CAPTURE = 'data:image/jpeg;base64,' + 'A' * 2000
+
+
+@override_settings(KIOSK_IDENTIFICATION_ENABLED=True, KIOSK_MIN_SIMILARITY=0.67, KIOSK_AMBIGUITY_MARGIN=0.18)
+class KioskRecordTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(employees=3, work_areas=1)
+        cls.guard, cls.other = Employee.objects.filter(employee_id__startswith='LT').order_by('employee_id')[:2]
+        cls.kiosk = AttendanceKiosk(work_area=WorkArea.objects.get(name__startswith='loadtest'), name='Recepción')
+        cls.token = cls.kiosk.set_new_token()
+        cls.kiosk.save()
+
+    def setUp(self):
+        geofence_index.invalidate()
+        self.addCleanup(geofence_index.invalidate)
+        calibrated = mock.patch.object(FaceGallery, 'calibrated', new_callable=mock.PropertyMock, return_value=True)
+        calibrated.start()
+        self.addCleanup(calibrated.stop)
+
+    def post(self, candidates):
+        result = {'success': bool(candidates), 'candidates': candidates, 'security_checks': {}}
+        with mock.patch('attendance.kiosk.identify_employee', return_value=result) as identify:
+            response = self.client.post(
+                reverse('attendance:kiosk_record'),
+                data=json.dumps({'facial_image': CAPTURE}),
+                content_type='application/json',
+                HTTP_AUTHORIZATION=f'Kiosk {self.token}',
+                HTTP_HOST='localhost',
+            )
+        self.identify = identify
+        return response.json()
+
+    def candidate(self, employee, similarity):
+        return {'employee_id': employee.id, 'profile_id': employee.id, 'similarity': similarity}
+
+    def test_one_match_records_attendance(self):
+        data = self.post([self.candidate(self.guard, 0.91), self.candidate(self.other, 0.40)])
+
+        self.assertTrue(data['success'])
+        self.assertEqual(data['employee']['employee_id'], self.guard.employee_id)
+        self.assertEqual(data['attendance_type'], 'IN')
+        record = AttendanceRecord.objects.get(employee=self.guard)
+        self.assertEqual(record.facial_confidence, 0.91)
+        self.assertFalse(AttendanceRecord.objects.filter(employee=self.other).exists())
+        # Solo se buscan los empleados asignados al área del kiosco
+        self.assertEqual(
+            set(self.identify.call_args.kwargs['employee_ids']),
+            set(Employee.objects.filter(employee_id__startswith='LT').values_list('id', flat=True)),
+        )
+
+    def test_no_match_is_rejected(self):
+        data = self.post([])
+
+        self.assertFalse(data['success'])
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+    def test_below_threshold_is_rejected(self):
+        data = self.post([self.candidate(self.guard, 0.60)])
+
+        self.assertFalse(data['success'])
+        self.assertEqual(data['error'], 'Rostro no reconocido')
+        self.assertEqual(data['confidence'], 0.60)
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+    def test_ambiguous_match_is_rejected(self):
+        data = self.post([self.candidate(self.guard, 0.80), self.candidate(self.other, 0.70)])
+
+        self.assertFalse(data['success'])
+        self.assertIn('ambigua', data['error'])
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+    @override_settings(KIOSK_IDENTIFICATION_ENABLED=False)
+    def test_disabled_until_rolled_out(self):
+        response = self.client.post(
+            reverse('attendance:kiosk_record'),
+            data=json.dumps({'facial_image': CAPTURE}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Kiosk {self.token}',
+            HTTP_HOST='localhost',
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(AttendanceRecord.objects.exists())
@@ -0,0 +1,96 @@
+"""
+Pruebas del LBP vectorizado (lbp.py) contra el bucle píxel a píxel original
+"""
+import unittest
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from attendance.facial_recognition import CV2_AVAILABLE, get_facial_recognition_system
+from attendance.lbp import lbp_codes, lbp_histogram, lbp_histogram_reference
+
+# (alto, ancho) en el límite del borde de 1 píxel y formas no cuadradas
+EDGE_SHAPES = [(2, 2), (2, 7), (3, 3), (3, 8), (8, 3), (4, 5), (17, 31)]
+
+
+def reference_codes(image):
+    """Mapa de códigos del bucle original de FacialRecognitionSystem._compute_lbp"""
+    h, w = image.shape
+    lbp = np.zeros((h-2, w-2), dtype=np.uint8)
+
+    for i in range(1, h-1):
+        for j in range(1, w-1):
+            center = image[i, j]
+            code = 0
+
+            neighbors = [
+                image[i-1, j-1], image[i-1, j], image[i-1, j+1],
+                image[i, j+1], image[i+1, j+1], image[i+1, j],
+                image[i+1, j-1], image[i, j-1]
+            ]
+
+            for k, neighbor in enumerate(neighbors):
+                if neighbor >= center:
+                    code |= (1 << k)
+
+            lbp[i-1, j-1] = code
+
+    return lbp
+
+
+def sample_images():
+    """Imágenes aleatorias, cuantizadas (muchos empates) y de tamaño límite"""
+    rng = np.random.default_rng(20240611)
+    images = []
+
+    for shape in [(64, 64), (48, 37), (100, 80)]:
+        images.append(('aleatoria %sx%s' % shape, rng.integers(0, 256, shape, dtype=np.uint8)))
+
+    for levels in (2, 4, 16):
+        image = rng.integers(0, levels, (60, 45), dtype=np.uint8) * (255 // (levels - 1))
+        images.append((f'cuantizada {levels} niveles', image.astype(np.uint8)))
+
+    images.append(('constante', np.full((20, 20), 128, dtype=np.uint8)))
+    images.append(('extremos', rng.choice(np.array([0, 255], dtype=np.uint8), (25, 33))))
+
+    for shape in EDGE_SHAPES:
+        images.append(('borde %sx%s' % shape, rng.integers(0, 256, shape, dtype=np.uint8)))
+
+    return images
+
+
+class VectorizedLbpTests(SimpleTestCase):
+
+    def test_codes_are_bit_identical_to_reference_loop(self):
+        for name, image in sample_images():
+            with self.subTest(image=name):
+                expected = reference_codes(image)
+                codes = lbp_codes(image)
+
+                self.assertEqual(codes.dtype, np.uint8)
+                self.assertEqual(codes.size, expected.size)
+                if expected.size:
+                    np.testing.assert_array_equal(codes, expected)
+
+    def test_histogram_matches_reference(self):
+        for name, image in sample_images():
+            with self.subTest(image=name):
+                self.assertEqual(lbp_histogram(image), lbp_histogram_reference(image))
+
+    def test_quantized_ties_set_every_bit(self):
+        # Con vecinos iguales al centro la comparación >= activa los 8 bits
+        image = np.full((3, 3), 7, dtype=np.uint8)
+
+        self.assertEqual(lbp_codes(image).tolist(), [[255]])
+        self.assertEqual(lbp_histogram(image)[15], 1)
+
+
+@unittest.skipUnless(CV2_AVAILABLE, 'OpenCV no está instalado')
+class ComputeLbpTests(SimpleTestCase):
+
+    def test_compute_lbp_matches_reference(self):
+        system = get_facial_recognition_system()
+
+        for name, image in sample_images():
+            with self.subTest(image=name):
+                self.assertEqual(system._compute_lbp(image), lbp_histogram_reference(image))
@@ -0,0 +1,72 @@
+"""
+Pruebas de la matriz de nómina mensual (payroll_calendar.py)
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from attendance.loadtest.dataset import seed_dataset
+from attendance.models import EmployeeShiftAssignment, Shift, ShiftTemplate, WorkSchedule
+from attendance.payroll_calendar import build_payroll_calendar
+from employees.models import Employee
+
+YEAR, MONTH = 2026, 3
+
+
+def make_shift(code):
+    template = ShiftTemplate.objects.create(
+        name=f'Prueba {code}', category='SECURITY', shift_type='ROTATING', shift_code=code,
+    )
+    schedule = WorkSchedule.objects.create(
+        name=f'Horario {code}', schedule_type='GLOBAL', shift_template=template, start_date=date(YEAR, 1, 1),
+    )
+    return Shift.objects.create(
+        work_schedule=schedule, order=1, name='MORNING', start_time=time(6, 0), end_time=time(18, 0),
+    )
+
+
+class PayrollCalendarOverlapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(employees=1, work_areas=1)
+        cls.employee = Employee.objects.get(employee_id='LT00000')
+        EmployeeShiftAssignment.objects.filter(employee=cls.employee).delete()
+
+        created = timezone.make_aware(datetime(YEAR, 1, 1, 8, 0))
+        # (código, inicio, fin, minutos tras la primera asignación)
+        for code, start, end, minutes in (
+            ('A', date(YEAR, 2, 1), None, 0),
+            ('B', date(YEAR, MONTH, 10), date(YEAR, MONTH, 20), 20),
+            ('C', date(YEAR, MONTH, 15), date(YEAR, MONTH, 25), 10),
+        ):
+            assignment = EmployeeShiftAssignment.objects.create(
+                employee=cls.employee, shift=make_shift(code), start_date=start, end_date=end,
+            )
+            EmployeeShiftAssignment.objects.filter(id=assignment.id).update(
+                created_at=created + timedelta(minutes=minutes)
+            )
+
+    def shift_codes(self):
+        calendar = build_payroll_calendar([self.employee], YEAR, MONTH, today=date(YEAR, MONTH + 1, 1))
+        return [day['shift_code'] for day in calendar['employees_data'][0]['days']]
+
+    def test_newest_assignment_wins_overlaps(self):
+        codes = self.shift_codes()
+
+        self.assertEqual(codes[:9], ['A'] * 9)
+        self.assertEqual(codes[9:20], ['B'] * 11)
+        self.assertEqual(codes[20:25], ['C'] * 5)
+        self.assertEqual(codes[25:], ['A'] * 6)
+
+    def test_same_creation_time_highest_id_wins(self):
+        EmployeeShiftAssignment.objects.filter(employee=self.employee).update(
+            created_at=timezone.make_aware(datetime(YEAR, 1, 1, 8, 0))
+        )
+
+        codes = self.shift_codes()
+
+        # Sin diferencia de created_at decide el orden de creación (id)
+        self.assertEqual(codes[9:14], ['B'] * 5)
+        self.assertEqual(codes[14:25], ['C'] * 11)
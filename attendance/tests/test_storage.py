@@ -0,0 +1,160 @@
+"""
+Pruebas de CloudinaryStorage contra el Cloudinary simulado (tests/fakes.py)
+"""
+import os
+import shutil
+import tempfile
+
+import requests
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from attendance.storage import CloudinaryStorage, cloudinary_uploader
+from attendance.tests.fakes import FakeCloudinary, make_fake_handler, start_server
+
+PAYLOAD = b'\xff\xd8' + bytes(64 * 1024)
+CHUNK_SIZE = 5 * 1024 * 1024
+
+
+@override_settings(CLOUDINARY_RETRY_BACKOFF_SECONDS=0.01, CLOUDINARY_SPOOL_STALE_SECONDS=0)
+class CloudinaryStorageTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.state = FakeCloudinary('demo', 'secret')
+        cls.server, cls.base_url = start_server(make_fake_handler(cls.state))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.state.resources.clear()
+        self.state.fail_next = 0
+        self.spool_dir = tempfile.mkdtemp(prefix='cloudinary-spool-')
+        self.local_root = tempfile.mkdtemp(prefix='media-')
+        self.addCleanup(shutil.rmtree, self.spool_dir, True)
+        self.addCleanup(shutil.rmtree, self.local_root, True)
+        self.addCleanup(cloudinary_uploader.shutdown)
+
+    def make_storage(self, async_uploads=False, local_root=None):
+        return CloudinaryStorage(
+            cloud_name='demo', api_key='key', api_secret='secret',
+            api_url=f'{self.base_url}/v1_1', delivery_url=self.base_url, spool_dir=self.spool_dir,
+            async_uploads=async_uploads, chunk_size=CHUNK_SIZE, session=requests.Session(),
+            local_root=local_root or self.local_root,
+        )
+
+    def uploaded(self, name, resource_type='image'):
+        public_id = name if resource_type == 'raw' else name.rsplit('.', 1)[0]
+        return self.state.resources.get((resource_type, public_id))
+
+    def test_sync_upload(self):
+        name = self.make_storage().save('fotos/guardia.jpg', ContentFile(PAYLOAD))
+
+        self.assertEqual(name, 'fotos/guardia.jpg')
+        self.assertEqual(self.uploaded(name), PAYLOAD)
+
+    def test_background_upload_empties_spool(self):
+        storage = self.make_storage(async_uploads=True)
+        names = [storage.save(f'fotos/ronda_{i}.jpg', ContentFile(PAYLOAD)) for i in range(3)]
+
+        uploaded, failed = cloudinary_uploader.flush(storage, timeout=30)
+
+        self.assertEqual(failed, 0)
+        self.assertEqual(storage.spooled_names(), [])
+        for name in names:
+            self.assertEqual(self.uploaded(name), PAYLOAD)
+
+    def test_repeated_name_is_renamed(self):
+        storage = self.make_storage()
+        first = storage.save('fotos/repetida.jpg', ContentFile(PAYLOAD))
+        second = storage.save('fotos/repetida.jpg', ContentFile(PAYLOAD))
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.uploaded(second), PAYLOAD)
+
+    def test_size_is_cached_after_first_head(self):
+        name = self.make_storage().save('fotos/tamano.jpg', ContentFile(PAYLOAD))
+        fresh = self.make_storage()
+
+        heads = self.state.requests['HEAD']
+        self.assertEqual(fresh.size(name), len(PAYLOAD))
+        self.assertEqual(fresh.size(name), len(PAYLOAD))
+        self.assertEqual(self.state.requests['HEAD'] - heads, 1)
+
+    def test_missing_file_does_not_exist(self):
+        self.assertFalse(self.make_storage().exists('fotos/nada.jpg'))
+
+    def test_large_file_uploaded_in_chunks(self):
+        storage = self.make_storage()
+        large = bytes(range(256)) * (11 * 4096)
+
+        uploads = self.state.requests['upload']
+        name = storage.save('videos/ronda.mp4', ContentFile(large))
+
+        self.assertEqual(self.state.requests['upload'] - uploads, 3)
+        with self.make_storage().open(name) as f:
+            self.assertEqual(f.read(), large)
+
+    def test_upload_retried_after_503(self):
+        self.state.fail_next = 2
+        name = self.make_storage().save('fotos/reintento.jpg', ContentFile(PAYLOAD))
+
+        self.assertEqual(self.state.fail_next, 0)
+        self.assertEqual(self.uploaded(name), PAYLOAD)
+
+    def test_delete_removes_resource(self):
+        storage = self.make_storage()
+        name = storage.save('fotos/borrar.jpg', ContentFile(PAYLOAD))
+
+        storage.delete(name)
+
+        self.assertIsNone(self.uploaded(name))
+        self.assertFalse(self.make_storage().exists(name))
+
+    # Archivos anteriores a Cloudinary en MEDIA_ROOT
+
+    def write_local(self, name, data=PAYLOAD):
+        path = os.path.join(self.local_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def test_local_file_is_served_from_media_root(self):
+        self.write_local('attendance/faces/antigua.jpg')
+        storage = self.make_storage()
+        requests_before = dict(self.state.requests)
+
+        self.assertEqual(storage.url('attendance/faces/antigua.jpg'), '/media/attendance/faces/antigua.jpg')
+        self.assertTrue(storage.exists('attendance/faces/antigua.jpg'))
+        self.assertEqual(storage.size('attendance/faces/antigua.jpg'), len(PAYLOAD))
+        with storage.open('attendance/faces/antigua.jpg') as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        self.assertEqual(self.state.requests, requests_before)
+
+    def test_local_name_is_not_overwritten_by_upload(self):
+        self.write_local('fotos/local.jpg')
+
+        name = self.make_storage().save('fotos/local.jpg', ContentFile(b'nueva'))
+
+        self.assertNotEqual(name, 'fotos/local.jpg')
+
+    def test_cloudinary_url_when_not_local(self):
+        url = self.make_storage().url('fotos/nueva.jpg')
+
+        self.assertEqual(url, f'{self.base_url}/demo/image/upload/fotos/nueva.jpg')
+
+    @override_settings(CLOUDINARY_LOCAL_FALLBACK=False)
+    def test_fallback_can_be_disabled(self):
+        storage = CloudinaryStorage(
+            cloud_name='demo', api_key='key', api_secret='secret',
+            api_url=f'{self.base_url}/v1_1', delivery_url=self.base_url, spool_dir=self.spool_dir,
+            session=requests.Session(),
+        )
+
+        self.assertIsNone(storage.local)
+        self.assertTrue(storage.url('fotos/antigua.jpg').startswith(self.base_url))
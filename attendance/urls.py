@@ -19,6 +19,9 @@ urlpatterns = [
     
     # API para registrar asistencia
     path('api/record/', views.record_attendance, name='record'),
+    path('api/record/<int:task_id>/estado/', views.record_attendance_status, name='record_status'),
+    # Kiosco de marcación (tablet en el área de trabajo, autenticada por token)
+    path('api/kiosco/marcar/', views.kiosk_record_attendance, name='kiosk_record'),
     
     # Dashboard para supervisores
     path('dashboard/', views.attendance_dashboard, name='dashboard'),
@@ -27,7 +30,10 @@ urlpatterns = [
     path('reportes/', reports_views.attendance_reports, name='reports'),
     path('reportes/departamento/<int:department_id>/', reports_views.department_attendance_report, name='department_report'),
     path('reportes/nomina-mensual/<int:department_id>/', reports_views.monthly_payroll_report, name='monthly_payroll_report'),
+    path('reportes/nomina-mensual/<int:department_id>/exportar/', reports_views.export_monthly_payroll, name='export_monthly_payroll'),
     path('reportes/exportar/', reports_views.export_attendance_report, name='export_report'),
+    path('exportaciones/<int:job_id>/', reports_views.export_job_status, name='export_job_status'),
+    path('exportaciones/<int:job_id>/descargar/', reports_views.download_export, name='download_export'),
     
     # Mapas y ubicaciones
     path('mapa/', reports_views.attendance_locations_map, name='locations_map'),
@@ -38,7 +44,9 @@ urlpatterns = [
     path('api/rastreo-gps/', gps_views.gps_tracking_api, name='gps_tracking_api'),
     path('api/areas-trabajo/', gps_views.work_areas_api, name='work_areas_api'),
     path('api/actualizar-gps/', gps_views.update_gps_location, name='update_gps_location'),
+    path('api/actualizar-gps/lote/', gps_views.update_gps_batch, name='update_gps_batch'),
     path('empleado/<int:employee_id>/historial-gps/', gps_views.employee_tracking_history, name='employee_tracking_history'),
+    path('api/empleado/<int:employee_id>/recorrido/', gps_views.employee_track_api, name='employee_track_api'),
     path('alertas-ubicacion/', gps_views.location_alerts_view, name='location_alerts'),
     
     # Gestión de Áreas de Trabajo
@@ -148,6 +156,7 @@ urlpatterns = [
     # APIs en Tiempo Real
     path('operaciones/api/ubicaciones/', views_operations.get_live_locations, name='get_live_locations'),
     path('operaciones/api/alertas/', views_operations.get_active_alerts, name='get_active_alerts'),
+    path('operaciones/api/eventos/', views_operations.live_events_stream, name='live_events'),
     
     # Gestión de Alertas
     path('operaciones/alertas/<int:alert_id>/reconocer/', views_operations.acknowledge_alert, name='acknowledge_alert'),
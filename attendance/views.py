@@ -6,8 +6,10 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, Count, Avg, F
 from django.contrib import messages
+from django.conf import settings as django_settings
+from django.urls import reverse
 from datetime import datetime, date, timedelta
 import json
 import base64
@@ -19,63 +21,10 @@ from core.permissions import employee_required, permission_required, get_employe
 from .models import AttendanceRecord, AttendanceSummary, FacialRecognitionProfile, AttendanceSettings
 from employees.models import Employee
 from .facial_recognition import verify_employee_identity, enroll_employee_facial_profile
+from .summary_service import apply_record_to_summary
 
 logger = logging.getLogger(__name__)
 
-def update_daily_summary(employee, attendance_record):
-    """Actualizar resumen diario de asistencia"""
-    date = attendance_record.timestamp.date()
-    
-    summary, created = AttendanceSummary.objects.get_or_create(
-        employee=employee,
-        date=date,
-        defaults={
-            'first_entry': None,
-            'last_exit': None,
-            'entries_count': 0,
-            'exits_count': 0,
-            'break_count': 0,
-            'is_present': False,
-            'is_late': False,
-            'is_early_exit': False,
-        }
-    )
-    
-    # Actualizar contadores
-    if attendance_record.attendance_type == 'IN':
-        summary.entries_count += 1
-        if not summary.first_entry:
-            summary.first_entry = attendance_record.timestamp  # Guardar datetime completo
-            summary.is_present = True
-            
-            # Verificar si llegó tarde (después de las 8:00 AM en hora local)
-            local_time = attendance_record.timestamp.astimezone()
-            if local_time.hour > 8:
-                summary.is_late = True
-    
-    elif attendance_record.attendance_type == 'OUT':
-        summary.exits_count += 1
-        summary.last_exit = attendance_record.timestamp  # Guardar datetime completo
-        
-        # Verificar salida temprana (antes de las 5:00 PM en hora local)
-        local_time = attendance_record.timestamp.astimezone()
-        if local_time.hour < 17:
-            summary.is_early_exit = True
-    
-    elif attendance_record.attendance_type in ['BREAK_OUT', 'BREAK_IN']:
-        summary.break_count += 1
-    
-    # Calcular horas trabajadas
-    if summary.first_entry and summary.last_exit:
-        work_duration = summary.last_exit - summary.first_entry
-        # Limitar a máximo 24 horas por día (en caso de turnos nocturnos)
-        max_hours = timedelta(hours=24)
-        summary.total_work_hours = min(work_duration, max_hours)
-    
-    summary.save()
-    return summary
-
-
 @employee_required
 def attendance_clock(request):
     """Vista principal para marcar entrada/salida"""
@@ -144,6 +93,153 @@ def attendance_clock(request):
     return render(request, template, context)
 
 
+def process_attendance_submission(employee, attendance_type, latitude, longitude, location_accuracy,
+                                  facial_image, device_info='', ip_address=None, timestamp=None):
+    """
+    Verifica la identidad y registra la marcación
+
+    Usado por record_attendance (modo síncrono) y por los workers de la cola
+    de verificación (modo asíncrono, ver attendance_queue.py).
+
+    Returns:
+        dict: Respuesta para el cliente (misma estructura en ambos modos)
+    """
+    timestamp = timestamp or timezone.now()
+    
+    # Procesar imagen facial con sistema real
+    try:
+        logger.info(f"🔍 Iniciando verificación facial para: {employee.get_full_name()} ({employee.employee_id})")
+        logger.info(f"Tamaño de imagen: {len(facial_image) if facial_image else 0} caracteres")
+        
+        # Verificar identidad usando reconocimiento facial real
+        verification_result = verify_employee_identity(facial_image, employee)
+        
+        logger.info(f"Resultado verificación: Success={verification_result['success']}, Confianza={verification_result.get('confidence', 0):.2f}")
+        
+        if not verification_result['success']:
+            # Registrar intento fallido
+            logger.warning(f"❌ Verificación FALLIDA para {employee.employee_id}: {verification_result['error']}")
+            
+            # Verificar si es alerta de seguridad (posible fraude)
+            if verification_result.get('security_alert', False):
+                logger.error(f"🚨 ALERTA DE SEGURIDAD: Posible intento de fraude por {employee.employee_id}")
+            
+            # Mensaje amigable para el usuario
+            error_message = verification_result['error']
+            
+            # Si requiere enrollment, dar instrucciones claras
+            if verification_result.get('requires_enrollment', False):
+                error_message += '\n\n📸 Ve a "Registrar Rostro" en el menú para configurar tu perfil facial.'
+            
+            return {
+                'success': False, 
+                'error': error_message,
+                'requires_enrollment': verification_result.get('requires_enrollment', False),
+                'confidence': verification_result['confidence'],
+                'help_text': 'Asegúrate de estar bien iluminado, mirando a la cámara y sin obstrucciones.'
+            }
+        
+        facial_confidence = verification_result['confidence']
+        security_checks = verification_result.get('security_checks', {})
+        
+        logger.info(f"Verificación exitosa con confianza: {facial_confidence}")
+        
+        # Verificar checks de seguridad
+        if not security_checks.get('overall_security', True):
+            logger.warning(f"Checks de seguridad fallidos: {security_checks}")
+            return {
+                'success': False,
+                'error': 'Verificación de seguridad fallida. Intente con mejor iluminación.',
+                'security_details': security_checks
+            }
+        
+        # Guardar imagen
+        facial_image_path = f'attendance/faces/{employee.employee_id}_{timestamp.strftime("%Y%m%d_%H%M%S")}.jpg'
+        
+    except Exception as e:
+        logger.error(f"Error en reconocimiento facial: {str(e)}")
+        logger.error(f"Tipo de error: {type(e).__name__}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return {'success': False, 'error': f'Error en reconocimiento facial: {str(e)}'}
+    
+    return register_attendance(
+        employee=employee,
+        attendance_type=attendance_type,
+        latitude=latitude,
+        longitude=longitude,
+        location_accuracy=location_accuracy,
+        facial_confidence=facial_confidence,
+        facial_image_path=facial_image_path,
+        device_info=device_info,
+        ip_address=ip_address,
+        timestamp=timestamp,
+    )
+
+
+def register_attendance(employee, attendance_type, latitude, longitude, location_accuracy,
+                        facial_confidence, facial_image_path='', device_info='', ip_address=None,
+                        timestamp=None):
+    """
+    Crea la marcación de un empleado ya verificado (1:1 en
+    process_attendance_submission o 1:N en el kiosco, ver kiosk.py)
+
+    Returns:
+        dict: Respuesta de éxito para el cliente
+    """
+    timestamp = timestamp or timezone.now()
+
+    # Obtener dirección (simulado - en producción usar API de geocodificación)
+    address = get_address_from_coordinates(latitude, longitude)
+    
+    # Crear registro de asistencia con logging
+    logger.info(f"💾 CREANDO REGISTRO: {employee.get_full_name()} - Tipo: {attendance_type}")
+    
+    attendance_record = AttendanceRecord.objects.create(
+        employee=employee,
+        attendance_type=attendance_type,
+        timestamp=timestamp,
+        verification_method='FACIAL',
+        latitude=latitude,
+        longitude=longitude,
+        location_accuracy=location_accuracy,
+        address=address,
+        facial_confidence=facial_confidence,
+        facial_image_path=facial_image_path,
+        device_info=device_info,
+        ip_address=ip_address,
+    )
+    
+    # Verificar si está en ubicación permitida
+    is_valid_location = attendance_record.is_within_work_location()
+    if not is_valid_location:
+        attendance_record.notes = "Marcación fuera del área de trabajo permitida"
+        attendance_record.save()
+    
+    # Actualizar resumen diario
+    update_daily_summary(employee, attendance_record)
+    
+    # Actualizar estadísticas del perfil facial (UPDATE atómico: sin post_save,
+    # así updated_at no cambia y los demás workers no recargan la galería)
+    FacialRecognitionProfile.objects.filter(employee=employee).update(
+        total_recognitions=F('total_recognitions') + 1,
+        successful_recognitions=F('successful_recognitions') + 1,
+        last_recognition=timezone.now(),
+    )
+    
+    return {
+        'success': True,
+        'message': f'{attendance_record.get_attendance_type_display()} registrada exitosamente',
+        'record': {
+            'id': attendance_record.id,
+            'type': attendance_record.get_attendance_type_display(),
+            'timestamp': attendance_record.timestamp.strftime('%H:%M:%S'),
+            'confidence': facial_confidence,
+            'location_valid': is_valid_location,
+        }
+    }
+
+
 @csrf_exempt
 @employee_required
 def record_attendance(request):
@@ -195,113 +291,152 @@ def record_attendance(request):
                 'security_alert': True
             })
         
-        # Procesar imagen facial con sistema real
-        try:
-            logger.info(f"🔍 Iniciando verificación facial para: {employee.get_full_name()} ({employee.employee_id})")
-            logger.info(f"Tamaño de imagen: {len(facial_image) if facial_image else 0} caracteres")
-            
-            # Verificar identidad usando reconocimiento facial real
-            verification_result = verify_employee_identity(facial_image, employee)
+        # Modo asíncrono: guardar la marcación y verificar en segundo plano
+        if getattr(django_settings, 'ATTENDANCE_ASYNC_ENABLED', False):
+            from .attendance_queue import QueueFullError, enqueue_attendance
             
-            logger.info(f"Resultado verificación: Success={verification_result['success']}, Confianza={verification_result.get('confidence', 0):.2f}")
-            
-            if not verification_result['success']:
-                # Registrar intento fallido
-                logger.warning(f"❌ Verificación FALLIDA para {employee.employee_id}: {verification_result['error']}")
-                
-                # Verificar si es alerta de seguridad (posible fraude)
-                if verification_result.get('security_alert', False):
-                    logger.error(f"🚨 ALERTA DE SEGURIDAD: Posible intento de fraude por {employee.employee_id}")
-                
-                # Mensaje amigable para el usuario
-                error_message = verification_result['error']
-                
-                # Si requiere enrollment, dar instrucciones claras
-                if verification_result.get('requires_enrollment', False):
-                    error_message += '\n\n📸 Ve a "Registrar Rostro" en el menú para configurar tu perfil facial.'
-                
-                return JsonResponse({
-                    'success': False, 
-                    'error': error_message,
-                    'requires_enrollment': verification_result.get('requires_enrollment', False),
-                    'confidence': verification_result['confidence'],
-                    'help_text': 'Asegúrate de estar bien iluminado, mirando a la cámara y sin obstrucciones.'
-                })
-            
-            facial_confidence = verification_result['confidence']
-            security_checks = verification_result.get('security_checks', {})
-            
-            logger.info(f"Verificación exitosa con confianza: {facial_confidence}")
-            
-            # Verificar checks de seguridad
-            if not security_checks.get('overall_security', True):
-                logger.warning(f"Checks de seguridad fallidos: {security_checks}")
-                return JsonResponse({
+            try:
+                task = enqueue_attendance(
+                    employee=employee,
+                    attendance_type=attendance_type,
+                    latitude=latitude,
+                    longitude=longitude,
+                    location_accuracy=location_accuracy,
+                    facial_image=facial_image,
+                    device_info=device_info,
+                    ip_address=get_client_ip(request),
+                )
+            except QueueFullError as e:
+                response = JsonResponse({
                     'success': False,
-                    'error': 'Verificación de seguridad fallida. Intente con mejor iluminación.',
-                    'security_details': security_checks
-                })
-            
-            # Guardar imagen
-            facial_image_path = f'attendance/faces/{employee.employee_id}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.jpg'
+                    'error': str(e),
+                    'retry_after': e.retry_after,
+                }, status=503)
+                response['Retry-After'] = str(e.retry_after)
+                return response
             
-        except Exception as e:
-            logger.error(f"Error en reconocimiento facial: {str(e)}")
-            logger.error(f"Tipo de error: {type(e).__name__}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return JsonResponse({'success': False, 'error': f'Error en reconocimiento facial: {str(e)}'})
-        
-        # Obtener dirección (simulado - en producción usar API de geocodificación)
-        address = get_address_from_coordinates(latitude, longitude)
-        
-        # Crear registro de asistencia con logging
-        logger.info(f"💾 CREANDO REGISTRO: {employee.get_full_name()} - Tipo: {attendance_type}")
+            return JsonResponse({
+                'success': True,
+                'queued': True,
+                'task_id': task.id,
+                'status': task.status,
+                'status_url': reverse('attendance:record_status', args=[task.id]),
+                'message': 'Marcación recibida, verificando identidad...',
+            }, status=202)
         
-        attendance_record = AttendanceRecord.objects.create(
+        return JsonResponse(process_attendance_submission(
             employee=employee,
             attendance_type=attendance_type,
-            verification_method='FACIAL',
             latitude=latitude,
             longitude=longitude,
             location_accuracy=location_accuracy,
-            address=address,
-            facial_confidence=facial_confidence,
-            facial_image_path=facial_image_path,
+            facial_image=facial_image,
             device_info=device_info,
             ip_address=get_client_ip(request),
-        )
-        
-        # Verificar si está en ubicación permitida
-        is_valid_location = attendance_record.is_within_work_location()
-        if not is_valid_location:
-            attendance_record.notes = "Marcación fuera del área de trabajo permitida"
-            attendance_record.save()
-        
-        # Actualizar resumen diario
-        update_daily_summary(employee, attendance_record)
-        
-        # Actualizar estadísticas del perfil facial
-        if hasattr(employee, 'facial_profile'):
-            profile = employee.facial_profile
-            profile.total_recognitions += 1
-            profile.successful_recognitions += 1
-            profile.last_recognition = timezone.now()
-            profile.save()
+        ))
         
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': f'Error interno: {str(e)}'})
+
+
+@employee_required
+def record_attendance_status(request, task_id):
+    """API de estado de una marcación asíncrona (consultada por el PWA)"""
+    from .models import AttendanceVerificationTask
+
+    employee = get_employee_from_user(request.user)
+    task = AttendanceVerificationTask.objects.filter(id=task_id).first()
+
+    if not task or (task.employee_id != employee.id and not request.user.is_superuser):
+        return JsonResponse({'success': False, 'error': 'Marcación no encontrada'}, status=404)
+
+    if not task.is_finished:
+        position = None
+        if task.status == 'PENDING':
+            position = AttendanceVerificationTask.objects.filter(
+                status='PENDING', created_at__lt=task.created_at
+            ).count() + 1
+
         return JsonResponse({
             'success': True,
-            'message': f'{attendance_record.get_attendance_type_display()} registrada exitosamente',
-            'record': {
-                'id': attendance_record.id,
-                'type': attendance_record.get_attendance_type_display(),
-                'timestamp': attendance_record.timestamp.strftime('%H:%M:%S'),
-                'confidence': facial_confidence,
-                'location_valid': is_valid_location,
-            }
+            'finished': False,
+            'task_id': task.id,
+            'status': task.status,
+            'queue_position': position,
+            'poll_after_ms': 1000,
         })
-        
+
+    response = task.get_result()
+    response.update({
+        'finished': True,
+        'task_id': task.id,
+        'status': task.status,
+    })
+    return JsonResponse(response)
+
+
+@csrf_exempt
+def kiosk_record_attendance(request):
+    """
+    API del kiosco de marcación (tablet fija en un área de trabajo)
+
+    Autenticada con el token del kiosco, no con sesión. GET retorna los datos
+    del kiosco; POST recibe {"facial_image": base64, "attendance_type": opcional},
+    identifica al guardia entre los asignados al área y registra la marcación.
+    """
+    from .kiosk import authenticate_kiosk, identification_enabled, kiosk_candidates, kiosk_clock_in
+
+    kiosk = authenticate_kiosk(request)
+    if kiosk is None:
+        return JsonResponse({'success': False, 'error': 'Kiosco no autorizado'}, status=401)
+
+    if not kiosk.work_area.is_active:
+        return JsonResponse({'success': False, 'error': 'El área de este kiosco está desactivada'}, status=403)
+
+    if request.method == 'GET':
+        return JsonResponse({
+            'success': True,
+            'kiosk': {
+                'id': kiosk.id,
+                'name': kiosk.name,
+                'work_area': kiosk.work_area.name,
+                'employees': len(kiosk_candidates(kiosk)),
+                'identification_enabled': identification_enabled(),
+            },
+        })
+
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+
+    if not identification_enabled():
+        return JsonResponse({
+            'success': False,
+            'error': 'Identificación por kiosco deshabilitada: marque desde su teléfono',
+        }, status=503)
+
+    try:
+        data = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+
+    facial_image = data.get('facial_image')
+    attendance_type = data.get('attendance_type') or None
+
+    if not facial_image:
+        return JsonResponse({'success': False, 'error': 'Imagen facial requerida'}, status=400)
+
+    if attendance_type and attendance_type not in dict(AttendanceRecord.ATTENDANCE_TYPES):
+        return JsonResponse({'success': False, 'error': 'Tipo de asistencia inválido'}, status=400)
+
+    try:
+        return JsonResponse(kiosk_clock_in(
+            kiosk,
+            facial_image,
+            attendance_type=attendance_type,
+            ip_address=get_client_ip(request),
+        ))
     except Exception as e:
+        logger.error(f"Error en kiosco {kiosk.id}: {str(e)}")
         return JsonResponse({'success': False, 'error': f'Error interno: {str(e)}'})
 
 
@@ -714,8 +849,7 @@ def create_profile_from_photos(request):
             
             # Combinar características y codificar
             combined_features = profile._combine_features(processed_features)
-            features_json = json.dumps(combined_features)
-            profile.face_encoding = base64.b64encode(features_json.encode('utf-8')).decode('utf-8')
+            profile.set_face_features(combined_features)
             profile.save()
             
             return JsonResponse({
@@ -770,63 +904,8 @@ def get_client_ip(request):
 
 
 def update_daily_summary(employee, attendance_record):
-    """Actualiza el resumen diario de asistencia"""
-    date = attendance_record.timestamp.date()
-    
-    summary, created = AttendanceSummary.objects.get_or_create(
-        employee=employee,
-        date=date,
-        defaults={
-            'first_entry': None,
-            'last_exit': None,
-            'entries_count': 0,
-            'exits_count': 0,
-            'break_count': 0,
-            'is_present': False,
-            'is_late': False,
-            'is_early_exit': False,
-        }
-    )
-    
-    # Actualizar contadores
-    if attendance_record.attendance_type == 'IN':
-        summary.entries_count += 1
-        if not summary.first_entry:
-            summary.first_entry = attendance_record.timestamp
-            summary.is_present = True
-            
-            # Verificar si llegó tarde
-            settings = AttendanceSettings.objects.filter(is_active=True).first()
-            if settings:
-                work_start = timezone.make_aware(
-                    datetime.combine(date, settings.work_start_time)
-                )
-                tolerance = timedelta(minutes=settings.late_tolerance_minutes)
-                if attendance_record.timestamp > (work_start + tolerance):
-                    summary.is_late = True
-    
-    elif attendance_record.attendance_type == 'OUT':
-        summary.exits_count += 1
-        summary.last_exit = attendance_record.timestamp
-        
-        # Verificar salida temprana
-        settings = AttendanceSettings.objects.filter(is_active=True).first()
-        if settings:
-            work_end = timezone.make_aware(
-                datetime.combine(date, settings.work_end_time)
-            )
-            tolerance = timedelta(minutes=settings.early_exit_tolerance_minutes)
-            if attendance_record.timestamp < (work_end - tolerance):
-                summary.is_early_exit = True
-    
-    elif attendance_record.attendance_type in ['BREAK_OUT', 'BREAK_IN']:
-        summary.break_count += 1
-    
-    # Calcular horas trabajadas
-    if summary.first_entry and summary.last_exit:
-        summary.total_work_hours = summary.last_exit - summary.first_entry
-    
-    summary.save()
+    """Actualiza el resumen diario de asistencia (upsert atómico, ver summary_service.py)"""
+    return apply_record_to_summary(attendance_record)
 
 
 
@@ -908,14 +987,15 @@ def attendance_dashboard(request):
     from .permissions import AttendancePermissions
     viewable_employees = AttendancePermissions.get_viewable_employees(request.user)
     
-    if viewable_employees.count() <= 1:  # Solo se ve a sí mismo
+    total_employees = viewable_employees.count()
+    if total_employees <= 1:  # Solo se ve a sí mismo
         return redirect('attendance:my_attendance')
     
     # Estadísticas del día
     today = timezone.now().date()
     
     stats = {
-        'total_employees': viewable_employees.count(),
+        'total_employees': total_employees,
         'present_today': AttendanceSummary.objects.filter(
             employee__in=viewable_employees,
             date=today,
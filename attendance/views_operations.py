@@ -5,8 +5,11 @@ Sistema de monitoreo en tiempo real con IA
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_http_methods
+from django.utils.cache import patch_cache_control
 from django.utils import timezone
 from django.db.models import Q, Count, Avg
 from datetime import timedelta
@@ -14,7 +17,10 @@ import json
 
 from employees.models import Employee
 from .models_security_photos import SecurityPhoto, SecurityAlert, VideoSession
-from .models_gps import GPSTracking, WorkArea
+from .models_gps import GPSTracking, WorkArea, EmployeeLastPosition
+from .live_events import CHANNELS, Subscription, event_bus, parse_event_id, security_alert_payload, stream, stream_async
+from .live_positions import fleet_etag
+from .ai_queue import enqueue_photo_analysis
 from .ai_services import roboflow_service, facepp_service, firebase_service, agora_service
 
 
@@ -138,9 +144,10 @@ def capture_security_photo(request):
                 # No fallar si no se puede crear GPS
                 print(f"Error creando GPS tracking: {gps_error}")
         
-        # Analizar con IA en segundo plano (opcional)
+        # Analizar con IA en segundo plano (opcional, ver ai_queue.py)
+        ai_job = None
         if request.POST.get('analyze_ai') == 'true':
-            security_photo.analyze_with_ai()
+            ai_job = enqueue_photo_analysis(security_photo)
         
         return JsonResponse({
             'success': True,
@@ -148,7 +155,9 @@ def capture_security_photo(request):
             'message': 'Foto capturada exitosamente',
             'has_alerts': security_photo.has_alerts,
             'alert_level': security_photo.alert_level,
-            'ai_analyzed': security_photo.ai_analyzed
+            'ai_analyzed': security_photo.ai_analyzed,
+            'ai_job_id': ai_job.id if ai_job else None,
+            'ai_status': ai_job.status if ai_job else None,
         })
         
     except Exception as e:
@@ -182,7 +191,21 @@ def analyze_photo_ai(request, photo_id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+LIVE_LOCATIONS_WINDOW = timedelta(minutes=5)
+
+
+def _live_locations_etag(request):
+    if not (request.user.is_staff or request.user.is_superuser):
+        return None
+    last_5min = timezone.now() - LIVE_LOCATIONS_WINDOW
+    return fleet_etag(
+        EmployeeLastPosition.objects.filter(timestamp__gte=last_5min),
+        photo_since=last_5min,
+    )
+
+
 @login_required
+@condition(etag_func=_live_locations_etag)
 def get_live_locations(request):
     """API para obtener ubicaciones en tiempo real"""
     
@@ -190,56 +213,45 @@ def get_live_locations(request):
         return JsonResponse({'error': 'Sin permisos'}, status=403)
     
     try:
-        # Últimas ubicaciones (últimos 5 minutos)
-        last_5min = timezone.now() - timedelta(minutes=5)
-        
-        # Obtener última ubicación por empleado (compatible con PostgreSQL)
-        from django.db.models import Max
-        latest_timestamps = GPSTracking.objects.filter(
+        # Últimas ubicaciones (últimos 5 minutos) desde la tabla de última posición
+        last_5min = timezone.now() - LIVE_LOCATIONS_WINDOW
+        positions = EmployeeLastPosition.objects.filter(
             timestamp__gte=last_5min
-        ).values('employee').annotate(
-            latest_time=Max('timestamp')
-        )
+        ).select_related('employee', 'work_area', 'last_photo')
         
         locations = []
-        for item in latest_timestamps:
-            gps = GPSTracking.objects.filter(
-                employee_id=item['employee'],
-                timestamp=item['latest_time']
-            ).select_related('employee', 'work_area').first()
-            
-            if not gps:
-                continue
-            
-            # Obtener última foto si existe
-            last_photo = SecurityPhoto.objects.filter(
-                employee=gps.employee,
-                timestamp__gte=last_5min
-            ).order_by('-timestamp').first()
+        for position in positions:
+            # Última foto solo si es reciente
+            last_photo = position.last_photo
+            if last_photo and (not position.last_photo_at or position.last_photo_at < last_5min):
+                last_photo = None
             
             locations.append({
-                'employee_id': gps.employee.id,
-                'employee_name': gps.employee.get_full_name(),
-                'employee_code': gps.employee.employee_id,
-                'latitude': float(gps.latitude),
-                'longitude': float(gps.longitude),
-                'accuracy': float(gps.accuracy) if gps.accuracy else None,
-                'timestamp': gps.timestamp.isoformat(),
-                'work_area': gps.work_area.name if gps.work_area else None,
-                'is_within_area': gps.is_within_work_area,
-                'battery_level': gps.battery_level,
+                'employee_id': position.employee.id,
+                'employee_name': position.employee.get_full_name(),
+                'employee_code': position.employee.employee_id,
+                'latitude': float(position.latitude),
+                'longitude': float(position.longitude),
+                'accuracy': float(position.accuracy) if position.accuracy else None,
+                'timestamp': position.timestamp.isoformat(),
+                'work_area': position.work_area.name if position.work_area else None,
+                'is_within_area': position.is_within_work_area,
+                'battery_level': position.battery_level,
                 'has_photo': last_photo is not None,
                 'photo_url': last_photo.thumbnail.url if last_photo and last_photo.thumbnail else None,
                 'has_alerts': last_photo.has_alerts if last_photo else False,
                 'alert_level': last_photo.alert_level if last_photo else 'NONE'
             })
         
-        return JsonResponse({
+        response = JsonResponse({
             'success': True,
             'locations': locations,
             'count': len(locations),
             'timestamp': timezone.now().isoformat()
         })
+        # El navegador revalida con If-None-Match en cada sondeo
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -255,22 +267,16 @@ def get_active_alerts(request):
     try:
         alerts = SecurityAlert.objects.filter(
             status__in=['PENDING', 'ACKNOWLEDGED', 'IN_PROGRESS']
-        ).select_related('employee', 'photo', 'acknowledged_by').order_by('-created_at')[:50]
-        
-        alerts_data = []
-        for alert in alerts:
-            alerts_data.append({
-                'id': alert.id,
-                'employee_id': alert.employee.id,
-                'employee_name': alert.employee.get_full_name(),
-                'alert_type': alert.alert_type,
-                'severity': alert.severity,
-                'message': alert.message,
-                'status': alert.status,
-                'created_at': alert.created_at.isoformat(),
-                'photo_url': alert.photo.thumbnail.url if alert.photo and alert.photo.thumbnail else None,
-                'acknowledged_by': alert.acknowledged_by.get_full_name() if alert.acknowledged_by else None,
-            })
+        ).select_related('employee', 'photo', 'acknowledged_by').order_by('-created_at')
+        
+        # Solo alertas nuevas desde la última consulta del dashboard
+        since_id = request.GET.get('since_id')
+        if since_id and since_id.isdigit():
+            alerts = alerts.filter(id__gt=int(since_id))
+        
+        alerts = alerts[:50]
+        
+        alerts_data = [security_alert_payload(alert) for alert in alerts]
         
         return JsonResponse({
             'success': True,
@@ -282,6 +288,43 @@ def get_active_alerts(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@login_required
+def live_events_stream(request):
+    """
+    Flujo Server-Sent Events de posiciones, alertas y solicitudes de video
+
+    ?channels=positions,alerts,video (por defecto todos los permitidos). Los
+    canales positions y alerts son solo para staff; video solo entrega las
+    solicitudes dirigidas al propio usuario. Con ASGI la conexión permanece
+    abierta LIVE_EVENTS_STREAM_SECONDS; con WSGI cada conexión ocuparía un
+    worker, así que se responde con lo pendiente tras
+    LIVE_EVENTS_WSGI_STREAM_SECONDS y el navegador se reconecta solo (retry)
+    enviando Last-Event-ID, sin consultar la base de datos.
+    """
+    allowed = CHANNELS if (request.user.is_staff or request.user.is_superuser) else ('video',)
+    requested = [channel for channel in request.GET.get('channels', '').split(',') if channel]
+    channels = [channel for channel in (requested or allowed) if channel in allowed]
+    if not channels:
+        return JsonResponse({'error': 'Sin permisos'}, status=403)
+
+    subscription = Subscription(request.user, channels)
+    last_event_id = parse_event_id(
+        request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    )
+    event_bus.ensure_listener()
+
+    if isinstance(request, ASGIRequest):
+        content = stream_async(subscription, last_event_id, getattr(settings, 'LIVE_EVENTS_STREAM_SECONDS', 300))
+    else:
+        content = stream(subscription, last_event_id, getattr(settings, 'LIVE_EVENTS_WSGI_STREAM_SECONDS', 0))
+
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    patch_cache_control(response, private=True, no_cache=True, no_store=True)
+    # Evitar que nginx u otros proxies acumulen el flujo
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 @require_http_methods(["POST"])
 def acknowledge_alert(request, alert_id):
@@ -3,7 +3,7 @@ Context processors para EURO SECURITY
 Hace disponible información global en todos los templates
 """
 from django.utils import timezone
-from employees.models import Employee
+from .permission_scope import get_scope
 
 def attendance_permissions(request):
     """
@@ -42,17 +42,13 @@ def attendance_permissions(request):
             context['attendance_permission_level'] = 'staff'
             return context
         
-        # EMPLEADOS REGULARES: Verificar perfil
-        try:
-            # Verificar si el usuario tiene perfil de empleado
-            employee = Employee.objects.get(user=request.user)
+        # EMPLEADOS REGULARES: Verificar perfil (caché de alcance de permisos)
+        scope = get_scope(request.user)
+        if scope.employee_id is not None:
             context['has_employee_profile'] = True
             
-            # Importar aquí para evitar imports circulares
-            from attendance.permissions import AttendancePermissions
-            
             # Obtener nivel de permisos
-            permission_level = AttendancePermissions.get_permission_level(request.user)
+            permission_level = scope.position_level
             context['attendance_permission_level'] = permission_level
             
             # Determinar permisos específicos
@@ -68,10 +64,6 @@ def attendance_permissions(request):
             # Supervisores también pueden ver mapas
             if permission_level == 'supervisor':
                 context['can_view_location_maps'] = True
-                
-        except Employee.DoesNotExist:
-            # Usuario autenticado pero sin perfil de empleado
-            context['has_employee_profile'] = False
     
     return context
 
@@ -0,0 +1,150 @@
+"""
+Comando para perfilar consultas y latencia de vistas y verificar presupuestos
+
+Hace peticiones GET con el cliente de pruebas (dentro de una transacción que
+se revierte) y muestra lo registrado por QueryProfilerMiddleware. Sin nombres
+de URL perfila todas las vistas de QUERY_BUDGETS. Los argumentos de la URL se
+pasan tras ':' separados por comas y la query string tras '?', por ejemplo:
+
+    python manage.py profile_views attendance:monthly_payroll_report:2?month=1
+
+Las vistas de DEPARTMENT_VIEWS sin argumentos se perfilan con --department
+(por defecto el primer departamento activo). Una URL que no se puede resolver
+o una respuesta de error hacen fallar el comando igual que un presupuesto
+superado.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import NoReverseMatch, reverse
+
+from core.query_profiler import query_profile
+from departments.models import Department
+
+# Vistas de QUERY_BUDGETS que reciben el ID de un departamento
+DEPARTMENT_VIEWS = ('attendance:monthly_payroll_report', 'attendance:export_monthly_payroll')
+
+
+class _Rollback(Exception):
+    pass
+
+
+def parse_target(target):
+    """'app:nombre:arg1,arg2?query' → (nombre de URL, args, query string)"""
+    target, _, query = target.partition('?')
+    parts = target.split(':')
+    args = []
+    if len(parts) > 2 or (len(parts) == 2 and ',' in parts[1]):
+        args = [arg for arg in parts.pop().split(',') if arg]
+    return ':'.join(parts), args, query
+
+
+class Command(BaseCommand):
+    help = 'Perfila consultas, duplicados y latencia de vistas y falla si superan QUERY_BUDGETS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets',
+            nargs='*',
+            help="Nombres de URL (opcionalmente con ':args' y '?query'); por defecto los de QUERY_BUDGETS",
+        )
+        parser.add_argument(
+            '--user',
+            default=None,
+            help='Usuario con el que se hacen las peticiones (por defecto: el primer superusuario)',
+        )
+        parser.add_argument(
+            '--department',
+            type=int,
+            default=None,
+            help='ID del departamento para las vistas de nómina (por defecto: el primero activo)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Peticiones por vista (por defecto: 3)',
+        )
+        parser.add_argument(
+            '--show-repeated',
+            type=int,
+            default=3,
+            help='Consultas repetidas mostradas por vista (por defecto: 3)',
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('No se encontró el usuario para las peticiones')
+
+        targets = options['targets'] or list(getattr(settings, 'QUERY_BUDGETS', {}))
+        if not targets:
+            raise CommandError('No hay vistas que perfilar: pasa nombres de URL o define QUERY_BUDGETS')
+
+        department_id = options['department'] or (
+            Department.objects.filter(is_active=True).order_by('id').values_list('id', flat=True).first()
+        )
+
+        self.stdout.write(f"\n🔬 Perfilando {len(targets)} vistas como {user.username} ({options['repeat']} peticiones c/u)")
+        query_profile.reset()
+        errors = []
+
+        try:
+            with override_settings(QUERY_PROFILING_ENABLED=True, QUERY_BUDGET_STRICT=False), transaction.atomic():
+                client = Client()
+                client.force_login(user)
+                for target in targets:
+                    name, url_args, query = parse_target(target)
+                    if not url_args and name in DEPARTMENT_VIEWS:
+                        if department_id is None:
+                            errors.append(f"{target}: no hay departamentos (usa --department o {name}:id)")
+                            continue
+                        url_args = [department_id]
+                    try:
+                        url = reverse(name, args=url_args)
+                    except NoReverseMatch:
+                        errors.append(f"{target}: no se pudo resolver la URL (argumentos: {name}:arg1,arg2)")
+                        continue
+                    if query:
+                        url = f"{url}?{query}"
+                    for _ in range(options['repeat']):
+                        response = client.get(url, HTTP_HOST='localhost')
+                        if response.status_code >= 400:
+                            errors.append(f"{target}: HTTP {response.status_code}")
+                            break
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        views = query_profile.snapshot()
+        self.stdout.write(self.style.SUCCESS("\n📊 Consultas por vista:"))
+        self.stdout.write(f"   {'Vista':45} {'Consultas':>9} {'Máx':>5} {'Presup.':>7} {'DB ms':>8} {'Total ms':>9}")
+        breaches = []
+        for view in views:
+            budget = view['budget']
+            over = budget is not None and view['max_queries'] > budget
+            line = (
+                f"   {view['view'][:45]:45} {view['avg_queries']:9.1f} {view['max_queries']:5d} "
+                f"{budget if budget is not None else '-':>7} {view['avg_db_ms']:8.1f} {view['avg_latency_ms']:9.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if over else line)
+            for repeated in view['repeated_queries'][:options['show_repeated']]:
+                self.stdout.write(f"      ↻ {repeated['executions']}× {repeated['sql'][:110]}")
+            if over:
+                breaches.append(f"{view['view']} ({view['max_queries']} > {budget})")
+
+        for error in errors:
+            self.stdout.write(self.style.ERROR(f"   ❌ {error}"))
+
+        if breaches:
+            raise CommandError(f"Presupuesto de consultas superado: {', '.join(breaches)}")
+        if errors:
+            raise CommandError(f"{len(errors)} vistas no se pudieron perfilar")
+        self.stdout.write(self.style.SUCCESS("\n✅ Todas las vistas dentro de su presupuesto"))
@@ -0,0 +1,232 @@
+"""
+Caché de alcance de permisos por usuario
+EURO SECURITY - Permission Scope Cache
+
+employee_required, permission_required, el context processor
+attendance_permissions y AttendancePermissions consultaban Employee varias
+veces por petición y reconstruían los conjuntos de empleados visibles. El
+alcance resuelto de cada usuario (empleado, departamento, niveles de
+permisos y ids de empleados/departamentos visibles) se guarda:
+
+- En el propio objeto request.user (caché de la petición).
+- En una caché del proceso compartida entre peticiones, que se vacía con las
+  señales de Employee, Position y Department (ver core/signals.py). Como
+  cada worker de gunicorn tiene su propia copia, cada
+  PERMISSION_SCOPE_REFRESH_SECONDS se comprueba si otro proceso modificó
+  esas tablas.
+
+Los superusuarios y el staff se resuelven con los flags del usuario y no
+pasan por la caché.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+
+# Los conjuntos de ids son frozenset; None significa "todos"
+PermissionScope = namedtuple('PermissionScope', [
+    'user_id',
+    'employee_id',
+    'employee_code',
+    'department_id',
+    'position_level',        # Position.level (usado por attendance.permissions)
+    'permission_level',      # Employee.get_permission_level() (usado por core.permissions)
+    'attendance_employee_ids',
+    'attendance_department_ids',
+    'employee_ids',
+])
+
+NO_EMPLOYEE = dict(
+    employee_id=None, employee_code=None, department_id=None, position_level=None, permission_level=None,
+    attendance_employee_ids=frozenset(), attendance_department_ids=frozenset(), employee_ids=frozenset(),
+)
+
+# Jefa de Operaciones: ve Operaciones + Control de Calidad
+OPERATIONS_HEAD_CODE = 'EMP13807414'
+OPERATIONS_HEAD_DEPARTMENTS = ['OPE', 'CC']
+
+
+def _ids(queryset):
+    return frozenset(queryset.values_list('id', flat=True))
+
+
+def _attendance_employee_ids(employee, level):
+    """Reglas de AttendancePermissions.get_viewable_employees (attendance)"""
+    from departments.models import Department
+    from employees.models import Employee
+
+    if level == 'full':
+        return None
+    if level == 'management':
+        subordinate_depts = Department.objects.filter(parent_department=employee.department)
+        return _ids(Employee.objects.filter(department=employee.department)) | _ids(
+            Employee.objects.filter(department__in=subordinate_depts)
+        )
+    if level == 'supervisor':
+        return _ids(Employee.objects.filter(
+            department=employee.department,
+            position__level__in=['advanced', 'standard', 'basic']
+        ))
+    if level == 'advanced':
+        return _ids(Employee.objects.filter(
+            department=employee.department,
+            position__level__in=['standard', 'basic']
+        ))
+    return frozenset([employee.id])
+
+
+def _attendance_department_ids(employee, level):
+    """Reglas de AttendancePermissions.get_viewable_departments (attendance)"""
+    from departments.models import Department
+
+    if employee.employee_id == OPERATIONS_HEAD_CODE:
+        return _ids(Department.objects.filter(code__in=OPERATIONS_HEAD_DEPARTMENTS))
+    if level == 'full':
+        return None
+    if level == 'management':
+        return frozenset([employee.department_id]) | _ids(
+            Department.objects.filter(parent_department=employee.department)
+        )
+    if level in ['supervisor', 'advanced']:
+        return frozenset([employee.department_id])
+    return frozenset()
+
+
+def _employee_ids(employee, permission_level):
+    """Reglas de AttendancePermissions.get_viewable_employees (core)"""
+    from employees.models import Employee
+
+    if permission_level in ['full', 'advanced']:
+        return None
+    if permission_level in ['management']:
+        return _ids(Employee.objects.filter(department=employee.department))
+    if permission_level in ['supervisor']:
+        return _ids(Employee.objects.filter(
+            department=employee.department,
+            position__level__in=['ENTRY', 'JUNIOR', 'SENIOR']
+        ))
+    return frozenset([employee.id])
+
+
+def build_scope(user, employee):
+    """Resuelve el alcance de permisos de un usuario (y su empleado o None)"""
+    if employee is None:
+        return PermissionScope(user_id=user.pk, **NO_EMPLOYEE)
+
+    # Evitar la consulta de employee.user dentro de get_permission_level
+    employee.user = user
+    position_level = employee.position.level if employee.position else None
+    permission_level = employee.get_permission_level()
+
+    return PermissionScope(
+        user_id=user.pk,
+        employee_id=employee.id,
+        employee_code=employee.employee_id,
+        department_id=employee.department_id,
+        position_level=position_level,
+        permission_level=permission_level,
+        attendance_employee_ids=_attendance_employee_ids(employee, position_level),
+        attendance_department_ids=_attendance_department_ids(employee, position_level),
+        employee_ids=_employee_ids(employee, permission_level),
+    )
+
+
+class PermissionScopeCache:
+    """Alcances de permisos resueltos, compartidos por todo el proceso"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._scopes = {}
+        self._last_check = 0.0
+        self._signature = None
+
+    def _current_signature(self):
+        from departments.models import Department
+        from employees.models import Employee
+        from positions.models import Position
+
+        return tuple(
+            tuple(model.objects.aggregate(total=Count('id'), last_update=Max('updated_at')).values())
+            for model in (Employee, Position, Department)
+        )
+
+    def _check_signature(self):
+        """Vacía la caché si otro proceso cambió empleados, cargos o departamentos"""
+        refresh_seconds = getattr(settings, 'PERMISSION_SCOPE_REFRESH_SECONDS', 60)
+        if not refresh_seconds or time.monotonic() - self._last_check < refresh_seconds:
+            return
+
+        with self._lock:
+            if time.monotonic() - self._last_check < refresh_seconds:
+                return
+            self._last_check = time.monotonic()
+            try:
+                signature = self._current_signature()
+            except Exception as e:
+                logger.error(f"Error verificando caché de permisos: {str(e)}")
+                return
+            if signature != self._signature:
+                if self._signature is not None:
+                    logger.info(f"🔐 Caché de permisos vaciada por cambios externos ({len(self._scopes)} usuarios)")
+                self._scopes = {}
+                self._signature = signature
+
+    def get(self, user):
+        """Alcance del usuario (calculado y guardado si no estaba en caché)"""
+        self._check_signature()
+        key = (user.pk, user.is_superuser)
+        scope = self._scopes.get(key)
+        if scope is not None:
+            return scope
+
+        scope = build_scope(user, load_employee(user))
+        with self._lock:
+            self._scopes[key] = scope
+        return scope
+
+    def invalidate(self):
+        """Vacía la caché (llamado desde las señales)"""
+        with self._lock:
+            self._scopes = {}
+
+    def __len__(self):
+        return len(self._scopes)
+
+
+# Instancia global del proceso
+permission_scopes = PermissionScopeCache()
+
+
+def load_employee(user):
+    """Empleado del usuario, consultado como mucho una vez por petición"""
+    from employees.models import Employee
+
+    try:
+        return user._permission_employee
+    except AttributeError:
+        pass
+
+    try:
+        employee = Employee.objects.select_related('position', 'department').get(user=user)
+    except Employee.DoesNotExist:
+        employee = None
+    user._permission_employee = employee
+    return employee
+
+
+def get_scope(user):
+    """Alcance de permisos del usuario, memorizado en el objeto de la petición"""
+    try:
+        return user._permission_scope
+    except AttributeError:
+        pass
+
+    scope = permission_scopes.get(user)
+    user._permission_scope = scope
+    return scope
@@ -6,14 +6,12 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from django.http import Http404
 from employees.models import Employee
+from .permission_scope import get_scope, load_employee
 
 
 def get_employee_from_user(user):
-    """Obtiene el empleado asociado al usuario"""
-    try:
-        return Employee.objects.select_related('position', 'department').get(user=user)
-    except Employee.DoesNotExist:
-        return None
+    """Obtiene el empleado asociado al usuario (una consulta por petición como máximo)"""
+    return load_employee(user)
 
 
 def employee_required(view_func):
@@ -28,8 +26,7 @@ def employee_required(view_func):
         if request.user.is_superuser or request.user.is_staff:
             return view_func(request, *args, **kwargs)
         
-        employee = get_employee_from_user(request.user)
-        if not employee:
+        if get_scope(request.user).employee_id is None:
             messages.error(request, 'No se encontró tu perfil de empleado. Contacta al administrador.')
             return redirect('dashboard:home')
         
@@ -59,12 +56,12 @@ def permission_required(permission_level):
             if request.user.is_superuser:
                 return view_func(request, *args, **kwargs)
             
-            employee = get_employee_from_user(request.user)
-            if not employee:
+            scope = get_scope(request.user)
+            if scope.employee_id is None:
                 messages.error(request, 'No tienes permisos para acceder a esta sección.')
                 return redirect('dashboard:home')
             
-            user_permission = employee.get_permission_level()
+            user_permission = scope.permission_level
             
             # Mapear niveles a números para comparación
             permission_hierarchy = {
@@ -102,25 +99,27 @@ def can_view_employee_data(user, target_employee=None):
     if user.is_superuser:
         return True
     
-    employee = get_employee_from_user(user)
-    if not employee:
+    scope = get_scope(user)
+    if scope.employee_id is None:
         return False
     
+    can_view_all = scope.permission_level in ['full', 'management', 'advanced']
+    
     # Si no se especifica empleado objetivo, verificar permisos generales
     if not target_employee:
-        return employee.can_view_all_employees()
+        return can_view_all
     
     # Los empleados siempre pueden ver sus propios datos
-    if employee == target_employee:
+    if scope.employee_id == target_employee.pk:
         return True
     
     # Verificar si puede ver todos los empleados
-    if employee.can_view_all_employees():
+    if can_view_all:
         return True
     
     # Los supervisores pueden ver empleados de su departamento
-    if (employee.get_permission_level() in ['supervisor', 'management', 'full'] and 
-        employee.department == target_employee.department):
+    if (scope.permission_level in ['supervisor', 'management', 'full'] and 
+        scope.department_id == target_employee.department_id):
         return True
     
     return False
@@ -140,12 +139,12 @@ def can_edit_employee_data(user, target_employee=None):
     if user.is_superuser:
         return True
     
-    employee = get_employee_from_user(user)
-    if not employee:
+    scope = get_scope(user)
+    if scope.employee_id is None:
         return False
     
     # Solo gerentes y directores pueden editar empleados
-    if not employee.can_edit_employees():
+    if scope.permission_level not in ['full', 'management', 'advanced']:
         return False
     
     # Si no se especifica empleado objetivo, verificar permisos generales
@@ -153,12 +152,12 @@ def can_edit_employee_data(user, target_employee=None):
         return True
     
     # Los directores pueden editar a cualquiera
-    if employee.get_permission_level() == 'full':
+    if scope.permission_level == 'full':
         return True
     
     # Los gerentes pueden editar empleados de su departamento (excepto otros gerentes/directores)
-    if (employee.get_permission_level() == 'management' and 
-        employee.department == target_employee.department and
+    if (scope.permission_level == 'management' and 
+        scope.department_id == target_employee.department_id and
         target_employee.get_permission_level() not in ['management', 'full']):
         return True
     
@@ -179,21 +178,21 @@ def filter_employees_by_permissions(user, queryset):
     if user.is_superuser:
         return queryset
     
-    employee = get_employee_from_user(user)
-    if not employee:
+    scope = get_scope(user)
+    if scope.employee_id is None:
         return queryset.none()
     
-    permission_level = employee.get_permission_level()
+    permission_level = scope.permission_level
     
     if permission_level in ['full', 'management']:
         # Directores y gerentes ven todos los empleados
         return queryset
     elif permission_level == 'supervisor':
         # Supervisores ven empleados de su departamento
-        return queryset.filter(department=employee.department)
+        return queryset.filter(department_id=scope.department_id)
     else:
         # Empleados básicos solo ven su propia información
-        return queryset.filter(pk=employee.pk)
+        return queryset.filter(pk=scope.employee_id)
 
 
 class EmployeePermissionMixin:
@@ -212,8 +211,7 @@ class EmployeePermissionMixin:
             return redirect('login')
         
         # Verificar si el usuario tiene permisos básicos
-        employee = get_employee_from_user(request.user)
-        if not employee and not request.user.is_superuser:
+        if not request.user.is_superuser and get_scope(request.user).employee_id is None:
             messages.error(request, 'No tienes permisos para acceder a esta sección.')
             return redirect('dashboard:home')
         
@@ -226,28 +224,16 @@ class AttendancePermissions:
     @staticmethod
     def can_view_location_maps(user):
         """Determina si puede ver mapas de ubicación"""
-        print(f"🔍 PERMISSION CHECK - can_view_location_maps para {user.username}")
-        
         if user.is_superuser or user.is_staff:
-            print(f"✅ PERMISSION - Superusuario/Staff acceso automático")
             return True
             
-        employee = get_employee_from_user(user)
-        if not employee:
-            print(f"❌ PERMISSION - Sin empleado")
+        scope = get_scope(user)
+        if scope.employee_id is None:
             return False
-            
-        permission_level = employee.get_permission_level()
-        print(f"🔍 PERMISSION - Nivel: {permission_level}")
         
         # FORZAR: Incluir 'advanced' para empleados SENIOR que son directores/gerentes
         allowed_levels = ['full', 'management', 'supervisor', 'advanced']
-        print(f"🔍 PERMISSION - Niveles permitidos: {allowed_levels}")
-        
-        result = permission_level in allowed_levels
-        print(f"🔍 PERMISSION - Resultado final: {result}")
-        
-        return result
+        return scope.permission_level in allowed_levels
     
     @staticmethod
     def can_manage_work_areas(user):
@@ -255,40 +241,22 @@ class AttendancePermissions:
         if user.is_superuser or user.is_staff:
             return True
             
-        employee = get_employee_from_user(user)
-        if not employee:
+        scope = get_scope(user)
+        if scope.employee_id is None:
             return False
             
-        permission_level = employee.get_permission_level()
         # Incluir 'advanced' para empleados SENIOR con responsabilidades directivas
-        return permission_level in ['full', 'management', 'advanced']
+        return scope.permission_level in ['full', 'management', 'advanced']
     
     @staticmethod
     def get_viewable_employees(user):
         """Obtiene empleados que el usuario puede ver"""
-        from employees.models import Employee
-        
         if user.is_superuser or user.is_staff:
             return Employee.objects.all()
-            
-        employee = get_employee_from_user(user)
-        if not employee:
-            return Employee.objects.none()
-            
-        permission_level = employee.get_permission_level()
         
-        if permission_level in ['full', 'advanced']:
-            # Directores y empleados SENIOR con responsabilidades directivas ven todos
+        # Directores y SENIOR ven todos; gerentes su departamento; supervisores
+        # su equipo; el resto solo a sí mismos (ver permission_scope._employee_ids)
+        employee_ids = get_scope(user).employee_ids
+        if employee_ids is None:
             return Employee.objects.all()
-        elif permission_level in ['management']:
-            # Gerentes ven su departamento
-            return Employee.objects.filter(department=employee.department)
-        elif permission_level in ['supervisor']:
-            # Supervisores ven su equipo
-            return Employee.objects.filter(
-                department=employee.department,
-                position__level__in=['ENTRY', 'JUNIOR', 'SENIOR']
-            )
-        else:
-            # Empleados básicos solo se ven a sí mismos
-            return Employee.objects.filter(pk=employee.pk)
+        return Employee.objects.filter(id__in=employee_ids)
@@ -0,0 +1,218 @@
+"""
+Perfilado de consultas y latencia por vista
+EURO SECURITY - Query Profiler
+
+QueryProfilerMiddleware envuelve cada petición con connection.execute_wrapper
+(no requiere DEBUG) y registra por nombre de URL:
+
+- Número de consultas, tiempo en base de datos y latencia total.
+- Huellas de consultas repetidas: el SQL con los parámetros ya separados y
+  las listas IN colapsadas. Una misma huella ejecutada muchas veces en una
+  petición es la señal típica de un N+1.
+
+Las consultas de respuestas en streaming (exportaciones) ocurren después
+de salir de la vista y no se cuentan.
+
+Los agregados viven en memoria del proceso (query_profile) y se consultan
+en /health/queries/ (solo staff). Cada respuesta lleva además una cabecera
+Server-Timing con el tiempo de base de datos y el total.
+
+QUERY_BUDGETS declara el máximo de consultas por nombre de URL. Al
+superarlo se registra una advertencia con las huellas repetidas; en modo
+estricto (QUERY_BUDGET_STRICT, activado por core.test_runner) se lanza
+QueryBudgetExceeded y la prueba falla.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACES = re.compile(r'\s+')
+
+# Huellas repetidas guardadas por vista
+MAX_FINGERPRINTS = 20
+
+
+def fingerprint(sql):
+    """SQL normalizado para agrupar consultas que solo cambian en sus valores"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Una vista ejecutó más consultas que su presupuesto"""
+
+
+class QueryRecorder:
+    """Registra las consultas ejecutadas mientras está activo"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def record(self):
+        """Contexto que instala el registro en todas las conexiones"""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def repeated(self):
+        """Huellas ejecutadas más de una vez, de mayor a menor"""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > 1]
+
+
+class ViewStats:
+    """Agregados de una vista"""
+
+    def __init__(self, name):
+        self.name = name
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_ms = 0.0
+        self.latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.budget_breaches = 0
+        self.repeated = Counter()
+
+    def add(self, recorder, latency_ms, over_budget):
+        self.requests += 1
+        self.queries += recorder.count
+        self.max_queries = max(self.max_queries, recorder.count)
+        self.db_ms += recorder.duration * 1000
+        self.latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self.budget_breaches += int(over_budget)
+        for sql, count in recorder.repeated():
+            self.repeated[sql] += count
+        if len(self.repeated) > MAX_FINGERPRINTS * 5:
+            self.repeated = Counter(dict(self.repeated.most_common(MAX_FINGERPRINTS)))
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            'view': self.name,
+            'requests': self.requests,
+            'avg_queries': round(self.queries / requests, 1),
+            'max_queries': self.max_queries,
+            'budget': query_budget(self.name),
+            'budget_breaches': self.budget_breaches,
+            'avg_db_ms': round(self.db_ms / requests, 1),
+            'avg_latency_ms': round(self.latency_ms / requests, 1),
+            'max_latency_ms': round(self.max_latency_ms, 1),
+            'repeated_queries': [
+                {'sql': sql, 'executions': count}
+                for sql, count in self.repeated.most_common(MAX_FINGERPRINTS)
+            ],
+        }
+
+
+class QueryProfile:
+    """Agregados por vista compartidos por todo el proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def add(self, name, recorder, latency_ms, over_budget=False):
+        with self._lock:
+            stats = self._views.get(name)
+            if stats is None:
+                stats = self._views[name] = ViewStats(name)
+            stats.add(recorder, latency_ms, over_budget)
+
+    def snapshot(self):
+        """Vistas ordenadas por consultas promedio (las más costosas primero)"""
+        with self._lock:
+            views = [stats.as_dict() for stats in self._views.values()]
+        return sorted(views, key=lambda view: view['avg_queries'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+
+# Instancia global del proceso
+query_profile = QueryProfile()
+
+
+def query_budget(view_name):
+    """Máximo de consultas declarado para una vista (None = sin presupuesto)"""
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+def view_name_for(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'sin-resolver'
+    return match.view_name or match._func_path
+
+
+def check_budget(view_name, recorder):
+    """
+    Compara las consultas de una petición con el presupuesto de la vista
+
+    Returns:
+        True si lo superó (en modo estricto lanza QueryBudgetExceeded)
+    """
+    budget = query_budget(view_name)
+    if budget is None or recorder.count <= budget:
+        return False
+
+    repeated = '; '.join(f"{count}× {sql[:120]}" for sql, count in recorder.repeated()[:3])
+    message = f"{view_name}: {recorder.count} consultas (presupuesto {budget}). Repetidas: {repeated or 'ninguna'}"
+    if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(f"⚠️ Presupuesto de consultas superado - {message}")
+    return True
+
+
+class QueryProfilerMiddleware:
+    """Registra consultas y latencia de cada petición por nombre de URL"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_PROFILING_ENABLED', True):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with recorder.record():
+            response = self.get_response(request)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        view_name = view_name_for(request)
+        over_budget = check_budget(view_name, recorder)
+        query_profile.add(view_name, recorder, latency_ms, over_budget)
+
+        response['Server-Timing'] = (
+            f'db;desc="{recorder.count} consultas";dur={recorder.duration * 1000:.1f}, '
+            f'total;dur={latency_ms:.1f}'
+        )
+        return response
@@ -0,0 +1,24 @@
+"""
+Señales del núcleo
+EURO SECURITY - Core Signals
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from departments.models import Department
+from employees.models import Employee
+from positions.models import Position
+
+from .permission_scope import permission_scopes
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Position)
+@receiver(post_delete, sender=Position)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_permission_scopes(sender, **kwargs):
+    """Recalcular los alcances de permisos cuando cambian empleados, cargos o departamentos"""
+    transaction.on_commit(permission_scopes.invalidate)
@@ -0,0 +1,22 @@
+"""
+Test runner con presupuestos de consultas estrictos
+EURO SECURITY - Query Budget Test Runner
+
+Durante las pruebas cualquier petición que supere su presupuesto de
+QUERY_BUDGETS lanza QueryBudgetExceeded (ver core/query_profiler.py), por lo
+que la prueba que la hizo falla.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._strict_budgets = override_settings(QUERY_PROFILING_ENABLED=True, QUERY_BUDGET_STRICT=True)
+        self._strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
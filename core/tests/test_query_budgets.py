@@ -0,0 +1,55 @@
+"""
+Pruebas de las vistas con presupuesto de consultas (QUERY_BUDGETS)
+
+El runner de pruebas (core/test_runner.py) hace estrictos los presupuestos:
+una petición que los supera lanza QueryBudgetExceeded y la prueba falla.
+"""
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from attendance.loadtest.dataset import seed_dataset
+from core.management.commands.profile_views import DEPARTMENT_VIEWS
+from core.query_profiler import query_profile
+from departments.models import Department
+
+
+class QueryBudgetViewsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(employees=12, work_areas=3)
+        cls.department = Department.objects.get(code='LTEST')
+        cls.user = User.objects.create_superuser('presupuestos', 'presupuestos@example.com', 'clave-de-prueba')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def url(self, name):
+        return reverse(name, args=[self.department.id] if name in DEPARTMENT_VIEWS else [])
+
+    def test_every_budgeted_view_within_budget(self):
+        for name in settings.QUERY_BUDGETS:
+            with self.subTest(view=name):
+                response = self.client.get(self.url(name), HTTP_HOST='localhost')
+                self.assertLess(response.status_code, 400)
+
+    def test_payroll_views_are_budgeted(self):
+        for name in DEPARTMENT_VIEWS:
+            self.assertIn(name, settings.QUERY_BUDGETS)
+
+    def test_profile_views_command(self):
+        out = StringIO()
+        call_command('profile_views', '--repeat', '1', stdout=out)
+
+        self.assertIn('Todas las vistas dentro de su presupuesto', out.getvalue())
+        self.assertEqual({view['view'] for view in query_profile.snapshot()}, set(settings.QUERY_BUDGETS))
+
+    def test_profile_views_fails_on_unresolvable_url(self):
+        with self.assertRaises(CommandError):
+            call_command('profile_views', 'attendance:vista_inexistente', '--repeat', '1', stdout=StringIO())
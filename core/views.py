@@ -1,10 +1,12 @@
 """
 Vistas centrales del sistema
 """
+import os
+
 from django.shortcuts import redirect
 from django.contrib.auth import logout
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 
 
 def custom_logout(request):
@@ -20,3 +22,19 @@ def custom_logout(request):
 def health_check(request):
     """Vista simple para verificar que el servidor esté funcionando"""
     return HttpResponse("Sistema EURO SECURITY funcionando correctamente", content_type="text/plain")
+
+
+def query_profile_view(request):
+    """Consultas y latencia por vista registradas por QueryProfilerMiddleware (solo staff)"""
+    from .query_profiler import query_profile
+
+    if not (request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser)):
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+
+    if request.method == 'POST' and request.GET.get('reset') == '1':
+        query_profile.reset()
+
+    return JsonResponse({
+        'pid': os.getpid(),
+        'views': query_profile.snapshot(),
+    })
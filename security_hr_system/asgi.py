@@ -0,0 +1,22 @@
+"""
+ASGI config for security_hr_system project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Misma aplicación que wsgi.py, pero las conexiones Server-Sent Events del
+centro de operaciones (attendance/live_events.py) quedan abiertas sin ocupar
+un worker. Para servirla con gunicorn:
+
+    gunicorn security_hr_system.asgi:application -k uvicorn.workers.UvicornWorker
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'security_hr_system.settings')
+
+application = get_asgi_application()
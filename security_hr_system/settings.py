@@ -127,6 +127,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.query_profiler.QueryProfilerMiddleware',  # Consultas y latencia por vista (primero para medir todo)
     'django.middleware.security.SecurityMiddleware',  # Habilitado para producción
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Servir archivos estáticos en producción
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -159,6 +160,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'security_hr_system.wsgi.application'
+ASGI_APPLICATION = 'security_hr_system.asgi.application'  # Eventos en vivo sin ocupar workers (ver asgi.py)
 
 
 # Database
@@ -252,6 +254,30 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 # Cloudinary ya está configurado al inicio del archivo
+# Desde Django 5.1 DEFAULT_FILE_STORAGE se ignora: el backend se activa con STORAGES
+STORAGES = {
+    'default': {'BACKEND': DEFAULT_FILE_STORAGE},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Subidas a Cloudinary (ver attendance/storage.py)
+# Escribir en un spool local y subir en segundo plano (la petición no espera a Cloudinary)
+CLOUDINARY_ASYNC_UPLOADS = os.environ.get('CLOUDINARY_ASYNC_UPLOADS', 'False').lower() == 'true'
+CLOUDINARY_SPOOL_DIR = os.environ.get('CLOUDINARY_SPOOL_DIR', str(BASE_DIR / 'media_spool'))
+CLOUDINARY_UPLOAD_WORKERS = int(os.environ.get('CLOUDINARY_UPLOAD_WORKERS', 2))
+# Segundos sin cambios antes de que un worker recoja archivos huérfanos del spool
+CLOUDINARY_SPOOL_STALE_SECONDS = int(os.environ.get('CLOUDINARY_SPOOL_STALE_SECONDS', 300))
+# Archivos mayores se suben por partes (mínimo 5 MB por parte)
+CLOUDINARY_CHUNK_SIZE = int(os.environ.get('CLOUDINARY_CHUNK_SIZE', 20 * 1024 * 1024))
+CLOUDINARY_HTTP_POOL_SIZE = int(os.environ.get('CLOUDINARY_HTTP_POOL_SIZE', 10))
+CLOUDINARY_TIMEOUT_SECONDS = int(os.environ.get('CLOUDINARY_TIMEOUT_SECONDS', 60))
+# Reintentos ante errores de red, 429 y 5xx (backoff exponencial desde la base)
+CLOUDINARY_UPLOAD_RETRIES = int(os.environ.get('CLOUDINARY_UPLOAD_RETRIES', 3))
+CLOUDINARY_RETRY_BACKOFF_SECONDS = float(os.environ.get('CLOUDINARY_RETRY_BACKOFF_SECONDS', 0.5))
+# Vigencia de la caché de existencia/tamaño de archivos
+CLOUDINARY_METADATA_TTL_SECONDS = int(os.environ.get('CLOUDINARY_METADATA_TTL_SECONDS', 86400))
+# Archivos subidos antes de activar Cloudinary se siguen sirviendo desde MEDIA_ROOT
+CLOUDINARY_LOCAL_FALLBACK = os.environ.get('CLOUDINARY_LOCAL_FALLBACK', 'True').lower() == 'true'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -318,6 +344,37 @@ ROBOFLOW_MODELS = {
     'person_detection': 'person-detection-j44uo/1',
 }
 
+# Análisis de IA concurrente de fotos de seguridad
+# Hilos del pool compartido (5 detectores por foto)
+AI_ANALYSIS_MAX_WORKERS = int(os.environ.get('AI_ANALYSIS_MAX_WORKERS', 10))
+# Timeout por detector en segundos
+AI_ANALYSIS_TIMEOUT_SECONDS = float(os.environ.get('AI_ANALYSIS_TIMEOUT_SECONDS', 10))
+# Conexiones keep-alive por host en la sesión HTTP compartida
+AI_HTTP_POOL_SIZE = int(os.environ.get('AI_HTTP_POOL_SIZE', 16))
+
+# Caché de resultados de IA por hash perceptual (ver attendance/ai_cache.py)
+AI_RESULT_CACHE_ENABLED = os.environ.get('AI_RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+AI_RESULT_CACHE_TTL_SECONDS = int(os.environ.get('AI_RESULT_CACHE_TTL_SECONDS', 86400))
+AI_RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('AI_RESULT_CACHE_MAX_ENTRIES', 20000))
+# Bits de diferencia (de 64) para considerar dos fotos casi idénticas; 0 = solo exactas
+# Los casi-duplicados se limitan al mismo empleado y nunca aplican al detector de armas
+AI_RESULT_CACHE_MAX_DISTANCE = int(os.environ.get('AI_RESULT_CACHE_MAX_DISTANCE', 0))
+# Antigüedad máxima de un casi-duplicado (segundos)
+AI_RESULT_CACHE_NEAR_SECONDS = int(os.environ.get('AI_RESULT_CACHE_NEAR_SECONDS', 300))
+# Entradas recientes por modelo revisadas al buscar casi-duplicados
+AI_RESULT_CACHE_NEAR_WINDOW = int(os.environ.get('AI_RESULT_CACHE_NEAR_WINDOW', 500))
+
+# Cola de análisis de IA en segundo plano (ver attendance/ai_queue.py)
+# Hilos por proceso web (0 = solo workers dedicados: manage.py run_ai_worker)
+AI_QUEUE_WORKERS = int(os.environ.get('AI_QUEUE_WORKERS', 2))
+AI_QUEUE_POLL_SECONDS = float(os.environ.get('AI_QUEUE_POLL_SECONDS', 2.0))
+# Segundos antes de considerar abandonado un análisis en proceso
+AI_QUEUE_TASK_TIMEOUT = int(os.environ.get('AI_QUEUE_TASK_TIMEOUT', 300))
+AI_QUEUE_MAX_ATTEMPTS = int(os.environ.get('AI_QUEUE_MAX_ATTEMPTS', 5))
+# Backoff exponencial entre reintentos (base y máximo en segundos)
+AI_QUEUE_RETRY_BASE_SECONDS = int(os.environ.get('AI_QUEUE_RETRY_BASE_SECONDS', 30))
+AI_QUEUE_RETRY_MAX_SECONDS = int(os.environ.get('AI_QUEUE_RETRY_MAX_SECONDS', 1800))
+
 # Firebase Configuration (Notificaciones Push)
 FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID', 'euro-security')
 FIREBASE_CREDENTIALS_JSON = os.environ.get('FIREBASE_CREDENTIALS_JSON', '{}')
@@ -342,6 +399,150 @@ ATTENDANCE_SETTINGS = {
     'LOCATION_RADIUS_METERS': 100,
 }
 
+# Caché de alcance de permisos por usuario (ver core/permission_scope.py)
+# Cada cuántos segundos se verifica si otro proceso cambió empleados, cargos o departamentos
+PERMISSION_SCOPE_REFRESH_SECONDS = int(os.environ.get('PERMISSION_SCOPE_REFRESH_SECONDS', 60))
+
+# Perfilado de consultas por vista (ver core/query_profiler.py, /health/queries/)
+QUERY_PROFILING_ENABLED = os.environ.get('QUERY_PROFILING_ENABLED', 'True').lower() == 'true'
+# En modo estricto superar un presupuesto lanza una excepción (activado por el test runner)
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False').lower() == 'true'
+TEST_RUNNER = 'core.test_runner.QueryBudgetTestRunner'
+# Máximo de consultas por nombre de URL (incluye sesión y autenticación); verificar con manage.py profile_views
+QUERY_BUDGETS = {
+    'health_check': 0,
+    'dashboard:home': 12,
+    'attendance:dashboard': 8,
+    'attendance:reports': 20,
+    'attendance:monthly_payroll_report': 10,
+    'attendance:export_monthly_payroll': 10,
+    'attendance:export_report': 6,
+    'attendance:locations_api': 8,
+    'attendance:gps_tracking_api': 8,
+    'attendance:work_areas_api': 6,
+}
+
+# Galería facial en memoria (identificación 1:N)
+# Cada cuántos segundos un worker verifica si otro proceso cambió perfiles
+FACE_GALLERY_REFRESH_SECONDS = int(os.environ.get('FACE_GALLERY_REFRESH_SECONDS', 300))
+# Perfiles mínimos para estandarizar las características; con menos la galería no puntúa
+FACE_STANDARDIZE_MIN_PROFILES = int(os.environ.get('FACE_STANDARDIZE_MIN_PROFILES', 10))
+# Umbral de similitud estandarizada para la verificación 1:1, medido con
+# calibrate_face_matching sobre fotos del personal. Sin definir (por defecto) la
+# verificación usa la confianza y el umbral del perfil como siempre
+FACE_VERIFY_THRESHOLD = float(os.environ['FACE_VERIFY_THRESHOLD']) if os.environ.get('FACE_VERIFY_THRESHOLD') else None
+
+# Directorio del detector DNN res10_300x300_ssd (ver download_models.py)
+FACE_DNN_MODEL_DIR = os.environ.get('FACE_DNN_MODEL_DIR', str(BASE_DIR / 'models'))
+
+# Detección de rostros: lado mayor de la miniatura y margen del ROI de refinamiento
+FACE_DETECTION_MAX_DIMENSION = int(os.environ.get('FACE_DETECTION_MAX_DIMENSION', 640))
+FACE_DETECTION_ROI_MARGIN = float(os.environ.get('FACE_DETECTION_ROI_MARGIN', 0.25))
+# Lado mayor al decodificar la foto de marcación (decodificación JPEG reducida)
+FACE_IMAGE_MAX_SIDE = int(os.environ.get('FACE_IMAGE_MAX_SIDE', 1280))
+
+# Versiones derivadas de las fotos de seguridad (ver attendance/image_derivatives.py)
+IMAGE_THUMBNAIL_MAX_SIDE = int(os.environ.get('IMAGE_THUMBNAIL_MAX_SIDE', 300))
+IMAGE_PREVIEW_MAX_SIDE = int(os.environ.get('IMAGE_PREVIEW_MAX_SIDE', 1024))
+# Imagen enviada a Roboflow/Face++ en lugar del original
+IMAGE_ANALYSIS_MAX_SIDE = int(os.environ.get('IMAGE_ANALYSIS_MAX_SIDE', 1280))
+IMAGE_DERIVATIVE_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_QUALITY', 85))
+
+# Marcación asíncrona: la verificación facial se procesa en una cola en base de datos
+ATTENDANCE_ASYNC_ENABLED = os.environ.get('ATTENDANCE_ASYNC_ENABLED', 'False').lower() == 'true'
+ATTENDANCE_QUEUE_MAX_PENDING = int(os.environ.get('ATTENDANCE_QUEUE_MAX_PENDING', 300))  # Back-pressure: 503 al superarlo
+ATTENDANCE_QUEUE_WORKERS = int(os.environ.get('ATTENDANCE_QUEUE_WORKERS', 2))  # Hilos por proceso web (0 = solo run_attendance_worker)
+ATTENDANCE_QUEUE_TASK_TIMEOUT = int(os.environ.get('ATTENDANCE_QUEUE_TASK_TIMEOUT', 120))  # Segundos antes de reintentar una tarea bloqueada
+ATTENDANCE_QUEUE_MAX_ATTEMPTS = int(os.environ.get('ATTENDANCE_QUEUE_MAX_ATTEMPTS', 3))
+ATTENDANCE_QUEUE_POLL_SECONDS = float(os.environ.get('ATTENDANCE_QUEUE_POLL_SECONDS', 1.0))
+ATTENDANCE_QUEUE_RETRY_AFTER = int(os.environ.get('ATTENDANCE_QUEUE_RETRY_AFTER', 10))
+
+# Kiosco de marcación por rostro (ver attendance/kiosk.py)
+# Interruptor de despliegue de la identificación 1:N del kiosco, por instalación:
+# habilitarlo cuando calibrate_face_matching, con las fotos del personal
+# registrado, recomiende KIOSK_MIN_SIMILARITY y KIOSK_AMBIGUITY_MARGIN y acepte
+# al menos el 90% de las capturas. Requiere además la galería calibrada
+# (FACE_STANDARDIZE_MIN_PROFILES perfiles activos)
+KIOSK_IDENTIFICATION_ENABLED = os.environ.get('KIOSK_IDENTIFICATION_ENABLED', 'False').lower() == 'true'
+KIOSK_MIN_SIMILARITY = float(os.environ.get('KIOSK_MIN_SIMILARITY', 0.67))  # Similitud estandarizada mínima del mejor candidato
+KIOSK_AMBIGUITY_MARGIN = float(os.environ.get('KIOSK_AMBIGUITY_MARGIN', 0.18))  # Diferencia mínima con el segundo candidato
+KIOSK_REPEAT_SECONDS = int(os.environ.get('KIOSK_REPEAT_SECONDS', 60))  # Capturas repetidas del mismo guardia no crean otra marcación
+# La cámara del kiosco ve el rostro de cerca: decodificación reducida y sin buscar rostros pequeños
+KIOSK_IMAGE_MAX_SIDE = int(os.environ.get('KIOSK_IMAGE_MAX_SIDE', 640))
+KIOSK_MIN_FACE_PIXELS = int(os.environ.get('KIOSK_MIN_FACE_PIXELS', 100))
+
+# Índice de geocercas en memoria (áreas de trabajo)
+# Tamaño de celda de la rejilla en grados (0.01° ≈ 1.1 km)
+GEOFENCE_CELL_DEGREES = float(os.environ.get('GEOFENCE_CELL_DEGREES', 0.01))
+# Cada cuántos segundos se verifica si otro proceso cambió áreas o asignaciones
+GEOFENCE_REFRESH_SECONDS = int(os.environ.get('GEOFENCE_REFRESH_SECONDS', 60))
+
+# Ingesta GPS por lotes (puntos acumulados offline por la PWA)
+GPS_BATCH_MAX_POINTS = int(os.environ.get('GPS_BATCH_MAX_POINTS', 500))
+# Antigüedad máxima aceptada de un punto reenviado
+GPS_BATCH_MAX_AGE_HOURS = int(os.environ.get('GPS_BATCH_MAX_AGE_HOURS', 72))
+
+# Almacenamiento por niveles del rastreo GPS (ver attendance/gps_storage.py)
+# Días que se conservan los puntos crudos; después se resumen por minuto
+GPS_RAW_RETENTION_DAYS = int(os.environ.get('GPS_RAW_RETENTION_DAYS', 30))
+# Días que se conservan los resúmenes por minuto; después se resumen por hora
+GPS_MINUTE_ROLLUP_RETENTION_DAYS = int(os.environ.get('GPS_MINUTE_ROLLUP_RETENTION_DAYS', 180))
+# Días que se conservan los resúmenes por hora (0 = indefinidamente)
+GPS_HOUR_ROLLUP_RETENTION_DAYS = int(os.environ.get('GPS_HOUR_ROLLUP_RETENTION_DAYS', 730))
+# Tipos de punto que nunca se borran al compactar
+GPS_RETENTION_KEEP_TYPES = os.environ.get('GPS_RETENTION_KEEP_TYPES', 'ATTENDANCE,EMERGENCY')
+GPS_COMPACTION_BATCH_SIZE = int(os.environ.get('GPS_COMPACTION_BATCH_SIZE', 5000))
+
+# Recorridos simplificados para mapas (ver attendance/gps_tracks.py)
+# Tolerancia de simplificación en píxeles del mapa según el zoom solicitado
+GPS_TRACK_TOLERANCE_PIXELS = float(os.environ.get('GPS_TRACK_TOLERANCE_PIXELS', 1.5))
+# Tolerancia en metros cuando no se indica zoom
+GPS_TRACK_DEFAULT_TOLERANCE_METERS = float(os.environ.get('GPS_TRACK_DEFAULT_TOLERANCE_METERS', 5))
+# Parada: permanecer dentro de este radio al menos este tiempo
+GPS_STOP_RADIUS_METERS = float(os.environ.get('GPS_STOP_RADIUS_METERS', 30))
+GPS_STOP_MIN_SECONDS = int(os.environ.get('GPS_STOP_MIN_SECONDS', 300))
+GPS_TRACK_MAX_DAYS = int(os.environ.get('GPS_TRACK_MAX_DAYS', 31))  # Rango máximo por petición
+
+# Motor de alertas de ubicación (ver attendance/gps_alerts.py)
+GPS_ALERT_COOLDOWN_MINUTES = int(os.environ.get('GPS_ALERT_COOLDOWN_MINUTES', 15))  # Misma alerta sin resolver
+GPS_ALERT_OUT_OF_AREA_SECONDS = int(os.environ.get('GPS_ALERT_OUT_OF_AREA_SECONDS', 60))  # Fuera del área de forma continua
+GPS_ALERT_NO_MOVEMENT_MINUTES = int(os.environ.get('GPS_ALERT_NO_MOVEMENT_MINUTES', 30))
+GPS_ALERT_NO_MOVEMENT_RADIUS_METERS = float(os.environ.get('GPS_ALERT_NO_MOVEMENT_RADIUS_METERS', 25))
+GPS_ALERT_BATTERY_LOW_PERCENT = int(os.environ.get('GPS_ALERT_BATTERY_LOW_PERCENT', 15))
+GPS_ALERT_BATTERY_CRITICAL_MINUTES = int(os.environ.get('GPS_ALERT_BATTERY_CRITICAL_MINUTES', 30))  # Autonomía estimada para nivel crítico
+GPS_ALERT_DEPARTURE_MINUTES = int(os.environ.get('GPS_ALERT_DEPARTURE_MINUTES', 10))  # Fuera del área antes del fin del turno
+# Cada cuántos segundos se recargan las asignaciones de turno
+GPS_ALERT_SHIFT_REFRESH_SECONDS = int(os.environ.get('GPS_ALERT_SHIFT_REFRESH_SECONDS', 300))
+GPS_ALERT_STATE_IDLE_HOURS = int(os.environ.get('GPS_ALERT_STATE_IDLE_HOURS', 12))  # Descartar estado sin puntos
+
+# Eventos en vivo para dashboards (ver attendance/live_events.py)
+# Eventos recientes que cada proceso conserva para reanudar con Last-Event-ID
+LIVE_EVENTS_BUFFER_SIZE = int(os.environ.get('LIVE_EVENTS_BUFFER_SIZE', 2000))
+# Duración de cada conexión SSE con ASGI; con WSGI se responde lo pendiente y el navegador se reconecta
+LIVE_EVENTS_STREAM_SECONDS = int(os.environ.get('LIVE_EVENTS_STREAM_SECONDS', 300))
+LIVE_EVENTS_WSGI_STREAM_SECONDS = int(os.environ.get('LIVE_EVENTS_WSGI_STREAM_SECONDS', 0))  # > 0 ocupa un worker por cliente
+LIVE_EVENTS_HEARTBEAT_SECONDS = int(os.environ.get('LIVE_EVENTS_HEARTBEAT_SECONDS', 15))
+LIVE_EVENTS_RETRY_MS = int(os.environ.get('LIVE_EVENTS_RETRY_MS', 5000))  # Espera del navegador antes de reconectar
+# Difundir eventos entre procesos con LISTEN/NOTIFY (solo PostgreSQL)
+LIVE_EVENTS_DB_NOTIFY = os.environ.get('LIVE_EVENTS_DB_NOTIFY', 'True').lower() == 'true'
+
+# Exportaciones CSV/Excel en streaming (ver attendance/exports.py)
+# Filas leídas por consulta con .iterator()
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+# Por encima de estas filas la exportación se prepara en segundo plano
+EXPORT_ASYNC_THRESHOLD_ROWS = int(os.environ.get('EXPORT_ASYNC_THRESHOLD_ROWS', 50000))
+EXPORT_QUEUE_WORKERS = int(os.environ.get('EXPORT_QUEUE_WORKERS', 1))  # Hilos por proceso web (0 = solo run_export_worker)
+EXPORT_QUEUE_POLL_SECONDS = float(os.environ.get('EXPORT_QUEUE_POLL_SECONDS', 5.0))
+EXPORT_QUEUE_TASK_TIMEOUT = int(os.environ.get('EXPORT_QUEUE_TASK_TIMEOUT', 1800))  # Segundos antes de reintentar una exportación bloqueada
+EXPORT_QUEUE_MAX_ATTEMPTS = int(os.environ.get('EXPORT_QUEUE_MAX_ATTEMPTS', 2))
+# Directorio privado de los archivos generados (fuera de MEDIA_ROOT, nunca en Cloudinary)
+EXPORT_STORAGE_ROOT = os.environ.get('EXPORT_STORAGE_ROOT', str(BASE_DIR / 'private_exports'))
+# Días que se conservan los archivos generados
+EXPORT_RETENTION_DAYS = int(os.environ.get('EXPORT_RETENTION_DAYS', 2))
+
+# Pruebas de carga (manage.py loadtest): líneas base JSON para detectar regresiones
+LOADTEST_BASELINE_DIR = os.environ.get('LOADTEST_BASELINE_DIR', os.path.join(BASE_DIR, 'loadtest_baselines'))
+
 # Configuración específica para EURO SECURITY
 COMPANY_NAME = 'EURO SECURITY'
 COMPANY_TAGLINE = 'Seguridad Física Profesional - Guayaquil, Ecuador'
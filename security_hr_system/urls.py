@@ -8,7 +8,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 from django.shortcuts import redirect
-from core.views import custom_logout
+from core.views import custom_logout, health_check, query_profile_view
 
 # Personalizar el admin
 admin.site.site_header = "EURO SECURITY - Administración"
@@ -35,6 +35,10 @@ urlpatterns = [
     # Autenticación
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', custom_logout, name='logout'),
+    
+    # Monitoreo
+    path('health/', health_check, name='health_check'),
+    path('health/queries/', query_profile_view, name='query_profile'),
     path('password_change/', auth_views.PasswordChangeView.as_view(template_name='registration/password_change.html'), name='password_change'),
     path('password_change/done/', auth_views.PasswordChangeDoneView.as_view(template_name='registration/password_change_done.html'), name='password_change_done'),
 ]
@@ -11,6 +11,10 @@ class BackgroundGPS {
         this.sendInterval = 30000; // 30 segundos
         this.maxRetries = 3;
         this.currentRetries = 0;
+        this.queueKey = 'euro_gps_queue';
+        this.maxQueueSize = 2000; // puntos guardados offline como máximo
+        this.batchSize = 200;     // puntos por petición al vaciar la cola
+        this.isFlushing = false;
         
         this.init();
     }
@@ -32,6 +36,9 @@ class BackgroundGPS {
         
         // Configurar eventos de visibilidad
         this.setupVisibilityHandlers();
+        
+        // Reenviar puntos acumulados al recuperar la conexión
+        window.addEventListener('online', () => this.flushQueue());
     }
     
     isUserLoggedIn() {
@@ -126,11 +133,12 @@ class BackgroundGPS {
                 return;
             }
             
-            // Enviar al servidor
-            const success = await this.sendLocationToServer(position);
+            // Encolar y enviar al servidor (incluye puntos pendientes offline)
+            this.enqueuePosition(position);
+            this.lastPosition = position;
+            const success = await this.flushQueue();
             
             if (success) {
-                this.lastPosition = position;
                 this.currentRetries = 0;
                 console.log('✅ Ubicación enviada exitosamente');
                 this.updateGPSStatus('active', `Última actualización: ${new Date().toLocaleTimeString()}`);
@@ -144,6 +152,61 @@ class BackgroundGPS {
         }
     }
     
+    loadQueue() {
+        try {
+            return JSON.parse(localStorage.getItem(this.queueKey) || '[]');
+        } catch (error) {
+            return [];
+        }
+    }
+    
+    saveQueue(queue) {
+        try {
+            localStorage.setItem(this.queueKey, JSON.stringify(queue.slice(-this.maxQueueSize)));
+        } catch (error) {
+            console.error('❌ Error guardando cola GPS:', error);
+        }
+    }
+    
+    enqueuePosition(position) {
+        const queue = this.loadQueue();
+        queue.push({
+            client_id: `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`,
+            latitude: position.latitude,
+            longitude: position.longitude,
+            accuracy: position.accuracy,
+            timestamp: position.timestamp,
+            source: 'background_tracking'
+        });
+        this.saveQueue(queue);
+    }
+    
+    async flushQueue() {
+        if (this.isFlushing || !navigator.onLine) {
+            return false;
+        }
+        
+        this.isFlushing = true;
+        try {
+            let queue = this.loadQueue();
+            while (queue.length) {
+                const batch = queue.slice(0, this.batchSize);
+                const success = await this.sendBatchToServer(batch);
+                if (!success) {
+                    return false;
+                }
+                
+                // Quitar solo lo enviado (pudieron encolarse puntos nuevos)
+                const sent = new Set(batch.map(point => point.client_id));
+                queue = this.loadQueue().filter(point => !sent.has(point.client_id));
+                this.saveQueue(queue);
+            }
+            return true;
+        } finally {
+            this.isFlushing = false;
+        }
+    }
+    
     getCurrentPosition() {
         return new Promise((resolve, reject) => {
             if (!navigator.geolocation) {
@@ -173,27 +236,30 @@ class BackgroundGPS {
         });
     }
     
-    async sendLocationToServer(position) {
+    async sendBatchToServer(points) {
         try {
             const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]')?.value || 
                              document.querySelector('meta[name="csrf-token"]')?.content;
             
-            const response = await fetch('/asistencia/actualizar-gps/', {
+            const response = await fetch('/asistencia/api/actualizar-gps/lote/', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                     'X-CSRFToken': csrfToken,
                 },
-                body: JSON.stringify({
-                    latitude: position.latitude,
-                    longitude: position.longitude,
-                    accuracy: position.accuracy,
-                    timestamp: position.timestamp,
-                    source: 'background_tracking'
-                })
+                body: JSON.stringify({ points: points })
             });
             
-            return response.ok;
+            if (response.ok) {
+                const result = await response.json();
+                if (result.rejected && result.rejected.length) {
+                    console.log(`⚠️ ${result.rejected.length} puntos GPS rechazados`, result.rejected);
+                }
+                return true;
+            }
+            
+            // Un lote inválido no se reintenta indefinidamente
+            return response.status === 400;
             
         } catch (error) {
             console.error('❌ Error enviando al servidor:', error);
@@ -6,6 +6,7 @@
 class EmployeeVideoSystem {
     constructor() {
         this.checkInterval = null;
+        this.subscription = null;
         this.currentSession = null;
         this.client = null;
         this.localTracks = {
@@ -18,9 +19,18 @@ class EmployeeVideoSystem {
      * Iniciar verificación de solicitudes de video
      */
     startChecking() {
-        if (this.checkInterval) return;
-
-        this.checkInterval = setInterval(() => this.checkPendingRequests(), 5000);
+        if (this.checkInterval || this.subscription) return;
+
+        this.checkPendingRequests();
+        if (window.LiveEvents) {
+            // El servidor avisa de cada solicitud; el sondeo queda como respaldo
+            this.subscription = LiveEvents.subscribe(['video'], {
+                video_request: () => this.checkPendingRequests(),
+                resync: () => this.checkPendingRequests()
+            }, { fallback: () => this.checkPendingRequests(), fallbackInterval: 5000 });
+        } else {
+            this.checkInterval = setInterval(() => this.checkPendingRequests(), 5000);
+        }
         console.log('✅ Verificación de solicitudes de video iniciada');
     }
 
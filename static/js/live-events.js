@@ -0,0 +1,73 @@
+/**
+ * Eventos en Vivo (Server-Sent Events)
+ * El servidor avisa cuando cambia una posición, llega una alerta o se
+ * solicita video, en lugar de que cada pantalla consulte periódicamente.
+ * Si el navegador no soporta EventSource o el flujo no logra conectarse,
+ * se vuelve al sondeo con la función de respaldo.
+ */
+
+window.LiveEvents = {
+    url: '/asistencia/operaciones/api/eventos/',
+
+    /**
+     * Suscribirse a canales del servidor
+     * @param {string[]} channels - 'positions', 'alerts' y/o 'video'
+     * @param {Object} handlers - función por tipo de evento: position,
+     *     security_alert, location_alert, video_request y resync (recargar todo)
+     * @param {Object} options - fallback: función de sondeo; fallbackInterval: ms
+     * @returns {{close: Function}}
+     */
+    subscribe(channels, handlers, options = {}) {
+        let fallbackTimer = null;
+
+        const startFallback = () => {
+            if (!options.fallback || fallbackTimer) return;
+            fallbackTimer = setInterval(options.fallback, options.fallbackInterval || 30000);
+            console.warn('⚠️ Eventos en vivo no disponibles, usando sondeo');
+        };
+
+        const stopFallback = () => {
+            if (!fallbackTimer) return;
+            clearInterval(fallbackTimer);
+            fallbackTimer = null;
+        };
+
+        if (!window.EventSource) {
+            startFallback();
+            return { close: stopFallback };
+        }
+
+        const source = new EventSource(`${this.url}?channels=${channels.join(',')}`);
+
+        Object.entries(handlers).forEach(([type, handler]) => {
+            source.addEventListener(type, event => {
+                try {
+                    handler(JSON.parse(event.data));
+                } catch (error) {
+                    console.error(`Error procesando evento ${type}:`, error);
+                }
+            });
+        });
+
+        // Cada respuesta puede terminar y el navegador se reconecta solo
+        // (Last-Event-ID): solo cuentan los intentos que no llegan a abrir
+        let failures = 0;
+        source.addEventListener('open', () => {
+            failures = 0;
+            stopFallback();
+        });
+        source.addEventListener('error', () => {
+            failures += 1;
+            if (source.readyState === EventSource.CLOSED || failures >= 3) {
+                startFallback();
+            }
+        });
+
+        return {
+            close() {
+                source.close();
+                stopFallback();
+            }
+        };
+    }
+};